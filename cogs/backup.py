@@ -1,5 +1,5 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import os
 import json
 import shutil
@@ -7,6 +7,7 @@ import datetime
 import zipfile
 import logging
 from .utils.config import ADMIN_USER_IDS, ADMIN_ROLE_IDS, COLORS
+from .utils.scheduler import get_scheduler, daily_at
 
 logger = logging.getLogger("Backup")
 
@@ -28,12 +29,16 @@ class Backup(commands.Cog):
         
         # Ensure backup directory exists
         os.makedirs(self.backup_dir, exist_ok=True)
-        
-        # Start automated backup loop
-        self.daily_backup_task.start()
+    
+    async def cog_load(self):
+        # Daily backup at 03:00 on the shared deadline scheduler (missed runs catch up on startup)
+        scheduler = get_scheduler(self.bot)
+        await scheduler.add_job("daily_backup", daily_at(3), self.daily_backup_task)
     
     def cog_unload(self):
-        self.daily_backup_task.cancel()
+        scheduler = getattr(self.bot, "scheduler", None)
+        if scheduler:
+            scheduler.remove_job("daily_backup")
     
     async def check_admin(self, ctx):
         """Check if user is admin"""
@@ -141,15 +146,8 @@ class Backup(commands.Cog):
             logger.error(f"Cleanup error: {e}")
             return []
     
-    @tasks.loop(hours=24)
     async def daily_backup_task(self):
         """Automated daily backup at 3 AM"""
-        now = datetime.datetime.now()
-        
-        # Only run at 3 AM (with 1 hour window)
-        if now.hour != 3:
-            return
-        
         logger.info("Running automated daily backup...")
         success, msg, backup_path = await self.create_backup()
         
@@ -162,10 +160,6 @@ class Backup(commands.Cog):
             # Send notification to admin (optional)
             # You could add a notification channel here
     
-    @daily_backup_task.before_loop
-    async def before_daily_backup(self):
-        await self.bot.wait_until_ready()
-    
     @commands.command(name='backup_now')
     async def backup_now(self, ctx):
         """Manuel olarak hemen yedek oluşturur."""
@@ -1,14 +1,20 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import os
 import datetime
 import asyncio
 
 # Database import
 from database.adapter import DatabaseAdapter
+from .utils.event_store import EventStore, event_to_dict, mention_id
+from .utils.event_timers import EventTimers
+from .utils.rsvp_aggregator import RSVPAggregator
+from .utils.dm_dispatcher import DMDispatcher
+from .utils.role_index import get_role_index
 
 # Auth Constants
-from .utils.config import ADMIN_USER_IDS, ADMIN_ROLE_IDS, CLAN_MEMBER_ROLE_IDS, COLORS, DEV_MODE, MANAGER_USER_IDS, MANAGER_ROLE_IDS
+from .utils.config import ADMIN_USER_IDS, ADMIN_ROLE_IDS, COLORS, DEV_MODE, MANAGER_USER_IDS, MANAGER_ROLE_IDS, EVENT_RSVP_FLUSH_SECONDS
+from .utils.config import DM_DISPATCH_WORKERS, DM_DISPATCH_RATE, DM_CLOSED_TTL_SECONDS
 import logging
 
 # Import custom exceptions
@@ -34,6 +40,17 @@ except ImportError:
 # Türkiye Saati (+3)
 TR_TIMEZONE = datetime.timezone(datetime.timedelta(hours=3))
 
+# Hatırlatma etkinlikten ne kadar önce gönderilir
+REMINDER_LEAD = datetime.timedelta(minutes=15)
+
+
+def set_rsvp_fields(embed, attendees, declined, tentative):
+    """Katılımcı alanlarını (ilk 3 field) günceller"""
+    embed.set_field_at(0, name=f"✅ Katılanlar ({len(attendees)})", value="\n".join(attendees) if attendees else "-", inline=True)
+    embed.set_field_at(1, name=f"❌ Katılmayanlar ({len(declined)})", value="\n".join(declined) if declined else "-", inline=True)
+    embed.set_field_at(2, name=f"❔ Belki ({len(tentative)})", value="\n".join(tentative) if tentative else "-", inline=True)
+    return embed
+
 class EventModal(discord.ui.Modal, title="Etkinlik Oluştur"):
     def __init__(self, bot, target_channel, image_url=None, wizard_message=None):
         super().__init__()
@@ -143,8 +160,8 @@ class EventModal(discord.ui.Modal, title="Etkinlik Oluştur"):
             max_event_id = await asyncio.to_thread(get_max_event_id)
             new_event_id = max_event_id + 1
             
-            # Add event to database
-            event_db_id = await cog.db.add_event(
+            # Add event to database (and in-memory store)
+            event_dict = await cog.store.add_event(
                 guild_id=guild_id,
                 event_id=new_event_id,
                 title=self.event_title.value,
@@ -155,14 +172,11 @@ class EventModal(discord.ui.Modal, title="Etkinlik Oluştur"):
             )
             
             # Update message_id in database
-            await cog.db.update_event_message(event_db_id, msg.id)
+            await cog.store.set_message(event_dict["db_id"], msg.id)
             
             # Update embed footer
             embed.set_footer(text=f"Cotabot Event System | ID: {new_event_id}")
             await msg.edit(embed=embed)
-
-            # Reload events from database to sync memory
-            cog.events = await cog.load_events_from_db()
             
             # Log
             log_channel = discord.utils.get(interaction.guild.text_channels, name="etkinlik-log")
@@ -245,23 +259,19 @@ class EventEditModal(discord.ui.Modal, title="Etkinliği Düzenle"):
         
         cog = self.bot.get_cog("Event")
         if cog:
-            # Find event in database by message_id
-            guild_id = interaction.guild.id
-            event_obj = await cog.db.get_event_by_message_id(guild_id, self.message.id)
+            # Find event by message_id (memory first, then database)
+            event_dict = await cog.find_event(interaction.guild.id, self.message.id)
             
-            if event_obj:
-                # Update event in database
-                await cog.db.update_event(
-                    event_db_id=event_obj.id,
+            if event_dict:
+                # Update event in database and memory
+                await cog.store.update_event(
+                    event_dict["db_id"],
                     title=self.event_title.value,
                     description=desc_text,
                     timestamp=local_time,
                     reminder_sent=False  # Reset reminder when editing
                 )
-                
-                # Reload events from database to sync memory
-                cog.events = await cog.load_events_from_db()
-                logger.info(f"Event #{event_obj.event_id} updated in database")
+                logger.info(f"Event #{event_dict['event_id']} updated in database")
         
         await interaction.response.send_message(f"✅ Etkinlik güncellendi!", ephemeral=True)
         
@@ -306,122 +316,67 @@ class EventView(discord.ui.View):
     def __init__(self):
         super().__init__(timeout=None)
 
-    async def log_action(self, interaction: discord.Interaction, action: str):
-        cog = interaction.client.get_cog("Event")
-        if cog:
-            is_active = False
-            msg_id = interaction.message.id
-            for events in cog.events.values():
-                for event in events:
-                    if event["message_id"] == msg_id:
-                        is_active = True
-                        break
-                if is_active: break
-            
-            if not is_active: return
-
-        guild = interaction.guild
-        log_channel = discord.utils.get(guild.text_channels, name="etkinlik-log")
-        if log_channel:
-            embed = discord.Embed(
-                title="📝 Etkinlik Güncellemesi",
-                description=f"**Kullanıcı:** {interaction.user.mention}\n**Olay:** {action}\n**Mesaj:** [Tıkla]({interaction.message.jump_url})",
-                color=discord.Color(COLORS.INFO)
-            )
-            embed.set_footer(text=f"Tarih: {datetime.datetime.now().strftime('%d.%m.%Y %H:%M:%S')}")
-            await log_channel.send(embed=embed)
-
     async def update_embed(self, interaction: discord.Interaction, status: str, reason: str = None):
         embed = interaction.message.embeds[0]
         user_mention = interaction.user.mention
         
         if len(embed.fields) < 3: return
 
-        attendees = self.get_users_from_field(embed.fields[0].value)
-        declined = self.get_users_from_field(embed.fields[1].value)
-        tentative = self.get_users_from_field(embed.fields[2].value)
-
-        attendees = [u for u in attendees if not u.startswith(user_mention)]
-        declined = [u for u in declined if not u.startswith(user_mention)]
-        tentative = [u for u in tentative if not u.startswith(user_mention)]
-
         action_text = ""
         should_log_mazeret = False
 
         if status == "join":
-            attendees.append(user_mention)
             action_text = "✅ Katıldı"
         elif status == "decline":
-            declined.append(user_mention)
             action_text = "❌ Katılmıyor"
             if reason: should_log_mazeret = True
         elif status == "maybe":
-            tentative.append(user_mention)
             action_text = "❔ Belki"
-            
-        embed.set_field_at(0, name=f"✅ Katılanlar ({len(attendees)})", value="\n".join(attendees) if attendees else "-", inline=True)
-        embed.set_field_at(1, name=f"❌ Katılmayanlar ({len(declined)})", value="\n".join(declined) if declined else "-", inline=True)
-        embed.set_field_at(2, name=f"❔ Belki ({len(tentative)})", value="\n".join(tentative) if tentative else "-", inline=True)
 
-        await interaction.response.edit_message(embed=embed)
-        
         cog = interaction.client.get_cog("Event")
-        if cog:
-            server_id = str(interaction.guild.id)
-            guild_id = interaction.guild.id
-            
-            # Find event in memory first
-            event_dict = None
-            if server_id in cog.events:
-                for event in cog.events[server_id]:
-                    if event["message_id"] == interaction.message.id:
-                        event_dict = event
-                        break
-            
-            # If not in memory, try database by message_id
-            if not event_dict:
-                event_obj = await cog.db.get_event_by_message_id(guild_id, interaction.message.id)
+        event_dict = cog.store.get_by_message(interaction.message.id) if cog else None
+        db_status = status if status != "join" else "attendee"
+        
+        if event_dict:
+            # Active event: acknowledge now, embed edit / DB write / broadcast / log are coalesced per burst
+            await interaction.response.defer()
+            cog.rsvp.submit(
+                event_dict, interaction.message,
+                user_id=interaction.user.id,
+                user_mention=user_mention,
+                username=interaction.user.display_name,
+                status=db_status,
+                reason=reason,
+                guild=interaction.guild,
+                log_line=f"{user_mention} — {action_text} — [Mesaj]({interaction.message.jump_url})"
+            )
+        else:
+            # Not in memory (archived / unknown): update this message directly
+            attendees = self.get_users_from_field(embed.fields[0].value)
+            declined = self.get_users_from_field(embed.fields[1].value)
+            tentative = self.get_users_from_field(embed.fields[2].value)
+
+            attendees = [u for u in attendees if not u.startswith(user_mention)]
+            declined = [u for u in declined if not u.startswith(user_mention)]
+            tentative = [u for u in tentative if not u.startswith(user_mention)]
+
+            if status == "join": attendees.append(user_mention)
+            elif status == "decline": declined.append(user_mention)
+            elif status == "maybe": tentative.append(user_mention)
+
+            set_rsvp_fields(embed, attendees, declined, tentative)
+            await interaction.response.edit_message(embed=embed)
+
+            if cog:
+                event_obj = await cog.db.get_event_by_message_id(interaction.guild.id, interaction.message.id)
                 if event_obj:
-                    # Convert to dict format
-                    event_dict = {
-                        "db_id": event_obj.id,
-                        "event_id": event_obj.event_id,
-                        "message_id": event_obj.message_id,
-                        "title": event_obj.title
-                    }
-            
-            if event_dict:
-                # Update participants in database
-                user_id = interaction.user.id
-                
-                await cog.db.add_event_participant(
-                    event_db_id=event_dict.get("db_id"),
-                    user_id=user_id,
-                    user_mention=user_mention,
-                    status=status if status != "join" else "attendee",
-                    reason=reason
-                )
-                
-                # Reload events from database
-                cog.events = await cog.load_events_from_db()
-                
-                # Broadcast to web admin panel for real-time updates
-                if SOCKETIO_AVAILABLE and broadcast_event:
-                    try:
-                        broadcast_event('event_participant_update', {
-                            'event_id': event_dict.get("event_id"),
-                            'db_id': event_dict.get("db_id"),
-                            'action': 'participant_update',
-                            'user_id': str(user_id),
-                            'username': interaction.user.display_name,
-                            'status': status if status != "join" else "attendee",
-                            'reason': reason
-                        })
-                        logger.info(f"📡 Broadcasted participant update for event #{event_dict.get('event_id')}")
-                    except Exception as e:
-                        logger.warning(f"Failed to broadcast event update to web: {e}")
-
-        await self.log_action(interaction, action_text)
+                    await cog.db.add_event_participant(
+                        event_db_id=event_obj.id,
+                        user_id=interaction.user.id,
+                        user_mention=user_mention,
+                        status=db_status,
+                        reason=reason
+                    )
 
         if should_log_mazeret:
             target_name = "oyuncu-mazeret"
@@ -491,14 +446,7 @@ class EventView(discord.ui.View):
                         has_permission = True; break
         
         cog = interaction.client.get_cog("Event")
-        found_event = None
-        if cog:
-            server_id = str(interaction.guild.id)
-            if server_id in cog.events:
-                for event in cog.events[server_id]:
-                    if event["message_id"] == interaction.message.id:
-                        found_event = event
-                        break
+        found_event = cog.store.get_by_message(interaction.message.id) if cog else None
         
         if found_event and interaction.user.id == found_event.get("author_id"): has_permission = True
         
@@ -548,17 +496,9 @@ class EventView(discord.ui.View):
         found_event = None
         guild_id = interaction.guild.id
         
-        # Get event from database
+        # Get event (memory first, then database)
         if cog:
-            event_obj = await cog.db.get_event_by_message_id(guild_id, interaction.message.id)
-            if event_obj:
-                # Convert to dict for compatibility
-                found_event = {
-                    "db_id": event_obj.id,
-                    "event_id": event_obj.event_id,
-                    "title": event_obj.title,
-                    "author_id": event_obj.creator_id
-                }
+            found_event = await cog.find_event(guild_id, interaction.message.id)
         
         if found_event and interaction.user.id == found_event.get("author_id"): has_permission = True
 
@@ -568,9 +508,7 @@ class EventView(discord.ui.View):
 
         # Deactivate event in database
         if found_event and cog:
-            await cog.db.deactivate_event(found_event["db_id"])
-            # Reload events from database to sync memory
-            cog.events = await cog.load_events_from_db()
+            await cog.store.deactivate(found_event["db_id"])
             logger.info(f"Event #{found_event['event_id']} deactivated in database")
         
         event_title = found_event.get("title", "Bilinmeyen Etkinlik") if found_event else "Bilinmeyen Etkinlik"
@@ -614,16 +552,19 @@ class EventView(discord.ui.View):
              return
         
         voice_channel = interaction.user.voice.channel
-        vc_members = {m.mention for m in voice_channel.members if not m.bot}
+        vc_ids = {m.id for m in voice_channel.members if not m.bot}
         
         embed = interaction.message.embeds[0]
         attendees_text = embed.fields[0].value
-        if attendees_text == "-": signed_users = set()
-        else: signed_users = set(attendees_text.split("\n"))
-
-        present_and_signed = vc_members.intersection(signed_users)
-        present_unsigned = vc_members.difference(signed_users)
-        absent_signed = signed_users.difference(vc_members)
+        signed_entries = [] if attendees_text == "-" else attendees_text.split("\n")
+        signed_ids = set(filter(None, map(mention_id, signed_entries)))
+        # Plain-name entries (old data) cannot be matched to a voice member
+        unmatched = [u for u in signed_entries if mention_id(u) is None]
+
+        def mentions(ids): return [f"<@{user_id}>" for user_id in sorted(ids)]
+        present_and_signed = mentions(vc_ids & signed_ids)
+        present_unsigned = mentions(vc_ids - signed_ids)
+        absent_signed = mentions(signed_ids - vc_ids) + unmatched
         
         report_embed = discord.Embed(
             title=f"📋 Yoklama Raporu: {embed.title.replace('📅 ', '')}", 
@@ -666,44 +607,31 @@ class EventView(discord.ui.View):
 
         # TikYok Logic
         embed = interaction.message.embeds[0]
-        all_reactors = []
-        def extract_mentions(field_val):
-            if field_val == "-": return []
-            return field_val.split("\n")
-
-        for i in range(3):
-            if len(embed.fields) > i:
-                users = extract_mentions(embed.fields[i].value)
-                all_reactors.extend(users)
-        
-        reacted_set = set(all_reactors)
-        target_members = set()
         group_name = "Klan Üyeleri (Varsayılan)"
-        
+        cog = interaction.client.get_cog("Event")
+        if not cog:
+            return
+
+        # Responded user IDs: store participants + mentions in the embed fields
+        event_dict = cog.store.get_by_message(interaction.message.id) or {}
+        responded = cog.responded_ids(event_dict)
+        for field in embed.fields[:3]:
+            if field.value != "-":
+                responded.update(filter(None, map(mention_id, field.value.split("\n"))))
+
         # Default to Clan Roles
-        found_roles = 0
-        for r_id in CLAN_MEMBER_ROLE_IDS:
-            r_obj = interaction.guild.get_role(r_id)
-            if r_obj:
-                target_members.update(r_obj.members)
-                found_roles += 1
-        
-        if found_roles == 0:
+        if not cog.roles.found_roles(interaction.guild):
             await interaction.response.send_message("⚠️ Varsayılan roller (CLAN_MEMBER_ROLE_IDS) sunucuda bulunamadı veya yapılandırılmadı.", ephemeral=True)
             return
 
-        missing_members = []
-        for member in target_members:
-            if member.bot: continue
-            if member.mention not in reacted_set:
-                missing_members.append(member)
+        missing_ids = sorted(cog.roles.missing(interaction.guild, responded))
 
-        if not missing_members:
+        if not missing_ids:
             await interaction.response.send_message(f"✅ **{group_name}** grubundaki herkes tepki vermiş!", ephemeral=True)
         else:
-            missing_list = "\n".join([m.mention for m in missing_members])
+            missing_list = "\n".join(f"<@{user_id}>" for user_id in missing_ids)
             result_embed = discord.Embed(
-                title=f"⚠️ {group_name} - Tepki Vermeyenler ({len(missing_members)})",
+                title=f"⚠️ {group_name} - Tepki Vermeyenler ({len(missing_ids)})",
                 description=missing_list if len(missing_list) < 4000 else "Liste çok uzun...",
                 color=discord.Color.orange()
             )
@@ -764,37 +692,16 @@ class EventManageActionsView(discord.ui.View):
         cog = self.bot.get_cog("Event")
         if cog:
             guild_id = interaction.guild.id
-            # Get event from database by message_id
-            event_obj = await cog.db.get_event_by_message_id(guild_id, self.message.id)
+            # Get event by message_id (memory first, then database)
+            event_dict = await cog.find_event(guild_id, self.message.id)
             
-            if event_obj:
-                # Archive event first (convert to dict format for archive function)
-                event_dict = {
-                    "db_id": event_obj.id,
-                    "event_id": event_obj.event_id,
-                    "title": event_obj.title,
-                    "attendees": [],
-                    "declined": [],
-                    "tentative": []
-                }
-                
-                # Load participants into dict format
-                if event_obj.participants:
-                    for p in event_obj.participants:
-                        if p.status == "attendee":
-                            event_dict["attendees"].append(p.user_mention)
-                        elif p.status == "declined":
-                            event_dict["declined"].append(p.user_mention)
-                        elif p.status == "tentative":
-                            event_dict["tentative"].append(p.user_mention)
-                
+            if event_dict:
+                # Archive event first
                 await cog.archive_event(event_dict, interaction.guild)
                 
-                # Deactivate event in database
-                await cog.db.deactivate_event(event_obj.id)
-                # Reload events from database to sync memory
-                cog.events = await cog.load_events_from_db()
-                logger.info(f"Event #{event_obj.event_id} archived and deactivated")
+                # Deactivate event in database and drop it from memory
+                await cog.store.deactivate(event_dict["db_id"])
+                logger.info(f"Event #{event_dict['event_id']} archived and deactivated")
         
         log_channel = discord.utils.get(interaction.guild.text_channels, name="etkinlik-log")
         if log_channel:
@@ -900,96 +807,102 @@ class Event(commands.Cog):
         self.db = DatabaseAdapter('sqlite:///cotabot_dev.db')
         # Initialize db tables
         self.db.init_db()
-        # Keep events dict for backward compatibility with views
-        self.events = {}
+        # Active events, loaded once and updated in place (see EventStore)
+        self.store = EventStore(self.db)
+        # Reminder / start deadlines, kept in sync through the store listener
+        self.timers = EventTimers(self._on_timer)
+        self.store.add_listener(self._on_event_changed)
+        # RSVP bursts: one embed edit / DB transaction / broadcast per window
+        self.rsvp = RSVPAggregator(
+            self.store, self._render_rsvp,
+            broadcast=broadcast_event if SOCKETIO_AVAILABLE else None,
+            send_log=self._send_rsvp_log,
+            window=EVENT_RSVP_FLUSH_SECONDS
+        )
+        # Reminder DMs: bounded, rate limited background delivery
+        self.dm = DMDispatcher(
+            workers=DM_DISPATCH_WORKERS,
+            rate=DM_DISPATCH_RATE,
+            closed_ttl=DM_CLOSED_TTL_SECONDS
+        )
         self.history = {}
+    
+    @property
+    def events(self):
+        """guild_id (str) -> [event dict], kept for backward compatibility with views"""
+        return self.store.by_guild
+
+    @property
+    def roles(self):
+        """Clan member ID sets per guild (shared RoleIndex)"""
+        return get_role_index(self.bot)
+
+    def responded_ids(self, event):
+        """User IDs that answered the event (join / decline / maybe)"""
+        ids = self.store.participant_ids(event.get("db_id"))
+        for key in ("attendees", "declined", "tentative"):
+            ids.update(filter(None, map(mention_id, event.get(key, []))))
+        return ids
         
     async def cog_load(self):
-        # Load events from database instead of JSON
-        self.events = await self.load_events_from_db()
         self.history = {}  # History not loaded in memory anymore
-        self.check_events_task.start()
-        self.check_reminders.start()
+        self.timers.start()
+        self.dm.start()
 
     def cog_unload(self):
-        self.check_events_task.cancel()
-        self.check_reminders.cancel()
+        self.timers.stop()
+        self.dm.stop()
+        asyncio.create_task(self.rsvp.close())
+
+    async def _render_rsvp(self, message, event_dict):
+        """Re-render participant fields of an event message from the store"""
+        embed = message.embeds[0]
+        set_rsvp_fields(embed, event_dict["attendees"], event_dict["declined"], event_dict["tentative"])
+        await message.edit(embed=embed)
+
+    async def _send_rsvp_log(self, guild, lines):
+        """RSVP clicks of one flush window -> a single #etkinlik-log message"""
+        log_channel = discord.utils.get(guild.text_channels, name="etkinlik-log")
+        if not log_channel:
+            return
+        # Embed descriptions are capped at 4096 characters, a message at 10 embeds
+        chunks, size = [[]], 0
+        for line in lines:
+            if size + len(line) > 4000:
+                chunks.append([])
+                size = 0
+            chunks[-1].append(line)
+            size += len(line) + 1
+        footer = f"Tarih: {datetime.datetime.now().strftime('%d.%m.%Y %H:%M:%S')}"
+        embeds = [
+            discord.Embed(title="📝 Etkinlik Güncellemesi", description="\n".join(chunk),
+                          color=discord.Color(COLORS.INFO)).set_footer(text=footer)
+            for chunk in chunks
+        ]
+        for i in range(0, len(embeds), 10):
+            await log_channel.send(embeds=embeds[i:i + 10])
 
     async def load_events_from_db(self):
-        """Load all active events from database and organize by guild_id"""
-        try:
-            # Get all guilds that bot is in
-            events_dict = {}
-            for guild in self.bot.guilds:
-                guild_id_str = str(guild.id)
-                active_events = await self.db.get_active_events(guild.id)
-                
-                if active_events:
-                    events_list = []
-                    for event in active_events:
-                        # Convert database event to dict format for compatibility
-                        event_dict = {
-                            "db_id": event.id,  # ADD THIS - database primary key
-                            "event_id": event.event_id,
-                            "message_id": event.message_id,
-                            "channel_id": event.channel_id,
-                            "author_id": event.creator_id,
-                            "title": event.title,
-                            "timestamp": event.timestamp.isoformat() if event.timestamp else "",
-                            "description": event.description or "",
-                            "attendees": [],
-                            "declined": [],
-                            "tentative": [],
-                            "reminder_sent": event.reminder_sent,
-                            "active": event.active
-                        }
-                        
-                        # Load participants
-                        if event.participants:
-                            for p in event.participants:
-                                if p.status == "attendee":
-                                    event_dict["attendees"].append(p.user_mention)
-                                elif p.status == "declined":
-                                    event_dict["declined"].append(p.user_mention)
-                                elif p.status == "tentative":
-                                    event_dict["tentative"].append(p.user_mention)
-                        
-                        events_list.append(event_dict)
-                    
-                    events_dict[guild_id_str] = events_list
-                    logger.info(f"Loaded {len(events_list)} events for guild {guild_id_str}")
-            
-            return events_dict
-        except Exception as e:
-            logger.error(f"Error loading events from database: {e}", exc_info=True)
-            return {}
-
-
+        """Load all active events from database into the store (startup)"""
+        await self.store.load([guild.id for guild in self.bot.guilds])
+        return self.store.by_guild
+
+    async def find_event(self, guild_id, message_id):
+        """Event dict by message ID: store first, database for events not in memory"""
+        event_dict = self.store.get_by_message(message_id)
+        if event_dict:
+            return event_dict
+        event_obj = await self.db.get_event_by_message_id(guild_id, message_id)
+        return event_to_dict(event_obj) if event_obj else None
 
     async def archive_event(self, event, guild):
         """Archive event - Database already marks event as inactive"""
-        server_id = str(guild.id)
         attendees = event.get("attendees", [])
         declined = event.get("declined", [])
         tentative = event.get("tentative", [])
-        all_interacted = set()
-        def extract_mention(text): return text.split(" ")[0]
-        for u in attendees: all_interacted.add(extract_mention(u))
-        for u in declined: all_interacted.add(extract_mention(u))
-        for u in tentative: all_interacted.add(extract_mention(u))
-        
-        missing_members = []
-        target_role_members = set()
-        for r_id in CLAN_MEMBER_ROLE_IDS:
-            role = guild.get_role(r_id)
-            if role:
-                for member in role.members:
-                    if not member.bot:
-                        target_role_members.add(member)
-        
-        for member in target_role_members:
-            if member.mention not in all_interacted:
-                missing_members.append(member.mention)
+
+        # Clan members (RoleIndex) that did not answer, compared by user ID
+        missing_members = self.roles.missing(guild, self.responded_ids(event))
         
         # Log archive stats
         logger.info(
@@ -1001,138 +914,113 @@ class Event(commands.Cog):
         # Database already has the event marked as inactive (active=False)
         # No need to write to JSON history file anymore
 
-    @tasks.loop(seconds=60)
-    async def check_reminders(self):
-        """Her dakika etkinlikleri kontrol eder ve 15 dk kala hatırlatma gönderir."""
-        now = datetime.datetime.now(TR_TIMEZONE)
-        data_changed = False
+    # === TIMERS ===
+    # Reminder (15 min before) and start/archive deadlines live in a min-heap
+    # (EventTimers); they are rescheduled whenever the store changes an event.
 
-        for server_id, events_list in self.events.items():
-            for event in events_list:
-                # Daha önce hatırlatma gönderildi mi veya etkinlik pasif mi?
-                if event.get("reminder_sent", False) or not event.get("active", True):
-                    continue
+    def _event_time(self, event):
+        try:
+            return datetime.datetime.fromisoformat(event["timestamp"]).replace(tzinfo=TR_TIMEZONE)
+        except (KeyError, ValueError):
+            return None  # Tarih formatı bozuksa atla
+
+    def _on_event_changed(self, event, removed):
+        """EventStore listener: keep the timer heap in sync with the event"""
+        db_id = event["db_id"]
+        self.timers.cancel(db_id)
+        if removed or not event.get("active", True):
+            return
 
-                try:
-                    event_time = datetime.datetime.fromisoformat(event["timestamp"]).replace(tzinfo=TR_TIMEZONE)
-                except ValueError:
-                    continue  # Tarih formatı bozuksa atla
+        event_time = self._event_time(event)
+        if not event_time:
+            return
 
-                # Zaman farkını hesapla
-                diff = event_time - now
-                
-                # 15 dakika kala (14-16 dk arası tolerans) ve etkinlik henüz başlamadıysa
-                if datetime.timedelta(minutes=14) <= diff <= datetime.timedelta(minutes=16):
-                    
-                    guild = self.bot.get_guild(int(server_id))
-                    if not guild: continue
-
-                    # 1. Genel Kanal Bildirimi
-                    channel_id = event.get("channel_id")
-                    channel = guild.get_channel(channel_id)
-                    
-                    if channel:
-                        try:
-                            msg_link = f"https://discord.com/channels/{server_id}/{channel_id}/{event['message_id']}"
-                            # Katılımcı rolünü etiketleyelim (eğer varsa configden çekilebilir ama şimdilik genel)
-                            # Daha spesifik: Katılımcıları etiketle? Çok spam olabilir.
-                            # Embed ile şık bir hatırlatma
-                            embed = discord.Embed(
-                                title="⏰ Etkinlik Hatırlatıcı",
-                                description=f"**{event['title']}** etkinliği yaklaşık **15 dakika** sonra başlayacak!\n\n[Etkinliğe Git]({msg_link})",
-                                color=discord.Color(COLORS.WARNING)
-                            )
-                            await channel.send(content="@here", embed=embed)
-                        except Exception as e:
-                            logger.error(f"Reminder Channel Error: {e}")
-
-                    # 2. Katılımcılara DM
-                    attendees = event.get("attendees", [])
-                    
-                    # DM gönderilecek kullanıcıları bul
-                    # attendees listesinde mention stringleri var ("<@123>" veya "Display Name")
-                    # Discord ID'yi mentiondan parse etmeliyiz
-                    
-                    for att in attendees:
-                        user_id = None
-                        if att.startswith("<@") and att.endswith(">"):
-                            try:
-                                user_id = int(att[2:-1].replace("!", ""))
-                            except: pass
-                        
-                        # Eğer ID bulamadıysak, metin tabanlı isim olabilir (Eski veri), DM atamayız.
-                        if user_id:
-                            member = guild.get_member(user_id)
-                            if member:
-                                try:
-                                    dm_embed = discord.Embed(
-                                        title=f"🔔 Hatırlatma: {event['title']}",
-                                        description=f"Etkinlik 15 dakika içinde başlıyor! Hazırlanın.\n\nZaman: <t:{int(event_time.timestamp())}:R>",
-                                        color=discord.Color(COLORS.INFO)
-                                    )
-                                    await member.send(embed=dm_embed)
-                                except discord.Forbidden:
-                                    pass # DM kapalı
-                                except Exception as e:
-                                    logger.error(f"DM Error ({member.display_name}): {e}")
-
-                    # 3. Update reminder status in database
-                    event_db_id = event.get("db_id")
-                    if event_db_id:
-                        await self.db.update_reminder_status(event_db_id, True)
-                        logger.info(f"Reminder sent for event #{event.get('event_id')}")
-                        data_changed = True
-        
-        if data_changed:
-            # Reload events from database to sync memory
-            self.events = await self.load_events_from_db()
+        start_ts = event_time.timestamp()
+        if not event.get("reminder_sent", False):
+            self.timers.schedule(db_id, "reminder", start_ts - REMINDER_LEAD.total_seconds())
+        self.timers.schedule(db_id, "start", start_ts)
+
+    async def _on_timer(self, db_id, action):
+        event = self.store.get(db_id)
+        if not event:
+            return
+        if action == "reminder":
+            await self.send_reminder(event)
+        elif action == "start":
+            await self.archive_started_event(event)
+
+    async def send_reminder(self, event):
+        """Etkinliğe 15 dk kala kanala ve katılımcılara hatırlatma gönderir."""
+        event_time = self._event_time(event)
+        # Bot kapalıyken kaçırılan hatırlatma, etkinlik başlamadıysa yine gönderilir
+        if not event_time or event.get("reminder_sent", False) or event_time <= datetime.datetime.now(TR_TIMEZONE):
+            return
+        server_id = self.store.guild_of(event["db_id"])
+
+        guild = self.bot.get_guild(int(server_id))
+        if not guild: return
 
-    @check_reminders.before_loop
-    async def before_check_reminders(self):
-        await self.bot.wait_until_ready()
+        # 1. Genel Kanal Bildirimi
+        channel_id = event.get("channel_id")
+        channel = guild.get_channel(channel_id)
+
+        if channel:
+            try:
+                msg_link = f"https://discord.com/channels/{server_id}/{channel_id}/{event['message_id']}"
+                # Katılımcı rolünü etiketleyelim (eğer varsa configden çekilebilir ama şimdilik genel)
+                # Daha spesifik: Katılımcıları etiketle? Çok spam olabilir.
+                # Embed ile şık bir hatırlatma
+                embed = discord.Embed(
+                    title="⏰ Etkinlik Hatırlatıcı",
+                    description=f"**{event['title']}** etkinliği yaklaşık **15 dakika** sonra başlayacak!\n\n[Etkinliğe Git]({msg_link})",
+                    color=discord.Color(COLORS.WARNING)
+                )
+                await channel.send(content="@here", embed=embed)
+            except Exception as e:
+                logger.error(f"Reminder Channel Error: {e}")
+
+        # 2. Katılımcılara DM (arka planda, hatırlatma zamanlayıcısını bekletmez)
+        # attendees listesinde mention stringleri var ("<@123>" veya "Display Name")
+        members = []
+        for att in event.get("attendees", []):
+            # Eğer ID bulamadıysak, metin tabanlı isim olabilir (Eski veri), DM atamayız.
+            user_id = mention_id(att)
+            if user_id:
+                member = guild.get_member(user_id)
+                if member:
+                    members.append(member)
+
+        dm_embed = discord.Embed(
+            title=f"🔔 Hatırlatma: {event['title']}",
+            description=f"Etkinlik 15 dakika içinde başlıyor! Hazırlanın.\n\nZaman: <t:{int(event_time.timestamp())}:R>",
+            color=discord.Color(COLORS.INFO)
+        )
+        self.dm.send_many(members, embed=dm_embed, tag=f"reminder #{event.get('event_id')}")
+
+        # 3. Update reminder status in database
+        await self.store.set_reminder_sent(event["db_id"], True)
+        logger.info(f"Reminder sent for event #{event.get('event_id')}")
 
     @commands.Cog.listener()
     async def on_ready(self):
         self.bot.add_view(EventView())
+        # Guilds are only known after ready; on_ready also fires on reconnects
+        if not self.store.loaded:
+            await self.load_events_from_db()
         logger.info('Event Cog ready and View loaded.')
 
     @commands.command(name='etkinlikler', aliases=['events'])
     async def list_events(self, ctx):
         try:
             # Fetch events from DB (Active + Archived, limit 25)
-            # Use get_all_events
-            events_obj = await self.db.get_all_events(ctx.guild.id, limit=25)
+            events_obj = (await self.db.get_events_bulk([ctx.guild.id], active_only=False, limit_per_guild=25))[ctx.guild.id]
             
             if not events_obj:
                 await ctx.send("📭 Kayıtlı etkinlik bulunmuyor.")
                 return
 
-            events_list = []
-            for event in events_obj:
-                # Convert database event to dict format for compatibility
-                event_dict = {
-                    "db_id": event.id,
-                    "event_id": event.event_id,
-                    "message_id": event.message_id,
-                    "channel_id": event.channel_id,
-                    "author_id": event.creator_id,
-                    "title": event.title,
-                    "timestamp": event.timestamp.isoformat() if event.timestamp else "",
-                    "description": event.description or "",
-                    "attendees": [],
-                    "declined": [],
-                    "tentative": [],
-                    "reminder_sent": event.reminder_sent,
-                    "active": event.active
-                }
-                
-                if event.participants:
-                    for p in event.participants:
-                        if p.status == "attendee": event_dict["attendees"].append(p.user_mention)
-                        elif p.status == "declined": event_dict["declined"].append(p.user_mention)
-                        elif p.status == "tentative": event_dict["tentative"].append(p.user_mention)
-                
-                events_list.append(event_dict)
+            # Convert database events to dict format for compatibility
+            events_list = [event_to_dict(event) for event in events_obj]
             
             embed = discord.Embed(title="📅 Etkinlik Listesi (Son 25)", color=discord.Color(COLORS.INFO))
             desc = ""
@@ -1185,62 +1073,47 @@ class Event(commands.Cog):
 
     # !tikyok command removed (moved to EventView button)
 
-    @tasks.loop(hours=1)
-    async def check_events_task(self):
-        """Saatlik kontrol: Geçmiş etkinlikleri arşivle. Deprecated in favor of check_reminders."""
-        data_changed = False
-        now = datetime.datetime.now(TR_TIMEZONE)
-        
-        for server_id, events in list(self.events.items()):
-            for event in list(events):
+    async def archive_started_event(self, event):
+        """Başlayan etkinliği arşivler ve kanala başlangıç bildirimi gönderir."""
+        try:
+            channel = self.bot.get_channel(event["channel_id"])
+            guild_id = self.store.guild_of(event["db_id"])
+            guild = channel.guild if channel else (self.bot.get_guild(int(guild_id)) if guild_id else None)
+            if guild:
                 try:
-                    # Check if event has started and archive it
-                    event_time = datetime.datetime.fromisoformat(event["timestamp"]).replace(tzinfo=TR_TIMEZONE)
-                    
-                    if now >= event_time:
-                        try:
-                            guild_id = int(server_id)
-                            channel = self.bot.get_channel(event["channel_id"])
-                            if channel:
-                                await self.archive_event(event, channel.guild)
-                                
-                                # Deactivate in database
-                                event_db_id = event.get("db_id")
-                                if event_db_id:
-                                    await self.db.deactivate_event(event_db_id)
-                                    logger.info(f"Event #{event.get('event_id')} started and archived")
-                                    data_changed = True
-                                
-                                # Optional: Send notification
-                                try:
-                                    msg = await channel.fetch_message(event["message_id"])
-                                    embed = msg.embeds[0]
-                                    attendees_field = embed.fields[0].value if embed.fields else "-"
-                                    if attendees_field != "-":
-                                        await channel.send(f"⏰ **{event['title']}** etkinliği başlıyor!\n{attendees_field}")
-                                    else:
-                                        await channel.send(f"⏰ **{event['title']}** etkinliği başlıyor! (Katılan kimse görünmüyor)")
-                                    
-                                    log_channel = discord.utils.get(channel.guild.text_channels, name="etkinlik-log")
-                                    if log_channel:
-                                        await log_channel.send(f"🏁 **Etkinlik Başladı ve Arşivlendi:** {event['title']}")
-                                except discord.NotFound:
-                                    logger.warning(f"Event message not found for event #{event.get('event_id')}")
-                                except Exception as e:
-                                    logger.error(f"Error notifying event start: {e}")
-                        except Exception as e:
-                            logger.error(f"Event archive error: {e}")
-                            
+                    await self.archive_event(event, guild)
                 except Exception as e:
-                    logger.error(f"Event processing error: {e}")
+                    logger.error(f"Event archive stats error: {e}")
 
-        if data_changed:
-            # Reload events from database to sync memory
-            self.events = await self.load_events_from_db()
+            # Deactivate even without a channel: the start timer has fired and is not rescheduled
+            event_db_id = event.get("db_id")
+            if event_db_id:
+                await self.store.deactivate(event_db_id)
+                logger.info(f"Event #{event.get('event_id')} started and archived")
 
-    @check_events_task.before_loop
-    async def before_check_events(self):
-        await self.bot.wait_until_ready()
+            if not channel:
+                logger.warning(f"Channel not found for event #{event.get('event_id')}, start notification skipped")
+                return
+
+            # Optional: Send notification
+            try:
+                msg = await channel.fetch_message(event["message_id"])
+                embed = msg.embeds[0]
+                attendees_field = embed.fields[0].value if embed.fields else "-"
+                if attendees_field != "-":
+                    await channel.send(f"⏰ **{event['title']}** etkinliği başlıyor!\n{attendees_field}")
+                else:
+                    await channel.send(f"⏰ **{event['title']}** etkinliği başlıyor! (Katılan kimse görünmüyor)")
+
+                log_channel = discord.utils.get(channel.guild.text_channels, name="etkinlik-log")
+                if log_channel:
+                    await log_channel.send(f"🏁 **Etkinlik Başladı ve Arşivlendi:** {event['title']}")
+            except discord.NotFound:
+                logger.warning(f"Event message not found for event #{event.get('event_id')}")
+            except Exception as e:
+                logger.error(f"Error notifying event start: {e}")
+        except Exception as e:
+            logger.error(f"Event archive error: {e}")
 
 async def setup(bot):
     await bot.add_cog(Event(bot))
@@ -47,7 +47,8 @@ class Help(commands.Cog):
             f"`{prefix}squad` Sunucu anlık durumu (Oyuncu, Map, Queue)\n"
             f"`{prefix}player <isim/ID>` Oyuncu arama ve detayları\n"
             f"`{prefix}squad_top` Top 10 Oyuncu sıralaması (Puan)\n"
-            f"`{prefix}squad_season` Top 10 Sezon sıralaması"
+            f"`{prefix}squad_season` Top 10 Sezon sıralaması\n"
+            f"`{prefix}oyun_saatleri [oyuncu]` En yoğun oyun saatleri ve birlikte oynananlar"
         )
         embed.add_field(name="🎮 Squad & Oyuncu", value=squad_desc, inline=False)
 
@@ -55,6 +56,8 @@ class Help(commands.Cog):
         voice_desc = (
             f"`{prefix}stat [kullanıcı]` Ses istatistikleri ve kanal dağılımı\n"
             f"`{prefix}top10` En aktif ses kullanıcıları\n"
+            f"`{prefix}yoğunluk [kullanıcı]` En yoğun ses gün/saatleri\n"
+            f"`{prefix}geçmiş [kullanıcı] [gün/hafta]` Ses oturum geçmişi\n"
             f"`{prefix}duyuru` İnteraktif etkinlik oluşturma sihirbazı"
         )
         embed.add_field(name="🎤 Ses & Etkinlik", value=voice_desc, inline=False)
@@ -121,6 +124,7 @@ class Help(commands.Cog):
             (f"{prefix}squad_top", "En yüksek puana sahip top 10 oyuncuyu sıralar. Genel liderboard."),
             (f"{prefix}squad_season", "Sezonluk en iyi 10 oyuncuyu gösterir. Sezon başından itibaren kazanılan puanlara göre sıralama."),
             (f"{prefix}aktiflik_panel", "Kişisel aktiflik panelini gösterir. Son 30 günlük oynama sürenizi ve sıralamanızı görüntüler."),
+            (f"{prefix}oyun_saatleri [oyuncu]", "Son 4 haftanın en yoğun oyun gün/saatlerini gösterir. Oyuncu verilirse (isim, Steam ID veya @üye) onun saatlerini ve en çok birlikte oynadığı oyuncuları listeler."),
         ]
         
         for cmd, desc in squad_commands:
@@ -138,6 +142,8 @@ class Help(commands.Cog):
         voice_commands = [
             (f"{prefix}stat [kullanıcı]", "Ses kanalı istatistiklerini gösterir. Kullanıcı belirtilmezse kendini, belirtilirse o kişiyi gösterir. Toplam süre, kanal dağılımı, günlük ortalama."),
             (f"{prefix}top10", "En aktif ses kullanıcılarının top 10 listesi. Son 30 gün içindeki toplam ses sürelerine göre sıralama."),
+            (f"{prefix}yoğunluk [kullanıcı]", "Son 4 haftanın en yoğun ses gün/saatleri ve en çok kullanılan kanallar. Kullanıcı belirtilirse o kişinin haftalık düzeni."),
+            (f"{prefix}geçmiş [kullanıcı] [gün/hafta]", "Ses oturumlarını yeniden eskiye sayfa sayfa listeler. `gün` veya `hafta` yazılırsa günlük (son 14 gün) ya da haftalık (son 12 hafta) toplamları gösterir."),
             (f"{prefix}duyuru", "İnteraktif etkinlik oluşturma sihirbazı başlatır. Başlık, açıklama, tarih, katılımcı sayısı gibi bilgileri adım adım alır."),
         ]
         
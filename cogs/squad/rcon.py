@@ -0,0 +1,372 @@
+"""
+Squad Players - Squad RCON Client
+Squad sunucusuna kalıcı, doğrulanmış bir RCON bağlantısı tutar: ListPlayers
+ile anlık oyuncu listesi (BattleMetrics snapshot formatında) ve sunucunun
+kendiliğinden gönderdiği sohbet/yayın paketleri.
+
+Canlı sunucu olmadan test için tests/fake_rcon_server.py kullanılır
+(tests/verify_rcon.py).
+"""
+import asyncio
+import datetime
+import json
+import logging
+import re
+import struct
+from typing import Dict, List, NamedTuple, Optional
+
+from exceptions import RconError
+
+logger = logging.getLogger("SquadPlayers.Rcon")
+
+# Packet types (Source RCON + Squad's chat packets)
+SERVERDATA_RESPONSE_VALUE = 0
+SERVERDATA_CHAT_VALUE = 1
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_AUTH_RESPONSE = 2
+SERVERDATA_AUTH = 3
+
+_HEADER = struct.Struct("<iii")
+MAX_PACKET_BYTES = 1 << 16
+
+
+def encode_packet(packet_id: int, packet_type: int, body: str = "") -> bytes:
+    payload = body.encode("utf-8") + b"\x00\x00"
+    return _HEADER.pack(len(payload) + 8, packet_id, packet_type) + payload
+
+
+async def read_packet(reader: asyncio.StreamReader):
+    """(id, type, body) of the next packet; raises IncompleteReadError on EOF"""
+    size, packet_id, packet_type = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if size < 10 or size > MAX_PACKET_BYTES:
+        raise RconError(f"Invalid RCON packet size {size}")
+    payload = await reader.readexactly(size - 8)
+    return packet_id, packet_type, payload[:-2].decode("utf-8", errors="replace")
+
+
+# === RECORDS ===
+
+class RconPlayer(NamedTuple):
+    player_id: int
+    eos_id: Optional[str]
+    steam_id: Optional[str]
+    name: str
+    team_id: Optional[int]
+    squad_id: Optional[int]
+    is_leader: bool
+    role: Optional[str]
+
+
+class ChatMessage(NamedTuple):
+    time: datetime.datetime
+    channel: str
+    name: str
+    steam_id: Optional[str]
+    eos_id: Optional[str]
+    message: str
+
+
+class ServerBroadcast(NamedTuple):
+    """Any other unsolicited packet (admin camera, kicks, warns, ...)"""
+    time: datetime.datetime
+    body: str
+
+
+# [ChatAll] [Online IDs:EOS: 0002... steam: 7656...] Name : message
+# [ChatAll] [SteamID:7656...] Name : message  (before Squad 7)
+_CHAT = re.compile(
+    r"\[(Chat\w+)\] \[(?:Online IDs:EOS: ([0-9a-f]+)(?: steam: (\d{17}))?|SteamID:(\d{17}))\] (.+?) : (.*)",
+    re.DOTALL
+)
+_ONLINE_IDS = re.compile(r"EOS: ([0-9a-f]+)(?: steam: (\d{17}))?")
+
+
+def _optional_int(value):
+    return int(value) if value and value.isdigit() else None
+
+
+def parse_list_players(body: str) -> List[RconPlayer]:
+    """
+    Active players of a ListPlayers response.
+
+    Each line is a " | " separated list of "Key: value" fields; both the
+    current "Online IDs: EOS: ... steam: ..." and the older "SteamID: ..."
+    forms are accepted. The "Recently Disconnected" section is ignored.
+    """
+    players = []
+    for line in body.splitlines():
+        if line.startswith("-----") and "Disconnected" in line:
+            break
+        if not line.startswith("ID: "):
+            continue
+        fields = {}
+        for part in line.split(" | "):
+            key, _, value = part.partition(": ")
+            fields[key.strip()] = value.strip()
+        eos_id = steam_id = None
+        if "Online IDs" in fields:
+            m = _ONLINE_IDS.search(fields["Online IDs"])
+            if m:
+                eos_id, steam_id = m.groups()
+        else:
+            steam_id = fields.get("SteamID") or None
+        players.append(RconPlayer(
+            int(fields["ID"]) if fields["ID"].isdigit() else -1,
+            eos_id,
+            steam_id,
+            fields.get("Name", "Unknown"),
+            _optional_int(fields.get("Team ID")),
+            _optional_int(fields.get("Squad ID")),
+            fields.get("Is Leader") == "True",
+            fields.get("Role")
+        ))
+    return players
+
+
+def parse_broadcast(body: str, at: datetime.datetime = None):
+    at = at or datetime.datetime.now()
+    m = _CHAT.match(body)
+    if m is None:
+        return ServerBroadcast(at, body)
+    channel, eos_id, steam_id, legacy_steam_id, name, message = m.groups()
+    return ChatMessage(at, channel, name, steam_id or legacy_steam_id, eos_id, message)
+
+
+# === CLIENT ===
+
+class SquadRcon:
+    """
+    Persistent Squad RCON connection.
+
+    The connection is opened (and authenticated) by the first command and
+    kept open; a background reader routes responses to the waiting command
+    by packet ID and hands chat/broadcast packets to the listeners. If the
+    connection drops, waiting commands fail with RconError and the next
+    command reconnects, backing off up to `max_backoff` seconds between
+    failed attempts.
+
+    Multi-packet responses are terminated the usual way: every command is
+    followed by an empty RESPONSE_VALUE packet with the next ID, and the
+    command is complete once the server echoes that ID back.
+    """
+
+    def __init__(self, host: str, port: int, password: str, server_id: Optional[str] = None,
+                 timeout: float = 10.0, max_backoff: float = 60.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.server_id = server_id
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._connect_lock = asyncio.Lock()
+        self._next_id = 1
+        # command id -> {"chunks": [...], "future"}; terminator id -> command id
+        self._pending = {}
+        self._terminators = {}
+        self._auth_future = None
+        self._backoff = 0.0
+        self._retry_at = None
+
+        self._listeners = []
+        self.stats = {"commands": 0, "connects": 0, "broadcasts": 0}
+
+    def add_listener(self, callback):
+        """callback(event) for every ChatMessage / ServerBroadcast (sync or async)"""
+        self._listeners.append(callback)
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    def _new_id(self) -> int:
+        packet_id = self._next_id
+        # Keep IDs positive; -1 is the server's "auth failed" answer
+        self._next_id = self._next_id + 1 if self._next_id < 2 ** 30 else 1
+        return packet_id
+
+    # === Connection ===
+
+    async def connect(self):
+        async with self._connect_lock:
+            if self.connected:
+                return
+            now = asyncio.get_running_loop().time()
+            if self._retry_at and now < self._retry_at:
+                raise RconError(f"RCON {self.host}:{self.port} unavailable, retrying in {self._retry_at - now:.0f}s")
+            try:
+                await self._open()
+            except (OSError, asyncio.TimeoutError, RconError) as e:
+                self._backoff = min(max(self._backoff * 2, 1.0), self.max_backoff)
+                self._retry_at = asyncio.get_running_loop().time() + self._backoff
+                await self._drop(e)
+                if isinstance(e, RconError):
+                    raise
+                raise RconError(f"RCON connection to {self.host}:{self.port} failed: {e}") from e
+            self._backoff = 0.0
+            self._retry_at = None
+            self.stats["connects"] += 1
+            logger.info(f"RCON connected to {self.host}:{self.port}")
+
+    async def _open(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        self._auth_future = asyncio.get_running_loop().create_future()
+        self._read_task = asyncio.create_task(self._read_loop(self._reader))
+        auth_id = self._new_id()
+        self._writer.write(encode_packet(auth_id, SERVERDATA_AUTH, self.password))
+        await self._writer.drain()
+        answer = await asyncio.wait_for(self._auth_future, self.timeout)
+        if answer != auth_id:
+            raise RconError(f"RCON authentication failed for {self.host}:{self.port}")
+
+    async def _read_loop(self, reader):
+        error = None
+        try:
+            while True:
+                packet_id, packet_type, body = await read_packet(reader)
+                self._dispatch(packet_id, packet_type, body)
+        except asyncio.CancelledError:
+            raise
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            error = e
+        except Exception as e:
+            logger.error(f"RCON reader error: {e}", exc_info=True)
+            error = e
+        if reader is self._reader:
+            logger.warning(f"RCON connection to {self.host}:{self.port} lost: {error!r}")
+            await self._drop(error)
+
+    def _dispatch(self, packet_id, packet_type, body):
+        if packet_type == SERVERDATA_CHAT_VALUE:
+            self._notify(parse_broadcast(body))
+            return
+        if packet_type == SERVERDATA_AUTH_RESPONSE and self._auth_future and not self._auth_future.done():
+            self._auth_future.set_result(packet_id)
+            return
+
+        command_id = self._terminators.pop(packet_id, None)
+        if command_id is not None:
+            pending = self._pending.pop(command_id, None)
+            if pending and not pending["future"].done():
+                pending["future"].set_result("".join(pending["chunks"]))
+            return
+        pending = self._pending.get(packet_id)
+        if pending is not None:
+            pending["chunks"].append(body)
+        # Anything else is the second half of a terminator echo or an
+        # answer to a command that already timed out
+
+    def _notify(self, event):
+        self.stats["broadcasts"] += 1
+        for callback in self._listeners:
+            try:
+                result = callback(event)
+                if asyncio.iscoroutine(result):
+                    asyncio.create_task(result)
+            except Exception as e:
+                logger.error(f"RCON listener error: {e}", exc_info=True)
+
+    async def _drop(self, error=None):
+        writer, self._writer, self._reader = self._writer, None, None
+        task, self._read_task = self._read_task, None
+        if writer:
+            writer.close()
+        if task and task is not asyncio.current_task():
+            task.cancel()
+        failure = RconError(f"RCON connection to {self.host}:{self.port} closed: {error!r}")
+        for pending in self._pending.values():
+            if not pending["future"].done():
+                pending["future"].set_exception(failure)
+        self._pending.clear()
+        self._terminators.clear()
+        if self._auth_future and not self._auth_future.done():
+            self._auth_future.set_exception(failure)
+
+    async def close(self):
+        await self._drop(None)
+
+    # === Commands ===
+
+    async def execute(self, command: str) -> str:
+        """Run one RCON command and return its (possibly multi-packet) response"""
+        if not self.connected:
+            await self.connect()
+        command_id, terminator_id = self._new_id(), self._new_id()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[command_id] = {"chunks": [], "future": future}
+        self._terminators[terminator_id] = command_id
+        try:
+            self._writer.write(encode_packet(command_id, SERVERDATA_EXECCOMMAND, command))
+            self._writer.write(encode_packet(terminator_id, SERVERDATA_RESPONSE_VALUE))
+            await self._writer.drain()
+            self.stats["commands"] += 1
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise RconError(f"RCON command '{command}' timed out after {self.timeout}s")
+        except (OSError, AttributeError) as e:
+            await self._drop(e)
+            raise RconError(f"RCON command '{command}' failed: {e}") from e
+        finally:
+            self._pending.pop(command_id, None)
+            self._terminators.pop(terminator_id, None)
+
+    async def list_players(self) -> List[RconPlayer]:
+        return parse_list_players(await self.execute("ListPlayers"))
+
+    async def server_info(self) -> Dict:
+        """ShowServerInfo as a dict (ServerName_s, MapName_s, PlayerCount_I, MaxPlayers, ...)"""
+        body = await self.execute("ShowServerInfo")
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise RconError(f"Invalid ShowServerInfo response: {e}") from e
+
+    async def snapshot(self) -> Optional[Dict]:
+        """
+        Online players in the fetch_battlemetrics_snapshot format, or None on error.
+
+        There is no BattleMetrics player ID, so readers key players by
+        steam_id; players without a Steam ID are left out.
+        """
+        try:
+            players = await self.list_players()
+        except RconError as e:
+            logger.error(f"RCON snapshot failed: {e}")
+            return None
+        return {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "server_id": self.server_id,
+            "source": "rcon",
+            "players": [
+                {
+                    "steam_id": p.steam_id,
+                    "name": p.name,
+                    "battlemetrics_id": None,
+                    "eos_id": p.eos_id,
+                    "team_id": p.team_id,
+                    "squad_id": p.squad_id
+                }
+                for p in players if p.steam_id
+            ]
+        }
+
+
+def get_rcon(bot, server_id) -> Optional[SquadRcon]:
+    """Shared RCON client of a BattleMetrics server ID (None when it has no SQUAD_RCON_SERVERS entry)."""
+    from ..utils.config import SQUAD_RCON_SERVERS
+    cfg = SQUAD_RCON_SERVERS.get(str(server_id)) if server_id else None
+    if not cfg:
+        return None
+    clients = getattr(bot, "rcon_clients", None)
+    if clients is None:
+        clients = bot.rcon_clients = {}
+    client = clients.get(str(server_id))
+    if client is None:
+        client = SquadRcon(cfg["host"], int(cfg.get("port", 21114)), cfg["password"], server_id=str(server_id))
+        clients[str(server_id)] = client
+    return client
@@ -0,0 +1,289 @@
+"""
+Squad Players - Report Export Pipeline
+Rapor satırlarını veritabanından akış halinde okuyup Excel/PDF/CSV/NDJSON üretir.
+
+Fonksiyonlar ayrı bir süreçte (ProcessPoolExecutor) çalışacak şekilde
+modül seviyesinde ve discord'a bağımlılık olmadan yazılmıştır.
+"""
+import csv
+import datetime
+import io
+import json
+import logging
+
+logger = logging.getLogger("SquadPlayers.Export")
+
+EXPORT_FORMATS = ("excel", "pdf", "csv", "ndjson")
+
+EXTENSIONS = {"excel": "xlsx", "pdf": "pdf", "csv": "csv", "ndjson": "ndjson"}
+
+# Header, row key
+COLUMNS = (
+    ("Sıra", "rank"),
+    ("Oyuncu", "name"),
+    ("Score", "score"),
+    ("Kills", "kills"),
+    ("Deaths", "deaths"),
+    ("K/D", "kd"),
+    ("Revives", "revives"),
+)
+
+STREAM_BATCH_SIZE = 500
+
+
+def _row(rank, steam_id, name, score, kills, deaths, revives):
+    kills = kills or 0
+    deaths = deaths or 0
+    return {
+        "rank": rank,
+        "steam_id": steam_id,
+        "name": name or steam_id,
+        "score": score or 0,
+        "kills": kills,
+        "deaths": deaths,
+        "kd": round(kills / deaths if deaths > 0 else kills, 2),
+        "revives": revives or 0,
+    }
+
+
+def _stream_db_rows(db_url, delta_id):
+    """Yield report rows for a saved ReportDelta in rank order, batch by batch."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from database.models import DeltaEntry
+
+    engine = create_engine(db_url)
+    try:
+        with Session(engine) as session:
+            query = session.query(
+                DeltaEntry.steam_id, DeltaEntry.player_name, DeltaEntry.score_delta,
+                DeltaEntry.kills_delta, DeltaEntry.deaths_delta, DeltaEntry.revives_delta
+            ).filter(DeltaEntry.delta_id == delta_id)\
+             .order_by(DeltaEntry.score_delta.desc(), DeltaEntry.id)\
+             .yield_per(STREAM_BATCH_SIZE)
+
+            for rank, r in enumerate(query, 1):
+                yield _row(rank, *r)
+    finally:
+        engine.dispose()
+
+
+def _db_column_widths(db_url, delta_id):
+    """Excel column widths from one aggregate query (no extra pass over rows)."""
+    from sqlalchemy import create_engine, func
+    from sqlalchemy.orm import Session
+    from database.models import DeltaEntry
+
+    engine = create_engine(db_url)
+    try:
+        with Session(engine) as session:
+            agg = session.query(
+                func.count(DeltaEntry.id),
+                func.max(func.length(DeltaEntry.player_name)),
+                func.min(DeltaEntry.score_delta), func.max(DeltaEntry.score_delta),
+                func.min(DeltaEntry.kills_delta), func.max(DeltaEntry.kills_delta),
+                func.min(DeltaEntry.deaths_delta), func.max(DeltaEntry.deaths_delta),
+                func.min(DeltaEntry.revives_delta), func.max(DeltaEntry.revives_delta),
+            ).filter(DeltaEntry.delta_id == delta_id).one()
+    finally:
+        engine.dispose()
+
+    count, name_len = agg[0] or 0, agg[1] or 0
+
+    def num_len(lo, hi):
+        return max(len(str(lo or 0)), len(str(hi or 0)))
+
+    values = {
+        "rank": len(str(count)),
+        "name": name_len,
+        "score": num_len(agg[2], agg[3]),
+        "kills": num_len(agg[4], agg[5]),
+        "deaths": num_len(agg[6], agg[7]),
+        "kd": num_len(agg[4], agg[5]) + 3,
+        "revives": num_len(agg[8], agg[9]),
+    }
+    return {key: max(len(header), values[key]) + 2 for header, key in COLUMNS}
+
+
+def _list_rows(deltas):
+    """Rows from an in-memory delta list (JSON mode / no saved report)."""
+    ordered = sorted(deltas, key=lambda d: d.get("score", 0), reverse=True)
+    for rank, d in enumerate(ordered, 1):
+        yield _row(rank, d.get("steam_id"), d.get("name"), d.get("score"),
+                   d.get("kills"), d.get("deaths"), d.get("revives"))
+
+
+def _list_column_widths(deltas):
+    widths = {key: len(header) for header, key in COLUMNS}
+    widths["rank"] = max(widths["rank"], len(str(len(deltas))))
+    for d in deltas:
+        widths["name"] = max(widths["name"], len(str(d.get("name") or "")))
+        for key in ("score", "kills", "deaths", "revives"):
+            widths[key] = max(widths[key], len(str(d.get(key, 0))))
+    widths["kd"] = max(widths["kd"], widths["kills"] + 3)
+    return {key: w + 2 for key, w in widths.items()}
+
+
+# === WRITERS ===
+
+def _write_excel(rows, widths, period, out):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(f"{period.capitalize()} Report")
+
+    # write_only: dimensions must be set before the first row
+    for i, (_, key) in enumerate(COLUMNS, 1):
+        ws.column_dimensions[get_column_letter(i)].width = widths[key]
+
+    header_font = Font(bold=True, color='FFFFFF')
+    header_fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
+    header = []
+    for title, _ in COLUMNS:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font = header_font
+        cell.fill = header_fill
+        header.append(cell)
+    ws.append(header)
+
+    count = 0
+    for row in rows:
+        ws.append([row[key] for _, key in COLUMNS])
+        count += 1
+
+    wb.save(out)
+    return count
+
+
+def _write_csv(rows, out):
+    text = io.TextIOWrapper(out, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text)
+    writer.writerow(["steam_id"] + [title for title, _ in COLUMNS])
+    count = 0
+    for row in rows:
+        writer.writerow([row["steam_id"]] + [row[key] for _, key in COLUMNS])
+        count += 1
+    text.flush()
+    text.detach()
+    return count
+
+
+def _write_ndjson(rows, out):
+    count = 0
+    for row in rows:
+        out.write(json.dumps(row, ensure_ascii=False).encode("utf-8"))
+        out.write(b"\n")
+        count += 1
+    return count
+
+
+def _write_pdf(rows, period, out, chunk_size=40):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_CENTER
+
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, textColor=colors.HexColor('#4472C4'), spaceAfter=30, alignment=TA_CENTER)
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 10),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+    ])
+    col_widths = [1.5*cm, 5*cm, 2*cm, 2*cm, 2*cm, 2*cm, 2*cm]
+    header = [title for title, _ in COLUMNS]
+    totals = {"count": 0, "score": 0}
+
+    def flowables():
+        """Yield title, then one table per chunk of rows, then the summary."""
+        period_map = {"weekly": "Haftalık", "monthly": "Aylık"}
+        yield Paragraph(f"📊 {period_map.get(period, period.capitalize())} Performans Raporu", title_style)
+        date_str = datetime.datetime.now().strftime("%d %B %Y")
+        yield Paragraph(f"<b>Rapor Tarihi:</b> {date_str}", styles['Normal'])
+        yield Spacer(1, 20)
+
+        chunk = [header]
+        for row in rows:
+            totals["count"] += 1
+            totals["score"] += row["score"]
+            chunk.append([
+                str(row["rank"]), str(row["name"])[:20], str(row["score"]), str(row["kills"]),
+                str(row["deaths"]), f"{row['kd']:.2f}", str(row["revives"])
+            ])
+            if len(chunk) > chunk_size:
+                yield Table(chunk, colWidths=col_widths, style=table_style, repeatRows=1)
+                chunk = [header]
+        if len(chunk) > 1:
+            yield Table(chunk, colWidths=col_widths, style=table_style, repeatRows=1)
+
+        yield Spacer(1, 30)
+        avg_score = totals["score"] / totals["count"] if totals["count"] else 0
+        summary_text = f"<b>Özet İstatistikler:</b><br/>Toplam Aktif Oyuncu: {totals['count']}<br/>Ortalama Score: {avg_score:.0f}<br/>"
+        yield Paragraph(summary_text, styles['Normal'])
+        yield Spacer(1, 50)
+        yield Paragraph(f"<i>Squad Sunucu Raporu - {datetime.datetime.now().strftime('%Y')}</i>", styles['Normal'])
+
+    doc = SimpleDocTemplate(out, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
+    doc.build(list(flowables()))
+    return totals["count"]
+
+
+def run_export(fmt, period, db_url=None, delta_id=None, deltas=None, path=None):
+    """
+    Export a report. Designed to run in a worker process.
+
+    Rows are streamed from delta_entries when db_url/delta_id are given,
+    otherwise taken from the `deltas` list.
+
+    Args:
+        fmt: 'excel', 'pdf', 'csv' or 'ndjson'
+        period: 'weekly' or 'monthly'
+        db_url: SQLAlchemy URL of the bot database
+        delta_id: Saved ReportDelta id (materialized report)
+        deltas: Fallback in-memory delta list
+        path: Write to this file instead of returning bytes
+
+    Returns:
+        (bytes or path, row_count)
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    if delta_id is not None and db_url:
+        rows = _stream_db_rows(db_url, delta_id)
+        widths = _db_column_widths(db_url, delta_id) if fmt == "excel" else None
+    else:
+        deltas = deltas or []
+        rows = _list_rows(deltas)
+        widths = _list_column_widths(deltas) if fmt == "excel" else None
+
+    out = open(path, "wb") if path else io.BytesIO()
+    try:
+        if fmt == "excel":
+            count = _write_excel(rows, widths, period, out)
+        elif fmt == "pdf":
+            count = _write_pdf(rows, period, out)
+        elif fmt == "csv":
+            count = _write_csv(rows, out)
+        else:
+            count = _write_ndjson(rows, out)
+    finally:
+        if path:
+            out.close()
+
+    logger.info(f"{fmt} export created: {count} players")
+    return (path if path else out.getvalue()), count
@@ -0,0 +1,194 @@
+"""
+Squad Players - Report Frame
+Bir dönemin delta verilerini sütun dizilerine yükleyip vektörel analiz yapar
+"""
+from operator import itemgetter
+
+import numpy as np
+
+
+class ReportFrame:
+    """
+    Column-oriented view over one period's player deltas.
+
+    Accepts both the normalized delta dicts (score/kills/...) and the raw
+    DatabaseAdapter.calculate_deltas() output (score_delta/kills_delta/...).
+    Columns are loaded once; every aggregate afterwards is a NumPy call.
+    """
+
+    COLUMNS = ("score", "kills", "deaths", "revives", "wounds")
+
+    # Raw DB key -> normalized key
+    _ALIASES = {
+        "score_delta": "score",
+        "kills_delta": "kills",
+        "deaths_delta": "deaths",
+        "revives_delta": "revives",
+        "wounds_delta": "wounds",
+    }
+
+    def __init__(self, rows, names, steam_ids, columns):
+        self._rows = rows
+        self.names = names
+        self.steam_ids = steam_ids
+        self.columns = columns
+        self._kd = None
+        self._keys = None
+
+    @classmethod
+    def from_deltas(cls, deltas):
+        """
+        Build a frame from a list of delta dicts.
+
+        Args:
+            deltas: Output of calculate_deltas() (normalized or raw DB keys)
+
+        Returns:
+            ReportFrame
+        """
+        rows = list(deltas or [])
+        n = len(rows)
+
+        # Pick the key set once from the first row (all rows share a source)
+        raw = bool(rows) and "score" not in rows[0] and "score_delta" in rows[0]
+        keys = [next(k for k, v in cls._ALIASES.items() if v == c) if raw else c for c in cls.COLUMNS]
+
+        if n:
+            try:
+                matrix = np.array(list(map(itemgetter(*keys), rows)), dtype=np.float64)
+            except (KeyError, TypeError, ValueError):
+                # Missing or None values (e.g. no wounds column): slower tolerant path
+                matrix = np.array([[d.get(k) or 0 for k in keys] for d in rows], dtype=np.float64)
+        else:
+            matrix = np.zeros((0, len(keys)), dtype=np.float64)
+        columns = {c: matrix[:, i] for i, c in enumerate(cls.COLUMNS)}
+
+        names = np.array([d.get("name") or d.get("player_name") or "Unknown" for d in rows], dtype=object)
+        steam_ids = np.array([d.get("steam_id") for d in rows], dtype=object)
+        return cls(rows, names, steam_ids, columns)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __bool__(self):
+        return len(self._rows) > 0
+
+    @property
+    def kd(self):
+        """Period K/D; players without deaths get their kill count (legacy rule)."""
+        if self._kd is None:
+            kills = self.columns["kills"]
+            deaths = self.columns["deaths"]
+            self._kd = np.divide(kills, deaths, out=kills.copy(), where=deaths > 0)
+        return self._kd
+
+    def _column(self, key):
+        return self.kd if key == "kd" else self.columns[key]
+
+    def total(self, key):
+        return float(self._column(key).sum()) if len(self) else 0.0
+
+    def mean(self, key):
+        return float(self._column(key).mean()) if len(self) else 0.0
+
+    def percentile(self, key, q):
+        """q may be a scalar or a sequence (0-100)."""
+        if not len(self):
+            return 0.0
+        return np.percentile(self._column(key), q)
+
+    def argmax(self, key):
+        return int(np.argmax(self._column(key))) if len(self) else None
+
+    def top_k(self, key, k=10):
+        """Indices of the k highest values, sorted descending."""
+        values = self._column(key)
+        n = len(values)
+        if n == 0 or k <= 0:
+            return np.empty(0, dtype=np.intp)
+        if k < n:
+            idx = np.argpartition(-values, k - 1)[:k]
+        else:
+            idx = np.arange(n)
+        # Stable sort keeps input order for ties, like sorted()
+        return idx[np.argsort(-values[idx], kind="stable")]
+
+    def _player_keys(self):
+        """steam_id per row (name fallback) as a fixed-width string array."""
+        if self._keys is None:
+            self._keys = np.array(
+                [sid if sid else f"name:{name}" for sid, name in zip(self.steam_ids, self.names)],
+                dtype=str
+            )
+        return self._keys
+
+    def record(self, i):
+        """Original row merged with normalized fields."""
+        row = dict(self._rows[i])
+        row["name"] = self.names[i]
+        for key in self.COLUMNS:
+            value = self.columns[key][i]
+            row[key] = int(value) if value.is_integer() else float(value)
+        row["kd"] = float(self.kd[i])
+        return row
+
+    def records(self, indices=None):
+        if indices is None:
+            indices = range(len(self))
+        return [self.record(int(i)) for i in indices]
+
+    def summary(self):
+        """Top scorer / most kills / best K/D and averages in one pass."""
+        if not len(self):
+            return {"total_active": 0, "avg_score": 0, "avg_kills": 0}
+
+        top = self.argmax("score")
+        killer = self.argmax("kills")
+        best_kd = self.argmax("kd")
+        return {
+            "top_scorer": {"name": self.names[top], "score": self.record(top)["score"]},
+            "most_kills": {"name": self.names[killer], "kills": self.record(killer)["kills"]},
+            "best_kd": {"name": self.names[best_kd], "kd": float(self.kd[best_kd])},
+            "total_active": len(self),
+            "avg_score": round(self.mean("score"), 2),
+            "avg_kills": round(self.mean("kills"), 2),
+        }
+
+    @staticmethod
+    def most_improved(previous, current, key="score", k=5):
+        """
+        Rank players by change in `key` between two periods.
+
+        Only players present in both frames are compared (matched by steam_id,
+        falling back to name when steam_id is missing).
+
+        Returns:
+            list of dicts: name, steam_id, previous, current, change
+        """
+        if not previous or not current:
+            return []
+
+        prev_ids = previous._player_keys()
+        curr_ids = current._player_keys()
+        common, prev_idx, curr_idx = np.intersect1d(prev_ids, curr_ids, return_indices=True)
+        if len(common) == 0:
+            return []
+
+        prev_vals = previous._column(key)[prev_idx]
+        curr_vals = current._column(key)[curr_idx]
+        change = curr_vals - prev_vals
+
+        k = min(k, len(change))
+        order = np.argpartition(-change, k - 1)[:k] if k < len(change) else np.arange(len(change))
+        order = order[np.argsort(-change[order], kind="stable")]
+
+        return [
+            {
+                "name": current.names[curr_idx[i]],
+                "steam_id": current.steam_ids[curr_idx[i]],
+                "previous": float(prev_vals[i]),
+                "current": float(curr_vals[i]),
+                "change": float(change[i]),
+            }
+            for i in order
+        ]
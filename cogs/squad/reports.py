@@ -6,12 +6,21 @@ import os
 import json
 import datetime
 import discord
-from discord.ext import tasks
 import asyncio
+import functools
+import io
 import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 # Import custom exceptions
 from exceptions import DatabaseError, DiscordOperationError
+from .report_frame import ReportFrame
+from .report_export import run_export
+from ..utils.config import REPORT_PREVIEW_REFRESH_SECONDS, REPORT_FANOUT_CONCURRENCY, REPORT_FANOUT_RETRIES
+from ..utils.scheduler import weekly_at, monthly_at
 
 logger = logging.getLogger("SquadPlayers.Reports")
 
@@ -30,6 +39,10 @@ class ReportSystem:
         self.db = db
         self.json_mode = json_mode
         self.report_file = "squad_reports.json"
+        # (period, preview) -> materialized report (see materialize_report)
+        self._artifacts = {}
+        # Excel/PDF rendering runs outside the bot process (created on first export)
+        self._export_pool = None
         
     def _get_report_db(self):
         """Load report database from JSON"""
@@ -129,21 +142,8 @@ class ReportSystem:
                 # Calculate deltas from snapshot to current
                 db_deltas = await self.db.calculate_deltas(snapshot_id)
                 
-                # Normalize keys for compatibility with reports.py logic
-                deltas = []
-                for d in db_deltas:
-                    d_norm = d.copy()
-                    d_norm['score'] = d.get('score_delta', 0)
-                    d_norm['kills'] = d.get('kills_delta', 0)
-                    d_norm['deaths'] = d.get('deaths_delta', 0)
-                    d_norm['revives'] = d.get('revives_delta', 0)
-                    # d_norm['wounds'] missing in DB calculator? optional
-                    d_norm['name'] = d.get('player_name', 'Unknown')
-                    # KD calc if not present
-                    k = d_norm['kills']
-                    d_val = d_norm['deaths']
-                    d_norm['kd'] = k / d_val if d_val > 0 else k
-                    deltas.append(d_norm)
+                # Normalize keys (score_delta -> score, ...) and compute period K/D
+                deltas = ReportFrame.from_deltas(db_deltas).records()
                 
                 logger.info(f"Calculated {len(deltas)} deltas for {period} from database")
                 return deltas
@@ -214,22 +214,16 @@ class ReportSystem:
         if "history" not in report_db:
             report_db["history"] = {"weekly": [], "monthly": []}
         
-        # Sort players by score
-        top_players = sorted(deltas, key=lambda x: x.get('score', 0), reverse=True)
-        top_10 = top_players[:10]
-        
-        # Find best performers
-        best_kills = max(deltas, key=lambda x: x.get('kills', 0))
-        best_kd = max(deltas, key=lambda x: x.get('kd', 0))
+        frame = ReportFrame.from_deltas(deltas)
         
         # Create history entry
         history_entry = {
             "timestamp": str(datetime.datetime.now()),
             "period": period,
-            "top_10": top_10,
-            "best_kills": best_kills,
-            "best_kd": best_kd,
-            "total_players": len(deltas)
+            "top_10": frame.records(frame.top_k("score", 10)),
+            "best_kills": frame.record(frame.argmax("kills")),
+            "best_kd": frame.record(frame.argmax("kd")),
+            "total_players": len(frame)
         }
         
         # Add to history (maintain max 52 weeks or 12 months)
@@ -240,48 +234,308 @@ class ReportSystem:
         self._save_report_db(report_db)
         logger.info(f"Saved {period} report to history")
 
-    async def publish_report(self, guild, period, channel=None):
+    async def save_report(self, period, deltas, preview=False):
         """
-        Publish report to Discord channel
+        Persist a closed period as ReportDelta/DeltaEntry rows.
+        Hall of Fame records and champion tallies are updated in the same transaction.
         
         Args:
-            guild: Discord guild
             period: 'weekly' or 'monthly'
-            channel: Target channel (optional, defaults to #rapor-log)
+            deltas: Normalized deltas from calculate_deltas()
+            preview: Save as '<period>_preview' (no Hall of Fame update)
+            
+        Returns:
+            ReportDelta id or None
         """
-        deltas = await self.calculate_deltas(period)
-        if not deltas: 
-            return
+        if not deltas or not self.db or self.json_mode:
+            return None
         
-        embed = self.create_report_embed(deltas, period, preview=False)
-        
-        # Generate charts
         try:
-            from .utils.chart_maker import generate_report_charts
-            chart_buf = await asyncio.to_thread(generate_report_charts, deltas, period)
-            file = discord.File(chart_buf, filename="report_charts.png")
-            embed.set_image(url="attachment://report_charts.png")
+            snap_id = await self.db.get_report_metadata(f"last_{period}_snapshot_id")
+            if not snap_id:
+                return None
+            
+            # Remap keys back to adapter expectations
+            frame = ReportFrame.from_deltas(deltas)
+            db_payload = [
+                {
+                    'steam_id': d['steam_id'],
+                    'player_name': d['name'],
+                    'score_delta': d['score'],
+                    'kills_delta': d['kills'],
+                    'deaths_delta': d['deaths'],
+                    'revives_delta': d['revives'],
+                    'wounds_delta': d['wounds'],
+                    'rank': rank
+                }
+                for rank, d in enumerate(frame.records(frame.top_k("score", len(frame))), 1)
+            ]
+            
+            period_type = f"{period}_preview" if preview else period
+            delta_id = await self.db.save_report_delta(period_type, int(snap_id), db_payload, update_hall_of_fame=not preview)
+            logger.info(f"Saved {period} report to database (delta ID: {delta_id})")
+            return delta_id
+        except DatabaseError as e:
+            logger.error(f"Failed to save {period} report to DB: {e}", exc_info=True)
+            return None
+
+    async def _render_chart(self, deltas, period):
+        """Render report charts to PNG bytes (None on failure)"""
+        try:
+            from ..utils.chart_maker import generate_report_charts
+            buf = await asyncio.to_thread(generate_report_charts, deltas, period)
+            return buf.getvalue()
         except ImportError as e:
             logger.error(f"Chart generation import failed: {e}")
-            file = None
         except Exception as e:
             logger.error(f"Chart generation failed: {e}", exc_info=True)
-            file = None
+        return None
+
+    async def materialize_report(self, period, deltas=None, preview=False):
+        """
+        Compute the delta set once and persist it with a pre-built embed payload and chart PNG.
+        Views and exports are then served from this artifact instead of recomputing.
+        
+        Args:
+            period: 'weekly' or 'monthly'
+            deltas: Already calculated deltas (optional, calculated if None)
+            preview: Live preview of the running period instead of a closed report
+            
+        Returns:
+            dict (period, preview, delta_id, deltas, embed, chart_png, created_at) or None
+        """
+        if deltas is None:
+            deltas = await self.calculate_deltas(period)
+        if not deltas:
+            return None
+        
+        embed = self.create_report_embed(deltas, period, preview=preview)
+        chart_png = await self._render_chart(deltas, period)
+        
+        artifact = {
+            "period": period,
+            "preview": preview,
+            "delta_id": None,
+            "deltas": deltas,
+            "embed": embed.to_dict(),
+            "chart_png": chart_png,
+            "created_at": datetime.datetime.utcnow()
+        }
+        
+        if self.db and not self.json_mode:
+            try:
+                # Only the latest preview is kept; a closed period makes it stale
+                await self.db.delete_report_deltas(f"{period}_preview")
+                delta_id = await self.save_report(period, deltas, preview=preview)
+                if delta_id:
+                    await self.db.save_report_artifact(delta_id, artifact["embed"], chart_png)
+                    artifact["delta_id"] = delta_id
+            except DatabaseError as e:
+                logger.error(f"Failed to persist {period} report artifact: {e}", exc_info=True)
+        
+        if not preview:
+            self._artifacts.pop((period, True), None)
+        self._artifacts[(period, preview)] = artifact
+        logger.info(f"Materialized {period} {'preview' if preview else 'report'}: {len(deltas)} players")
+        return artifact
+
+    async def get_report_artifact(self, period, preview=True):
+        """
+        Get a materialized report without recomputing deltas.
+        Previews are refreshed at most once per REPORT_PREVIEW_REFRESH_SECONDS.
+        
+        Args:
+            period: 'weekly' or 'monthly'
+            preview: True = live preview of running period, False = last closed report
+            
+        Returns:
+            Artifact dict (see materialize_report) or None
+        """
+        key = (period, preview)
+        artifact = self._artifacts.get(key)
+        
+        if artifact is None and self.db and not self.json_mode:
+            try:
+                row = await self.db.get_latest_report(f"{period}_preview" if preview else period)
+                if row and row["embed"]:
+                    artifact = {
+                        "period": period,
+                        "preview": preview,
+                        "delta_id": row["id"],
+                        "deltas": ReportFrame.from_deltas(row["entries"]).records(),
+                        "embed": row["embed"],
+                        "chart_png": row["chart_png"],
+                        "created_at": row["artifact_created_at"] or row["timestamp"]
+                    }
+                    self._artifacts[key] = artifact
+            except DatabaseError as e:
+                logger.error(f"Failed to load {period} report artifact: {e}", exc_info=True)
         
+        if preview:
+            age = (datetime.datetime.utcnow() - artifact["created_at"]).total_seconds() if artifact else None
+            if age is None or age >= REPORT_PREVIEW_REFRESH_SECONDS:
+                artifact = await self.materialize_report(period, preview=True) or artifact
+        
+        return artifact
+
+    async def export_report(self, artifact, fmt):
+        """
+        Export a materialized report in a worker process.
+        Rows are streamed from delta_entries when the report is saved in DB.
+        
+        Args:
+            artifact: Materialized report (see materialize_report)
+            fmt: 'excel', 'pdf', 'csv' or 'ndjson'
+            
+        Returns:
+            (bytes, row_count)
+        """
+        if self._export_pool is None:
+            # spawn, not fork: the bot process holds an event loop, to_thread workers and pooled DB connections
+            self._export_pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        
+        if artifact.get("delta_id") and self.db and not self.json_mode:
+            job = functools.partial(
+                run_export, fmt, artifact["period"],
+                db_url=self.db.engine.url.render_as_string(hide_password=False),
+                delta_id=artifact["delta_id"]
+            )
+        else:
+            job = functools.partial(run_export, fmt, artifact["period"], deltas=artifact["deltas"])
+        
+        pool = self._export_pool
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, job)
+        except BrokenProcessPool:
+            # The worker died (OOM, crash): start a fresh pool on the next export
+            if self._export_pool is pool:
+                self._export_pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    def close(self):
+        """Stop background work (called from cog_unload)"""
+        if self._export_pool is not None:
+            self._export_pool.shutdown(wait=False, cancel_futures=True)
+            self._export_pool = None
+
+    def build_report_message(self, artifact):
+        """
+        Build (embed, file) from a materialized report.
+        A new discord.File is needed per send, the PNG bytes are reused.
+        """
+        embed = discord.Embed.from_dict(artifact["embed"])
+        file = None
+        if artifact.get("chart_png"):
+            file = discord.File(io.BytesIO(artifact["chart_png"]), filename="report_charts.png")
+            embed.set_image(url="attachment://report_charts.png")
+        return embed, file
+
+    def _report_channel(self, guild):
+        """#rapor-log, falling back to #squad-log"""
+        channel = discord.utils.get(guild.text_channels, name="rapor-log")
         if not channel:
-            channel = discord.utils.get(guild.text_channels, name="rapor-log")
-            if not channel:
-                # Fallback: squad-log
-                channel = discord.utils.get(guild.text_channels, name="squad-log")
+            channel = discord.utils.get(guild.text_channels, name="squad-log")
+        return channel
+
+    async def publish_report(self, guild, period, channel=None, artifact=None):
+        """
+        Publish report to Discord channel
+        
+        Args:
+            guild: Discord guild
+            period: 'weekly' or 'monthly'
+            channel: Target channel (optional, defaults to #rapor-log)
+            artifact: Materialized report (optional, materialized now if None)
+        """
+        if artifact is None:
+            artifact = await self.materialize_report(period)
+        if not artifact:
+            return
+        
+        if not channel:
+            channel = self._report_channel(guild)
         
         if channel:
-            if file:
-                await channel.send(embed=embed, file=file)
-            else:
-                await channel.send(embed=embed)
+            await self._send_report(channel, artifact)
         else:
             logger.warning(f"Report Generation Failed: No suitable channel found in {guild.name}")
 
+    async def _send_report(self, channel, artifact):
+        """
+        Send a materialized report, retrying when Discord rate limits us.
+        discord.py already waits out short 429s itself; this covers the ones it gives up on.
+        """
+        for attempt in range(REPORT_FANOUT_RETRIES + 1):
+            embed, file = self.build_report_message(artifact)
+            try:
+                if file:
+                    await channel.send(embed=embed, file=file)
+                else:
+                    await channel.send(embed=embed)
+                return
+            except discord.RateLimited as e:
+                retry_after = e.retry_after
+            except discord.HTTPException as e:
+                if e.status != 429 and e.status < 500:
+                    raise DiscordOperationError(f"Failed to send report to #{channel.name}: {e}") from e
+                retry_after = 2 ** attempt
+            
+            if attempt == REPORT_FANOUT_RETRIES:
+                raise DiscordOperationError(f"Failed to send report to #{channel.name}: rate limited")
+            logger.warning(f"Report send to #{channel.name} rate limited, retrying in {retry_after:.1f}s")
+            await asyncio.sleep(retry_after)
+
+    async def fan_out_report(self, artifact, guilds=None):
+        """
+        Post one materialized report to every guild concurrently.
+        
+        The embed and chart bytes are rendered once (materialize_report);
+        sends are bounded by REPORT_FANOUT_CONCURRENCY.
+        
+        Args:
+            artifact: Materialized report
+            guilds: Target guilds (default: all guilds of the bot)
+            
+        Returns:
+            List of dicts: guild_id, guild, channel, ok, latency_ms, error
+        """
+        guilds = list(self.bot.guilds if guilds is None else guilds)
+        semaphore = asyncio.Semaphore(REPORT_FANOUT_CONCURRENCY)
+        
+        async def _publish(guild):
+            result = {"guild_id": guild.id, "guild": guild.name, "channel": None, "ok": False, "latency_ms": 0.0, "error": None}
+            channel = self._report_channel(guild)
+            if not channel:
+                result["error"] = "no report channel"
+                return result
+            result["channel"] = channel.name
+            
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    await self._send_report(channel, artifact)
+                    result["ok"] = True
+                except DiscordOperationError as e:
+                    result["error"] = str(e)
+                except Exception as e:
+                    result["error"] = f"{type(e).__name__}: {e}"
+                result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            return result
+        
+        results = await asyncio.gather(*(_publish(g) for g in guilds))
+        
+        period = artifact["period"]
+        for r in results:
+            if r["ok"]:
+                logger.info(f"Published {period} report for {r['guild']} (#{r['channel']}, {r['latency_ms']}ms)")
+            else:
+                logger.error(f"Failed to publish {period} report for {r['guild']}: {r['error']}")
+        ok = sum(1 for r in results if r["ok"])
+        logger.info(f"{period} report fan-out: {ok}/{len(results)} guilds")
+        return results
+
     def create_report_embed(self, deltas, period, preview=False):
         """
         Create Discord embed for report
@@ -295,12 +549,13 @@ class ReportSystem:
             discord.Embed
         """
         # Sorts
-        top_score = sorted(deltas, key=lambda x: x["score"], reverse=True)[:1]
-        top_kill = sorted(deltas, key=lambda x: x["kills"], reverse=True)[:1]
-        top_revive = sorted(deltas, key=lambda x: x["revives"], reverse=True)[:1]
+        frame = ReportFrame.from_deltas(deltas)
+        top_score = frame.records(frame.top_k("score", 1))
+        top_kill = frame.records(frame.top_k("kills", 1))
+        top_revive = frame.records(frame.top_k("revives", 1))
         
         # Leaderboard (Score)
-        leaderboard = sorted(deltas, key=lambda x: x["score"], reverse=True)[:10]
+        leaderboard = frame.records(frame.top_k("score", 10))
 
         period_map = {"weekly": "Haftalık", "monthly": "Aylık", "daily": "Günlük"}
         title_p = period_map.get(period, period.capitalize())
@@ -343,14 +598,12 @@ class ReportSystem:
         
         return embed
     
-    @tasks.loop(hours=1)
-    async def automated_report_loop(self):
-        """Checks periodically if a scheduled report (Weekly/Monthly) is due"""
-        now = datetime.datetime.now()
+    async def register_jobs(self, scheduler):
+        """Register weekly (Monday 09:00) and monthly (1st, 10:00) report jobs on the deadline scheduler"""
         report_db = self._get_report_db()
         meta = report_db.get("meta", {})
         
-        # Load metadata from DB if available
+        # Seed first registration from legacy metadata so a fresh install does not re-run a report
         if self.db and not self.json_mode:
             try:
                 last_w = await self.db.get_report_metadata("last_weekly")
@@ -358,125 +611,47 @@ class ReportSystem:
                 
                 last_m = await self.db.get_report_metadata("last_monthly")
                 if last_m: meta["last_monthly"] = last_m
-            except:
+            except Exception:
                 pass
         
-        # --- WEEKLY REPORT ---
-        # Monday = 0. Run if it is Monday.
-        if now.weekday() == 0 and now.hour >= 9:  # After 9 AM
-            last_run_str = meta.get("last_weekly")
-            should_run = True
-            
-            if last_run_str:
-                last_run = datetime.datetime.fromisoformat(last_run_str)
-                # If last run was less than 4 days ago, don't run again
-                if (now - last_run).days < 4:
-                    should_run = False
-            
-            if should_run:
-                # Calculate deltas BEFORE taking new snapshot
-                deltas = await self.calculate_deltas("weekly")
-                
-                # Save to history (DB or JSON)
-                if self.db and not self.json_mode and deltas:
-                    try:
-                        # Get snapshot ID again to be safe
-                        snap_id = await self.db.get_report_metadata(f"last_weekly_snapshot_id")
-                        if snap_id:
-                            # Remap keys back to adapter expectations
-                            db_payload = []
-                            for i, d in enumerate(deltas, 1):
-                                db_payload.append({
-                                    'steam_id': d['steam_id'],
-                                    'player_name': d['name'],
-                                    'score_delta': d['score'],
-                                    'kills_delta': d['kills'],
-                                    'deaths_delta': d['deaths'],
-                                    'revives_delta': d['revives'],
-                                    'rank': i
-                                })
-                            
-                            await self.db.save_report_delta("weekly", int(snap_id), db_payload)
-                            logger.info("Saved Weekly Report to Database")
-                    except Exception as e:
-                        logger.error(f"Failed to save weekly report to DB: {e}")
-                
-                # Also save to JSON history for backup/legacy
-                if deltas:
-                    self.save_to_history("weekly", deltas)
-                
-                # Publish to all guilds
-                for guild in self.bot.guilds:
-                    try:
-                        await self.publish_report(guild, "weekly")
-                        logger.info(f"Published Automated Weekly Report for {guild.name}")
-                    except DiscordOperationError as e:
-                        logger.error(f"Failed to auto-publish weekly report: {e}", exc_info=True)
-                
-                # Take Snapshot & Update Meta (AFTER history save)
-                await self.take_snapshot("weekly")
-                meta["last_weekly"] = now.isoformat()
-                self._save_report_db(report_db)
-                logger.info("Automated Weekly Snapshot Taken.")
-        
-        # --- MONTHLY REPORT ---
-        # Run on 1st of month, after 10 AM
-        if now.day == 1 and now.hour >= 10:
-            last_monthly = meta.get("last_monthly")
-            should_run = True
-            
-            if last_monthly:
-                last = datetime.datetime.fromisoformat(last_monthly)
-                # If last run was less than 20 days ago, skip
-                if (now - last).days < 20:
-                    should_run = False
-            
-            if should_run:
-                # Calculate deltas BEFORE taking new snapshot
-                deltas = await self.calculate_deltas("monthly")
-                
-                # Save to history (DB or JSON)
-                if self.db and not self.json_mode and deltas:
-                    try:
-                        # Get snapshot ID again to be safe
-                        snap_id = await self.db.get_report_metadata(f"last_monthly_snapshot_id")
-                        if snap_id:
-                            # Remap keys back to adapter expectations
-                            db_payload = []
-                            for i, d in enumerate(deltas, 1):
-                                db_payload.append({
-                                    'steam_id': d['steam_id'],
-                                    'player_name': d['name'],
-                                    'score_delta': d['score'],
-                                    'kills_delta': d['kills'],
-                                    'deaths_delta': d['deaths'],
-                                    'revives_delta': d['revives'],
-                                    'rank': i
-                                })
-                            
-                            await self.db.save_report_delta("monthly", int(snap_id), db_payload)
-                            logger.info("Saved Monthly Report to Database")
-                    except Exception as e:
-                        logger.error(f"Failed to save monthly report to DB: {e}")
-                
-                # Also save to JSON history for backup/legacy
-                if deltas:
-                    self.save_to_history("monthly", deltas)
-                
-                for guild in self.bot.guilds:
-                    try:
-                        await self.publish_report(guild, "monthly")
-                        logger.info(f"Published Automated Monthly Report for {guild.name}")
-                    except DiscordOperationError as e:
-                        logger.error(f"Failed to auto-publish monthly report: {e}", exc_info=True)
-                
-                # Take Snapshot & Update Meta (AFTER history save)
-                await self.take_snapshot("monthly")
-                meta["last_monthly"] = now.isoformat()
-                self._save_report_db(report_db)
-                logger.info("Automated Monthly Snapshot Taken.")
-
-    @automated_report_loop.before_loop
-    async def before_report_loop(self):
-        """Wait until bot is ready before starting loop"""
-        await self.bot.wait_until_ready()
+        def _parse(value):
+            try:
+                return datetime.datetime.fromisoformat(value) if value else None
+            except ValueError:
+                return None
+        
+        await scheduler.add_job(
+            "report_weekly", weekly_at(0, 9),
+            functools.partial(self.run_scheduled_report, "weekly"),
+            last_run=_parse(meta.get("last_weekly"))
+        )
+        await scheduler.add_job(
+            "report_monthly", monthly_at(1, 10),
+            functools.partial(self.run_scheduled_report, "monthly"),
+            last_run=_parse(meta.get("last_monthly"))
+        )
+    
+    async def run_scheduled_report(self, period):
+        """Scheduled report: deltas -> materialize -> publish -> new snapshot"""
+        label = "Weekly" if period == "weekly" else "Monthly"
+        
+        # Calculate deltas BEFORE taking new snapshot
+        deltas = await self.calculate_deltas(period)
+        
+        # Save to history (DB: report deltas + Hall of Fame) and pre-render once
+        artifact = await self.materialize_report(period, deltas) if deltas else None
+        
+        # Also save to JSON history for backup/legacy
+        if deltas:
+            self.save_to_history(period, deltas)
+        
+        # Publish to all guilds (rendered once above, sent concurrently)
+        if artifact:
+            await self.fan_out_report(artifact)
+        
+        # Take Snapshot & Update Meta (AFTER history save)
+        await self.take_snapshot(period)
+        report_db = self._get_report_db()
+        report_db.setdefault("meta", {})[f"last_{period}"] = datetime.datetime.now().isoformat()
+        self._save_report_db(report_db)
+        logger.info(f"Automated {label} Snapshot Taken.")
@@ -0,0 +1,454 @@
+"""
+Squad Players - SquadGame.log Event Source
+Squad sunucusunun SquadGame.log dosyasını kaldığı yerden okuyup oyun içi
+olaylara (giriş/çıkış, yaralama, ölüm, revive, maç başlangıç/bitiş) çevirir.
+
+Ayrıştırıcı ve okuyucu discord'a bağımlı değildir; kayıtlı örnek loglarla
+canlı sunucu olmadan test edilebilir (tests/verify_squad_log.py).
+"""
+import asyncio
+import datetime
+import json
+import logging
+import os
+import re
+from typing import List, NamedTuple, Optional
+
+logger = logging.getLogger("SquadPlayers.SquadLog")
+
+READ_CHUNK_BYTES = 1 << 20
+
+
+# === EVENTS ===
+
+class PlayerConnected(NamedTuple):
+    time: datetime.datetime
+    chain: int
+    name: str
+    steam_id: Optional[str]
+    eos_id: Optional[str]
+    controller: Optional[str]
+
+
+class PlayerDisconnected(NamedTuple):
+    time: datetime.datetime
+    chain: int
+    name: Optional[str]
+    steam_id: Optional[str]
+    eos_id: str
+    controller: Optional[str]
+    # Time of the matching "Join succeeded" line (None if the join was never seen)
+    joined_at: Optional[datetime.datetime] = None
+
+
+class PlayerWounded(NamedTuple):
+    time: datetime.datetime
+    chain: int
+    victim_name: str
+    victim_steam_id: Optional[str]
+    attacker_steam_id: str
+    attacker_eos_id: str
+    weapon: str
+    damage: float
+
+
+class PlayerDied(NamedTuple):
+    time: datetime.datetime
+    chain: int
+    victim_name: str
+    victim_steam_id: Optional[str]
+    attacker_steam_id: str
+    attacker_eos_id: str
+    weapon: str
+    damage: float
+
+
+class PlayerRevived(NamedTuple):
+    time: datetime.datetime
+    chain: int
+    reviver_name: str
+    reviver_steam_id: str
+    victim_name: str
+    victim_steam_id: str
+
+
+class NewGame(NamedTuple):
+    time: datetime.datetime
+    chain: int
+    map_name: str
+    layer: str
+
+
+class RoundEnded(NamedTuple):
+    time: datetime.datetime
+    chain: int
+    team: int
+    faction: str
+    won: bool
+    tickets: int
+    layer: str
+
+
+# === PARSER ===
+
+# [2026.01.01-20.00.00:123][ 42]LogSquad: ...
+# The timestamp has a fixed width, so the head is cut with plain slicing
+_STAMP_END = 25
+
+_POST_LOGIN = re.compile(
+    r"PostLogin: NewPlayer: \S+ \S*?PersistentLevel\.(\S+) \(IP: [\d.]+ \| Online IDs: EOS: ([0-9a-f]+)(?: steam: (\d{17}))?\)"
+)
+_JOIN = re.compile(r"Join succeeded: (.+)")
+_CLOSE = re.compile(r"UChannel::Close: .*?PC: (\S+), Owner: \S+, UniqueId: RedpointEOS:([0-9a-f]+)")
+_TRACE = re.compile(
+    r"\[DedicatedServer\](?:ASQSoldier::)?(Wound|Die)\(\): Player:(.+) KillingDamage=-?([0-9.]+) from \S+ "
+    r"\(Online IDs: EOS: ([0-9a-f]+) steam: (\d{17}) \| Contr?oller ID: \S+\) caused by ([\w-]+?)_C"
+)
+_REVIVE = re.compile(
+    r"(.+) \(Online IDs: EOS: [0-9a-f]+ steam: (\d{17})\) has revived (.+) \(Online IDs: EOS: [0-9a-f]+ steam: (\d{17})\)\."
+)
+_WORLD = re.compile(r"Bringing World /\w+/(?:Maps/)?([\w-]+)/(?:.+/)?([\w-]+)(?:\.[\w-]+)")
+_ROUND = re.compile(
+    r"Display: Team (\d), (.*) \( ?.*? ?\) has (won|lost) the match with (\d+) Tickets on layer (.*) \(level .*\)!"
+)
+
+
+class SquadLogParser:
+    """
+    Line -> event parser with the state needed to resolve IDs.
+
+    The head (timestamp, chain, category) is cut by position, and a line
+    is only matched against the patterns of its category, so the bulk of
+    a log (LogEOS, LogOnline, ...) is skipped without running any regex.
+    Times are converted from the server's UTC to naive local time, like
+    the rest of the bot.
+
+    The connected players (with their join times) are the only state a
+    restart has to keep; state() / load_state() carry them through the
+    tailer checkpoint, and end_sessions() closes them when the log is
+    rotated (server restart) without disconnect lines.
+    """
+
+    def __init__(self):
+        # Last PostLogin waiting for its "Join succeeded" name line
+        self._pending_login = None
+        # eos_id -> {"name", "steam_id", "controller", "joined_at"}
+        self.players = {}
+        # name -> steam_id (trace lines only carry the victim's name)
+        self.names = {}
+        # Time of the last event, the close time of sessions cut by a rotation
+        self.last_time = None
+        self._utc_offset = datetime.datetime.now() - datetime.datetime.utcnow()
+        self._dispatch = {
+            "LogSquad": self._log_squad,
+            "LogNet": self._log_net,
+            "LogSquadTrace": self._log_trace,
+            "LogWorld": self._log_world,
+            "LogSquadGameEvents": self._log_game_events,
+        }
+
+    def parse_line(self, line: str):
+        """Event for one log line, or None"""
+        if line[:1] != "[" or line[_STAMP_END:_STAMP_END + 1] != "[" or not line[1:5].isdigit():
+            return None
+        chain_end = line.find("]", _STAMP_END)
+        colon = line.find(": ", chain_end)
+        if chain_end < 0 or colon < 0:
+            return None
+        handler = self._dispatch.get(line[chain_end + 1:colon])
+        if handler is None:
+            return None
+        return handler(line, chain_end, line[colon + 2:].rstrip("\r\n"))
+
+    def _stamp(self, line: str, chain_end: int):
+        """(local time, chain) of a line; only built for lines that matched"""
+        time = datetime.datetime(
+            int(line[1:5]), int(line[6:8]), int(line[9:11]),
+            int(line[12:14]), int(line[15:17]), int(line[18:20]), int(line[21:24]) * 1000
+        ) + self._utc_offset
+        self.last_time = time
+        return time, int(line[_STAMP_END + 1:chain_end] or 0)
+
+    def parse_lines(self, lines) -> list:
+        """Events of a batch of lines, in order"""
+        parse = self.parse_line
+        return [event for event in map(parse, lines) if event is not None]
+
+    def end_sessions(self) -> list:
+        """PlayerDisconnected for everyone still connected, at the last event time; clears the state"""
+        events = [
+            PlayerDisconnected(self.last_time, 0, p["name"], p["steam_id"], eos_id, p["controller"], p.get("joined_at"))
+            for eos_id, p in self.players.items()
+        ] if self.last_time else []
+        self.players = {}
+        self._pending_login = None
+        return events
+
+    def state(self) -> dict:
+        """JSON-safe connected players, stored with the tailer checkpoint"""
+        def iso(t):
+            return t.isoformat() if t else None
+        return {
+            "last_time": iso(self.last_time),
+            "players": {eos_id: {**p, "joined_at": iso(p.get("joined_at"))} for eos_id, p in self.players.items()}
+        }
+
+    def load_state(self, state: Optional[dict]):
+        if not state:
+            return
+        def parse(t):
+            return datetime.datetime.fromisoformat(t) if t else None
+        self.last_time = parse(state.get("last_time"))
+        self.players = {
+            eos_id: {**p, "joined_at": parse(p.get("joined_at"))} for eos_id, p in state.get("players", {}).items()
+        }
+        self.names.update({p["name"]: p["steam_id"] for p in self.players.values() if p["name"] and p["steam_id"]})
+
+    def _log_squad(self, line, chain_end, rest):
+        m = _POST_LOGIN.match(rest)
+        if m:
+            controller, eos_id, steam_id = m.groups()
+            self._pending_login = (controller, eos_id, steam_id)
+            self.players[eos_id] = {"name": None, "steam_id": steam_id, "controller": controller, "joined_at": None}
+            return None
+        m = _REVIVE.match(rest)
+        if m:
+            reviver, reviver_steam, victim, victim_steam = m.groups()
+            return PlayerRevived(*self._stamp(line, chain_end), reviver, reviver_steam, victim, victim_steam)
+        return None
+
+    def _log_net(self, line, chain_end, rest):
+        m = _JOIN.match(rest)
+        if m:
+            name = m.group(1)
+            time, chain = self._stamp(line, chain_end)
+            controller = eos_id = steam_id = None
+            if self._pending_login:
+                controller, eos_id, steam_id = self._pending_login
+                self._pending_login = None
+                # The connection may already be closed (dropped during login)
+                if eos_id in self.players:
+                    self.players[eos_id].update(name=name, joined_at=time)
+            if steam_id:
+                self.names[name] = steam_id
+            return PlayerConnected(time, chain, name, steam_id, eos_id, controller)
+        m = _CLOSE.match(rest)
+        if m:
+            controller, eos_id = m.groups()
+            known = self.players.pop(eos_id, None) or {}
+            return PlayerDisconnected(
+                *self._stamp(line, chain_end), known.get("name"), known.get("steam_id"), eos_id, controller,
+                known.get("joined_at")
+            )
+        return None
+
+    def _log_trace(self, line, chain_end, rest):
+        m = _TRACE.match(rest)
+        if m is None:
+            return None
+        kind, victim, damage, attacker_eos, attacker_steam, weapon = m.groups()
+        event = PlayerWounded if kind == "Wound" else PlayerDied
+        return event(
+            *self._stamp(line, chain_end), victim, self.names.get(victim), attacker_steam, attacker_eos, weapon, float(damage)
+        )
+
+    def _log_world(self, line, chain_end, rest):
+        m = _WORLD.match(rest)
+        if m is None or m.group(1) == "TransitionMap":
+            return None
+        return NewGame(*self._stamp(line, chain_end), m.group(1), m.group(2))
+
+    def _log_game_events(self, line, chain_end, rest):
+        m = _ROUND.match(rest)
+        if m is None:
+            return None
+        team, faction, action, tickets, layer = m.groups()
+        return RoundEnded(*self._stamp(line, chain_end), int(team), faction, action == "won", int(tickets), layer)
+
+
+# === TAILER ===
+
+class SquadLogTailer:
+    """
+    Incremental reader for a rotating SquadGame.log.
+
+    Reads complete lines from the last checkpointed byte offset; a trailing
+    partial line is left for the next read. Rotation is detected by the
+    file identity (device + inode) changing or the file shrinking; the old
+    handle is drained before switching, then reading restarts at 0.
+    The checkpoint (identity + offset, plus the parser state read up to
+    that offset) is a small JSON file written atomically after each batch,
+    so a restart neither skips nor repeats lines.
+    """
+
+    def __init__(self, path: str, checkpoint_path: Optional[str] = None):
+        self.path = path
+        self.checkpoint_path = checkpoint_path
+        self.offset = 0
+        self.identity = None
+        # Parser state saved with the checkpoint (see SquadLogParser.state)
+        self.saved_state = None
+        self._file = None
+        self.stats = {"lines": 0, "bytes": 0, "rotations": 0}
+        self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.identity = tuple(state["identity"]) if state.get("identity") else None
+            self.offset = int(state.get("offset", 0))
+            self.saved_state = state.get("parser")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Squad log checkpoint unreadable, starting from the beginning: {e}")
+
+    def save_checkpoint(self, parser_state: Optional[dict] = None):
+        if not self.checkpoint_path:
+            return
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"path": self.path, "identity": self.identity, "offset": self.offset, "parser": parser_state}, f)
+        os.replace(tmp, self.checkpoint_path)
+
+    @staticmethod
+    def _identity(st):
+        return [st.st_dev, st.st_ino]
+
+    def _open(self):
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        identity = self._identity(os.fstat(f.fileno()))
+        size = os.fstat(f.fileno()).st_size
+        if self.identity is None or list(self.identity) != identity or size < self.offset:
+            # New (or truncated) file: start over
+            if self.identity is not None:
+                self.stats["rotations"] += 1
+            self.offset = 0
+        self.identity = identity
+        f.seek(self.offset)
+        self._file = f
+        return True
+
+    def _read_complete(self, max_bytes: int) -> List[str]:
+        data = self._file.read(max_bytes)
+        end = data.rfind(b"\n")
+        while end < 0 and len(data) % max_bytes == 0 and data:
+            # A single line longer than max_bytes: keep reading until it is complete
+            more = self._file.read(max_bytes)
+            if not more:
+                break
+            data += more
+            end = data.rfind(b"\n")
+        if end < 0:
+            self._file.seek(self.offset)
+            return []
+        chunk = data[:end + 1]
+        self._file.seek(self.offset + len(chunk))
+        self.offset += len(chunk)
+        self.stats["bytes"] += len(chunk)
+        lines = chunk.decode("utf-8", errors="replace").splitlines()
+        self.stats["lines"] += len(lines)
+        return lines
+
+    def read_lines(self, max_bytes: int = READ_CHUNK_BYTES) -> List[str]:
+        """Complete lines written since the last call (at most ~max_bytes)"""
+        if self._file is None and not self._open():
+            return []
+
+        lines = self._read_complete(max_bytes)
+        if lines:
+            return lines
+
+        # Nothing new: check whether the file was rotated or truncated
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if self._identity(st) != list(self.identity) or st.st_size < self.offset:
+            lines = self._read_complete(max_bytes)  # drain the old file first
+            self._file.close()
+            self._file = None
+            # The old identity is kept, so the next _open() counts the rotation
+            if not lines and self._open():
+                lines = self._read_complete(max_bytes)
+        return lines
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+# === EVENT SOURCE ===
+
+class SquadLogSource:
+    """
+    Tailer + parser + listeners, polled by the shared scheduler.
+
+    listener(events) is called once per batch with the parsed events
+    (a list of the NamedTuples above), the way EventStore notifies.
+    When the log rotates, everyone still connected in the old file gets a
+    PlayerDisconnected at its last event, so no session stays open.
+    """
+
+    def __init__(self, path: str, checkpoint_path: Optional[str] = None, max_bytes: int = READ_CHUNK_BYTES):
+        self.tailer = SquadLogTailer(path, checkpoint_path)
+        self.parser = SquadLogParser()
+        self.parser.load_state(self.tailer.saved_state)
+        self.max_bytes = max_bytes
+        self._listeners = []
+        self._lock = asyncio.Lock()
+        self.stats = {"events": 0, "batches": 0}
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _read_batch(self):
+        events = []
+        while True:
+            rotations = self.tailer.stats["rotations"]
+            lines = self.tailer.read_lines(self.max_bytes)
+            if self.tailer.stats["rotations"] != rotations:
+                events.extend(self.parser.end_sessions())
+            if not lines:
+                break
+            events.extend(self.parser.parse_lines(lines))
+        return events
+
+    async def poll(self) -> int:
+        """Read and parse everything new, notify listeners, then checkpoint"""
+        async with self._lock:
+            events = await asyncio.to_thread(self._read_batch)
+            if events:
+                self.stats["events"] += len(events)
+                self.stats["batches"] += 1
+                for callback in self._listeners:
+                    try:
+                        result = callback(events)
+                        if asyncio.iscoroutine(result):
+                            await result
+                    except Exception as e:
+                        logger.error(f"Squad log listener error: {e}", exc_info=True)
+            await asyncio.to_thread(self.tailer.save_checkpoint, self.parser.state())
+            return len(events)
+
+
+def get_squad_log(bot) -> Optional[SquadLogSource]:
+    """Shared SquadGame.log event source (None when SQUAD_LOG_PATH is not configured)."""
+    from ..utils.config import SQUAD_LOG_PATH, SQUAD_LOG_CHECKPOINT, SQUAD_LOG_POLL_SECONDS
+    if not SQUAD_LOG_PATH:
+        return None
+    source = getattr(bot, "squad_log", None)
+    if source is None:
+        from ..utils.scheduler import get_scheduler, every
+        source = SquadLogSource(SQUAD_LOG_PATH, SQUAD_LOG_CHECKPOINT)
+        bot.squad_log = source
+        asyncio.create_task(get_scheduler(bot).add_job(
+            "squad_log_poll", every(datetime.timedelta(seconds=SQUAD_LOG_POLL_SECONDS)),
+            source.poll, catch_up=False
+        ))
+    return source
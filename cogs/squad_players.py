@@ -6,12 +6,18 @@ import os
 import datetime
 import json
 import asyncio
+import io
 import traceback
 import logging
+import numpy as np
 from .utils.config import ADMIN_USER_IDS, ADMIN_ROLE_IDS, CLAN_MEMBER_ROLE_IDS, COLORS, BM_API_URL, SERVER_ID, BM_API_KEY, GOOGLE_SHEET_KEY, DEV_MODE
+from .utils.config import SQUAD_RCON_POLL_SECONDS
 from .utils.chart_maker import generate_activity_image, generate_profile_card, HAS_MATPLOTLIB
 from .utils.pagination import PaginationView
 from .utils.cache import TTLCache
+from .utils.avatar_cache import AvatarCache
+from .utils.scheduler import get_scheduler, every
+from .utils.role_index import get_role_index
 
 # Database adapter for SQLite migration
 import sys
@@ -29,6 +35,10 @@ from .squad.views import (
 )
 from .squad.sheets_sync import GoogleSheetsSync
 from .squad.reports import ReportSystem
+from .squad.report_frame import ReportFrame
+from .squad.report_export import EXPORT_FORMATS, EXTENSIONS as EXPORT_EXTENSIONS
+from .squad.squad_log import get_squad_log, PlayerDisconnected
+from .squad.rcon import get_rcon
 
 try:
     import gspread
@@ -544,6 +554,7 @@ class SquadPlayers(commands.Cog):
         self.activity_config_file = "activity_panel.json"
         self.ACTIVITY_FILE = "squad_activity.json"
         self.cache = TTLCache(max_size=500)  # Initialize cache
+        self.avatar_cache = AvatarCache()  # Profil kartı avatarları (hash değişince indirilir)
         
         # Database adapter for SQLite migration
         self.db = DatabaseAdapter('sqlite:///cotabot_dev.db')
@@ -556,12 +567,12 @@ class SquadPlayers(commands.Cog):
         # Initialize helper systems (NEW - REFACTORED)
         self.sheets_sync = GoogleSheetsSync(GOOGLE_SHEET_KEY)
         self.report_system = ReportSystem(bot, db=self.db, json_mode=self.json_mode)
-        
-        # Start automated report loop
-        self.report_system.automated_report_loop.start()
+        # RCON presence: steam_id -> [unwritten seconds, name, player_id]; time of the previous sample
+        self._rcon_seconds = {}
+        self._rcon_last_sample = None
         logger.info("Helper systems initialized: GoogleSheetsSync, ReportSystem")
         
-        # Loops auto-start via @tasks.loop decorator
+        # Reports and sync run on the shared deadline scheduler (registered in cog_load)
 
 
     def _player_to_dict(self, p) -> dict:
@@ -603,86 +614,6 @@ class SquadPlayers(commands.Cog):
             "season_stats": season_stats
         }
 
-    @tasks.loop(hours=1)
-    async def automated_report_loop(self):
-        """Checks periodically if a scheduled report (Weekly/Monthly) is due."""
-        now = datetime.datetime.now()
-        report_db = self._get_report_db()
-        meta = report_db.get("meta", {})
-        
-        # --- WEEKLY REPORT ---
-        # Monday = 0. Run if it is Monday.
-        if now.weekday() == 0 and now.hour >= 9:  # After 9 AM
-            last_run_str = meta.get("last_weekly")
-            should_run = True
-            
-            if last_run_str:
-                last_run = datetime.datetime.fromisoformat(last_run_str)
-                # If last run was less than 4 days ago, don't run again (avoid double run on same Monday)
-                if (now - last_run).days < 4:
-                    should_run = False
-            
-            if should_run:
-                # Calculate deltas BEFORE taking new snapshot
-                deltas = self._calculate_deltas("weekly")
-                
-                # Save to history (Phase 2)
-                if deltas:
-                    self._save_to_history("weekly", deltas)
-                
-                # Find Guild (Assuming single server bot, or iterate)
-                # DEV/PROD specific GUILD_ID would be better, but we traverse bot.guilds
-                for guild in self.bot.guilds:
-                    # Optional: Check if guild has #rapor-log?
-                    try:
-                        await self._publish_report(guild, "weekly")
-                        logger.info(f"Published Automated Weekly Report for {guild.name}")
-                    except Exception as e:
-                        logger.error(f"Failed to auto-publish weekly report: {e}")
-                
-                # Take Snapshot & Update Meta (AFTER history save)
-                self._take_snapshot("weekly")
-                meta["last_weekly"] = now.isoformat()
-                self._save_report_db(report_db)
-                logger.info("Automated Weekly Snapshot Taken.")
-        
-        # --- MONTHLY REPORT ---
-        # Run on 1st of month, after 10 AM
-        if now.day == 1 and now.hour >= 10:
-            last_monthly = meta.get("last_monthly")
-            should_run = True
-            
-            if last_monthly:
-                last = datetime.datetime.fromisoformat(last_monthly)
-                # If last run was less than 20 days ago, skip (avoid double run)
-                if (now - last).days < 20:
-                    should_run = False
-            
-            if should_run:
-                # Calculate deltas BEFORE taking new snapshot
-                deltas = self._calculate_deltas("monthly")
-                
-                # Save to history (Phase 2)
-                if deltas:
-                    self._save_to_history("monthly", deltas)
-                
-                for guild in self.bot.guilds:
-                    try:
-                        await self._publish_report(guild, "monthly")
-                        logger.info(f"Published Automated Monthly Report for {guild.name}")
-                    except Exception as e:
-                        logger.error(f"Failed to auto-publish monthly report: {e}")
-                
-                # Take Snapshot & Update Meta (AFTER history save)
-                self._take_snapshot("monthly")
-                meta["last_monthly"] = now.isoformat()
-                self._save_report_db(report_db)
-                logger.info("Automated Monthly Snapshot Taken.")
-
-    @automated_report_loop.before_loop
-    async def before_report_loop(self):
-        await self.bot.wait_until_ready()
-
     async def update_sheet_player(self, steam_id, name, discord_id, delete=False):
         """Helper to sync single player changes to Google Sheet."""
         if not gspread or not GOOGLE_SHEET_KEY: return
@@ -870,18 +801,37 @@ class SquadPlayers(commands.Cog):
     async def cog_load(self):
         # trust_env=True is CRITICAL for using the system proxy environment variables
         self.session = aiohttp.ClientSession(trust_env=True)
-        self.auto_sync_loop.start()
         self.activity_panel_loop.start()
-        self.activity_tracker_loop.start()
-        self.automated_report_loop.start()
+        # Exact join/leave times from SquadGame.log (or RCON samples) replace the 2-minute BattleMetrics polling
+        scheduler = get_scheduler(self.bot)
+        squad_log = get_squad_log(self.bot)
+        if squad_log and not self.json_mode:
+            squad_log.add_listener(self.on_squad_log_events)
+        elif get_rcon(self.bot, SERVER_ID) and not self.json_mode:
+            await scheduler.add_job(
+                "rcon_presence", every(datetime.timedelta(seconds=SQUAD_RCON_POLL_SECONDS)),
+                self.sample_rcon_presence, catch_up=False
+            )
+        else:
+            self.activity_tracker_loop.start()
+        
+        await self.report_system.register_jobs(scheduler)
+        # Seeded one interval back so a fresh install syncs right after startup
+        await scheduler.add_job(
+            "squad_sync", every(datetime.timedelta(hours=6)), self.auto_sync,
+            last_run=datetime.datetime.now() - datetime.timedelta(hours=6)
+        )
 
     def cog_unload(self):
         if self.session:
             asyncio.create_task(self.session.close())
-        self.auto_sync_loop.cancel()
         self.activity_panel_loop.cancel()
         self.activity_tracker_loop.cancel()
-        self.automated_report_loop.cancel()
+        scheduler = getattr(self.bot, "scheduler", None)
+        if scheduler:
+            for name in ("report_weekly", "report_monthly", "squad_sync", "rcon_presence"):
+                scheduler.remove_job(name)
+        self.report_system.close()
 
     async def check_permissions(self, ctx_or_int):
         is_interaction = isinstance(ctx_or_int, discord.Interaction)
@@ -1183,6 +1133,21 @@ class SquadPlayers(commands.Cog):
                                 p_info.get("season_stats", {})
                             )
                     logger.info(f"Stats sync: Saved {len(db_data)} players to database")
+                    
+                    # Append to stats time series (only changed players are written)
+                    samples = [
+                        {
+                            "steam_id": p_info["steam_id"],
+                            "score": p_info["stats"].get("totalScore", 0),
+                            "kills": p_info["stats"].get("totalKills", 0),
+                            "deaths": p_info["stats"].get("totalDeaths", 0),
+                            "revives": p_info["stats"].get("totalRevives", 0),
+                            "wounds": p_info["stats"].get("totalWounds", 0)
+                        }
+                        for p_info in db_data if p_info.get("stats")
+                    ]
+                    written = await self.db.record_stat_samples(samples)
+                    logger.info(f"Stats sync: {written} time-series samples recorded")
                 except Exception as e:
                     logger.error(f"Database save error in sync: {e}, falling back to JSON")
             
@@ -1202,15 +1167,11 @@ class SquadPlayers(commands.Cog):
         await self.log_to_channel(guild, "🔄 Veritabanı Senkronizasyonu", 
             f"**Durum:** Tamamlandı\n**Toplam Oyuncu:** {len(db_data)}\n**Yeni:** {new_names}")
 
-    @tasks.loop(hours=6)
-    async def auto_sync_loop(self):
+    async def auto_sync(self):
+        """Scheduled sync (every 6 hours, see cog_load)"""
         for guild in self.bot.guilds:
             await self.run_sync_task(guild, status_callback=None)
 
-    @auto_sync_loop.before_loop
-    async def before_auto_sync(self):
-        await self.bot.wait_until_ready()
-
     @tasks.loop(minutes=5)
     async def activity_panel_loop(self):
         """Auto-update activity panels from Google Sheets (G2 timestamp tracking)"""
@@ -1334,9 +1295,8 @@ class SquadPlayers(commands.Cog):
                 
                 else:
                     # New SQLite mode
-                    from datetime import date
-                    today = date.today()
                     now_dt = datetime.datetime.now()
+                    player_ids = []
                     
                     for item in included:
                         if item.get("type") == "player":
@@ -1367,17 +1327,13 @@ class SquadPlayers(commands.Cog):
                                     if player.name != player_name:
                                         await self.db.update_player(steam_id, name=player_name)
                                 
-                                # Record activity (2 minutes)
-                                await self.db.add_or_update_activity(
-                                    player_id=player_id,
-                                    activity_date=today,
-                                    minutes=2,
-                                    last_seen=now_dt
-                                )
+                                player_ids.append(player_id)
                                 tracked_count += 1
                     
                     if tracked_count > 0:
-                        logger.info(f"Activity tracker (SQLite): Recorded {tracked_count} players")
+                        # One presence bit per 2-minute slot: a second run in the same slot adds nothing
+                        added = await self.db.mark_presence([(pid, now_dt, None) for pid in player_ids], count_minutes=True)
+                        logger.info(f"Activity tracker (SQLite): Recorded {tracked_count} players ({added} new slots)")
                     else:
                         # Log why 0 (empty server or map fail?)
                         logger.debug(f"Activity tracker: No players recorded. Players online: {len([i for i in included if i.get('type')=='player'])}")
@@ -1389,6 +1345,102 @@ class SquadPlayers(commands.Cog):
     async def before_activity_tracker(self):
         await self.bot.wait_until_ready()
 
+    async def on_squad_log_events(self, events):
+        """
+        SquadGame.log batch -> activity minutes of every finished server session.
+        
+        Open sessions live in the log parser and are saved with the tailer
+        checkpoint, so a bot restart keeps them; a log rotation closes them.
+        """
+        sessions = [
+            (e.steam_id, e.name, e.joined_at, e.time) for e in events
+            if isinstance(e, PlayerDisconnected) and e.steam_id and e.joined_at
+        ]
+
+        spans = []
+        for steam_id, name, joined_at, left_at in sessions:
+            minutes = int((left_at - joined_at).total_seconds() // 60)
+            if minutes > 0:
+                player_id = await self.record_activity_minutes(steam_id, name, minutes, joined_at.date(), left_at)
+                if player_id:
+                    spans.append((player_id, joined_at, left_at))
+        if spans:
+            # Minutes are exact already; the bitmap only records when they played
+            await self.db.mark_presence(spans)
+        if sessions:
+            logger.info(f"Squad log: Recorded {len(sessions)} finished sessions")
+
+    async def sample_rcon_presence(self):
+        """Scheduler job: one RCON ListPlayers sample -> activity minutes (sub-minute resolution)"""
+        snapshot = await get_rcon(self.bot, SERVER_ID).snapshot()
+        if snapshot is None:
+            # Connection problem: the gap is not credited to anyone
+            self._rcon_last_sample = None
+            return
+        now = datetime.datetime.now()
+        elapsed = (now - self._rcon_last_sample).total_seconds() if self._rcon_last_sample else 0.0
+        # A stalled job (sleep, reconnect) credits at most two intervals
+        elapsed = min(elapsed, 2 * SQUAD_RCON_POLL_SECONDS)
+        self._rcon_last_sample = now
+
+        online = {p["steam_id"]: p["name"] for p in snapshot["players"]}
+        for steam_id in list(self._rcon_seconds):
+            if steam_id not in online:
+                # Left: the remainder under a minute is dropped
+                del self._rcon_seconds[steam_id]
+        recorded = 0
+        spans = []
+        for steam_id, name in online.items():
+            entry = self._rcon_seconds.get(steam_id)
+            if entry is None:
+                player_id = await self.ensure_player(steam_id, name)
+                if not player_id:
+                    continue
+                entry = self._rcon_seconds[steam_id] = [0.0, name, player_id]
+            entry[0] += elapsed
+            entry[1] = name
+            spans.append((entry[2], now, None))
+            minutes = int(entry[0] // 60)
+            if minutes > 0:
+                entry[0] -= minutes * 60
+                await self.record_activity_minutes(steam_id, name, minutes, now.date(), now)
+                recorded += 1
+        if spans:
+            await self.db.mark_presence(spans)
+        if recorded:
+            logger.debug(f"RCON presence: {len(online)} online, {recorded} players credited")
+
+    async def ensure_player(self, steam_id, name):
+        """Player ID of a Steam ID (auto-creates unknown players, keeps the name current); None on error"""
+        try:
+            player = await self.db.get_player_by_steam_id(steam_id)
+            if not player:
+                player_id = await self.db.add_player(steam_id, name or "Unknown")
+                logger.info(f"Activity: Auto-created player {name}")
+                return player_id
+            if name and player.name != name:
+                await self.db.update_player(steam_id, name=name)
+            return player.id
+        except Exception as e:
+            logger.error(f"Activity player lookup error for {steam_id}: {e}", exc_info=True)
+            return None
+
+    async def record_activity_minutes(self, steam_id, name, minutes, activity_date, last_seen):
+        """Add activity minutes for a Steam ID; returns the player ID (None on error)"""
+        player_id = await self.ensure_player(steam_id, name)
+        if not player_id:
+            return None
+        try:
+            await self.db.add_or_update_activity(
+                player_id=player_id,
+                activity_date=activity_date,
+                minutes=minutes,
+                last_seen=last_seen
+            )
+        except Exception as e:
+            logger.error(f"Activity record error for {steam_id}: {e}", exc_info=True)
+        return player_id
+
 
     async def _get_all_players_hybrid(self):
         """Get all players from database or JSON (hybrid mode)"""
@@ -2010,7 +2062,11 @@ class SquadPlayers(commands.Cog):
         for p in db_players:
             did = p.get("discord_id")
             if did:
-                registered_ids.add(str(did))
+                try:
+                    registered_ids.add(int(did))
+                except (TypeError, ValueError):
+                    continue
+        role_index = get_role_index(self.bot)
         
         report_text = ""
         has_missing = False
@@ -2023,17 +2079,14 @@ class SquadPlayers(commands.Cog):
                 embed.add_field(name=f"🆔 {rid}", value="❌ Rol Bulunamadı", inline=False)
                 continue
             
-            found = 0
-            missing = 0
+            role_ids = role_index.role_members(ctx.guild, rid)
+            missing_ids = sorted(role_ids - registered_ids)
+            missing = len(missing_ids)
+            found = len(role_ids) - missing
             missing_members = []
-            
-            for member in role.members:
-                if member.bot: continue
-                if str(member.id) in registered_ids:
-                    found += 1
-                else:
-                    missing += 1
-                    missing_members.append(f"{member.display_name} ({member.id})")
+            for user_id in missing_ids:
+                member = ctx.guild.get_member(user_id)
+                missing_members.append(f"{member.display_name if member else user_id} ({user_id})")
             
             status_emoji = "✅" if missing == 0 else "⚠️"
             embed.add_field(
@@ -2212,21 +2265,19 @@ class SquadPlayers(commands.Cog):
         
         msg = await ctx.send("🎨 **Profil kartı oluşturuluyor...**")
         
-        # 3. Get Avatar
-        avatar_bytes = None
+        # 3. Get Avatar (cached, pre-decoded)
+        avatar_img = None
         discord_id = resolved_player.get("discord_id")
         
         # Only fetch avatar if we have a linked Discord ID
         if discord_id:
             try:
                 # Resolve member object
-                member = ctx.guild.get_member(int(discord_id))
-                if member:
-                    avatar_bytes = await member.display_avatar.with_size(256).read()
-                else:
+                user = ctx.guild.get_member(int(discord_id)) or self.bot.get_user(int(discord_id))
+                if not user:
                     # Try fetch user if not in guild
-                     u = await self.bot.fetch_user(int(discord_id))
-                     if u: avatar_bytes = await u.display_avatar.with_size(256).read()
+                    user = await self.bot.fetch_user(int(discord_id))
+                avatar_img = await self.avatar_cache.get(user)
             except Exception as e:
                 logger.warning(f"Avatar fetch error: {e}")
         
@@ -2234,7 +2285,7 @@ class SquadPlayers(commands.Cog):
         try:
             # Run blocking image gen in thread
             def _gen():
-                return generate_profile_card(player_data, avatar_bytes)
+                return generate_profile_card(player_data, avatar_img)
             
             buf = await asyncio.to_thread(_gen)
             
@@ -2389,7 +2440,10 @@ class SquadPlayers(commands.Cog):
                 snapshot_id = int(snapshot_id_str)
                 
                 # Calculate deltas from snapshot to current
-                deltas = await self.db.calculate_deltas(snapshot_id)
+                db_deltas = await self.db.calculate_deltas(snapshot_id)
+                
+                # Normalize keys (score_delta -> score, ...) and compute period K/D
+                deltas = ReportFrame.from_deltas(db_deltas).records()
                 
                 logger.info(f"Calculated {len(deltas)} deltas for {period} from database")
                 return deltas
@@ -2461,18 +2515,11 @@ class SquadPlayers(commands.Cog):
         if "history" not in report_db:
             report_db["history"] = {"weekly": [], "monthly": []}
         
-        # Sort players by score
-        top_players = sorted(deltas, key=lambda x: x.get('score', 0), reverse=True)
-        top_10 = top_players[:10]
-        
-        # Find best performers
-        best_kills = max(deltas, key=lambda x: x.get('kills', 0))
-        best_kd = max(deltas, key=lambda x: x.get('kd', 0))
-        
-        # Calculate summary statistics
-        total_active = len(deltas)
-        avg_score = sum(d.get('score', 0) for d in deltas) / total_active if total_active > 0 else 0
-        avg_kills = sum(d.get('kills', 0) for d in deltas) / total_active if total_active > 0 else 0
+        # Load columns once; all summary math is vectorized
+        frame = ReportFrame.from_deltas(deltas)
+        summary = frame.summary()
+        total_active = summary["total_active"]
+        avg_score = summary["avg_score"]
         
         now = datetime.datetime.now()
         
@@ -2482,31 +2529,16 @@ class SquadPlayers(commands.Cog):
             "timestamp": now.isoformat(),
             "week_number": now.isocalendar()[1],
             "year": now.year,
-            "summary": {
-                "top_scorer": {
-                    "name": top_players[0]['name'],
-                    "score": top_players[0]['score']
-                } if top_players else {},
-                "most_kills": {
-                    "name": best_kills['name'],
-                    "kills": best_kills['kills']
-                } if best_kills else {},
-                "best_kd": {
-                    "name": best_kd['name'],
-                    "kd": best_kd['kd']
-                } if best_kd else {},
-                "total_active": total_active,
-                "avg_score": round(avg_score, 2),
-                "avg_kills": round(avg_kills, 2)
-            },
+            "summary": summary,
             "top_10": [
                 {
                     "name": p['name'],
-                    "score": p.get('score', 0),
-                    "kills": p.get('kills', 0),
-                    "deaths": p.get('deaths', 0),
-                    "kd": p.get('kd', 0)
-                } for p in top_10
+                    "steam_id": p.get('steam_id'),
+                    "score": p['score'],
+                    "kills": p['kills'],
+                    "deaths": p['deaths'],
+                    "kd": p['kd']
+                } for p in frame.records(frame.top_k("score", 10))
             ]
         }
         
@@ -2522,8 +2554,9 @@ class SquadPlayers(commands.Cog):
         self._save_report_db(report_db)
         logger.info(f"Saved {period} report to history: {total_active} active players, avg score: {avg_score:.0f}")
         
-        # Update Hall of Fame (Phase 3)
-        self._update_hall_of_fame(period, deltas)
+        # Update Hall of Fame (Phase 3) - DB mode maintains it in save_report_delta
+        if self.json_mode:
+            self._update_hall_of_fame(period, deltas, frame=frame)
 
     def _analyze_trends(self, period="weekly", count=4):
         """
@@ -2547,13 +2580,13 @@ class SquadPlayers(commands.Cog):
         recent = history[-min(count, len(history)):]
         
         # Extract metrics
-        avg_scores = [h["summary"]["avg_score"] for h in recent]
+        avg_scores = np.array([h["summary"]["avg_score"] for h in recent], dtype=np.float64)
         total_actives = [h["summary"]["total_active"] for h in recent]
         
         # Trend detection (simple comparison)
         if len(avg_scores) >= 3:
-            first_avg = sum(avg_scores[:2]) / 2  # Average of first 2
-            last_avg = sum(avg_scores[-2:]) / 2  # Average of last 2
+            first_avg = avg_scores[:2].mean()  # Average of first 2
+            last_avg = avg_scores[-2:].mean()  # Average of last 2
             
             if last_avg > first_avg * 1.1:
                 activity_trend = "increasing"
@@ -2577,12 +2610,20 @@ class SquadPlayers(commands.Cog):
         most_consistent = max(player_appearances.items(), key=lambda x: x[1])[0] if player_appearances else None
         consistency_count = player_appearances.get(most_consistent, 0) if most_consistent else 0
         
+        # Most improved (last two periods' top 10)
+        most_improved = ReportFrame.most_improved(
+            ReportFrame.from_deltas(recent[-2].get("top_10", [])),
+            ReportFrame.from_deltas(recent[-1].get("top_10", [])),
+            key="score", k=3
+        )
+        
         return {
             "activity_trend": activity_trend,
-            "avg_score_change": round(avg_score_change, 2),
+            "avg_score_change": round(float(avg_score_change), 2),
             "most_consistent": most_consistent,
             "consistency_count": consistency_count,
-            "weekly_averages": avg_scores,
+            "most_improved": most_improved,
+            "weekly_averages": avg_scores.tolist(),
             "active_counts": total_actives,
             "period_count": len(recent),
             "first_date": recent[0]["date"],
@@ -2591,64 +2632,13 @@ class SquadPlayers(commands.Cog):
     
     # === Phase 3: Export & Recognition Features ===
     
-    def _export_to_excel(self, period, deltas):
-        """Export report data to Excel file."""
-        if not deltas:
-            return None
-        
-        import pandas as pd
-        from openpyxl.styles import Font, PatternFill
-        from io import BytesIO
-        
-        data = []
-        for p in deltas:
-            data.append({
-                'Oyuncu': p['name'],
-                'Score': p.get('score', 0),
-                'Kills': p.get('kills', 0),
-                'Deaths': p.get('deaths', 0),
-                'K/D': round(p.get('kd', 0), 2),
-                'Revives': p.get('revives', 0)
-            })
-        
-        df = pd.DataFrame(data)
-        df = df.sort_values('Score', ascending=False)
-        df.insert(0, 'Sıra', range(1, len(df) + 1))
-        
-        buf = BytesIO()
-        
-        with pd.ExcelWriter(buf, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name=f'{period.capitalize()} Report', index=False)
-            
-            workbook = writer.book
-            worksheet = writer.sheets[f'{period.capitalize()} Report']
-            
-            for cell in worksheet[1]:
-                cell.font = Font(bold=True, color='FFFFFF')
-                cell.fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
-            
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        cell_len = len(str(cell.value))
-                        if cell_len > max_length:
-                            max_length = cell_len
-                    except:
-                        pass
-                adjusted_width = (max_length + 2)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-        
-        buf.seek(0)
-        logger.info(f"Excel export created: {len(df)} players")
-        return buf
-    
-    def _update_hall_of_fame(self, period, deltas):
+    def _update_hall_of_fame(self, period, deltas, frame=None):
         """Update Hall of Fame with report winners."""
         if not deltas:
             return
         
+        frame = frame if frame is not None else ReportFrame.from_deltas(deltas)
+        
         report_db = self._get_report_db()
         
         if "hall_of_fame" not in report_db:
@@ -2660,12 +2650,7 @@ class SquadPlayers(commands.Cog):
             }
         
         hof = report_db["hall_of_fame"]
-        top_players = sorted(deltas, key=lambda x: x.get('score', 0), reverse=True)
-        
-        if not top_players:
-            return
-        
-        champion = top_players[0]
+        champion = frame.record(frame.argmax("score"))
         champion_name = champion['name']
         
         key = f"{period}_champions"
@@ -2680,7 +2665,7 @@ class SquadPlayers(commands.Cog):
                 "date": datetime.datetime.now().strftime("%Y-%m-%d")
             }
         
-        top_killer = max(deltas, key=lambda x: x.get('kills', 0))
+        top_killer = frame.record(frame.argmax("kills"))
         highest_kills = hof["records"].get("highest_kills_week", {}).get("kills", 0)
         if top_killer['kills'] > highest_kills:
             hof["records"]["highest_kills_week"] = {
@@ -2692,76 +2677,6 @@ class SquadPlayers(commands.Cog):
         self._save_report_db(report_db)
         logger.info(f"Hall of Fame updated: {champion_name} won {period}")
     
-    def _export_to_pdf(self, period, deltas):
-        """Export report to professional PDF."""
-        if not deltas:
-            return None
-        
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib import colors
-        from reportlab.lib.units import cm
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.enums import TA_CENTER
-        from io import BytesIO
-        
-        buf = BytesIO()
-        doc = SimpleDocTemplate(buf, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
-        
-        elements = []
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, textColor=colors.HexColor('#4472C4'), spaceAfter=30, alignment=TA_CENTER)
-        
-        period_map = {"weekly": "Haftalık", "monthly": "Aylık"}
-        title = Paragraph(f"📊 {period_map.get(period, period.capitalize())} Performans Raporu", title_style)
-        elements.append(title)
-        
-        date_str = datetime.datetime.now().strftime("%d %B %Y")
-        date_para = Paragraph(f"<b>Rapor Tarihi:</b> {date_str}", styles['Normal'])
-        elements.append(date_para)
-        elements.append(Spacer(1, 20))
-        
-        table_data = [['Sıra', 'Oyuncu', 'Score', 'Kills', 'Deaths', 'K/D', 'Revives']]
-        
-        for i, p in enumerate(sorted(deltas, key=lambda x: x.get('score', 0), reverse=True)[:10], 1):
-            table_data.append([str(i), p['name'][:20], str(p.get('score', 0)), str(p.get('kills', 0)), str(p.get('deaths', 0)), f"{p.get('kd', 0):.2f}", str(p.get('revives', 0))])
-        
-        table = Table(table_data, colWidths=[1.5*cm, 5*cm, 2*cm, 2*cm, 2*cm, 2*cm, 2*cm])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-        ]))
-        
-        elements.append(table)
-        elements.append(Spacer(1, 30))
-        
-        total_active = len(deltas)
-        avg_score = sum(d.get('score', 0) for d in deltas) / total_active if total_active > 0 else 0
-        
-        summary_text = f"<b>Özet İstatistikler:</b><br/>Toplam Aktif Oyuncu: {total_active}<br/>Ortalama Score: {avg_score:.0f}<br/>"
-        summary_para = Paragraph(summary_text, styles['Normal'])
-        elements.append(summary_para)
-        
-        elements.append(Spacer(1, 50))
-        footer = Paragraph(f"<i>Squad Sunucu Raporu - {datetime.datetime.now().strftime('%Y')}</i>", styles['Normal'])
-        elements.append(footer)
-        
-        doc.build(elements)
-        
-        buf.seek(0)
-        logger.info(f"PDF export created: {len(deltas)} players")
-        return buf
-
     @commands.command(name='report')
     async def report_cmd(self, ctx, period: str = "weekly", action: str = "view"):
         """
@@ -2787,17 +2702,21 @@ class SquadPlayers(commands.Cog):
              
              # Calculate deltas BEFORE snapshot (Phase 2)
              deltas = await self._calculate_deltas(period)
+             artifact = None
              if deltas:
+                 # DB + Hall of Fame + pre-rendered embed/chart (computed once)
+                 artifact = await self.report_system.materialize_report(period, deltas)
                  self._save_to_history(period, deltas)
              
-             await self._publish_report(ctx.guild, period) # Send to #rapor-log logic
+             if artifact:
+                 await self.report_system.publish_report(ctx.guild, period, artifact=artifact) # Send to #rapor-log logic
              await self._take_snapshot(period)  # Take NEW snapshot AFTER saving history
              await ctx.send(f"✅ {period.capitalize()} dönemi sıfırlandı. Yeni snapshot alındı. Rapor: #rapor-log")
              
         elif action == "view":
-             # Just preview
-             deltas = await self._calculate_deltas(period)
-             if not deltas:
+             # Just preview (served from the materialized preview, refreshed at most once per interval)
+             artifact = await self.report_system.get_report_artifact(period, preview=True)
+             if not artifact:
                  await ctx.send(f"⚠️ {period.capitalize()} için karşılaştırılacak veri bulunamadı (Snapshot yok veya veri değişmemiş).")
                  # Check if snapshot exists?
                  snap = self._get_report_db().get("snapshots", {}).get(period)
@@ -2806,16 +2725,48 @@ class SquadPlayers(commands.Cog):
                      await self._take_snapshot(period)
                  return
 
-             embed = self._create_report_embed(deltas, period, preview=True)
-             await ctx.send(embed=embed)
+             embed, file = self.report_system.build_report_message(artifact)
+             if file:
+                 await ctx.send(embed=embed, file=file)
+             else:
+                 await ctx.send(embed=embed)
              
         elif action == "init":
              await self._take_snapshot(period)
              await ctx.send(f"📸 {period.capitalize()} için başlangıç snapshot'ı alındı.")
     
+    @commands.command(name='rapor_aralik', aliases=['report_range'])
+    async def report_range_cmd(self, ctx, start: str, end: str = None):
+        """
+        Özel tarih aralığı raporu (istatistik zaman serisinden).
+        Kullanım: !1rapor_aralik 2026-01-01 [2026-01-31]
+        """
+        if not await self.check_permissions(ctx): return
+        
+        try:
+            t0 = datetime.datetime.strptime(start, "%Y-%m-%d")
+            t1 = datetime.datetime.strptime(end, "%Y-%m-%d") + datetime.timedelta(days=1) if end else datetime.datetime.utcnow()
+        except ValueError:
+            await ctx.send("⚠️ Tarih formatı: YYYY-MM-DD")
+            return
+        
+        if t1 <= t0:
+            await ctx.send("⚠️ Bitiş tarihi başlangıçtan sonra olmalı.")
+            return
+        
+        db_deltas = await self.db.stats_delta(None, t0, t1)
+        deltas = [d for d in ReportFrame.from_deltas(db_deltas).records() if d["score"] > 0 or d["kills"] > 0]
+        if not deltas:
+            await ctx.send("⚠️ Bu aralık için kayıtlı istatistik değişimi bulunamadı.")
+            return
+        
+        label = f"{t0:%d.%m.%Y} - {(t1 - datetime.timedelta(seconds=1)):%d.%m.%Y}"
+        embed = self._create_report_embed(deltas, label, preview=True)
+        await ctx.send(embed=embed)
+    
     @commands.command(name='export_report')
-    async def export_report_cmd(self, ctx, period: str = "weekly", format: str = "excel"):
-        """Raporu dışa aktar. Kullanım: !1export_report <weekly|monthly> <excel|pdf>"""
+    async def export_report_cmd(self, ctx, period: str = "weekly", format: str = "excel", source: str = "live"):
+        """Raporu dışa aktar. Kullanım: !1export_report <weekly|monthly> <excel|pdf|csv|ndjson> [live|last]"""
         if not await self.check_permissions(ctx): return
         
         valid_periods = ["weekly", "monthly"]
@@ -2823,52 +2774,65 @@ class SquadPlayers(commands.Cog):
             await ctx.send(f"⚠️ Geçersiz dönem. Seçenekler: {', '.join(valid_periods)}")
             return
         
-        valid_formats = ["excel", "pdf"]
-        if format not in valid_formats:
-            await ctx.send(f"⚠️ Geçersiz format. Seçenekler: {', '.join(valid_formats)}")
+        if format not in EXPORT_FORMATS:
+            await ctx.send(f"⚠️ Geçersiz format. Seçenekler: {', '.join(EXPORT_FORMATS)}")
+            return
+        
+        if source not in ("live", "last"):
+            await ctx.send("⚠️ Geçersiz kaynak. Seçenekler: live (devam eden dönem), last (son kapanan rapor)")
             return
         
         await ctx.send(f"📊 {period.capitalize()} raporu {format} olarak hazırlanıyor...")
         
         try:
-            deltas = await self._calculate_deltas(period)
+            # Served from the materialized report, no delta recomputation per export
+            artifact = await self.report_system.get_report_artifact(period, preview=(source == "live"))
             
-            if not deltas:
+            if not artifact or not artifact["deltas"]:
                 await ctx.send(f"⚠️ {period.capitalize()} için veri bulunamadı.")
                 return
             
-            if format == "excel":
-                buf = await asyncio.to_thread(self._export_to_excel, period, deltas)
-                
-                if buf:
-                    now = datetime.datetime.now().strftime("%Y%m%d")
-                    filename = f"{period}_report_{now}.xlsx"
-                    file = discord.File(buf, filename=filename)
-                    await ctx.send(f"✅ Excel raporu hazır!", file=file)
-                else:
-                    await ctx.send("❌ Excel oluşturulamadı.")
+            # Rendered in a worker process, rows streamed from the DB
+            data, count = await self.report_system.export_report(artifact, format)
             
-            elif format == "pdf":
-                buf = await asyncio.to_thread(self._export_to_pdf, period, deltas)
-                
-                if buf:
-                    now = datetime.datetime.now().strftime("%Y%m%d")
-                    filename = f"{period}_report_{now}.pdf"
-                    file = discord.File(buf, filename=filename)
-                    await ctx.send(f"✅ PDF raporu hazır!", file=file)
-                else:
-                    await ctx.send("❌ PDF oluşturulamadı.")
+            now = datetime.datetime.now().strftime("%Y%m%d")
+            filename = f"{period}_report_{now}.{EXPORT_EXTENSIONS[format]}"
+            file = discord.File(io.BytesIO(data), filename=filename)
+            await ctx.send(f"✅ {format.upper()} raporu hazır! ({count} oyuncu)", file=file)
         
         except Exception as e:
             await ctx.send(f"❌ Export hatası: {e}")
             logger.error(f"Export error: {e}", exc_info=True)
     
+    async def _load_hall_of_fame_db(self):
+        """Read Hall of Fame rows from DB in the legacy JSON layout used by the embed."""
+        hof = {"weekly_champions": {}, "monthly_champions": {}, "records": {}}
+        try:
+            records = await self.db.get_hall_of_fame_records()
+        except Exception as e:
+            logger.error(f"Hall of Fame DB read error: {e}")
+            return hof
+        
+        for r in records:
+            date_str = r.achieved_at.strftime("%Y-%m-%d") if r.achieved_at else "-"
+            if r.record_type in hof:
+                # Champion tallies (already ordered by count)
+                hof[r.record_type][r.player_name or r.steam_id] = int(r.value)
+            elif r.record_type == "highest_weekly_score":
+                hof["records"]["highest_weekly_score"] = {"player": r.player_name, "score": int(r.value), "date": date_str}
+            elif r.record_type == "highest_weekly_kills":
+                hof["records"]["highest_kills_week"] = {"player": r.player_name, "kills": int(r.value), "date": date_str}
+        return hof
+    
     @commands.command(name='hall_of_fame', aliases=['hof', 'sampiyonlar'])
     async def hall_of_fame_cmd(self, ctx):
         """Hall of Fame - Şampiyonlar listesi"""
         
-        report_db = self._get_report_db()
-        hof = report_db.get("hall_of_fame", {})
+        if not self.json_mode:
+            hof = await self._load_hall_of_fame_db()
+        else:
+            report_db = self._get_report_db()
+            hof = report_db.get("hall_of_fame", {})
         
         if not hof or not any(hof.values()):
             await ctx.send("📜 Henüz Hall of Fame verisi yok. İlk rapor sonrası oluşacak.")
@@ -2919,45 +2883,18 @@ class SquadPlayers(commands.Cog):
         await ctx.send(embed=embed)
 
     async def _publish_report(self, guild, period, channel=None):
-        deltas = self._calculate_deltas(period)
-        if not deltas: return
-        
-        embed = self._create_report_embed(deltas, period, preview=False)
-        
-        # Generate charts
-        from cogs.utils.chart_maker import generate_report_charts
-        try:
-            chart_buf = await asyncio.to_thread(generate_report_charts, deltas, period)
-            file = discord.File(chart_buf, filename="report_charts.png")
-            embed.set_image(url="attachment://report_charts.png")
-        except Exception as e:
-            logger.error(f"Chart generation failed: {e}")
-            file = None
-        
-        if not channel:
-            channel = discord.utils.get(guild.text_channels, name="rapor-log")
-            if not channel:
-                 # Fallback 1: squad-log
-                 channel = discord.utils.get(guild.text_channels, name="squad-log")
-        
-        if channel:
-            if file:
-                await channel.send(embed=embed, file=file)
-            else:
-                await channel.send(embed=embed)
-        else:
-             logger.warning(f"Report Generation Failed: No suitable channel found in {guild.name}")
-             pass
+        await self.report_system.publish_report(guild, period, channel=channel)
 
     def _create_report_embed(self, deltas, period, preview=False):
         # Sorts
-        top_score = sorted(deltas, key=lambda x: x["score"], reverse=True)[:1]
-        top_kill = sorted(deltas, key=lambda x: x["kills"], reverse=True)[:1]
-        top_revive = sorted(deltas, key=lambda x: x["revives"], reverse=True)[:1]
-        # top_kd = sorted(deltas, key=lambda x: x["kd"], reverse=True) # Needs min kill filter
+        frame = ReportFrame.from_deltas(deltas)
+        top_score = frame.records(frame.top_k("score", 1))
+        top_kill = frame.records(frame.top_k("kills", 1))
+        top_revive = frame.records(frame.top_k("revives", 1))
+        # top_kd = frame.top_k("kd", 1) # Needs min kill filter
         
         # Leaderboard (Score)
-        leaderboard = sorted(deltas, key=lambda x: x["score"], reverse=True)[:10]
+        leaderboard = frame.records(frame.top_k("score", 10))
 
         period_map = {"weekly": "Haftalık", "monthly": "Aylık", "daily": "Günlük"}
         title_p = period_map.get(period, period.capitalize())
@@ -3324,6 +3261,64 @@ class SquadPlayers(commands.Cog):
             await status_msg.edit(content=f"❌ **Panel oluşturulurken hata:** {e}")
             logger.error(f"Activity panel error: {e}", exc_info=True)
 
+    @commands.command(name='oyun_saatleri', aliases=['oyun_yogunluk', 'play_heatmap'])
+    async def oyun_saatleri(self, ctx, *, query: Union[discord.Member, str] = None):
+        """Sunucunun (veya bir oyuncunun) en yoğun oyun gün/saatlerini ve birlikte oynadıklarını gösterir (son 4 hafta)."""
+        if self.json_mode:
+            await ctx.send("❌ Bu komut SQLite modunda çalışır.")
+            return
+        days = ["Pzt", "Sal", "Çar", "Per", "Cum", "Cmt", "Paz"]
+        
+        player = None
+        if query is not None:
+            if isinstance(query, discord.Member):
+                player = await self.db.get_player_by_discord_id(query.id)
+            else:
+                player = await self.db.get_player_by_steam_id(query.strip())
+                if not player:
+                    found = await self.db.search_players(query.strip())
+                    exact = [p for p in found if p.name.lower() == query.strip().lower()]
+                    player = (exact or found or [None])[0]
+            if not player:
+                await ctx.send("❌ Oyuncu bulunamadı.")
+                return
+        
+        matrix = await self.db.get_presence_heatmap(days=28, player_ids=[player.id] if player else None)
+        slots = sorted(
+            ((minutes, day, hour) for day, row in enumerate(matrix) for hour, minutes in enumerate(row) if minutes > 0),
+            reverse=True
+        )[:5]
+        if not slots:
+            await ctx.send("Henüz kayıtlı oyun verisi yok.")
+            return
+        
+        def fmt(minutes):
+            return f"{minutes // 60}sa {minutes % 60}dk" if minutes >= 60 else f"{minutes}dk"
+        
+        title = f"🎮 Oyun Saatleri: {player.name}" if player else "🎮 Sunucu Oyun Yoğunluğu (Son 4 Hafta)"
+        embed = discord.Embed(title=title, color=discord.Color(COLORS.SQUAD))
+        embed.add_field(
+            name="En Yoğun Saatler" if player else "En Yoğun Saatler (toplam oyuncu-süre)",
+            value="\n".join(f"**{days[day]} {hour:02d}:00** – `{fmt(minutes)}`" for minutes, day, hour in slots),
+            inline=False
+        )
+        day_totals = [sum(row) for row in matrix]
+        embed.add_field(
+            name="Günlere Göre",
+            value=" | ".join(f"{days[d]}: {fmt(t)}" for d, t in enumerate(day_totals) if t > 0),
+            inline=False
+        )
+        
+        if player:
+            overlap = await self.db.get_presence_overlap(player.id, days=28, limit=5)
+            embed.add_field(
+                name="En Çok Birlikte Oynadıkları",
+                value="\n".join(f"**{p.name}** – `{fmt(minutes)}`" for p, minutes in overlap) or "-",
+                inline=False
+            )
+        embed.set_footer(text="2 dakikalık varlık kayıtlarından hesaplanır")
+        await ctx.send(embed=embed)
+
     @commands.command(name='aktiflik_yonet')
     async def aktiflik_yonet(self, ctx):
         """Aktiflik panelini yönet."""
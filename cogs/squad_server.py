@@ -7,6 +7,8 @@ import asyncio
 import datetime
 from .utils.config import ADMIN_USER_IDS, ADMIN_ROLE_IDS, BM_API_URL, SERVER_ID, COLORS
 from .utils.chart_maker import generate_live_server_image
+from .squad.rcon import get_rcon
+from exceptions import RconError
 import logging
 
 logger = logging.getLogger("SquadServer")
@@ -114,6 +116,98 @@ class SquadServer(commands.Cog):
     async def before_live_panel(self):
         await self.bot.wait_until_ready()
 
+    async def fetch_live_server(self):
+        """
+        (server_info, [(name, steam_id)]) of the main server, or None on error.
+        Uses RCON when it is configured for SERVER_ID, otherwise BattleMetrics.
+        """
+        rcon = get_rcon(self.bot, SERVER_ID)
+        if rcon:
+            try:
+                info = await rcon.server_info()
+                players = await rcon.list_players()
+            except RconError as e:
+                logger.error(f"RCON panel fetch failed: {e}")
+                return None
+            server_info = {
+                'name': info.get('ServerName_s', 'Squad Server'),
+                'map': info.get('MapName_s', '?'),
+                'players': f"{len(players)}/{info.get('MaxPlayers', 100)}",
+                'queue': str(info.get('PublicQueue_I', 0))
+            }
+            return server_info, [(p.name, p.steam_id) for p in players]
+
+        url = f"{BM_API_URL}/servers/{SERVER_ID}?include=player,identifier"
+        async with self.session.get(url, headers=self.get_headers()) as response:
+            if response.status != 200: 
+                logger.error(f"BM API Error: {response.status}")
+                return None
+            logger.info(f"BM API Success. Status: {response.status}")
+            
+            data = await response.json()
+            server_info = data['data']['attributes']
+            included_players = data.get('included', [])
+            
+            # Debug types in included
+            types_found = set(i.get('type') for i in included_players)
+            logger.debug(f"Input Included Types: {types_found}")
+            logger.debug(f"Included Count: {len(included_players)}")
+
+            # 1. Index Identifiers (Reverse Lookup: Identifier -> Player)
+            # The API structure links Identifier -> Player, not always Player -> Identifier
+            player_steam_map = {} # player_id -> steamID (str)
+            
+            for item in included_players:
+                if item.get('type') == 'identifier':
+                    attrs = item.get('attributes', {})
+                    if attrs.get('type') == 'steamID':
+                        steam_val = attrs.get('identifier')
+                        # Check relationships for player ID
+                        rels = item.get('relationships', {})
+                        player_data = rels.get('player', {}).get('data')
+                        if player_data and player_data.get('id'):
+                            p_id = player_data.get('id')
+                            player_steam_map[p_id] = steam_val
+
+            logger.info(f"Mapped {len(player_steam_map)} SteamIDs from Identifiers.")
+
+            players = []
+            for p in included_players:
+                if p['type'] != 'player': continue
+                
+                if len(players) == 0:
+                    logger.debug(f"First Player Raw Rels: {p.get('relationships')}")
+
+                attrs = p['attributes']
+                p_name = attrs['name']
+                p_id = p.get('id')
+                
+                # Extract SteamID
+                steam_id = None
+                
+                # 1. Try Reverse Map (Identifiers -> Player) which we just built
+                if p_id in player_steam_map:
+                    steam_id = player_steam_map[p_id]
+                
+                # 2. Try Attributes (Legacy/Some endpoints)
+                if not steam_id:
+                    idents_attr = attrs.get('identifiers', [])
+                    if idents_attr:
+                         for ident in idents_attr:
+                             if isinstance(ident, dict) and ident.get('type') == 'steamID':
+                                steam_id = ident.get('identifier')
+                                break
+                players.append((p_name, steam_id))
+
+            # Parse server info for image generation
+            parsed_server_info = {
+                'name': server_info.get('name', 'Squad Server'),
+                'map': server_info.get('details', {}).get('map', '?'),
+                'players': f"{server_info.get('players', 0)}/{server_info.get('maxPlayers', 100)}",
+                'queue': str(server_info.get('details', {}).get('squad_publicQueue', 0))
+            }
+            return parsed_server_info, players
+
     async def update_live_panels(self):
         if not self.session: self.session = aiohttp.ClientSession()
         
@@ -152,226 +246,163 @@ class SquadServer(commands.Cog):
         logger.info(f"Loaded {len(player_map)} Discord ID mappings.")
             
         try:
-            url = f"{BM_API_URL}/servers/{SERVER_ID}?include=player,identifier"
-            async with self.session.get(url, headers=self.get_headers()) as response:
-                if response.status != 200: 
-                    logger.error(f"BM API Error: {response.status}")
-                    return
-                logger.info(f"BM API Success. Status: {response.status}")
-                
-                data = await response.json()
-                server_info = data['data']['attributes']
-                included_players = data.get('included', [])
-                
-                # Debug types in included
-                types_found = set(i.get('type') for i in included_players)
-                logger.debug(f"Input Included Types: {types_found}")
-                logger.debug(f"Included Count: {len(included_players)}")
-
-                # 1. Index Identifiers (Reverse Lookup: Identifier -> Player)
-                # The API structure links Identifier -> Player, not always Player -> Identifier
-                player_steam_map = {} # player_id -> steamID (str)
-                
-                for item in included_players:
-                    if item.get('type') == 'identifier':
-                        attrs = item.get('attributes', {})
-                        if attrs.get('type') == 'steamID':
-                            steam_val = attrs.get('identifier')
-                            # Check relationships for player ID
-                            rels = item.get('relationships', {})
-                            player_data = rels.get('player', {}).get('data')
-                            if player_data and player_data.get('id'):
-                                p_id = player_data.get('id')
-                                player_steam_map[p_id] = steam_val
-
-                logger.info(f"Mapped {len(player_steam_map)} SteamIDs from Identifiers.")
-                
-                # Process Players
-                processed_list = []
-                # Better Guild Selection: Use the first one from config if available
-                guild = None
-                if config:
-                    try:
-                        gid = int(list(config.keys())[0])
-                        guild = self.bot.get_guild(gid)
-                    except: pass
+            fetched = await self.fetch_live_server()
+            if fetched is None:
+                return
+            parsed_server_info, live_players = fetched
+            logger.debug(f"Parsed Server Info: {parsed_server_info}")
+
+            # Process Players
+            processed_list = []
+            # Better Guild Selection: Use the first one from config if available
+            guild = None
+            if config:
+                try:
+                    gid = int(list(config.keys())[0])
+                    guild = self.bot.get_guild(gid)
+                except: pass
+            
+            if not guild and self.bot.guilds:
+                guild = self.bot.guilds[0]
+            
+            for p_name, steam_id in live_players:
+                # Check DB (Filter)
+                is_valid = False
+                if steam_id and steam_id in valid_identifiers: 
+                    is_valid = True
+                    logger.debug(f"MATCH: {p_name} ({steam_id}) found in DB.")
+                elif p_name in valid_identifiers: 
+                    is_valid = True
+                    logger.debug(f"MATCH: {p_name} found by NAME in DB.")
                 
-                if not guild and self.bot.guilds:
-                    guild = self.bot.guilds[0]
+                if not is_valid: 
+                    # Strict Mode: Skip if not in DB
+                    # log_debug(f"SKIP: {p_name} (Steam: {steam_id})")
+                    continue
+
+                # Find Discord ID for Voice Check
+                d_val = player_map.get(p_name)
+                if not d_val and steam_id:
+                    d_val = player_map.get(steam_id)
+
+                # Determine Status
+                status_text = "YOK"
+                details = "Ses Yok"
                 
-                for p in included_players:
-                    if p['type'] != 'player': continue
-                    
-                    if len(processed_list) == 0:
-                        logger.debug(f"First Player Raw Rels: {p.get('relationships')}")
-
-                    attrs = p['attributes']
-                    p_name = attrs['name']
-                    p_id = p.get('id')
-                    
-                    # Extract SteamID
-                    steam_id = None
-                    
-                    # 1. Try Reverse Map (Identifiers -> Player) which we just built
-                    if p_id in player_steam_map:
-                        steam_id = player_steam_map[p_id]
-                    
-                    # 2. Try Attributes (Legacy/Some endpoints)
-                    if not steam_id:
-                        idents_attr = attrs.get('identifiers', [])
-                        if idents_attr:
-                             for ident in idents_attr:
-                                 if isinstance(ident, dict) and ident.get('type') == 'steamID':
-                                    steam_id = ident.get('identifier')
-                                    break
-                    
-                    # Check DB (Filter)
-                    is_valid = False
-                    if steam_id and steam_id in valid_identifiers: 
-                        is_valid = True
-                        logger.debug(f"MATCH: {p_name} ({steam_id}) found in DB.")
-                    elif p_name in valid_identifiers: 
-                        is_valid = True
-                        logger.debug(f"MATCH: {p_name} found by NAME in DB.")
-                    
-                    if not is_valid: 
-                        # Strict Mode: Skip if not in DB
-                        # log_debug(f"SKIP: {p_name} (Steam: {steam_id})")
-                        continue
-
-                    # Find Discord ID for Voice Check
-                    d_val = player_map.get(p_name)
-                    if not d_val and steam_id:
-                        d_val = player_map.get(steam_id)
-
-                    # Determine Status
-                    status_text = "YOK"
-                    details = "Ses Yok"
-                    
-                    member = None
-                    if guild:
-                        # Strategy 1: Try Discord ID from DB
-                        if d_val:
-                            # Hybrid Lookup: Int (ID) or String (Nick)
-                            if isinstance(d_val, int) or (isinstance(d_val, str) and d_val.isdigit()):
-                                member = guild.get_member(int(d_val))
-                                if member:
-                                    logger.debug(f"✅ {p_name} → Found by ID: {member.display_name}")
-                                else:
-                                    logger.debug(f"⚠️ {p_name} → ID {d_val} not found in guild")
-                            elif isinstance(d_val, str):
-                                # Try to find by display_name or name
-                                d_val_lower = d_val.lower()
-                                member = discord.utils.get(guild.members, display_name=d_val)
-                                
-                                if not member: # Try exact name
-                                    member = discord.utils.get(guild.members, name=d_val)
-                                    
-                                if not member: # Try case-insensitive scan
-                                    for m in guild.members:
-                                        if m.display_name.lower() == d_val_lower or m.name.lower() == d_val_lower:
-                                            member = m
-                                            break
-                                
-                                if member:
-                                    logger.debug(f"✅ {p_name} → Found by nickname: {member.display_name}")
-                                else:
-                                    logger.debug(f"⚠️ {p_name} → Nickname '{d_val}' not found")
-                        
-                        # Strategy 2: FALLBACK - Try to find member by in-game name (if DB lookup failed)
-                        if not member:
-                            p_name_lower = p_name.lower()
-                            # Try exact match first
-                            member = discord.utils.get(guild.members, display_name=p_name)
-                            
-                            if not member:
-                                member = discord.utils.get(guild.members, name=p_name)
+                member = None
+                if guild:
+                    # Strategy 1: Try Discord ID from DB
+                    if d_val:
+                        # Hybrid Lookup: Int (ID) or String (Nick)
+                        if isinstance(d_val, int) or (isinstance(d_val, str) and d_val.isdigit()):
+                            member = guild.get_member(int(d_val))
+                            if member:
+                                logger.debug(f"✅ {p_name} → Found by ID: {member.display_name}")
+                            else:
+                                logger.debug(f"⚠️ {p_name} → ID {d_val} not found in guild")
+                        elif isinstance(d_val, str):
+                            # Try to find by display_name or name
+                            d_val_lower = d_val.lower()
+                            member = discord.utils.get(guild.members, display_name=d_val)
                             
-                            # Case-insensitive / partial match as last resort
-                            if not member:
+                            if not member: # Try exact name
+                                member = discord.utils.get(guild.members, name=d_val)
+                                
+                            if not member: # Try case-insensitive scan
                                 for m in guild.members:
-                                    # Check if in-game name is in Discord name or vice versa
-                                    if (p_name_lower in m.display_name.lower() or 
-                                        m.display_name.lower() in p_name_lower or
-                                        p_name_lower in m.name.lower() or
-                                        m.name.lower() in p_name_lower):
+                                    if m.display_name.lower() == d_val_lower or m.name.lower() == d_val_lower:
                                         member = m
-                                        logger.debug(f"🔍 {p_name} → Fallback match: {m.display_name}")
                                         break
                             
-                            if not member:
-                                logger.debug(f"❌ {p_name} → No Discord member found (DB: {d_val})")
-
-                    if member and member.voice and member.voice.channel:
-                        status_text = "SES"
-                        details = member.voice.channel.name
-                        if member.voice.self_mute or member.voice.mute:
-                            status_text = "MUTE"
-                    else:
-                        if member:
-                             logger.debug(f"🔇 {p_name} → Member {member.display_name} found but NOT in voice")
+                            if member:
+                                logger.debug(f"✅ {p_name} → Found by nickname: {member.display_name}")
+                            else:
+                                logger.debug(f"⚠️ {p_name} → Nickname '{d_val}' not found")
                     
-                    processed_list.append({
-                        "name": p_name,
-                        "status_text": status_text,
-                        "details": details
-                    })
+                    # Strategy 2: FALLBACK - Try to find member by in-game name (if DB lookup failed)
+                    if not member:
+                        p_name_lower = p_name.lower()
+                        # Try exact match first
+                        member = discord.utils.get(guild.members, display_name=p_name)
+                        
+                        if not member:
+                            member = discord.utils.get(guild.members, name=p_name)
+                        
+                        # Case-insensitive / partial match as last resort
+                        if not member:
+                            for m in guild.members:
+                                # Check if in-game name is in Discord name or vice versa
+                                if (p_name_lower in m.display_name.lower() or 
+                                    m.display_name.lower() in p_name_lower or
+                                    p_name_lower in m.name.lower() or
+                                    m.name.lower() in p_name_lower):
+                                    member = m
+                                    logger.debug(f"🔍 {p_name} → Fallback match: {m.display_name}")
+                                    break
+                        
+                        if not member:
+                            logger.debug(f"❌ {p_name} → No Discord member found (DB: {d_val})")
+
+                if member and member.voice and member.voice.channel:
+                    status_text = "SES"
+                    details = member.voice.channel.name
+                    if member.voice.self_mute or member.voice.mute:
+                        status_text = "MUTE"
+                else:
+                    if member:
+                         logger.debug(f"🔇 {p_name} → Member {member.display_name} found but NOT in voice")
+                
+                processed_list.append({
+                    "name": p_name,
+                    "status_text": status_text,
+                    "details": details
+                })
+            
+            # Sort: SES first, then Name
+            processed_list.sort(key=lambda x: (x["status_text"] != "SES", x["name"]))
+            
+            logger.info(f"Processed List Size: {len(processed_list)}")
+
+            # Generate Image
+            try:
+                image_buf = generate_live_server_image(parsed_server_info, processed_list)
+                # log_debug("Image Generated.")
+            except Exception as img_err:
+                logger.error(f"Image Gen Error: {img_err}")
+                raise img_err
+            
+            for guild_id, cfg in config.items():
+                channel_id = cfg.get("channel_id")
+                message_id = cfg.get("message_id")
                 
-                # Sort: SES first, then Name
-                processed_list.sort(key=lambda x: (x["status_text"] != "SES", x["name"]))
+                channel = self.bot.get_channel(channel_id)
+                if not channel: continue
                 
-                logger.info(f"Processed List Size: {len(processed_list)}")
-
-                # Parse server info for image generation
-                parsed_server_info = {
-                    'name': server_info.get('name', 'Squad Server'),
-                    'map': server_info.get('details', {}).get('map', '?'),
-                    'players': f"{server_info.get('players', 0)}/{server_info.get('maxPlayers', 100)}",
-                    'queue': str(server_info.get('details', {}).get('squad_publicQueue', 0))
-                }
+                image_buf.seek(0)
+                file = discord.File(image_buf, filename="status.png")
                 
-                logger.debug(f"Parsed Server Info: {parsed_server_info}")
-
-                # Generate Image
-                try:
-                    image_buf = generate_live_server_image(parsed_server_info, processed_list)
-                    # log_debug("Image Generated.")
-                except Exception as img_err:
-                    logger.error(f"Image Gen Error: {img_err}")
-                    raise img_err
+                embed = discord.Embed(color=discord.Color(COLORS.DEFAULT))
+                embed.set_image(url="attachment://status.png")
+                embed.set_footer(text=f"Son Güncelleme: {datetime.datetime.now().strftime('%H:%M:%S')}")
                 
-                for guild_id, cfg in config.items():
-                    channel_id = cfg.get("channel_id")
-                    message_id = cfg.get("message_id")
-                    
-                    channel = self.bot.get_channel(channel_id)
-                    if not channel: continue
-                    
-                    image_buf.seek(0)
-                    file = discord.File(image_buf, filename="status.png")
-                    
-                    embed = discord.Embed(color=discord.Color(COLORS.DEFAULT))
-                    embed.set_image(url="attachment://status.png")
-                    embed.set_footer(text=f"Son Güncelleme: {datetime.datetime.now().strftime('%H:%M:%S')}")
-                    
-                    # Update or Send
-                    if message_id:
-                        try:
-                            msg = await channel.fetch_message(message_id)
-                            await msg.edit(embed=embed, attachments=[file])
-                        except discord.NotFound:
-                             # Re-send
-                             image_buf.seek(0)
-                             file = discord.File(image_buf, filename="status.png")
-                             new_msg = await channel.send(embed=embed, file=file)
-                             config[guild_id]["message_id"] = new_msg.id
-                        except Exception as e:
-                            logger.error(f"Edit Error: {e}")
-                    else:
-                        new_msg = await channel.send(embed=embed, file=file)
-                        config[guild_id]["message_id"] = new_msg.id
-                    
-                await self.save_panel_config(config)
+                # Update or Send
+                if message_id:
+                    try:
+                        msg = await channel.fetch_message(message_id)
+                        await msg.edit(embed=embed, attachments=[file])
+                    except discord.NotFound:
+                         # Re-send
+                         image_buf.seek(0)
+                         file = discord.File(image_buf, filename="status.png")
+                         new_msg = await channel.send(embed=embed, file=file)
+                         config[guild_id]["message_id"] = new_msg.id
+                    except Exception as e:
+                        logger.error(f"Edit Error: {e}")
+                else:
+                    new_msg = await channel.send(embed=embed, file=file)
+                    config[guild_id]["message_id"] = new_msg.id
+                
+            await self.save_panel_config(config)
 
         except Exception as e:
             logger.error(f"Global Update Error: {e}", exc_info=True)
@@ -87,10 +87,19 @@ class Status(commands.Cog):
         # Squad Players
         if squad_players:
             track_status = "🟢 Çalışıyor" if squad_players.activity_tracker_loop.is_running() else "🔴 Durmuş"
-            sync_status = "🟢 Çalışıyor" if squad_players.auto_sync_loop.is_running() else "🔴 Durmuş"
+            scheduler = getattr(self.bot, "scheduler", None)
+            jobs = {j["name"]: j for j in scheduler.get_jobs()} if scheduler else {}
+            sync_job = jobs.get("squad_sync")
+            if sync_job:
+                sync_status = f"🟢 Sonraki: {sync_job['next_run'].strftime('%d.%m %H:%M')}"
+            else:
+                sync_status = "🔴 Durmuş"
             
             modules_text += f"**Aktivite Takip:** {track_status}\n"
             modules_text += f"**Auto Sync:** {sync_status}\n"
+            for name, label in (("report_weekly", "Haftalık Rapor"), ("report_monthly", "Aylık Rapor")):
+                if name in jobs:
+                    modules_text += f"**{label}:** {jobs[name]['next_run'].strftime('%d.%m %H:%M')}\n"
             
             # Last Activity Log check
             if hasattr(squad_players, 'json_mode'):
@@ -112,12 +121,13 @@ class Status(commands.Cog):
         event_cog = self.bot.get_cog('Event')
         event_txt = "⚪ Yüklü Değil"
         if event_cog:
-            # Assuming 'check_events_task' exists in Event cog
             try:
-                loop_status = "🟢" if event_cog.check_events_task.is_running() else "🔴"
-                event_txt = f"Etkinlik Döngüsü: {loop_status}"
+                next_timer = event_cog.timers.next_deadline()
+                event_txt = f"Aktif Etkinlik: {len(event_cog.store)} | Zamanlayıcı: {len(event_cog.timers)}"
+                if next_timer:
+                    event_txt += f"\nSonraki: <t:{int(next_timer[0])}:R>"
             except AttributeError:
-                event_txt = "🟡 Döngü Bulunamadı"
+                event_txt = "🟡 Zamanlayıcı Bulunamadı"
         embed.add_field(name="📅 Etkinlik Sistemi", value=event_txt, inline=False)
 
         # Voice Stats Module
@@ -125,11 +135,11 @@ class Status(commands.Cog):
         voice_txt = "⚪ Yüklü Değil"
         if voice_cog:
             try:
-                # Assuming 'save_stats_loop' exists
-                loop_status = "🟢" if voice_cog.save_stats_loop.is_running() else "🔴"
-                voice_txt = f"İstatistik Kayıt: {loop_status}"
+                ledger = voice_cog.ledger
+                voice_txt = (f"Seste: {len(ledger.open_sessions)} | "
+                             f"Kayıt: {ledger.stats['rows']} oturum / {ledger.stats['flushes']} toplu yazma")
             except AttributeError:
-                voice_txt = "🟡 Döngü Bulunamadı"
+                voice_txt = "🟡 Kayıt Defteri Bulunamadı"
         embed.add_field(name="🎤 Ses İstatistikleri", value=voice_txt, inline=False)
 
         await ctx.send(embed=embed)
@@ -9,6 +9,11 @@ from typing import Optional, Dict, List
 import logging
 
 from .utils.config import ADMIN_USER_IDS, ADMIN_ROLE_IDS, BM_API_URL, BM_API_KEY, COLORS
+from .utils.config import TRAINING_SERVER_ID, TRAINING_SAMPLE_SECONDS, SQUAD_RCON_POLL_SECONDS
+from .utils.match_recorder import MatchRecorder
+from .utils.scheduler import get_scheduler, every
+from .squad.squad_log import get_squad_log
+from .squad.rcon import get_rcon
 
 # Import custom exceptions
 from exceptions import APIError, BattleMetricsAPIError, DataError, JSONParseError
@@ -33,25 +38,69 @@ class TrainingMatches(commands.Cog):
         self.db.init_db()
         self.training_server_ip = "84.200.135.219:7789"
         self.active_match = None  # Will be loaded from DB
+        # Presence samples of the active match (in memory until training_end)
+        self.recorder = None
         
     async def cog_load(self):
         """Cog yüklendiğinde HTTP session oluştur ve aktif maçı kontrol et"""
         self.session = aiohttp.ClientSession()
         
+        # Kills / deaths / revives straight from SquadGame.log when it is available
+        squad_log = get_squad_log(self.bot)
+        if squad_log:
+            squad_log.add_listener(self.on_squad_log_events)
+        
         # Check for active match in DB
         active = await self.db.get_active_training_match()
         if active:
             self.active_match = active.id
+            # Samples taken before the restart are lost; tracking resumes from now
+            await self.start_recording(active.id, active.start_time, resumed=True)
             logger.info(f"Restored active match {self.active_match}")
         
         logger.info("TrainingMatches cog loaded")
         
     async def cog_unload(self):
         """Cog kaldırıldığında session'ı kapat"""
+        scheduler = getattr(self.bot, "scheduler", None)
+        if scheduler:
+            scheduler.remove_job("training_sample")
         if self.session:
             await self.session.close()
         logger.info("TrainingMatches cog unloaded")
     
+    async def start_recording(self, match_id: int, started_at: datetime.datetime, snapshot: Optional[Dict] = None,
+                              resumed: bool = False):
+        """Start sampling the training server for the active match"""
+        self.recorder = MatchRecorder(match_id, started_at, resumed=resumed)
+        if snapshot:
+            self.recorder.observe(snapshot, started_at)
+        if TRAINING_SERVER_ID:
+            await get_scheduler(self.bot).add_job(
+                "training_sample", every(datetime.timedelta(seconds=self.sample_seconds)),
+                self.sample_training_server, catch_up=False
+            )
+    
+    @property
+    def sample_seconds(self) -> int:
+        """RCON samples are free, BattleMetrics samples cost API quota"""
+        return SQUAD_RCON_POLL_SECONDS if get_rcon(self.bot, TRAINING_SERVER_ID) else TRAINING_SAMPLE_SECONDS
+    
+    def on_squad_log_events(self, events):
+        """SquadGame.log batch -> combat counters of the active match"""
+        if self.recorder and not self.recorder.ended_at:
+            self.recorder.apply_log_events(events)
+    
+    async def sample_training_server(self):
+        """Scheduler job: one presence sample of the active match"""
+        recorder = self.recorder
+        if not recorder or recorder.ended_at:
+            return
+        snapshot = await self.fetch_snapshot(TRAINING_SERVER_ID)
+        if snapshot and self.recorder is recorder:
+            recorder.observe(snapshot)
+            logger.debug(f"Match {recorder.match_id} sample {recorder.samples}: {recorder.online()} online")
+    
     def get_headers(self):
         """BattleMetrics API headers"""
         if BM_API_KEY:
@@ -72,6 +121,19 @@ class TrainingMatches(commands.Cog):
     
 
     
+    async def fetch_snapshot(self, server_id: str) -> Optional[Dict]:
+        """
+        Online players of a server: over RCON when it is configured for the
+        server, otherwise from BattleMetrics.
+        
+        There is no BattleMetrics fallback on RCON errors; mixing the two
+        sources within a match would key the same player twice.
+        """
+        rcon = get_rcon(self.bot, server_id)
+        if rcon:
+            return await rcon.snapshot()
+        return await self.fetch_battlemetrics_snapshot(server_id)
+    
     async def fetch_battlemetrics_snapshot(self, server_id: str) -> Optional[Dict]:
         """
         BattleMetrics API'den oyuncu snapshot'ı al
@@ -197,6 +259,20 @@ class TrainingMatches(commands.Cog):
     
 
     
+    async def resolve_match(self, ctx, match_id: str = None) -> Optional[Dict]:
+        """Maç ID'si verilirse o maçı, verilmezse son maçı getirir (bulunamazsa mesaj gönderir)"""
+        if match_id:
+            match = await self.db.get_training_match_detail(int(match_id)) if str(match_id).isdigit() else None
+            if not match:
+                await ctx.send(f"❌ Maç ID `{match_id}` bulunamadı! Mevcut maçları görmek için `!training_list` kullanın.")
+            return match
+        
+        matches, _ = await self.db.list_training_matches(limit=1)
+        if not matches:
+            await ctx.send("❌ Henüz hiç maç kaydı yok!")
+            return None
+        return matches[0]
+    
     @commands.command(name='training_start', aliases=['ts'])
     async def training_start(self, ctx, *, map_name: str = "Unknown"):
         """
@@ -237,9 +313,9 @@ class TrainingMatches(commands.Cog):
         # Snapshot al
         snapshot = None
         snapshot_json = None
-        from .utils.config import TRAINING_SERVER_ID
+        start_time = datetime.datetime.now()
         if TRAINING_SERVER_ID:
-            snapshot = await self.fetch_battlemetrics_snapshot(TRAINING_SERVER_ID)
+            snapshot = await self.fetch_snapshot(TRAINING_SERVER_ID)
             if snapshot:
                 snapshot_json = json.dumps(snapshot)
                 logger.info(f"Match {match_id} started with snapshot: {len(snapshot.get('players', []))} players")
@@ -250,7 +326,7 @@ class TrainingMatches(commands.Cog):
                 match_id=match_id,
                 server_ip=self.training_server_ip,
                 map_name=map_name,
-                start_time=datetime.datetime.now()
+                start_time=start_time
             )
             
             # Update snapshot logic if needed, create_training_match didn't support snapshot arg 
@@ -261,16 +337,18 @@ class TrainingMatches(commands.Cog):
                 await self.db.update_training_match(match_id=match_id, snapshot_start=snapshot_json)
             
             self.active_match = match_id
+            await self.start_recording(match_id, start_time, snapshot)
             
             embed = discord.Embed(
                 title="🎮 Training Maçı Başladı!",
-                description=f"**Maç ID:** `{match_id}`\n**Harita:** {map_name}\n**Başlangıç:** {datetime.datetime.now().strftime('%H:%M:%S')}",
+                description=f"**Maç ID:** `{match_id}`\n**Harita:** {map_name}\n**Başlangıç:** {start_time.strftime('%H:%M:%S')}",
                 color=discord.Color(COLORS.SUCCESS)
             )
             
             embed.add_field(
                 name="📊 Veri Toplama",
-                value="Maç bittiğinde `!training_end` komutu ile sonlandırın.",
+                value=f"Sunucu {self.sample_seconds} sn'de bir örnekleniyor (oyuncu giriş/çıkış süreleri).\n"
+                      f"Maç bittiğinde `!training_end` komutu ile sonlandırın.",
                 inline=False
             )
             
@@ -313,44 +391,37 @@ class TrainingMatches(commands.Cog):
         # Snapshot al
         snapshot_end = None
         snapshot_end_json = None
-        from .utils.config import TRAINING_SERVER_ID
         if TRAINING_SERVER_ID:
-            snapshot_end = await self.fetch_battlemetrics_snapshot(TRAINING_SERVER_ID)
+            snapshot_end = await self.fetch_snapshot(TRAINING_SERVER_ID)
             if snapshot_end:
                 snapshot_end_json = json.dumps(snapshot_end)
         
-        # Maçı kapat
+        get_scheduler(self.bot).remove_job("training_sample")
         end_time = datetime.datetime.now()
-        await self.db.update_training_match(
-            match_id=match_id,
-            status='completed',
-            end_time=end_time,
-            snapshot_end=snapshot_end_json
+        recorder = self.recorder
+        if recorder is None or recorder.match_id != match_id:
+            # No samples in memory: the final snapshot is all we know (seen, no time credited)
+            active_db = await self.db.get_active_training_match()
+            recorder = MatchRecorder(match_id, active_db.start_time if active_db else end_time, resumed=True)
+        recorder.stop(snapshot_end, end_time)
+        self.recorder = None
+        participants = recorder.participants()
+        
+        # KDA from SquadGame.log only. The stats sync runs every few hours and covers every
+        # server, so its samples cannot be cut to the match window; those players stay 'pending'.
+        deltas = {
+            steam_id: {"steam_id": steam_id, "kills_delta": s["kills"], "deaths_delta": s["deaths"]}
+            for steam_id, s in recorder.log_stats.items()
+        }
+        
+        # Maçı kapat + tüm katılımcılar tek işlemde
+        result = await self.db.finish_training_match(
+            match_id, end_time, participants, snapshot_end=snapshot_end_json, deltas=deltas
+        )
+        logger.info(
+            f"Match {match_id} finished: {result['presence']} players seen in {recorder.samples} samples, "
+            f"{result['added']} added, {result['delta']} with delta KDA"
         )
-        
-        # Delta calculation logic - simplified for DB
-        # Retrieve start snapshot from DB if logic requires it
-        # Actually calculate_delta operates on 'match' dict.
-        # We can reconstruct a simple match dict for it OR refactor it.
-        # For simplicity, let's reuse logic by fetching details.
-        
-        # Get match details just to get snapshot_start
-        # (This is a bit inefficient but safe)
-        matches = await self.db.get_training_matches(limit=1, status='completed') # Should be this one usually
-        # Actually get by ID or status might not index well.
-        # Let's just trust we have snapshot_end players and add them as placeholders
-        
-        if snapshot_end:
-             # Add all present players as pending
-             count = 0
-             for p in snapshot_end.get('players', []):
-                 await self.db.add_training_player(match_id, {
-                     'steam_id': p['steam_id'],
-                     'name': p['name'],
-                     'data_source': 'pending'
-                 })
-                 count += 1
-             logger.info(f"Added {count} pending players to match {match_id}")
         
         self.active_match = None
         
@@ -360,6 +431,13 @@ class TrainingMatches(commands.Cog):
             color=discord.Color(COLORS.GOLD)
         )
         
+        embed.add_field(
+            name="👥 Katılım",
+            value=f"**{result['presence']}** oyuncu görüldü ({recorder.samples} örnek)\n"
+                  f"📊 Otomatik KDA: **{result['delta']}** oyuncu",
+            inline=False
+        )
+        
         embed.add_field(
             name="📊 Sonraki Adımlar",
             value=f"• Ekran görüntüsünden KDA eklemek için: `!training_kda_add`\n• Rapor görmek için: `!training_report {match_id}`",
@@ -377,15 +455,10 @@ class TrainingMatches(commands.Cog):
         if not await self.check_permissions(ctx):
             return
         
-        # Son tamamlanan maçı bul
-        matches = await self.db.get_training_matches(limit=1)
-        
-        if not matches:
-            await ctx.send("❌ Henüz hiç maç kaydı yok!")
+        # Son maçı bul
+        last_match = await self.resolve_match(ctx)
+        if not last_match:
             return
-        
-        # Son maçı al
-        last_match = matches[0]
         match_id = last_match['match_id']
         
         # Oyuncu isminden Steam ID bul
@@ -437,76 +510,36 @@ class TrainingMatches(commands.Cog):
             return
         
         # Belirtilen maçı bul
-        db = self.load_training_db()
-        
-        if not db['matches']:
-            await ctx.send("❌ Henüz hiç maç kaydı yok!")
-            return
-        
-        # Match ID'yi bul
-        target_match = None
-        for match in db['matches']:
-            if match['match_id'] == match_id:
-                target_match = match
-                break
-        
+        target_match = await self.resolve_match(ctx, match_id)
         if not target_match:
-            await ctx.send(f"❌ Maç ID `{match_id}` bulunamadı! Mevcut maçları görmek için `!training_list` kullanın.")
             return
         
-        # Oyuncu isminden Steam ID bul
-        steam_id = await self.find_steam_id_by_name(player_name)
+        # Maçta aynı isimde oyuncu varsa onu güncelle, yoksa Steam ID'yi isimden bul
+        existing = next((p for p in target_match['players']
+                         if p['name'] and p['name'].lower() == player_name.lower()), None)
+        steam_id = existing['steam_id'] if existing else await self.find_steam_id_by_name(player_name)
         if not steam_id:
             steam_id = 'unknown'
             logger.info(f"Steam ID not found for {player_name}, using 'unknown'")
         
-        # Oyuncuyu bul veya ekle
-        player_found = False
-        for player in target_match['players']:
-            if player['name'].lower() == player_name.lower():
-                # Güncelle
-                player['kills_manual'] = kills
-                player['deaths_manual'] = deaths
-                player['assists_manual'] = assists
-                
-                # Delta varsa hibrit, yoksa manuel
-                if player.get('kills_delta') is not None:
-                    player['final_kills'] = kills
-                    player['final_deaths'] = deaths
-                    player['final_assists'] = assists
-                    player['data_source'] = 'hybrid'
-                else:
-                    player['final_kills'] = kills
-                    player['final_deaths'] = deaths
-                    player['final_assists'] = assists
-                    player['data_source'] = 'manual'
-                
-                player['kd_ratio'] = round(kills / deaths, 2) if deaths > 0 else kills
-                player_found = True
-                break
-        
-        if not player_found:
-            # Yeni oyuncu ekle
-            target_match['players'].append({
-                'name': player_name,
-                'steam_id': steam_id,  # Auto-found or 'unknown'
-                'kills_delta': None,
-                'deaths_delta': None,
-                'kills_manual': kills,
-                'deaths_manual': deaths,
-                'assists_manual': assists,
-                'final_kills': kills,
-                'final_deaths': deaths,
-                'final_assists': assists,
-                'kd_ratio': round(kills / deaths, 2) if deaths > 0 else kills,
-                'data_source': 'manual'
-            })
-        
-        self.save_training_db(db)
+        # Delta varsa hibrit, yoksa manuel
+        source = 'hybrid' if existing and existing['data_source'] in ('delta', 'hybrid') else 'manual'
+        await self.db.add_training_player(target_match['match_id'], {
+            'steam_id': steam_id,
+            'name': player_name,
+            'kills_manual': kills,
+            'deaths_manual': deaths,
+            'assists_manual': assists,
+            'final_kills': kills,
+            'final_deaths': deaths,
+            'final_assists': assists,
+            'kd_ratio': round(kills / deaths, 2) if deaths > 0 else kills,
+            'data_source': source
+        })
         
         embed = discord.Embed(
             title="✅ KDA Eklendi (Belirli Maç)",
-            description=f"**Oyuncu:** {player_name}\n**Maç ID:** `{match_id}`\n**Harita:** {target_match['map']}",
+            description=f"**Oyuncu:** {player_name}\n**Maç ID:** `{match_id}`\n**Harita:** {target_match['map_name']}",
             color=discord.Color(COLORS.SUCCESS)
         )
         
@@ -524,24 +557,9 @@ class TrainingMatches(commands.Cog):
         """
         Training maçı raporu gösterir
         """
-        match = None
-        
-        if match_id:
-            # Try to find specific match
-            # Since adapter only has 'get_training_matches' (recent), we fetch more
-            matches = await self.db.get_training_matches(limit=50)
-            match = next((m for m in matches if str(m['match_id']) == str(match_id)), None)
-            
-            if not match:
-                await ctx.send(f"❌ Maç ID `{match_id}` bulunamadı! (Son 50 maç içinde aranır)")
-                return
-        else:
-            # Last match
-            matches = await self.db.get_training_matches(limit=1)
-            if not matches:
-                await ctx.send("❌ Henüz hiç maç kaydı yok!")
-                return
-            match = matches[0]
+        match = await self.resolve_match(ctx, match_id)
+        if not match:
+            return
             
         # Rapor oluştur
         status_text = match['status'].upper() if match['status'] else 'UNKNOWN'
@@ -605,20 +623,9 @@ class TrainingMatches(commands.Cog):
         """
         Maçtaki oyuncu katılım listesini gösterir
         """
-        match = None
-        
-        if match_id:
-             matches = await self.db.get_training_matches(limit=50)
-             match = next((m for m in matches if str(m['match_id']) == str(match_id)), None)
-             if not match:
-                await ctx.send(f"❌ Maç ID `{match_id}` bulunamadı!")
-                return
-        else:
-             matches = await self.db.get_training_matches(limit=1)
-             if not matches:
-                await ctx.send("❌ Henüz hiç maç kaydı yok!")
-                return
-             match = matches[0]
+        match = await self.resolve_match(ctx, match_id)
+        if not match:
+            return
         
         status_text = match['status'].upper() if match['status'] else 'UNKNOWN'
         
@@ -640,6 +647,8 @@ class TrainingMatches(commands.Cog):
                  d = p.get('final_deaths', 0)
                  a = p.get('final_assists', 0)
                  status = f"✅ K:{k} D:{d} A:{a}"
+            if p.get('seconds_on_server'):
+                status += f" | ⏱️ {int(p['seconds_on_server'] // 60)} dk"
             full_match_players.append(f"• {name} - {status}")
             
         if full_match_players:
@@ -655,10 +664,8 @@ class TrainingMatches(commands.Cog):
         else:
              embed.add_field(name="Bilgi", value="Kayıtlı oyuncu yok.")
         
-        await ctx.send(embed=embed)
-        
         # KDA ekleme talimatı
-        pending_count = sum(1 for sid in all_participants.keys() if sid not in player_data_map or player_data_map.get(sid, {}).get('data_source') == 'pending')
+        pending_count = sum(1 for p in match.get('players', []) if p.get('data_source') == 'pending')
         
         if pending_count > 0:
             embed.add_field(
@@ -667,16 +674,14 @@ class TrainingMatches(commands.Cog):
                 inline=False
             )
         
-        # Snapshot bilgisi
-        snapshot_info = "✅ Snapshot var" if (snapshot_start or snapshot_end) else "📝 Manuel veri"
-        embed.set_footer(text=f"Toplam: {len(all_participants)} | {snapshot_info} | ✅ = Veri Eklendi | ⏳ = Bekliyor")
+        embed.set_footer(text=f"Toplam: {len(full_match_players)} | ✅ = Veri Eklendi | ⏳ = Bekliyor")
         
         await ctx.send(embed=embed)
     
     @commands.command(name='training_list', aliases=['tl'])
     async def training_list(self, ctx):
         """Tüm training maçlarını listeler"""
-        matches = await self.db.get_training_matches(limit=10)
+        matches, _ = await self.db.list_training_matches(limit=10)
         
         if not matches:
             await ctx.send("❌ Henüz hiç maç kaydı yok!")
@@ -715,6 +720,28 @@ class TrainingMatches(commands.Cog):
         
         await ctx.send(embed=embed)
 
+    
+    @commands.command(name='training_stats', aliases=['tst'])
+    async def training_stats(self, ctx):
+        """Tüm tamamlanan maçlardaki oyuncu toplamları (kill, K/D, maç sayısı)"""
+        totals = await self.db.get_training_player_totals(limit=15)
+        if not totals:
+            await ctx.send("❌ Henüz KDA verisi olan maç yok!")
+            return
+        
+        lines = [
+            f"**{i}.** {t['name'][:20]} – K:{t['kills']} D:{t['deaths']} A:{t['assists']} | "
+            f"K/D: {t['kd_ratio']:.2f} | {t['matches']} maç"
+            for i, t in enumerate(totals, 1)
+        ]
+        embed = discord.Embed(
+            title="🏅 Training Genel Sıralama",
+            description="\n".join(lines),
+            color=discord.Color(COLORS.GOLD)
+        )
+        embed.set_footer(text="Bekleyen (⏳) kayıtlar hariç, kill sayısına göre")
+        await ctx.send(embed=embed)
+
 
 async def setup(bot):
     await bot.add_cog(TrainingMatches(bot))
@@ -0,0 +1,128 @@
+import asyncio
+import io
+import logging
+import os
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger("AvatarCache")
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+
+class AvatarCache:
+    """
+    Discord avatar cache for profile cards.
+
+    Avatars are keyed by (user_id, avatar hash). The memory tier is an LRU of
+    pre-decoded, pre-resized Pillow images; the disk tier keeps the resized PNG
+    so a restart doesn't re-download everything. Discord is only hit when the
+    user's avatar hash changes.
+    """
+
+    def __init__(self, cache_dir: str = "avatar_cache", max_size: int = 256, size: int = 256):
+        self._memory = OrderedDict()  # user_id -> (avatar_key, Image)
+        self._lock = asyncio.Lock()
+        self._cache_dir = cache_dir
+        self._max_size = max_size
+        self._size = size
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._downloads = 0
+        os.makedirs(self._cache_dir, exist_ok=True)
+
+    def _disk_path(self, user_id: int, avatar_key: str) -> str:
+        return os.path.join(self._cache_dir, f"{user_id}_{avatar_key}.png")
+
+    def _decode(self, data: bytes):
+        """Decode raw bytes into an RGBA image at the card size."""
+        img = Image.open(io.BytesIO(data))
+        img = img.convert("RGBA")
+        if img.size != (self._size, self._size):
+            img = img.resize((self._size, self._size), Image.LANCZOS)
+        img.load()
+        return img
+
+    def _load_from_disk(self, user_id: int, avatar_key: str):
+        path = self._disk_path(user_id, avatar_key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return self._decode(f.read())
+
+    def _store_on_disk(self, user_id: int, avatar_key: str, img):
+        """Write the resized image and drop stale files for the same user."""
+        prefix = f"{user_id}_"
+        for name in os.listdir(self._cache_dir):
+            if name.startswith(prefix) and name != f"{user_id}_{avatar_key}.png":
+                try:
+                    os.remove(os.path.join(self._cache_dir, name))
+                except OSError:
+                    pass
+        img.save(self._disk_path(user_id, avatar_key), format="PNG")
+
+    def _remember(self, user_id: int, avatar_key: str, img):
+        self._memory[user_id] = (avatar_key, img)
+        self._memory.move_to_end(user_id)
+        while len(self._memory) > self._max_size:
+            self._memory.popitem(last=False)
+
+    async def get(self, user) -> Optional["Image.Image"]:
+        """
+        Return a ready-to-draw avatar image for a discord.User/Member.
+
+        Args:
+            user: Object with `id` and `display_avatar`
+
+        Returns:
+            Pillow image, or None if unavailable
+        """
+        if not HAS_PIL or user is None:
+            return None
+
+        asset = user.display_avatar
+        avatar_key = asset.key
+        user_id = user.id
+
+        async with self._lock:
+            cached = self._memory.get(user_id)
+            if cached and cached[0] == avatar_key:
+                self._memory.move_to_end(user_id)
+                self._memory_hits += 1
+                return cached[1]
+
+        # Disk tier
+        try:
+            img = await asyncio.to_thread(self._load_from_disk, user_id, avatar_key)
+        except Exception as e:
+            logger.warning(f"Avatar disk cache read error ({user_id}): {e}")
+            img = None
+
+        if img is not None:
+            self._disk_hits += 1
+        else:
+            # Hash changed or never seen: download once
+            data = await asyncio.wait_for(asset.with_size(self._size).read(), timeout=10)
+            img = await asyncio.to_thread(self._decode, data)
+            self._downloads += 1
+            try:
+                await asyncio.to_thread(self._store_on_disk, user_id, avatar_key, img)
+            except Exception as e:
+                logger.warning(f"Avatar disk cache write error ({user_id}): {e}")
+
+        async with self._lock:
+            self._remember(user_id, avatar_key, img)
+        return img
+
+    def get_stats(self) -> dict:
+        """Get basic cache statistics."""
+        return {
+            "memory_hits": self._memory_hits,
+            "disk_hits": self._disk_hits,
+            "downloads": self._downloads,
+            "size": len(self._memory),
+        }
@@ -208,7 +208,8 @@ def generate_profile_card(player_data, avatar_bytes=None):
     """
     Generates a player profile card using Matplotlib.
     player_data: dict containing 'name', 'rank', 'stats'
-    avatar_bytes: bytes of the discord avatar overlay
+    avatar_bytes: bytes of the discord avatar overlay, or an already decoded
+                  PIL image (see AvatarCache) to skip the decode step
     """
     from PIL import Image
     import io as io_module
@@ -225,9 +226,12 @@ def generate_profile_card(player_data, avatar_bytes=None):
     rank = player_data.get('rank', 'Üye')
     ax.text(0.5, 0.82, rank, ha='center', va='top', fontsize=16, color='#b9bbbe')
     
-    if avatar_bytes:
+    if avatar_bytes is not None:
         try:
-            avatar_img = Image.open(io_module.BytesIO(avatar_bytes))
+            if isinstance(avatar_bytes, Image.Image):
+                avatar_img = avatar_bytes
+            else:
+                avatar_img = Image.open(io_module.BytesIO(avatar_bytes))
             avatar_ax = fig.add_axes([0.05, 0.65, 0.2, 0.2])
             avatar_ax.imshow(avatar_img)
             avatar_ax.axis('off')
@@ -36,8 +36,48 @@ BM_API_KEY = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJ0b2tlbiI6ImZkNjFiNGUwNDg3N
 # Training Server Configuration (84.200.135.219:7789)
 TRAINING_SERVER_IP = "84.200.135.219:7789"
 TRAINING_SERVER_ID = "24580202"  # BattleMetrics Server ID - Delta hesaplama aktif
+# Active training matches: seconds between presence samples of the training server
+TRAINING_SAMPLE_SECONDS = 60
 
+# SquadGame.log event source (only when the bot runs next to the Squad server)
+# e.g. "/home/squad/SquadGame/Saved/Logs/SquadGame.log"; None = disabled, BattleMetrics polling only
+SQUAD_LOG_PATH = None
+SQUAD_LOG_CHECKPOINT = "squad_log_checkpoint.json"
+SQUAD_LOG_POLL_SECONDS = 5
 
+# Squad RCON: persistent connection instead of BattleMetrics polling
+# BattleMetrics server ID -> {"host", "port", "password"}; servers not listed keep using the BattleMetrics API
+# e.g. {SERVER_ID: {"host": "127.0.0.1", "port": 21114, "password": "..."}}
+SQUAD_RCON_SERVERS = {}
+# Seconds between ListPlayers presence samples over RCON
+SQUAD_RCON_POLL_SECONDS = 20
+
+
+# Report System
+# Live preview (!1report <period> view / export) is recomputed at most once per interval (seconds)
+REPORT_PREVIEW_REFRESH_SECONDS = 600
+# Automated reports are posted to all guilds in parallel, at most this many sends at once
+REPORT_FANOUT_CONCURRENCY = 5
+REPORT_FANOUT_RETRIES = 3
+
+# Event System
+# RSVP clicks are collected and flushed (embed edit + DB write + web broadcast) once per window (seconds)
+EVENT_RSVP_FLUSH_SECONDS = 1.5
+# Reminder DMs: parallel senders, max DMs per second, how long a "DMs closed" user is skipped (seconds)
+DM_DISPATCH_WORKERS = 4
+DM_DISPATCH_RATE = 5
+DM_CLOSED_TTL_SECONDS = 24 * 3600
+
+# Voice Stats
+# Closed sessions / balance deltas are written in one transaction every N seconds or after N events
+VOICE_LEDGER_FLUSH_SECONDS = 5
+VOICE_LEDGER_FLUSH_EVENTS = 50
+# Open sessions are stored / "bot alive" is recorded every N seconds
+VOICE_HEARTBEAT_SECONDS = 60
+# Startup repair of sessions left open by a crash: "heartbeat" (end at last heartbeat),
+# "max_duration" (end now) or "discard" (no credit); each capped at VOICE_ORPHAN_MAX_SECONDS
+VOICE_ORPHAN_POLICY = "heartbeat"
+VOICE_ORPHAN_MAX_SECONDS = 4 * 3600
 
 # Google Sheets Config
 # DEVELOPMENT MODE: Sheet sync disabled to protect production data
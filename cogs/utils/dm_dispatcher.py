@@ -0,0 +1,193 @@
+import asyncio
+import itertools
+import logging
+import time
+
+import discord
+
+logger = logging.getLogger("DMDispatcher")
+
+# Discord error code: "Cannot send messages to this user"
+CANNOT_DM_USER = 50007
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per `per` seconds."""
+
+    def __init__(self, rate: int, per: float = 1.0):
+        self.rate = rate
+        self.per = per
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.per)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+    def pause(self, seconds: float):
+        """Drain the bucket after a global 429 so no worker sends for `seconds`"""
+        self._tokens = -seconds * self.rate / self.per
+        self._updated = time.monotonic()
+
+
+class DMBatch:
+    """Delivery report of one send_many() call"""
+
+    def __init__(self, batch_id, tag, total):
+        self.id = batch_id
+        self.tag = tag
+        self.total = total
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0
+        self.latencies = []
+        self.started = time.perf_counter()
+        self.done = asyncio.Event()
+
+    @property
+    def finished(self):
+        return self.sent + self.failed + self.skipped
+
+    def record(self, outcome, latency=None):
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        if latency is not None:
+            self.latencies.append(latency)
+        if self.finished >= self.total:
+            self.done.set()
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "tag": self.tag,
+            "total": self.total,
+            "sent": self.sent,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else 0.0,
+            "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+            "duration_s": round(time.perf_counter() - self.started, 2)
+        }
+
+
+class DMDispatcher:
+    """
+    Background DM fan-out.
+
+    send_many() queues the messages and returns immediately; a bounded pool
+    of workers delivers them under a global token bucket. Rate limited and
+    5xx sends are retried with backoff, users with closed DMs are remembered
+    and skipped for `closed_ttl` seconds.
+    """
+
+    def __init__(self, workers: int = 4, rate: int = 5, per: float = 1.0,
+                 max_retries: int = 3, closed_ttl: float = 24 * 3600):
+        self.workers = workers
+        self.max_retries = max_retries
+        self.closed_ttl = closed_ttl
+        self.limiter = RateLimiter(rate, per)
+
+        self._queue = asyncio.Queue()
+        self._tasks = []
+        self._batch_ids = itertools.count(1)
+        # user_id -> time DMs were found closed
+        self._dm_closed = {}
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def is_dm_closed(self, user_id: int) -> bool:
+        closed_at = self._dm_closed.get(user_id)
+        if closed_at is None:
+            return False
+        if time.monotonic() - closed_at > self.closed_ttl:
+            del self._dm_closed[user_id]
+            return False
+        return True
+
+    def send_many(self, users, embed=None, content=None, tag="dm") -> DMBatch:
+        """
+        Queue the same message for many users.
+
+        Returns:
+            DMBatch; await batch.done.wait() for the delivery report
+        """
+        users = list(users)
+        batch = DMBatch(next(self._batch_ids), tag, len(users))
+        if not users:
+            batch.done.set()
+            return batch
+
+        for user in users:
+            if self.is_dm_closed(user.id):
+                batch.record("skipped")
+                continue
+            self._queue.put_nowait((batch, user, content, embed, time.perf_counter()))
+
+        if batch.done.is_set():
+            self._log(batch)
+        return batch
+
+    async def _worker(self):
+        while True:
+            batch, user, content, embed, queued = await self._queue.get()
+            try:
+                outcome, latency = await self._deliver(user, content, embed, queued)
+                batch.record(outcome, latency)
+            except Exception as e:
+                logger.error(f"DM worker error ({user}): {e}", exc_info=True)
+                batch.record("failed")
+            finally:
+                self._queue.task_done()
+            if batch.done.is_set() and batch.finished == batch.total:
+                self._log(batch)
+
+    async def _deliver(self, user, content, embed, queued):
+        """Returns (outcome, latency since queued)"""
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            try:
+                await user.send(content=content, embed=embed)
+                return "sent", time.perf_counter() - queued
+            except discord.Forbidden as e:
+                if e.code == CANNOT_DM_USER:
+                    self._dm_closed[user.id] = time.monotonic()
+                    return "skipped", None
+                logger.warning(f"DM to {user} forbidden: {e}")
+                return "failed", None
+            except discord.RateLimited as e:
+                retry_after = e.retry_after
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    retry_after = float(getattr(e, "retry_after", 0) or 2 ** attempt)
+                    if e.response is not None and e.response.headers.get("X-RateLimit-Global"):
+                        self.limiter.pause(retry_after)
+                elif e.status >= 500:
+                    retry_after = 2 ** attempt
+                else:
+                    logger.warning(f"DM to {user} failed: {e}")
+                    return "failed", None
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(retry_after)
+        return "failed", None
+
+    def _log(self, batch):
+        s = batch.summary()
+        logger.info(
+            f"DM batch #{batch.id} ({s['tag']}): {s['sent']}/{s['total']} sent, {s['skipped']} DMs closed, "
+            f"{s['failed']} failed, p50 {s['p50_ms']}ms, max {s['max_ms']}ms, {s['duration_s']}s"
+        )
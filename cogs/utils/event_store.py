@@ -0,0 +1,286 @@
+import logging
+
+logger = logging.getLogger("Event.Store")
+
+# DB participant status -> event dict list
+# ("decline"/"maybe" are what the RSVP buttons historically wrote)
+STATUS_LISTS = {
+    "attendee": "attendees",
+    "join": "attendees",
+    "declined": "declined",
+    "decline": "declined",
+    "tentative": "tentative",
+    "maybe": "tentative",
+}
+
+
+def _timestamp_key(event_dict):
+    return event_dict.get("timestamp") or ""
+
+
+def _iso(timestamp):
+    # SQLite drops tzinfo; keep cached values identical to what a reload would return
+    return timestamp.replace(tzinfo=None).isoformat() if timestamp else ""
+
+
+def mention_id(text: str):
+    """User ID from a "<@123>" / "<@!123> ..." list entry; None for plain names (old data)"""
+    token = text.split(" ")[0]
+    if token.startswith("<@") and token.endswith(">"):
+        try:
+            return int(token[2:-1].lstrip("!"))
+        except ValueError:
+            return None
+    return None
+
+
+def event_to_dict(event) -> dict:
+    """Convert a database Event / EventRecord (with participants) to the legacy event dict"""
+    event_dict = {
+        "db_id": event.id,
+        "event_id": event.event_id,
+        "message_id": event.message_id,
+        "channel_id": event.channel_id,
+        "author_id": event.creator_id,
+        "title": event.title,
+        "timestamp": _iso(event.timestamp),
+        "description": event.description or "",
+        "attendees": [],
+        "declined": [],
+        "tentative": [],
+        "reminder_sent": event.reminder_sent,
+        "active": event.active
+    }
+    for p in event.participants or []:
+        key = STATUS_LISTS.get(p.status)
+        if key:
+            event_dict[key].append(p.user_mention)
+    return event_dict
+
+
+class EventStore:
+    """
+    In-memory state of active events.
+
+    Loaded once at startup; every mutation is written to the database and
+    then applied to the cached dicts in place, so the views never need to
+    reload all events. Lookups by message_id and db_id are O(1).
+    """
+
+    def __init__(self, db):
+        self.db = db
+        # guild_id (str) -> [event dict]  (legacy cog.events shape)
+        self.by_guild = {}
+        self._by_db_id = {}
+        self._by_message = {}
+        self._guild_of = {}
+        # db_id -> {user_id: (user_mention, status)}, insertion order = join order
+        self._participants = {}
+        self.loaded = False
+        # callback(event_dict, removed) after an event is added, changed or removed
+        self._listeners = []
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _notify(self, event_dict, removed=False):
+        for callback in self._listeners:
+            try:
+                callback(event_dict, removed)
+            except Exception as e:
+                logger.error(f"Event store listener failed: {e}", exc_info=True)
+
+    # === LOADING ===
+
+    async def load(self, guild_ids):
+        """Load active events of the given guilds (startup only)"""
+        for event_dict in list(self._by_db_id.values()):
+            self._notify(event_dict, removed=True)
+        self.by_guild.clear()
+        self._by_db_id.clear()
+        self._by_message.clear()
+        self._guild_of.clear()
+        self._participants.clear()
+
+        try:
+            # All guilds, events + participants in two queries
+            grouped = await self.db.get_events_bulk(guild_ids, active_only=True)
+        except Exception as e:
+            logger.error(f"Error loading events from database: {e}", exc_info=True)
+            return
+
+        for guild_id, active_events in grouped.items():
+            for event in active_events:
+                # get_events_bulk is already ordered by timestamp
+                self._index(guild_id, event_to_dict(event), event.participants, sort=False)
+            if active_events:
+                logger.info(f"Loaded {len(active_events)} events for guild {guild_id}")
+        self.loaded = True
+
+    async def refresh_by_message(self, guild_id: int, message_id: int):
+        """Re-read one event from the database (e.g. created by the web panel)"""
+        event = await self.db.get_event_by_message_id(guild_id, message_id)
+        if not event:
+            return None
+        self._unindex(event.id)
+        if not event.active:
+            return None
+        return self._index(event.guild_id, event_to_dict(event), event.participants)
+
+    def _index(self, guild_id, event_dict, participants=(), sort=True):
+        db_id = event_dict["db_id"]
+        events = self.by_guild.setdefault(str(guild_id), [])
+        events.append(event_dict)
+        if sort:
+            events.sort(key=_timestamp_key)
+        self._by_db_id[db_id] = event_dict
+        self._guild_of[db_id] = str(guild_id)
+        if event_dict.get("message_id"):
+            self._by_message[event_dict["message_id"]] = event_dict
+        self._participants[db_id] = {p.user_id: (p.user_mention, p.status) for p in participants}
+        self._notify(event_dict)
+        return event_dict
+
+    def _unindex(self, db_id):
+        event_dict = self._by_db_id.pop(db_id, None)
+        self._participants.pop(db_id, None)
+        server_id = self._guild_of.pop(db_id, None)
+        if not event_dict:
+            return None
+        self._by_message.pop(event_dict.get("message_id"), None)
+        events = self.by_guild.get(server_id, [])
+        if event_dict in events:
+            events.remove(event_dict)
+            if not events:
+                del self.by_guild[server_id]
+        self._notify(event_dict, removed=True)
+        return event_dict
+
+    # === LOOKUPS ===
+
+    def get(self, db_id):
+        return self._by_db_id.get(db_id)
+
+    def get_by_message(self, message_id):
+        return self._by_message.get(message_id)
+
+    def guild_of(self, db_id):
+        """guild_id (str) of a cached event"""
+        return self._guild_of.get(db_id)
+
+    def guild_events(self, guild_id) -> list:
+        return self.by_guild.get(str(guild_id), [])
+
+    def __len__(self):
+        return len(self._by_db_id)
+
+    # === MUTATIONS (write-through) ===
+
+    async def add_event(self, guild_id: int, event_id: int, title: str, description: str,
+                        timestamp, channel_id: int, creator_id: int) -> dict:
+        """Create event in DB and cache"""
+        db_id = await self.db.add_event(
+            guild_id=guild_id,
+            event_id=event_id,
+            title=title,
+            description=description,
+            timestamp=timestamp,
+            channel_id=channel_id,
+            creator_id=creator_id
+        )
+        return self._index(guild_id, {
+            "db_id": db_id,
+            "event_id": event_id,
+            "message_id": None,
+            "channel_id": channel_id,
+            "author_id": creator_id,
+            "title": title,
+            "timestamp": _iso(timestamp),
+            "description": description or "",
+            "attendees": [],
+            "declined": [],
+            "tentative": [],
+            "reminder_sent": False,
+            "active": True
+        })
+
+    async def set_message(self, db_id: int, message_id: int):
+        await self.db.update_event_message(db_id, message_id)
+        event_dict = self._by_db_id.get(db_id)
+        if event_dict:
+            self._by_message.pop(event_dict.get("message_id"), None)
+            event_dict["message_id"] = message_id
+            self._by_message[message_id] = event_dict
+
+    async def update_event(self, db_id: int, title: str = None, description: str = None,
+                           timestamp=None, reminder_sent: bool = None) -> bool:
+        ok = await self.db.update_event(
+            event_db_id=db_id,
+            title=title,
+            description=description,
+            timestamp=timestamp,
+            reminder_sent=reminder_sent
+        )
+        event_dict = self._by_db_id.get(db_id)
+        if ok and event_dict:
+            if title is not None:
+                event_dict["title"] = title
+            if description is not None:
+                event_dict["description"] = description
+            if reminder_sent is not None:
+                event_dict["reminder_sent"] = reminder_sent
+            if timestamp is not None:
+                event_dict["timestamp"] = _iso(timestamp)
+                self.by_guild[self._guild_of[db_id]].sort(key=_timestamp_key)
+            self._notify(event_dict)
+        return ok
+
+    async def set_reminder_sent(self, db_id: int, reminder_sent: bool = True) -> bool:
+        ok = await self.db.update_reminder_status(db_id, reminder_sent)
+        event_dict = self._by_db_id.get(db_id)
+        if ok and event_dict:
+            event_dict["reminder_sent"] = reminder_sent
+            self._notify(event_dict)
+        return ok
+
+    async def deactivate(self, db_id: int) -> bool:
+        """Archive event in DB and drop it from the active cache"""
+        ok = await self.db.deactivate_event(db_id)
+        event_dict = self._unindex(db_id)
+        if event_dict:
+            event_dict["active"] = False
+        return ok
+
+    async def set_participant(self, db_id: int, user_id: int, user_mention: str, status: str, reason: str = None):
+        """Upsert one RSVP and patch the cached participant lists of that event"""
+        await self.db.add_event_participant(
+            event_db_id=db_id,
+            user_id=user_id,
+            user_mention=user_mention,
+            status=status,
+            reason=reason
+        )
+        return self.apply_participant(db_id, user_id, user_mention, status)
+
+    def participant_ids(self, db_id: int) -> set:
+        """User IDs with a participant row for the event (any status)"""
+        return set(self._participants.get(db_id, ()))
+
+    def apply_participant(self, db_id: int, user_id: int, user_mention: str, status: str):
+        """Patch the cached participant lists of an event (no database write)"""
+        event_dict = self._by_db_id.get(db_id)
+        if not event_dict:
+            return None
+
+        participants = self._participants.setdefault(db_id, {})
+        # Existing rows keep their original mention (DB upsert only changes status/reason)
+        mention = participants[user_id][0] if user_id in participants else user_mention
+        participants[user_id] = (mention, status)
+
+        lists = {"attendees": [], "declined": [], "tentative": []}
+        for p_mention, p_status in participants.values():
+            key = STATUS_LISTS.get(p_status)
+            if key:
+                lists[key].append(p_mention)
+        event_dict.update(lists)
+        return event_dict
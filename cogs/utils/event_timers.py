@@ -0,0 +1,103 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+logger = logging.getLogger("Event.Timers")
+
+
+class EventTimers:
+    """
+    Min-heap of (fire_time, seq, event_id, action) deadlines.
+
+    The runner sleeps until the earliest deadline and wakes up early only
+    when a timer is added in front of it. Rescheduling and cancelling are
+    O(log n): the old heap entry is left in place and skipped when popped
+    (its generation no longer matches).
+    """
+
+    def __init__(self, callback):
+        """
+        Args:
+            callback: async callback(event_id, action) called when a timer fires
+        """
+        self.callback = callback
+        self._heap = []
+        # (event_id, action) -> generation of the live entry
+        self._live = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def schedule(self, event_id, action: str, fire_at: float):
+        """Add or move a timer (fire_at: UNIX timestamp)"""
+        gen = next(self._seq)
+        self._live[(event_id, action)] = gen
+        heapq.heappush(self._heap, (fire_at, gen, event_id, action))
+        if self._heap[0][1] == gen:
+            # New earliest deadline
+            self._wakeup.set()
+
+    def cancel(self, event_id, action: str = None):
+        """Cancel one timer, or all timers of an event when action is None"""
+        if action is not None:
+            self._live.pop((event_id, action), None)
+            return
+        for key in [k for k in self._live if k[0] == event_id]:
+            del self._live[key]
+
+    def next_deadline(self):
+        """(fire_at, event_id, action) of the next live timer, or None"""
+        self._drop_stale()
+        if not self._heap:
+            return None
+        fire_at, _, event_id, action = self._heap[0]
+        return fire_at, event_id, action
+
+    def __len__(self):
+        return len(self._live)
+
+    def _drop_stale(self):
+        while self._heap:
+            _, gen, event_id, action = self._heap[0]
+            if self._live.get((event_id, action)) == gen:
+                return
+            heapq.heappop(self._heap)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            self._drop_stale()
+
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            fire_at, gen, event_id, action = self._heap[0]
+            delay = fire_at - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+
+            heapq.heappop(self._heap)
+            if self._live.get((event_id, action)) != gen:
+                continue
+            del self._live[(event_id, action)]
+
+            try:
+                await self.callback(event_id, action)
+            except Exception as e:
+                logger.error(f"Event timer {action} for event {event_id} failed: {e}", exc_info=True)
@@ -0,0 +1,138 @@
+import logging
+from datetime import datetime
+
+from ..squad.squad_log import PlayerWounded, PlayerDied, PlayerRevived
+
+logger = logging.getLogger("TrainingMatches.Recorder")
+
+
+class MatchRecorder:
+    """
+    Presence tracker for one training match.
+
+    Fed with server snapshots (fetch_battlemetrics_snapshot format, from
+    BattleMetrics or RCON) taken at a fixed interval. Players are keyed by
+    BattleMetrics player ID, or Steam ID for RCON snapshots; each keeps a
+    list of [joined_at, left_at] intervals, opened
+    on the first sample that contains them and closed on the first sample
+    that does not. Nothing touches the database until participants() is
+    written at the end of the match.
+
+    A failed fetch (None snapshot) is skipped, so an API error does not
+    count as everyone leaving.
+
+    A resumed recorder (match restored after a restart) opens intervals at
+    the first sample's own time: nothing is known about who was online
+    before it.
+
+    When the SquadGame.log source is configured, apply_log_events() also
+    counts kills (incapacitations, as on the in-game scoreboard), deaths
+    and revives per Steam ID from the log. The log has no teams: teamkills
+    are left out only when RCON snapshots gave both players' team_id.
+    """
+
+    def __init__(self, match_id: int, started_at: datetime = None, resumed: bool = False):
+        self.match_id = match_id
+        self.started_at = started_at or datetime.now()
+        self.resumed = resumed
+        self.ended_at = None
+        # battlemetrics_id -> {"steam_id", "name", "intervals": [[joined, left or None]], "samples"}
+        self.players = {}
+        self.samples = 0
+        self.last_sample = None
+        # steam_id -> {"kills", "deaths", "revives"} from SquadGame.log
+        self.log_stats = {}
+        # steam_id -> team_id from the latest RCON sample
+        self.teams = {}
+
+    def observe(self, snapshot: dict, at: datetime = None):
+        """Apply one snapshot taken at `at`"""
+        if not snapshot or self.ended_at:
+            return
+        at = at or datetime.now()
+        # The first sample stands for the whole start of the match (unless resumed)
+        opened_at = self.started_at if self.samples == 0 and not self.resumed else at
+
+        present = set()
+        for p in snapshot.get("players", []):
+            key = p.get("battlemetrics_id") or p.get("steam_id")
+            if not key:
+                continue
+            present.add(key)
+            entry = self.players.get(key)
+            if entry is None:
+                entry = self.players[key] = {"steam_id": None, "name": None, "intervals": [], "samples": 0}
+            if p.get("steam_id") and p["steam_id"] != "unknown":
+                entry["steam_id"] = p["steam_id"]
+            entry["name"] = p.get("name") or entry["name"]
+            if entry["steam_id"] and p.get("team_id") is not None:
+                self.teams[entry["steam_id"]] = p["team_id"]
+            entry["samples"] += 1
+            if not entry["intervals"] or entry["intervals"][-1][1] is not None:
+                entry["intervals"].append([opened_at, None])
+
+        for key, entry in self.players.items():
+            if key not in present and entry["intervals"] and entry["intervals"][-1][1] is None:
+                entry["intervals"][-1][1] = at
+
+        self.samples += 1
+        self.last_sample = at
+
+    def apply_log_events(self, events):
+        """Count SquadGame.log combat events that happened during the match"""
+        def bump(steam_id, field):
+            if steam_id:
+                entry = self.log_stats.setdefault(steam_id, {"kills": 0, "deaths": 0, "revives": 0})
+                entry[field] += 1
+
+        for e in events:
+            if e.time < self.started_at or (self.ended_at and e.time > self.ended_at):
+                continue
+            if isinstance(e, PlayerWounded):
+                team = self.teams.get(e.attacker_steam_id)
+                teamkill = team is not None and team == self.teams.get(e.victim_steam_id)
+                if e.attacker_steam_id != e.victim_steam_id and not teamkill:
+                    bump(e.attacker_steam_id, "kills")
+            elif isinstance(e, PlayerDied):
+                bump(e.victim_steam_id, "deaths")
+            elif isinstance(e, PlayerRevived):
+                bump(e.reviver_steam_id, "revives")
+
+    def online(self) -> int:
+        return sum(1 for e in self.players.values() if e["intervals"] and e["intervals"][-1][1] is None)
+
+    def seconds(self, key, now: datetime = None) -> float:
+        entry = self.players.get(key)
+        if not entry:
+            return 0.0
+        now = now or self.ended_at or datetime.now()
+        return sum(((left or now) - joined).total_seconds() for joined, left in entry["intervals"])
+
+    def stop(self, snapshot: dict = None, at: datetime = None):
+        """Apply the final snapshot (if any) and close every open interval"""
+        at = at or datetime.now()
+        if snapshot:
+            self.observe(snapshot, at)
+        for entry in self.players.values():
+            if entry["intervals"] and entry["intervals"][-1][1] is None:
+                entry["intervals"][-1][1] = at
+        self.ended_at = at
+
+    def participants(self) -> list:
+        """[{"battlemetrics_id", "steam_id", "name", "seconds", "first_seen", "last_seen", "samples", "intervals"}]"""
+        result = []
+        for key, entry in self.players.items():
+            if not entry["intervals"]:
+                continue
+            result.append({
+                "battlemetrics_id": str(key),
+                "steam_id": entry["steam_id"],
+                "name": entry["name"],
+                "seconds": self.seconds(key),
+                "first_seen": entry["intervals"][0][0],
+                "last_seen": entry["intervals"][-1][1] or self.ended_at or datetime.now(),
+                "samples": entry["samples"],
+                "intervals": [list(i) for i in entry["intervals"]]
+            })
+        result.sort(key=lambda p: p["seconds"], reverse=True)
+        return result
@@ -0,0 +1,123 @@
+import logging
+
+from .config import CLAN_MEMBER_ROLE_IDS
+
+logger = logging.getLogger("RoleIndex")
+
+
+class RoleIndex:
+    """
+    Per-guild snapshot of tracked role memberships as user ID sets.
+
+    A guild is indexed from the member cache the first time it is queried;
+    afterwards on_member_update / on_member_remove keep it current, so
+    attendance and roster checks are integer set operations instead of
+    walking role.members and comparing mention strings. Bots are ignored.
+    """
+
+    def __init__(self, role_ids=None):
+        self.role_ids = list(role_ids if role_ids is not None else CLAN_MEMBER_ROLE_IDS)
+        self._tracked = set(self.role_ids)
+        # guild_id -> {role_id: {user_id, ...}}
+        self._roles = {}
+        # guild_id -> union of all tracked roles
+        self._members = {}
+        # guild_id -> tracked roles that exist in the guild
+        self._found = {}
+
+    def build(self, guild):
+        """(Re)index a guild from its member cache"""
+        roles = {}
+        found = set()
+        for role_id in self.role_ids:
+            role = guild.get_role(role_id)
+            if role is None:
+                continue
+            found.add(role_id)
+            roles[role_id] = {m.id for m in role.members if not m.bot}
+
+        self._roles[guild.id] = roles
+        self._found[guild.id] = found
+        self._members[guild.id] = set().union(*roles.values())
+        logger.debug(f"Indexed guild {guild.id}: {len(self._members[guild.id])} members in {len(found)} roles")
+        return self._members[guild.id]
+
+    def _ensure(self, guild):
+        if guild.id not in self._roles:
+            self.build(guild)
+
+    def members(self, guild) -> set:
+        """User IDs holding any tracked role (copy, safe to mutate)"""
+        self._ensure(guild)
+        return set(self._members[guild.id])
+
+    def role_members(self, guild, role_id: int) -> set:
+        self._ensure(guild)
+        return set(self._roles[guild.id].get(role_id, ()))
+
+    def found_roles(self, guild) -> set:
+        """Tracked role IDs that exist in the guild"""
+        self._ensure(guild)
+        return set(self._found[guild.id])
+
+    def missing(self, guild, responded_ids) -> set:
+        """Tracked members whose ID is not in responded_ids"""
+        return self.members(guild) - set(responded_ids)
+
+    def invalidate(self, guild_id: int = None):
+        """Drop a guild (or everything); it is rebuilt on the next query"""
+        if guild_id is None:
+            self._roles.clear()
+            self._members.clear()
+            self._found.clear()
+        else:
+            self._roles.pop(guild_id, None)
+            self._members.pop(guild_id, None)
+            self._found.pop(guild_id, None)
+
+    # === Gateway events ===
+
+    async def on_member_update(self, before, after):
+        roles = self._roles.get(after.guild.id)
+        if roles is None or after.bot:
+            return
+        before_ids = {r.id for r in before.roles} & self._tracked
+        after_ids = {r.id for r in after.roles} & self._tracked
+        if before_ids == after_ids:
+            return
+
+        for role_id in before_ids - after_ids:
+            roles.get(role_id, set()).discard(after.id)
+        for role_id in after_ids - before_ids:
+            if role_id in roles:
+                roles[role_id].add(after.id)
+        self._members[after.guild.id] = set().union(*roles.values())
+
+    async def on_member_remove(self, member):
+        roles = self._roles.get(member.guild.id)
+        if roles is None:
+            return
+        for user_ids in roles.values():
+            user_ids.discard(member.id)
+        self._members[member.guild.id].discard(member.id)
+
+    async def on_guild_role_create(self, role):
+        if role.id in self._tracked:
+            self.invalidate(role.guild.id)
+
+    async def on_guild_role_delete(self, role):
+        if role.id in self._tracked:
+            self.invalidate(role.guild.id)
+
+
+def get_role_index(bot) -> RoleIndex:
+    """Shared clan role index for all cogs (created and wired to gateway events on first use)."""
+    index = getattr(bot, "role_index", None)
+    if index is None:
+        index = RoleIndex()
+        bot.add_listener(index.on_member_update, "on_member_update")
+        bot.add_listener(index.on_member_remove, "on_member_remove")
+        bot.add_listener(index.on_guild_role_create, "on_guild_role_create")
+        bot.add_listener(index.on_guild_role_delete, "on_guild_role_delete")
+        bot.role_index = index
+    return index
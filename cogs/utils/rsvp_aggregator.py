@@ -0,0 +1,151 @@
+import asyncio
+import logging
+
+logger = logging.getLogger("Event.RSVP")
+
+
+class RSVPAggregator:
+    """
+    Coalesces RSVP button bursts.
+
+    A click is applied to the in-memory EventStore right away; the database
+    write, the embed edit and the web broadcast are deferred and flushed
+    together once per window:
+      - all pending participant upserts in one transaction,
+      - at most one message edit per event message,
+      - one broadcast per event,
+      - one log message per guild.
+    """
+
+    def __init__(self, store, edit_message, broadcast=None, send_log=None, window: float = 1.5):
+        """
+        Args:
+            store: EventStore
+            edit_message: async edit_message(message, event_dict) -> re-render the event embed
+            broadcast: broadcast(event_type, data) for the web panel (optional)
+            send_log: async send_log(guild, lines) -> post the window's log lines (optional)
+            window: Flush delay after the first click of a burst (seconds)
+        """
+        self.store = store
+        self.edit_message = edit_message
+        self.broadcast = broadcast
+        self.send_log = send_log
+        self.window = window
+
+        # (db_id, user_id) -> participant row, last click wins
+        self._writes = {}
+        # message_id -> (message, db_id)
+        self._messages = {}
+        # db_id -> [update dicts]
+        self._updates = {}
+        # guild_id -> (guild, [log lines])
+        self._logs = {}
+        self._flush_task = None
+        self._lock = asyncio.Lock()
+
+        self.stats = {"clicks": 0, "flushes": 0, "db_rows": 0, "edits": 0, "broadcasts": 0, "logs": 0}
+
+    def submit(self, event_dict, message, user_id: int, user_mention: str, username: str, status: str, reason: str = None,
+               guild=None, log_line: str = None):
+        """Record one click (in memory) and make sure a flush is scheduled"""
+        db_id = event_dict["db_id"]
+        self.store.apply_participant(db_id, user_id, user_mention, status)
+
+        self._writes[(db_id, user_id)] = {
+            "event_db_id": db_id,
+            "user_id": user_id,
+            "user_mention": user_mention,
+            "status": status,
+            "reason": reason
+        }
+        self._messages[message.id] = (message, db_id)
+        self._updates.setdefault(db_id, []).append({
+            "user_id": str(user_id),
+            "username": username,
+            "status": status,
+            "reason": reason
+        })
+        if guild is not None and log_line:
+            self._logs.setdefault(guild.id, (guild, []))[1].append(log_line)
+        self.stats["clicks"] += 1
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    def _pending(self):
+        return bool(self._writes or self._messages or self._updates or self._logs)
+
+    async def _delayed_flush(self):
+        # Clicks that arrive while a flush is running go into the next window
+        while True:
+            await asyncio.sleep(self.window)
+            await self.flush()
+            if not self._pending():
+                break
+
+    async def flush(self):
+        """Write, edit and broadcast everything collected so far"""
+        async with self._lock:
+            writes, self._writes = self._writes, {}
+            messages, self._messages = self._messages, {}
+            updates, self._updates = self._updates, {}
+            logs, self._logs = self._logs, {}
+            if not (writes or messages or updates or logs):
+                return
+            self.stats["flushes"] += 1
+
+            # 1. One transaction for the whole burst
+            if writes:
+                try:
+                    self.stats["db_rows"] += await self.store.db.upsert_event_participants(list(writes.values()))
+                except Exception as e:
+                    logger.error(f"RSVP batch write failed ({len(writes)} rows): {e}", exc_info=True)
+
+            # 2. One edit per message, rendered from the current store state
+            for message, db_id in messages.values():
+                event_dict = self.store.get(db_id)
+                if not event_dict:
+                    continue
+                try:
+                    await self.edit_message(message, event_dict)
+                    self.stats["edits"] += 1
+                except Exception as e:
+                    logger.warning(f"RSVP embed edit failed for message {message.id}: {e}")
+
+            # 3. One broadcast per event
+            if self.broadcast:
+                for db_id, event_updates in updates.items():
+                    event_dict = self.store.get(db_id) or {}
+                    last = event_updates[-1]
+                    try:
+                        self.broadcast('event_participant_update', {
+                            'event_id': event_dict.get("event_id"),
+                            'db_id': db_id,
+                            'action': 'participant_update',
+                            'user_id': last["user_id"],
+                            'username': last["username"],
+                            'status': last["status"],
+                            'reason': last["reason"],
+                            'count': len(event_updates),
+                            'updates': event_updates
+                        })
+                        self.stats["broadcasts"] += 1
+                    except Exception as e:
+                        logger.warning(f"Failed to broadcast event update to web: {e}")
+
+            # 4. One log message per guild
+            if self.send_log:
+                for guild, lines in logs.values():
+                    try:
+                        await self.send_log(guild, lines)
+                        self.stats["logs"] += 1
+                    except Exception as e:
+                        logger.warning(f"RSVP log send failed for guild {guild.id}: {e}")
+
+            logger.info(f"RSVP flush: {len(writes)} rows, {len(messages)} edits")
+
+    async def close(self):
+        """Flush pending clicks (cog unload)"""
+        await self.flush()
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
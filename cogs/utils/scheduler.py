@@ -0,0 +1,221 @@
+import asyncio
+import datetime
+import logging
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger("Scheduler")
+
+# schedule(after) -> next fire time strictly after `after` (naive local time, like the rest of the bot)
+Schedule = Callable[[datetime.datetime], datetime.datetime]
+
+
+# === SCHEDULES ===
+
+def daily_at(hour: int, minute: int = 0) -> Schedule:
+    """Every day at hour:minute."""
+    def _next(after):
+        candidate = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate <= after:
+            candidate += datetime.timedelta(days=1)
+        return candidate
+    return _next
+
+
+def weekly_at(weekday: int, hour: int, minute: int = 0) -> Schedule:
+    """Every week on weekday (Monday = 0) at hour:minute."""
+    def _next(after):
+        candidate = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        candidate += datetime.timedelta(days=(weekday - after.weekday()) % 7)
+        if candidate <= after:
+            candidate += datetime.timedelta(days=7)
+        return candidate
+    return _next
+
+
+def monthly_at(day: int, hour: int, minute: int = 0) -> Schedule:
+    """Every month on `day` (1-28) at hour:minute."""
+    def _next(after):
+        candidate = after.replace(day=day, hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate <= after:
+            year, month = (after.year + 1, 1) if after.month == 12 else (after.year, after.month + 1)
+            candidate = candidate.replace(year=year, month=month)
+        return candidate
+    return _next
+
+
+def every(interval: datetime.timedelta) -> Schedule:
+    """Fixed interval after the previous run."""
+    def _next(after):
+        return after + interval
+    return _next
+
+
+class ScheduledJobEntry:
+    def __init__(self, name, schedule, callback, catch_up):
+        self.name = name
+        self.schedule = schedule
+        self.callback = callback
+        self.catch_up = catch_up
+        self.last_run = None
+        self.next_run = None
+        self.last_status = None
+        self.running = False
+
+
+class DeadlineScheduler:
+    """
+    Persistent deadline scheduler.
+
+    Keeps the next fire time of every job, sleeps until the earliest one and
+    stores last/next run in the `scheduled_jobs` table. Runs missed while the
+    bot was down are executed once on startup (catch-up).
+    """
+
+    def __init__(self, bot, db):
+        self.bot = bot
+        self.db = db
+        self._jobs = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def add_job(self, name: str, schedule: Schedule, callback: Callable[[], Awaitable], catch_up: bool = True,
+                      last_run: Optional[datetime.datetime] = None):
+        """
+        Register a job and load its stored state.
+
+        Args:
+            name: Unique job name (DB key)
+            schedule: Next-fire-time function (daily_at, weekly_at, monthly_at, every)
+            callback: Async function to run
+            catch_up: Run once on startup if a fire time was missed during downtime
+            last_run: Seed for the first registration (e.g. legacy metadata)
+        """
+        now = datetime.datetime.now()
+        job = ScheduledJobEntry(name, schedule, callback, catch_up)
+
+        state = None
+        try:
+            state = await self.db.get_scheduled_job(name)
+        except Exception as e:
+            logger.error(f"Scheduler state load failed for {name}: {e}")
+
+        if state:
+            job.last_run = state["last_run"]
+            job.next_run = state["next_run"]
+            job.last_status = state["last_status"]
+        else:
+            job.last_run = last_run
+            job.next_run = schedule(last_run) if last_run else schedule(now)
+
+        if job.next_run is None:
+            job.next_run = schedule(now)
+        elif job.next_run <= now and not catch_up:
+            logger.info(f"Skipping missed run of {name} ({job.next_run})")
+            job.next_run = schedule(now)
+
+        self._jobs[name] = job
+        await self._persist(job)
+        logger.info(f"Job registered: {name}, next run {job.next_run}")
+        self._wakeup.set()
+
+    def remove_job(self, name: str):
+        self._jobs.pop(name, None)
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def get_jobs(self) -> list:
+        """Job status list (name, last_run, next_run, last_status, running)."""
+        return [
+            {
+                "name": j.name,
+                "last_run": j.last_run,
+                "next_run": j.next_run,
+                "last_status": j.last_status,
+                "running": j.running
+            }
+            for j in sorted(self._jobs.values(), key=lambda j: j.next_run)
+        ]
+
+    async def run_now(self, name: str) -> bool:
+        """Fire a job immediately (next run is rescheduled from now)."""
+        job = self._jobs.get(name)
+        if not job or job.running:
+            return False
+        await self._fire(job)
+        self._wakeup.set()
+        return True
+
+    async def _persist(self, job):
+        try:
+            await self.db.save_scheduled_job(job.name, job.last_run, job.next_run, job.last_status)
+        except Exception as e:
+            logger.error(f"Scheduler state save failed for {job.name}: {e}")
+
+    async def _fire(self, job):
+        job.running = True
+        started = datetime.datetime.now()
+        try:
+            logger.info(f"Running scheduled job: {job.name}")
+            await job.callback()
+            job.last_status = "ok"
+        except Exception as e:
+            job.last_status = "error"
+            logger.error(f"Scheduled job {job.name} failed: {e}", exc_info=True)
+        finally:
+            job.running = False
+            job.last_run = started
+            job.next_run = job.schedule(max(started, datetime.datetime.now()))
+            await self._persist(job)
+            logger.info(f"Job {job.name} done ({job.last_status}), next run {job.next_run}")
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+
+        while True:
+            self._wakeup.clear()
+            pending = [j for j in self._jobs.values() if not j.running]
+
+            if not pending:
+                await self._wakeup.wait()
+                continue
+
+            job = min(pending, key=lambda j: j.next_run)
+            delay = (job.next_run - datetime.datetime.now()).total_seconds()
+
+            if delay > 0:
+                try:
+                    # Sleep until the earliest deadline; add/remove wakes us to recompute
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+
+            if self._jobs.get(job.name) is job:
+                # Jobs run as tasks so a slow report does not delay a backup
+                asyncio.create_task(self._fire_and_wake(job))
+                job.running = True
+
+    async def _fire_and_wake(self, job):
+        await self._fire(job)
+        self._wakeup.set()
+
+
+def get_scheduler(bot) -> DeadlineScheduler:
+    """Shared scheduler for all cogs (created on first use)."""
+    scheduler = getattr(bot, "scheduler", None)
+    if scheduler is None:
+        from database.adapter import DatabaseAdapter
+        db = DatabaseAdapter('sqlite:///cotabot_dev.db')
+        db.init_db()
+        scheduler = DeadlineScheduler(bot, db)
+        bot.scheduler = scheduler
+    scheduler.start()
+    return scheduler
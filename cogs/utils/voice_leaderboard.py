@@ -0,0 +1,105 @@
+import bisect
+import logging
+
+logger = logging.getLogger("VoiceStats.Leaderboard")
+
+
+class GuildLeaderboard:
+    """
+    Voice time ranking of one guild.
+
+    `keys` is kept sorted as (-seconds, user_id) so index 0 is the leader;
+    `totals` maps user -> seconds to find a user's key. Rank lookups are
+    a bisect (O(log n)); an update is a bisect + list delete/insert.
+    """
+
+    def __init__(self, totals=None):
+        self.totals = {}
+        self.keys = []
+        if totals:
+            self.totals = {uid: float(secs) for uid, secs in totals.items() if secs and secs > 0}
+            self.keys = sorted((-secs, uid) for uid, secs in self.totals.items())
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, user_id: int, seconds: float):
+        """Add seconds to a user's total (negative to subtract)"""
+        old = self.totals.get(user_id)
+        if old is not None:
+            i = bisect.bisect_left(self.keys, (-old, user_id))
+            del self.keys[i]
+        new = (old or 0.0) + seconds
+        if new > 0:
+            self.totals[user_id] = new
+            bisect.insort(self.keys, (-new, user_id))
+        else:
+            self.totals.pop(user_id, None)
+
+    def top(self, n: int = 10, live=None) -> list:
+        """
+        Top n as [(user_id, seconds)], live seconds (users in voice) included.
+
+        Live time only increases totals, so the result is among the stored
+        top n + len(live) and the live users themselves.
+        """
+        live = live or {}
+        candidates = {uid: -neg for neg, uid in self.keys[:n + len(live)]}
+        for uid, secs in live.items():
+            candidates[uid] = self.totals.get(uid, 0.0) + secs
+        return sorted(candidates.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+    def rank(self, user_id: int, live=None):
+        """(rank starting at 1, total seconds) or (None, 0.0) without voice time"""
+        live = live or {}
+        total = self.totals.get(user_id, 0.0) + live.get(user_id, 0.0)
+        if total <= 0:
+            return None, 0.0
+
+        key = (-total, user_id)
+        # Stored totals ahead of the user (the user's own stored key never sorts before `key`)...
+        ahead = bisect.bisect_left(self.keys, key)
+        for uid, secs in live.items():
+            if uid == user_id:
+                continue
+            base = self.totals.get(uid, 0.0)
+            counted = base > 0 and (-base, uid) < key
+            # ...plus live users that only get ahead with their live time
+            if not counted and (-(base + secs), uid) < key:
+                ahead += 1
+        return ahead + 1, total
+
+
+class VoiceLeaderboard:
+    """Per-guild GuildLeaderboard registry, seeded from voice_balances"""
+
+    def __init__(self):
+        self.guilds = {}
+        self.loaded = False
+
+    def load(self, totals_by_guild: dict, unflushed=()):
+        """
+        totals_by_guild: {guild_id: {user_id: seconds}}
+        unflushed: [(guild_id, user_id, seconds)] closed after the totals were written
+        """
+        self.guilds = {gid: GuildLeaderboard(totals) for gid, totals in totals_by_guild.items()}
+        for guild_id, user_id, seconds in unflushed:
+            self.add(guild_id, user_id, seconds)
+        self.loaded = True
+        logger.info(f"Voice leaderboard loaded: {sum(len(b) for b in self.guilds.values())} users in {len(self.guilds)} guilds")
+
+    def board(self, guild_id: int) -> GuildLeaderboard:
+        board = self.guilds.get(guild_id)
+        if board is None:
+            board = self.guilds[guild_id] = GuildLeaderboard()
+        return board
+
+    def add(self, guild_id: int, user_id: int, seconds: float):
+        if seconds:
+            self.board(guild_id).add(user_id, seconds)
+
+    def top(self, guild_id: int, n: int = 10, live=None) -> list:
+        return self.board(guild_id).top(n, live)
+
+    def rank(self, guild_id: int, user_id: int, live=None):
+        return self.board(guild_id).rank(user_id, live)
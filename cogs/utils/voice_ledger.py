@@ -0,0 +1,261 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from database.adapter import voice_credit
+
+logger = logging.getLogger("VoiceStats.Ledger")
+
+
+class VoiceLedger:
+    """
+    Write-behind voice session ledger.
+
+    Joins and leaves only touch memory: open sessions are kept per
+    (guild_id, user_id), a leave turns the session into a closed row plus a
+    balance delta. Closed rows and merged deltas are written to
+    voice_sessions / voice_balances in one transaction every `interval`
+    seconds or as soon as `max_events` sessions are waiting.
+
+    Every flush (and the periodic heartbeat) also stores sessions that are
+    still open as voice_sessions rows with left_at NULL, so a crash leaves
+    rows the startup reconciler can close; the later leave closes that row.
+
+    Readers add live_seconds() / pending() on top of the database values, so
+    totals stay exact between flushes.
+    """
+
+    def __init__(self, db, interval: float = 5, max_events: int = 50):
+        self.db = db
+        self.interval = interval
+        self.max_events = max_events
+
+        # (guild_id, user_id) -> {"id", "guild_id", "user_id", "channel_id", "channel_name", "joined_at"}
+        # id is the open voice_sessions row (None until the next flush)
+        self.open_sessions = {}
+        # Closed session rows waiting for the next flush
+        self._sessions = []
+        # (guild_id, user_id) -> {"coins", "pending_seconds", "duration"}
+        self._deltas = {}
+        # Batch being written right now (still counted by readers)
+        self._inflight = ([], {})
+        self._flush_task = None
+        self._batch_task = None
+        self._lock = asyncio.Lock()
+
+        self.stats = {"joins": 0, "leaves": 0, "flushes": 0, "rows": 0}
+        # listener(guild_id, user_id, duration) on every closed session
+        self._listeners = []
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    # === Events ===
+
+    def join(self, guild_id: int, user_id: int, channel_id: int, channel_name: str,
+             joined_at: datetime = None, session_id: int = None):
+        """Open a session (no-op if the user is already tracked in that channel)"""
+        key = (guild_id, user_id)
+        current = self.open_sessions.get(key)
+        if current and current["channel_id"] == channel_id:
+            return
+        if current:
+            self.leave(guild_id, user_id, at=joined_at)
+        self.open_sessions[key] = {
+            "id": session_id,
+            "guild_id": guild_id,
+            "user_id": user_id,
+            "channel_id": channel_id,
+            "channel_name": channel_name,
+            "joined_at": joined_at or datetime.now()
+        }
+        self.stats["joins"] += 1
+
+    def leave(self, guild_id: int, user_id: int, at: datetime = None) -> float:
+        """Close the open session; returns its duration in seconds"""
+        opened = self.open_sessions.pop((guild_id, user_id), None)
+        if not opened:
+            return 0.0
+
+        left_at = at or datetime.now()
+        duration = max((left_at - opened["joined_at"]).total_seconds(), 0.0)
+        coins, pending_secs = voice_credit(duration, opened["channel_name"])
+
+        self._sessions.append({
+            # The open row (if already stored) is resolved at flush time
+            "open": opened,
+            "guild_id": guild_id,
+            "user_id": user_id,
+            "channel_id": opened["channel_id"],
+            "channel_name": opened["channel_name"],
+            "joined_at": opened["joined_at"],
+            "left_at": left_at,
+            "duration_seconds": duration,
+            "coins_earned": 0
+        })
+        delta = self._deltas.setdefault((guild_id, user_id), {"coins": 0, "pending_seconds": 0.0, "duration": 0.0})
+        delta["coins"] += coins
+        delta["pending_seconds"] += pending_secs
+        delta["duration"] += duration
+        self.stats["leaves"] += 1
+        for callback in self._listeners:
+            try:
+                callback(guild_id, user_id, duration)
+            except Exception as e:
+                logger.error(f"Voice ledger listener error: {e}", exc_info=True)
+
+        self._schedule_flush()
+        return duration
+
+    def move(self, guild_id: int, user_id: int, channel_id: int, channel_name: str):
+        now = datetime.now()
+        self.leave(guild_id, user_id, at=now)
+        self.join(guild_id, user_id, channel_id, channel_name, joined_at=now)
+
+    # === Reads ===
+
+    def live_seconds(self, guild_id: int, user_id: int, now: datetime = None) -> float:
+        opened = self.open_sessions.get((guild_id, user_id))
+        if not opened:
+            return 0.0
+        return max(((now or datetime.now()) - opened["joined_at"]).total_seconds(), 0.0)
+
+    def _all_sessions(self):
+        return self._inflight[0] + self._sessions
+
+    def _all_deltas(self):
+        for deltas in (self._inflight[1], self._deltas):
+            yield from deltas.items()
+
+    def pending(self, guild_id: int, user_id: int) -> dict:
+        """Balance delta not yet written to voice_balances"""
+        total = {"coins": 0, "pending_seconds": 0.0, "duration": 0.0}
+        for key, delta in self._all_deltas():
+            if key == (guild_id, user_id):
+                for field, value in delta.items():
+                    total[field] += value
+        return total
+
+    def pending_channels(self, guild_id: int, user_id: int) -> dict:
+        """channel_id (str) -> {"name", "seconds"} of unflushed sessions + the open one"""
+        channels = {}
+        def add(channel_id, name, seconds):
+            entry = channels.setdefault(str(channel_id), {"name": name or "Unknown", "seconds": 0.0})
+            entry["seconds"] += seconds
+
+        for s in self._all_sessions():
+            if s["guild_id"] == guild_id and s["user_id"] == user_id:
+                add(s["channel_id"], s["channel_name"], s["duration_seconds"])
+        opened = self.open_sessions.get((guild_id, user_id))
+        if opened:
+            add(opened["channel_id"], opened["channel_name"], self.live_seconds(guild_id, user_id))
+        return channels
+
+    def guild_extra_seconds(self, guild_id: int) -> dict:
+        """user_id -> unflushed + live seconds, for leaderboards"""
+        now = datetime.now()
+        extra = {}
+        for (g_id, user_id), delta in self._all_deltas():
+            if g_id == guild_id:
+                extra[user_id] = extra.get(user_id, 0.0) + delta["duration"]
+        for (g_id, user_id) in self.open_sessions:
+            if g_id == guild_id:
+                extra[user_id] = extra.get(user_id, 0.0) + self.live_seconds(g_id, user_id, now)
+        return extra
+
+    def guild_live_seconds(self, guild_id: int) -> dict:
+        """user_id -> seconds of the open session (users currently in voice)"""
+        now = datetime.now()
+        return {
+            user_id: self.live_seconds(g_id, user_id, now)
+            for (g_id, user_id) in self.open_sessions if g_id == guild_id
+        }
+
+    def has_pending(self) -> bool:
+        return bool(self._sessions or self._deltas)
+
+    def _unsaved_open(self):
+        return [o for o in self.open_sessions.values() if o["id"] is None]
+
+    @staticmethod
+    def _session_row(s):
+        row = {k: v for k, v in s.items() if k != "open"}
+        if s["open"]["id"] is not None:
+            row["id"] = s["open"]["id"]
+        return row
+
+    # === Flush ===
+
+    def _schedule_flush(self):
+        if len(self._sessions) >= self.max_events and (self._batch_task is None or self._batch_task.done()):
+            self._batch_task = asyncio.create_task(self.flush())
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+            if not self.has_pending():
+                break
+
+    async def flush(self) -> int:
+        """Write everything closed so far in one transaction"""
+        async with self._lock:
+            return await self._flush()
+
+    async def flush_and_read(self, read):
+        """
+        Flush, then await read() before any other flush can run.
+
+        Whatever read() sees in the database is exactly what was flushed:
+        sessions closed since then are still in unflushed_durations() when
+        it returns (the caller must use both before its next await).
+        """
+        async with self._lock:
+            await self._flush()
+            return await read()
+
+    def unflushed_durations(self) -> list:
+        """[(guild_id, user_id, seconds)] of closed sessions not written yet"""
+        return [(g, u, d["duration"]) for (g, u), d in self._all_deltas() if d["duration"]]
+
+    async def _flush(self) -> int:
+        sessions, self._sessions = self._sessions, []
+        deltas, self._deltas = self._deltas, {}
+        unsaved = self._unsaved_open()
+        if not sessions and not deltas and not unsaved:
+            return 0
+
+        rows = [{"guild_id": g, "user_id": u, **d} for (g, u), d in deltas.items()]
+        opened = [{k: v for k, v in o.items() if k != "id"} for o in unsaved]
+        self._inflight = (sessions, deltas)
+        try:
+            ids = await self.db.apply_voice_ledger([self._session_row(s) for s in sessions], rows, opened)
+            for o, session_id in zip(unsaved, ids):
+                o["id"] = session_id
+        except Exception as e:
+            # Keep the batch for the next flush (merged ahead of newer events)
+            logger.error(f"Voice ledger flush failed ({len(sessions)} sessions): {e}", exc_info=True)
+            self._sessions = sessions + self._sessions
+            for key, d in deltas.items():
+                newer = self._deltas.setdefault(key, {"coins": 0, "pending_seconds": 0.0, "duration": 0.0})
+                for field, value in d.items():
+                    newer[field] += value
+            return 0
+        finally:
+            self._inflight = ([], {})
+
+        self.stats["flushes"] += 1
+        self.stats["rows"] += len(sessions)
+        logger.debug(f"Voice ledger flush: {len(sessions)} sessions, {len(rows)} balances")
+        return len(sessions)
+
+    async def close(self):
+        """Close all open sessions and flush (cog unload / shutdown)"""
+        now = datetime.now()
+        for guild_id, user_id in list(self.open_sessions):
+            self.leave(guild_id, user_id, at=now)
+        await self.flush()
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
@@ -1,5 +1,6 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
+import asyncio
 import json
 import os
 import datetime
@@ -8,6 +9,11 @@ import logging
 
 # Database import
 from database.adapter import DatabaseAdapter
+from .utils.voice_ledger import VoiceLedger
+from .utils.voice_leaderboard import VoiceLeaderboard
+from .utils.scheduler import get_scheduler, every
+from .utils.config import VOICE_LEDGER_FLUSH_SECONDS, VOICE_LEDGER_FLUSH_EVENTS
+from .utils.config import VOICE_HEARTBEAT_SECONDS, VOICE_ORPHAN_POLICY, VOICE_ORPHAN_MAX_SECONDS
 
 # Logger setup
 logger = logging.getLogger('VoiceStats')
@@ -17,6 +23,57 @@ handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(
 logger.addHandler(handler)
 
 STATS_FILE = "voice_stats.json"  # Deprecated, keeping for migration reference
+HISTORY_PAGE_SIZE = 10
+
+
+class VoiceHistoryView(discord.ui.View):
+    """Older/newer buttons over keyset pages of !geçmiş (one bounded query per click)"""
+
+    def __init__(self, cog, author_id, guild_id, target):
+        super().__init__(timeout=180)
+        self.cog = cog
+        self.author_id = author_id
+        self.guild_id = guild_id
+        self.target = target
+        # Cursors of the pages shown so far (None = newest page)
+        self.cursors = [None]
+        self.next_cursor = None
+
+    async def render(self):
+        page = await self.cog.db.get_user_voice_history(
+            self.guild_id, self.target.id, days=None, limit=HISTORY_PAGE_SIZE, cursor=self.cursors[-1]
+        )
+        self.next_cursor = page.next_cursor
+        self.newer.disabled = len(self.cursors) == 1
+        self.older.disabled = page.next_cursor is None
+
+        embed = discord.Embed(title=f"🕓 Ses Geçmişi: {self.target.display_name}", color=discord.Color.blue())
+        if page.sessions:
+            lines = []
+            for s in page.sessions:
+                duration = "devam ediyor" if s.left_at is None else self.cog.format_duration(s.duration_seconds)
+                lines.append(f"`{s.joined_at.strftime('%d.%m %H:%M')}` **{s.channel_name or 'Unknown'}** – {duration}")
+            embed.description = "\n".join(lines)
+        else:
+            embed.description = "Kayıtlı oturum yok."
+        embed.set_footer(text=f"Sayfa {len(self.cursors)}")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.author_id
+
+    @discord.ui.button(label="◀ Daha yeni", style=discord.ButtonStyle.secondary)
+    async def newer(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        await interaction.response.edit_message(embed=await self.render(), view=self)
+
+    @discord.ui.button(label="Daha eski ▶", style=discord.ButtonStyle.secondary)
+    async def older(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.next_cursor is not None:
+            self.cursors.append(self.next_cursor)
+        await interaction.response.edit_message(embed=await self.render(), view=self)
+
 
 class VoiceStats(commands.Cog):
     def __init__(self, bot):
@@ -24,11 +81,52 @@ class VoiceStats(commands.Cog):
         # Database adapter
         self.db = DatabaseAdapter('sqlite:///cotabot_dev.db')
         self.db.init_db()
-        # Active session IDs: {user_id: session_db_id}
-        self.active_sessions = {}
+        # Open sessions + unflushed session rows / balance deltas (write-behind)
+        self.ledger = VoiceLedger(
+            self.db,
+            interval=VOICE_LEDGER_FLUSH_SECONDS,
+            max_events=VOICE_LEDGER_FLUSH_EVENTS
+        )
+        # Ranking by total seconds (stored + closed sessions); live time is added per query
+        self.leaderboard = VoiceLeaderboard()
+        self.ledger.add_listener(self.leaderboard.add)
+        # Last heartbeat before this start (end time of sessions orphaned by a crash)
+        self.last_heartbeat = None
+        self.last_reconcile = None
+        # When the gateway connection dropped (close time of sessions missed while down)
+        self.disconnected_at = None
         logger.info("VoiceStats initialized with database")
 
+    async def cog_load(self):
+        # First start after the rollup table was added: fill it from past sessions
+        rolled = await self.db.rebuild_voice_hourly(only_if_empty=True)
+        if rolled:
+            logger.info(f"Voice hourly rollup built from {rolled} sessions")
+        # Coin audit log starts from the current balances
+        seeded = await self.db.seed_voice_ledger()
+        if seeded:
+            logger.info(f"Voice ledger seeded with {seeded} opening balances")
+
+        state = await self.db.get_scheduled_job("voice_heartbeat")
+        self.last_heartbeat = state["last_run"] if state else None
+        # Heartbeat = periodic flush; its stored last_run tells the next start when the bot was last alive
+        scheduler = get_scheduler(self.bot)
+        await scheduler.add_job(
+            "voice_heartbeat", every(datetime.timedelta(seconds=VOICE_HEARTBEAT_SECONDS)),
+            self.ledger.flush, catch_up=False
+        )
+
+    @property
+    def active_sessions(self):
+        """(guild_id, user_id) -> open session, kept for debug / status"""
+        return self.ledger.open_sessions
+
     def cog_unload(self):
+        scheduler = getattr(self.bot, "scheduler", None)
+        if scheduler:
+            scheduler.remove_job("voice_heartbeat")
+        # Credit the time of users still in voice and write the last batch
+        asyncio.create_task(self.ledger.close())
         logger.info("VoiceStats unloaded.")
 
     # Deprecated - keeping for migration script reference
@@ -42,34 +140,78 @@ class VoiceStats(commands.Cog):
             logger.error(f"Error loading stats: {e}")
             return {}
 
-    # Deprecated - sessions are now tracked in database on join/leave
-    # No periodic loop needed
+    # Sessions are tracked in memory by the VoiceLedger and written in batches
         
     @commands.Cog.listener()
     async def on_ready(self):
         """Bot açıldığında seste olanları tespit et ve sessions başlat."""
         logger.info("VoiceStats scanning for active users...")
-        count = 0
-        
-        for guild in self.bot.guilds:
-            for vc in guild.voice_channels:
-                for member in vc.members:
-                    if not member.bot:
-                        # Start database session
-                        try:
-                            session_id = await self.db.start_voice_session(
-                                guild_id=guild.id,
-                                user_id=member.id,
-                                channel_id=vc.id,
-                                channel_name=vc.name
-                            )
-                            self.active_sessions[member.id] = session_id
-                            count += 1
-                        except Exception as e:
-                            logger.error(f"Error starting session for {member.display_name}: {e}")
-                            
-        if count > 0:
-            logger.info(f"{count} users detected in voice and tracking started")
+        now = datetime.datetime.now()
+        current = [
+            {"guild_id": guild.id, "user_id": member.id, "channel_id": vc.id,
+             "channel_name": vc.name, "joined_at": now}
+            for guild in self.bot.guilds
+            for vc in guild.voice_channels
+            for member in vc.members if not member.bot
+        ]
+
+        if self.last_reconcile is not None:
+            # Reconnect: users already tracked keep their session, users who left while
+            # the gateway was down are closed at the disconnect
+            in_voice = {(row["guild_id"], row["user_id"]) for row in current}
+            left_at = self.disconnected_at or now
+            for guild_id, user_id in list(self.ledger.open_sessions):
+                if (guild_id, user_id) not in in_voice:
+                    self.ledger.leave(guild_id, user_id, at=left_at)
+            for row in current:
+                self.ledger.join(row["guild_id"], row["user_id"], row["channel_id"], row["channel_name"])
+            self.disconnected_at = None
+            return
+
+        await self.reconcile_sessions(current)
+
+    @commands.Cog.listener()
+    async def on_disconnect(self):
+        # Fires on every failed reconnect attempt too; the first one is when voice events stopped
+        if self.disconnected_at is None:
+            self.disconnected_at = datetime.datetime.now()
+
+    @commands.Cog.listener()
+    async def on_resumed(self):
+        # A resumed session replays the missed voice events, nothing to close
+        self.disconnected_at = None
+
+    async def reconcile_sessions(self, current):
+        """Close sessions orphaned by a crash/restart and open everyone in voice (one transaction)"""
+        try:
+            result = await self.db.reconcile_voice_sessions(
+                current,
+                policy=VOICE_ORPHAN_POLICY,
+                max_seconds=VOICE_ORPHAN_MAX_SECONDS,
+                heartbeat_at=self.last_heartbeat
+            )
+        except Exception as e:
+            logger.error(f"Voice session reconciliation failed: {e}", exc_info=True)
+            result = {"closed": 0, "capped": 0, "credited_seconds": 0.0, "opened_ids": [None] * len(current)}
+
+        for row, session_id in zip(current, result["opened_ids"]):
+            self.ledger.join(row["guild_id"], row["user_id"], row["channel_id"], row["channel_name"],
+                             joined_at=row["joined_at"], session_id=session_id)
+
+        self.last_reconcile = result
+        # Balances now include the credited orphans; closed sessions update it from here on.
+        # Leaves during the totals query are not in them yet: they are added from the ledger.
+        try:
+            totals = await self.ledger.flush_and_read(self.db.get_voice_totals)
+            self.leaderboard.load(totals, self.ledger.unflushed_durations())
+        except Exception as e:
+            logger.error(f"Voice leaderboard load failed: {e}", exc_info=True)
+        logger.info(
+            f"Voice reconciliation ({VOICE_ORPHAN_POLICY}): {result['closed']} orphaned sessions closed "
+            f"({result['capped']} capped, {result['credited_seconds'] / 3600:.1f}h credited), "
+            f"{len(current)} users in voice tracked"
+        )
+        return result
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
@@ -77,57 +219,22 @@ class VoiceStats(commands.Cog):
 
         user_id = member.id
         guild_id = member.guild.id
+        if before.channel == after.channel:
+            return  # Mute / deafen / stream changes
         
-        # 1. KANAL DEĞİŞİMİ veya ÇIKIŞ (Eski oturumu kapat)
-        if before.channel is not None:
-            if user_id in self.active_sessions:
-                session_id = self.active_sessions.pop(user_id)
-                
-                # Calculate coins earned (1 coin per 60 seconds, AFK channel = 0)
-                is_afk = before.channel.name == "AFK"
-                
-                try:
-                    # End session in database
-                    duration = await self.db.end_voice_session(session_id, coins_earned=0)
-                    
-                    # Update balance
-                    if not is_afk and duration > 0:
-                        coins_earned = int(duration // 60)
-                        pending_secs = duration % 60
-                        
-                        await self.db.update_voice_balance(
-                            guild_id=guild_id,
-                            user_id=user_id,
-                            coins_delta=coins_earned,
-                            pending_secs_delta=pending_secs,
-                            duration_delta=duration
-                        )
-                    else:
-                        # AFK or no time - just update total time
-                        await self.db.update_voice_balance(
-                            guild_id=guild_id,
-                            user_id=user_id,
-                            duration_delta=duration if duration > 0 else 0
-                        )
-                    
-                    logger.debug(f"Session ended: {member.display_name} in {before.channel.name}, {duration:.1f}s")
-                except Exception as e:
-                    logger.error(f"Error ending session: {e}")
-
-        # 2. GİRİŞ (Yeni oturum başlat)
-        if after.channel is not None:
-            if before.channel != after.channel:  # New join or channel switch
-                try:
-                    session_id = await self.db.start_voice_session(
-                        guild_id=guild_id,
-                        user_id=user_id,
-                        channel_id=after.channel.id,
-                        channel_name=after.channel.name
-                    )
-                    self.active_sessions[user_id] = session_id
-                    logger.debug(f"Session started: {member.display_name} in {after.channel.name}")
-                except Exception as e:
-                    logger.error(f"Error starting session: {e}")
+        # Memory only; closed sessions and coins are flushed by the ledger
+        if after.channel is None:
+            # ÇIKIŞ
+            duration = self.ledger.leave(guild_id, user_id)
+            logger.debug(f"Session ended: {member.display_name} in {before.channel.name}, {duration:.1f}s")
+        elif before.channel is None:
+            # GİRİŞ
+            self.ledger.join(guild_id, user_id, after.channel.id, after.channel.name)
+            logger.debug(f"Session started: {member.display_name} in {after.channel.name}")
+        else:
+            # KANAL DEĞİŞİMİ
+            self.ledger.move(guild_id, user_id, after.channel.id, after.channel.name)
+            logger.debug(f"Session moved: {member.display_name} {before.channel.name} -> {after.channel.name}")
 
     def format_duration(self, seconds):
         if seconds < 60:
@@ -150,22 +257,14 @@ class VoiceStats(commands.Cog):
             guild_id = ctx.guild.id
             
             # Get stats from database
-            stats = await self.db.get_user_voice_stats(guild_id, target.id)
-            balance_obj = await self.db.get_voice_balance(guild_id, target.id)
+            stats = await self.db.get_user_voice_stats(guild_id, target.id, include_open=False)
             
-            total_seconds = stats["total_seconds"]
-            
-            # Add active session time if currently in voice
-            active_session_seconds = 0
-            if target.id in self.active_sessions:
-                # Get session from database would be ideal, but we can calculate from local start time if needed
-                # For accuracy, let's just use what we have in DB + current delta if we track start time locally
-                # But active_sessions now holds DB ID, not start time.
-                # So we fetch active session from DB
-                session = await self.db.get_active_session(guild_id, target.id)
-                if session:
-                    active_session_seconds = (datetime.datetime.now() - session.joined_at).total_seconds()
-                    total_seconds += active_session_seconds
+            # Database totals + sessions not flushed yet + the live session
+            active_session_seconds = self.ledger.live_seconds(guild_id, target.id)
+            total_seconds = stats["total_seconds"] + self.ledger.pending(guild_id, target.id)["duration"] + active_session_seconds
+            for cid, cdata in self.ledger.pending_channels(guild_id, target.id).items():
+                entry = stats["channels"].setdefault(cid, {"name": cdata["name"], "seconds": 0.0})
+                entry["seconds"] += cdata["seconds"]
             
             formatted_total = self.format_duration(total_seconds)
 
@@ -175,6 +274,10 @@ class VoiceStats(commands.Cog):
             )
             embed.set_thumbnail(url=target.display_avatar.url)
             embed.add_field(name="Toplam Süre", value=f"**{formatted_total}**", inline=False)
+            if self.leaderboard.loaded:
+                rank, _ = self.leaderboard.rank(guild_id, target.id, live=self.ledger.guild_live_seconds(guild_id))
+                if rank:
+                    embed.add_field(name="Sıralama", value=f"#{rank} / {len(self.leaderboard.board(guild_id))}", inline=False)
             
             # En çok vakit geçirilen kanallar (Top 5)
             channels_data = stats.get("channels", {})
@@ -212,8 +315,9 @@ class VoiceStats(commands.Cog):
         # Get balance from database
         balance_obj = await self.db.get_voice_balance(guild_id, target.id)
         
-        balance = balance_obj.balance
-        total_time = balance_obj.total_time_seconds
+        pending = self.ledger.pending(guild_id, target.id)
+        balance = balance_obj.balance + pending["coins"]
+        total_time = balance_obj.total_time_seconds + pending["duration"] + self.ledger.live_seconds(guild_id, target.id)
         formatted_time = self.format_duration(total_time)
         
         embed = discord.Embed(
@@ -240,6 +344,9 @@ class VoiceStats(commands.Cog):
 
         guild_id = ctx.guild.id
         
+        # Coins earned since the last flush must be in the database first
+        await self.ledger.flush()
+        
         # Check balance
         sender_balance = await self.db.get_voice_balance(guild_id, ctx.author.id)
         
@@ -263,27 +370,127 @@ class VoiceStats(commands.Cog):
         else:
             await ctx.send("❌ Transfer başarısız.")
 
+    @commands.command(name='cüzdan_denetim', aliases=['coin_audit'])
+    async def cuzdan_denetim(self, ctx, mode: str = None):
+        """(Admin) Bakiyeleri işlem defteriyle karşılaştırır. `düzelt` ile defterden yeniden hesaplar."""
+        if not ctx.author.guild_permissions.administrator: return
+        
+        await self.ledger.flush()
+        fix = mode in ("düzelt", "fix")
+        mismatches = await self.db.audit_voice_ledger(ctx.guild.id, fix=fix)
+        if not mismatches:
+            await ctx.send("✅ Tüm bakiyeler işlem defteriyle uyumlu.")
+            return
+        
+        lines = []
+        for m in mismatches[:20]:
+            member = ctx.guild.get_member(m["user_id"])
+            name = member.display_name if member else f"Unknown ({m['user_id']})"
+            lines.append(f"- {name}: bakiye {m['balance']}, defter {m['ledger']}")
+        header = "🔧 Düzeltildi" if fix else "⚠️ Uyumsuz bakiyeler"
+        await ctx.send(f"{header} ({len(mismatches)}):\n" + "\n".join(lines))
+
     @commands.command(name='debug_sessions')
     async def debug_sessions(self, ctx):
         """(Admin) Aktif ses oturumlarını gösterir."""
         if not ctx.author.guild_permissions.administrator: return
         
-        active_count = len(self.active_sessions)
-        msg = f"🔍 **Aktif Oturumlar (DB IDs):** {active_count}\n"
-        for uid, session_id in self.active_sessions.items():
+        sessions = {uid: s for (gid, uid), s in self.active_sessions.items() if gid == ctx.guild.id}
+        stats = self.ledger.stats
+        msg = (f"🔍 **Aktif Oturumlar:** {len(sessions)}\n"
+               f"💾 Yazılan: {stats['rows']} oturum / {stats['flushes']} işlem\n")
+        if self.last_reconcile:
+            msg += f"🧹 Açılışta kapatılan yetim oturum: {self.last_reconcile['closed']} ({self.last_reconcile['capped']} sınırlandı)\n"
+        for uid, opened in sessions.items():
             member = ctx.guild.get_member(uid)
             name = member.display_name if member else f"Unknown ({uid})"
-            msg += f"- {name}: Session #{session_id}\n"
+            live = self.format_duration(self.ledger.live_seconds(ctx.guild.id, uid))
+            msg += f"- {name}: {opened['channel_name']} ({live})\n"
             
         await ctx.send(msg)
 
+    @commands.command(name='geçmiş', aliases=['gecmis', 'voice_history'])
+    async def gecmis(self, ctx, member: discord.Member = None, bucket: str = None):
+        """Ses oturum geçmişi (sayfalı). `gün` / `hafta` ile günlük veya haftalık toplamlar."""
+        target = member or ctx.author
+        # Sessions closed since the last flush should be on the first page
+        await self.ledger.flush()
+        
+        if bucket in ("gün", "gun", "day", "hafta", "week"):
+            size = "day" if bucket in ("gün", "gun", "day") else "week"
+            rows = await self.db.get_user_voice_buckets(ctx.guild.id, target.id, bucket=size,
+                                                        days=14 if size == "day" else 84)
+            if not rows:
+                await ctx.send("Henüz kayıtlı ses verisi yok.")
+                return
+            title = "Günlük" if size == "day" else "Haftalık"
+            embed = discord.Embed(title=f"📅 {title} Ses Süresi: {target.display_name}", color=discord.Color.blue())
+            embed.description = "\n".join(
+                f"`{row['start'].strftime('%d.%m.%Y')}` {self.format_duration(row['seconds'])} ({row['sessions']} oturum)"
+                for row in rows
+            )
+            await ctx.send(embed=embed)
+            return
+        
+        view = VoiceHistoryView(self, ctx.author.id, ctx.guild.id, target)
+        await ctx.send(embed=await view.render(), view=view)
+
+    @commands.command(name='yoğunluk', aliases=['yogunluk', 'heatmap'])
+    async def yogunluk(self, ctx, member: discord.Member = None):
+        """Ses kanallarının (veya bir üyenin) en yoğun gün/saatlerini gösterir (son 4 hafta)."""
+        guild_id = ctx.guild.id
+        days = ["Pzt", "Sal", "Çar", "Per", "Cum", "Cmt", "Paz"]
+        
+        matrix = await self.db.get_voice_heatmap(guild_id, days=28, user_id=member.id if member else None)
+        slots = sorted(
+            ((seconds, day, hour) for day, row in enumerate(matrix) for hour, seconds in enumerate(row) if seconds > 0),
+            reverse=True
+        )[:5]
+        if not slots:
+            await ctx.send("Henüz kayıtlı ses verisi yok.")
+            return
+        
+        title = f"📈 Haftalık Ses Düzeni: {member.display_name}" if member else "📈 Ses Yoğunluğu (Son 4 Hafta)"
+        embed = discord.Embed(title=title, color=discord.Color.blue())
+        embed.add_field(
+            name="En Yoğun Saatler",
+            value="\n".join(f"**{days[day]} {hour:02d}:00** – `{self.format_duration(seconds)}`" for seconds, day, hour in slots),
+            inline=False
+        )
+        day_totals = [sum(row) for row in matrix]
+        embed.add_field(
+            name="Günlere Göre",
+            value=" | ".join(f"{days[d]}: {self.format_duration(t)}" for d, t in enumerate(day_totals) if t > 0),
+            inline=False
+        )
+        
+        if not member:
+            trend = await self.db.get_voice_channel_trend(guild_id, days=30)
+            top_channels = sorted(trend.values(), key=lambda c: c["total"], reverse=True)[:5]
+            embed.add_field(
+                name="En Çok Kullanılan Kanallar (30 gün)",
+                value="\n".join(f"**{c['name']}**: `{self.format_duration(c['total'])}` ({len(c['days'])} gün aktif)" for c in top_channels) or "-",
+                inline=False
+            )
+        
+        await ctx.send(embed=embed)
+
     @commands.command(name='top10')
     async def top10(self, ctx):
         """Sunucudaki en çok ses süresine sahip 10 kişiyi gösterir."""
         guild_id = ctx.guild.id
         
-        # Get leaderboard from database
-        leaderboard = await self.db.get_voice_leaderboard(guild_id, limit=10)
+        if self.leaderboard.loaded:
+            live = self.ledger.guild_live_seconds(guild_id)
+            leaderboard = [
+                {"user_id": uid, "total_seconds": secs}
+                for uid, secs in self.leaderboard.top(guild_id, 10, live=live)
+            ]
+        else:
+            # Not loaded yet (before on_ready): read from the database
+            leaderboard = await self.db.get_voice_leaderboard(
+                guild_id, limit=10, extra_seconds=self.ledger.guild_extra_seconds(guild_id), include_open=False
+            )
         
         if not leaderboard:
             await ctx.send("Henüz kayıtlı istatistik yok.")
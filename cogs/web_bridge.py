@@ -130,7 +130,11 @@ class WebBridge(commands.Cog):
         if event_id:
             await self.db.update_event_message(event_id, message.id)
             logger.info(f"📝 Updated event {event_id} with message ID {message.id}")
-        
+
+            # Web-created events bypass the Event cog, add it to the in-memory store
+            if event_cog:
+                await event_cog.store.refresh_by_message(channel.guild.id, message.id)
+
         logger.info(f"📢 Event announced: {data['title']} in channel {channel_id}")
     
     async def handle_player_added(self, data: dict):
@@ -2,21 +2,108 @@
 Database Adapter - Async interface for database operations
 Provides clean API for all database CRUD operations
 """
-from sqlalchemy import create_engine, select, update, delete
-from sqlalchemy.orm import sessionmaker, scoped_session, joinedload
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import create_engine, select, update, delete, insert, bindparam, literal, func, and_, or_
+from sqlalchemy.orm import sessionmaker, scoped_session, joinedload, selectinload
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from contextlib import contextmanager, asynccontextmanager
-from .models import Base, Player, PlayerStats, ActivityLog, Event, EventParticipant, PassiveRequest, VoiceSession, VoiceBalance, TrainingMatch, TrainingMatchPlayer, AdminActivityLog
+from .models import Base, Player, PlayerStats, ActivityLog, ActivityPresence, Event, EventParticipant, PassiveRequest, VoiceSession, VoiceBalance, VoiceLedgerEntry, VoiceHourly, TrainingMatch, TrainingMatchPlayer, AdminActivityLog
+from .presence import SLOT_MINUTES, day_slots, set_slots, as_matrix, minutes as presence_minutes, hour_of_week, overlap_by_player
 from exceptions import DatabaseError, DatabaseOperationError, DatabaseConnectionError
 import asyncio
 import logging
-from typing import Optional, List
-from datetime import date, datetime
+from typing import Optional, List, Dict, NamedTuple, Iterable
+from datetime import date, datetime, timedelta
 import json
 
 # Setup logger
 logger = logging.getLogger(__name__)
 
+# Columns tracked by the player stats time series (player_stat_samples)
+STAT_SERIES_FIELDS = ('score', 'kills', 'deaths', 'revives', 'wounds')
+
+# Voice economy: 1 coin per 60 seconds, nothing in the AFK channel
+AFK_CHANNEL_NAME = "AFK"
+
+
+def voice_credit(duration: float, channel_name: Optional[str]) -> tuple:
+    """(coins, pending_seconds) earned by a closed voice session"""
+    if channel_name == AFK_CHANNEL_NAME or duration <= 0:
+        return 0, 0.0
+    return int(duration // 60), duration % 60
+
+
+# Atomic balance change; executemany-able (one statement per batch)
+_VOICE_BALANCE_ADD = (
+    update(VoiceBalance.__table__)
+    .where(
+        VoiceBalance.__table__.c.guild_id == bindparam('b_guild'),
+        VoiceBalance.__table__.c.user_id == bindparam('b_user')
+    )
+    .values(
+        balance=VoiceBalance.__table__.c.balance + bindparam('b_coins'),
+        pending_seconds=VoiceBalance.__table__.c.pending_seconds + bindparam('b_pending'),
+        total_time_seconds=VoiceBalance.__table__.c.total_time_seconds + bindparam('b_duration'),
+        last_updated=bindparam('b_now')
+    )
+)
+
+
+def split_hours(start: datetime, end: datetime) -> List[tuple]:
+    """Split [start, end) into (hour bucket start, seconds) pieces"""
+    pieces = []
+    hour = start.replace(minute=0, second=0, microsecond=0)
+    while hour < end:
+        next_hour = hour + timedelta(hours=1)
+        seconds = (min(end, next_hour) - max(start, hour)).total_seconds()
+        if seconds > 0:
+            pieces.append((hour, seconds))
+        hour = next_hour
+    return pieces
+
+
+class ParticipantRecord(NamedTuple):
+    """Read-only event participant (same attribute names as EventParticipant)"""
+    id: int
+    event_id: int
+    user_id: int
+    user_mention: str
+    status: str
+    reason: Optional[str]
+    joined_at: Optional[datetime]
+
+
+class VoiceSessionRecord(NamedTuple):
+    """Read-only voice session row for history pages"""
+    id: int
+    channel_id: Optional[int]
+    channel_name: Optional[str]
+    joined_at: datetime
+    left_at: Optional[datetime]
+    duration_seconds: float
+
+
+class VoiceHistoryPage(NamedTuple):
+    """One page of voice history; next_cursor is None on the last page"""
+    sessions: List[VoiceSessionRecord]
+    next_cursor: Optional[tuple]
+
+
+class EventRecord(NamedTuple):
+    """Read-only event with its participants (same attribute names as Event)"""
+    id: int
+    guild_id: int
+    event_id: int
+    title: str
+    description: Optional[str]
+    timestamp: datetime
+    channel_id: int
+    message_id: Optional[int]
+    creator_id: int
+    active: bool
+    reminder_sent: bool
+    created_at: Optional[datetime]
+    participants: tuple
+
 
 class DatabaseAdapter:
     """
@@ -30,6 +117,14 @@ class DatabaseAdapter:
     def init_db(self):
         """Create all tables if they don't exist"""
         Base.metadata.create_all(self.engine)
+        
+        # create_all skips indexes on tables that already exist; add new ones
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                try:
+                    index.create(self.engine, checkfirst=True)
+                except SQLAlchemyError as e:
+                    logger.warning(f"Could not create index {index.name}: {e}")
         print("Database tables created")
     
     @contextmanager
@@ -229,6 +324,145 @@ class DatabaseAdapter:
                 return results
         return await asyncio.to_thread(_query)
     
+    # === PRESENCE BITMAPS ===
+    
+    async def mark_presence(self, spans: List[tuple], count_minutes: bool = False) -> int:
+        """
+        Set presence slots for [(player_id, start, end)] spans (end None = the slot of start)
+        
+        Setting a bit is idempotent. With count_minutes, only slots that were
+        not set before add SLOT_MINUTES to activity_logs, so a poll that
+        fires twice in the same slot is counted once, also when both runs
+        overlap (bitmaps are written with a compare-and-set UPDATE, minutes
+        with minutes + n). Returns the number of newly set slots.
+        """
+        def _mark():
+            wanted = {}  # (player_id, date) -> slots
+            last_seen = {}
+            for player_id, start, end in spans:
+                for day, slots in day_slots(start, end).items():
+                    wanted.setdefault((player_id, day), set()).update(slots)
+                last_seen[player_id] = max(end or start, last_seen.get(player_id, end or start))
+            if not wanted:
+                return 0
+            player_ids = {k[0] for k in wanted}
+            days = {k[1] for k in wanted}
+            
+            presence = ActivityPresence.__table__
+            logs = ActivityLog.__table__
+            with self.session_scope() as session:
+                def read_bits(player_id, day):
+                    return session.execute(select(presence.c.bits).where(
+                        presence.c.player_id == player_id, presence.c.date == day
+                    )).scalar_one()
+                
+                current_bits = {
+                    (r.player_id, r.date): r.bits for r in session.execute(
+                        select(presence.c.player_id, presence.c.date, presence.c.bits).where(
+                            presence.c.player_id.in_(player_ids),
+                            presence.c.date.in_(days)
+                        )
+                    )
+                }
+                
+                total = 0
+                for (player_id, day), slots in wanted.items():
+                    current = current_bits.get((player_id, day))
+                    while True:
+                        bits, added = set_slots(current, slots)
+                        if current is None:
+                            try:
+                                with session.begin_nested():
+                                    session.execute(insert(presence).values(player_id=player_id, date=day, bits=bits))
+                                break
+                            except IntegrityError:
+                                # Created by a concurrent poll: merge into its bitmap
+                                current = read_bits(player_id, day)
+                                continue
+                        if not added:
+                            break
+                        # Compare-and-set: a concurrent poll that changed the bitmap first makes this a no-op
+                        result = session.execute(update(presence).where(
+                            presence.c.player_id == player_id,
+                            presence.c.date == day,
+                            presence.c.bits == current
+                        ).values(bits=bits))
+                        if result.rowcount == 1:
+                            break
+                        current = read_bits(player_id, day)
+                    total += added
+                    
+                    if count_minutes and added:
+                        values = {"minutes": logs.c.minutes + added * SLOT_MINUTES, "last_seen": last_seen[player_id]}
+                        result = session.execute(update(logs).where(
+                            logs.c.player_id == player_id, logs.c.date == day
+                        ).values(**values))
+                        if result.rowcount == 0:
+                            try:
+                                with session.begin_nested():
+                                    session.execute(insert(logs).values(
+                                        player_id=player_id, date=day,
+                                        minutes=added * SLOT_MINUTES, last_seen=last_seen[player_id]
+                                    ))
+                            except IntegrityError:
+                                session.execute(update(logs).where(
+                                    logs.c.player_id == player_id, logs.c.date == day
+                                ).values(**values))
+                return total
+        return await asyncio.to_thread(_mark)
+    
+    def _presence_rows(self, session, days: int, player_ids: Optional[Iterable[int]] = None):
+        """(player_ids, dates, (rows, 90) bitmap matrix) of the last N days"""
+        since = date.today() - timedelta(days=days)
+        q = session.query(ActivityPresence.player_id, ActivityPresence.date, ActivityPresence.bits).filter(
+            ActivityPresence.date >= since
+        )
+        if player_ids is not None:
+            q = q.filter(ActivityPresence.player_id.in_(list(player_ids)))
+        rows = q.all()
+        return [r[0] for r in rows], [r[1] for r in rows], as_matrix([r[2] for r in rows])
+    
+    async def get_presence_minutes(self, player_id: int, days: int = 30) -> Dict[date, int]:
+        """date -> present minutes (popcount * 2) of one player"""
+        def _query():
+            with self.session_scope() as session:
+                _, dates, matrix = self._presence_rows(session, days, [player_id])
+                return dict(zip(dates, presence_minutes(matrix).tolist()))
+        return await asyncio.to_thread(_query)
+    
+    async def get_presence_heatmap(self, days: int = 28, player_ids: Optional[Iterable[int]] = None) -> List[List[int]]:
+        """7 x 24 present player-minutes per weekday (Monday first) and hour"""
+        def _query():
+            with self.session_scope() as session:
+                _, dates, matrix = self._presence_rows(session, days, player_ids)
+                return hour_of_week(dates, matrix).tolist()
+        return await asyncio.to_thread(_query)
+    
+    async def get_presence_overlap(self, player_id: int, days: int = 28, limit: int = 10) -> List[tuple]:
+        """[(Player, shared minutes)] of the players seen most together with player_id"""
+        def _query():
+            with self.session_scope() as session:
+                since = date.today() - timedelta(days=days)
+                target = dict(session.query(ActivityPresence.date, ActivityPresence.bits).filter(
+                    ActivityPresence.player_id == player_id,
+                    ActivityPresence.date >= since
+                ).all())
+                if not target:
+                    return []
+                # Only rows on days the player was present can overlap
+                rows = session.query(ActivityPresence.player_id, ActivityPresence.date, ActivityPresence.bits).filter(
+                    ActivityPresence.date.in_(list(target)),
+                    ActivityPresence.player_id != player_id
+                ).all()
+                if not rows:
+                    return []
+                totals = overlap_by_player(target, [r[0] for r in rows], [r[1] for r in rows], as_matrix([r[2] for r in rows]))
+                top = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+                players = {p.id: p for p in session.query(Player).filter(Player.id.in_([pid for pid, _ in top]))}
+                session.expunge_all()
+                return [(players[pid], value) for pid, value in top if pid in players]
+        return await asyncio.to_thread(_query)
+    
     # === EVENT OPERATIONS ===
     
     async def add_event(self, guild_id: int, event_id: int, title: str, description: str,
@@ -251,36 +485,14 @@ class DatabaseAdapter:
         return await asyncio.to_thread(_add)
     
     async def get_active_events(self, guild_id: int) -> List[Event]:
-        """Get all active events for a guild"""
+        """Get all active events for a guild (participants loaded in one extra query)"""
         def _query():
             with self.session_scope() as session:
-                events = session.query(Event).filter_by(
+                events = session.query(Event).options(selectinload(Event.participants)).filter_by(
                     guild_id=guild_id,
                     active=True
                 ).order_by(Event.timestamp).all()
-                
-                # Force load all attributes and relationships before expunge
-                for event in events:
-                    # Touch all lazy-loaded attributes
-                    _ = event.event_id
-                    _ = event.message_id
-                    _ = event.channel_id
-                    _ = event.creator_id
-                    _ = event.title
-                    _ = event.description
-                    _ = event.timestamp
-                    _ = event.reminder_sent
-                    _ = event.active
-                    
-                    if event.participants:
-                        for p in event.participants:
-                            _ = p.user_id
-                            _ = p.user_mention
-                            _ = p.status
-                            _ = p.reason
-                            
-                    session.expunge(event)
-                
+                session.expunge_all()
                 return events
         return await asyncio.to_thread(_query)
 
@@ -288,33 +500,73 @@ class DatabaseAdapter:
         """Get ALL events (active + archived) for a guild, sorted by date desc"""
         def _query():
             with self.session_scope() as session:
-                events = session.query(Event).filter_by(
+                events = session.query(Event).options(selectinload(Event.participants)).filter_by(
                     guild_id=guild_id
                 ).order_by(Event.timestamp.desc()).limit(limit).all()
-                
-                for event in events:
-                    # Touch attributes
-                    _ = event.event_id
-                    _ = event.message_id
-                    _ = event.channel_id
-                    _ = event.creator_id
-                    _ = event.title
-                    _ = event.description
-                    _ = event.timestamp
-                    _ = event.reminder_sent
-                    _ = event.active
-                    
-                    if event.participants:
-                        for p in event.participants:
-                            _ = p.user_id
-                            _ = p.user_mention
-                            _ = p.status
-                            _ = p.reason
-                            
-                    session.expunge(event)
+                session.expunge_all()
                 return events
         return await asyncio.to_thread(_query)
     
+    async def get_events_bulk(self, guild_ids: Iterable[int], active_only: bool = True,
+                              limit_per_guild: Optional[int] = None) -> Dict[int, List[EventRecord]]:
+        """
+        Load events of many guilds and all their participants in two queries
+        
+        Args:
+            guild_ids: Guilds to load
+            active_only: Only active events (ordered by timestamp asc), otherwise all (desc)
+            limit_per_guild: Keep at most this many events per guild
+        
+        Returns:
+            {guild_id: [EventRecord]} (every requested guild is present)
+        """
+        guild_ids = list(guild_ids)
+        
+        def _query():
+            grouped = {gid: [] for gid in guild_ids}
+            if not guild_ids:
+                return grouped
+            
+            with self.session_scope() as session:
+                query = session.query(
+                    Event.id, Event.guild_id, Event.event_id, Event.title, Event.description,
+                    Event.timestamp, Event.channel_id, Event.message_id, Event.creator_id,
+                    Event.active, Event.reminder_sent, Event.created_at
+                ).filter(Event.guild_id.in_(guild_ids))
+                if active_only:
+                    query = query.filter(Event.active == True).order_by(Event.timestamp, Event.id)
+                else:
+                    query = query.order_by(Event.timestamp.desc(), Event.id.desc())
+                
+                if limit_per_guild is not None and len(guild_ids) == 1:
+                    query = query.limit(limit_per_guild)
+                
+                rows = query.all()
+                if limit_per_guild is not None and len(guild_ids) > 1:
+                    counts = {}
+                    kept = []
+                    for row in rows:
+                        counts[row.guild_id] = counts.get(row.guild_id, 0) + 1
+                        if counts[row.guild_id] <= limit_per_guild:
+                            kept.append(row)
+                    rows = kept
+                
+                participants = {row.id: [] for row in rows}
+                # SQLite caps bound parameters; chunk the IN list
+                ids = list(participants)
+                for i in range(0, len(ids), 500):
+                    for p in session.query(
+                        EventParticipant.id, EventParticipant.event_id, EventParticipant.user_id,
+                        EventParticipant.user_mention, EventParticipant.status, EventParticipant.reason,
+                        EventParticipant.joined_at
+                    ).filter(EventParticipant.event_id.in_(ids[i:i + 500])).order_by(EventParticipant.id):
+                        participants[p.event_id].append(ParticipantRecord(*p))
+                
+                for row in rows:
+                    grouped[row.guild_id].append(EventRecord(*row, participants=tuple(participants[row.id])))
+            return grouped
+        return await asyncio.to_thread(_query)
+    
     async def update_event_message(self, event_db_id: int, message_id: int):
         """Update event message ID"""
         def _update():
@@ -349,6 +601,49 @@ class DatabaseAdapter:
                 session.commit()
         return await asyncio.to_thread(_upsert)
     
+    async def upsert_event_participants(self, rows: List[dict]) -> int:
+        """
+        Add or update many participants in one transaction
+        
+        Args:
+            rows: dicts with event_db_id, user_id, user_mention, status, reason
+        
+        Returns:
+            Number of rows written
+        """
+        if not rows:
+            return 0
+        
+        def _upsert():
+            with self.session_scope() as session:
+                event_ids = {r['event_db_id'] for r in rows}
+                user_ids = {r['user_id'] for r in rows}
+                existing = {
+                    (p.event_id, p.user_id): p
+                    for p in session.query(EventParticipant).filter(
+                        EventParticipant.event_id.in_(event_ids),
+                        EventParticipant.user_id.in_(user_ids)
+                    )
+                }
+                
+                for r in rows:
+                    participant = existing.get((r['event_db_id'], r['user_id']))
+                    if participant:
+                        participant.status = r['status']
+                        participant.reason = r.get('reason')
+                    else:
+                        participant = EventParticipant(
+                            event_id=r['event_db_id'],
+                            user_id=r['user_id'],
+                            user_mention=r['user_mention'],
+                            status=r['status'],
+                            reason=r.get('reason')
+                        )
+                        session.add(participant)
+                        existing[(r['event_db_id'], r['user_id'])] = participant
+                return len(rows)
+        return await asyncio.to_thread(_upsert)
+    
     async def create_event(self, guild_id: int, title: str, description: str, timestamp: datetime, 
                           channel_id: int, creator_id: int) -> int:
         """Create a new event"""
@@ -571,6 +866,11 @@ class DatabaseAdapter:
                     voice_session.left_at = datetime.now()
                     voice_session.duration_seconds = (voice_session.left_at - voice_session.joined_at).total_seconds()
                     voice_session.coins_earned = coins_earned
+                    self._apply_voice_rollup(session, [{
+                        'guild_id': voice_session.guild_id, 'user_id': voice_session.user_id,
+                        'channel_id': voice_session.channel_id, 'channel_name': voice_session.channel_name,
+                        'joined_at': voice_session.joined_at, 'left_at': voice_session.left_at
+                    }])
                     return voice_session.duration_seconds
                 return 0.0
         return await asyncio.to_thread(_end)
@@ -615,67 +915,346 @@ class DatabaseAdapter:
     
     async def update_voice_balance(self, guild_id: int, user_id: int, 
                                    coins_delta: int = 0, pending_secs_delta: float = 0,
-                                   duration_delta: float = 0) -> bool:
-        """Update voice balance (add/subtract coins, pending seconds, total time)"""
+                                   duration_delta: float = 0, kind: str = 'adjust') -> bool:
+        """Update voice balance (add/subtract coins, pending seconds, total time) with one atomic UPDATE"""
         def _update():
             with self.session_scope() as session:
-                balance = session.query(VoiceBalance).filter_by(
-                    guild_id=guild_id,
-                    user_id=user_id
-                ).first()
-                
-                if not balance:
-                    balance = VoiceBalance(
-                        guild_id=guild_id,
-                        user_id=user_id,
-                        balance=coins_delta,
-                        pending_seconds=pending_secs_delta,
-                        total_time_seconds=duration_delta
-                    )
-                    session.add(balance)
-                else:
-                    balance.balance += coins_delta
-                    balance.pending_seconds += pending_secs_delta
-                    balance.total_time_seconds += duration_delta
-                    balance.last_updated = datetime.now()
-                
+                self._apply_balance_deltas(session, [{
+                    'guild_id': guild_id,
+                    'user_id': user_id,
+                    'coins': coins_delta,
+                    'pending_seconds': pending_secs_delta,
+                    'duration': duration_delta
+                }], kind=kind)
                 return True
         return await asyncio.to_thread(_update)
     
     async def transfer_voice_coins(self, guild_id: int, sender_id: int, 
                                    receiver_id: int, amount: int) -> bool:
-        """Transfer coins between users"""
+        """
+        Transfer coins between users
+        
+        The sender is debited with a conditional UPDATE (balance >= amount),
+        so concurrent transfers can never overdraw or lose an update.
+        """
+        if amount <= 0:
+            return False
+        
         def _transfer():
             with self.session_scope() as session:
-                sender = session.query(VoiceBalance).filter_by(
-                    guild_id=guild_id, user_id=sender_id
-                ).first()
-                
-                if not sender or sender.balance < amount:
+                table = VoiceBalance.__table__
+                now = datetime.now()
+                debited = session.connection().execute(
+                    update(table)
+                    .where(table.c.guild_id == guild_id, table.c.user_id == sender_id, table.c.balance >= amount)
+                    .values(balance=table.c.balance - amount, last_updated=now)
+                )
+                if debited.rowcount != 1:
                     return False
                 
-                receiver = session.query(VoiceBalance).filter_by(
-                    guild_id=guild_id, user_id=receiver_id
-                ).first()
-                
-                if not receiver:
-                    receiver = VoiceBalance(
+                credit = (
+                    update(table)
+                    .where(table.c.guild_id == guild_id, table.c.user_id == receiver_id)
+                    .values(balance=table.c.balance + amount, last_updated=now)
+                )
+                if session.connection().execute(credit).rowcount == 0:
+                    self._ensure_balance_rows(session, {(guild_id, receiver_id)})
+                    session.connection().execute(credit)
+                session.connection().execute(insert(VoiceLedgerEntry.__table__), [
+                    {'guild_id': guild_id, 'user_id': sender_id, 'delta': -amount,
+                     'kind': 'transfer_out', 'counterparty_id': receiver_id, 'created_at': now},
+                    {'guild_id': guild_id, 'user_id': receiver_id, 'delta': amount,
+                     'kind': 'transfer_in', 'counterparty_id': sender_id, 'created_at': now}
+                ])
+                return True
+        return await asyncio.to_thread(_transfer)
+    
+    def _ensure_balance_rows(self, session, keys: set):
+        """Create missing (guild_id, user_id) voice_balances rows (caller's transaction)"""
+        existing = set(session.query(VoiceBalance.guild_id, VoiceBalance.user_id).filter(
+            VoiceBalance.guild_id.in_({k[0] for k in keys}),
+            VoiceBalance.user_id.in_({k[1] for k in keys})
+        ).all())
+        for guild_id, user_id in keys - {tuple(k) for k in existing}:
+            try:
+                with session.begin_nested():
+                    session.add(VoiceBalance(
                         guild_id=guild_id,
-                        user_id=receiver_id,
+                        user_id=user_id,
                         balance=0,
                         pending_seconds=0.0,
                         total_time_seconds=0.0
+                    ))
+            except IntegrityError:
+                pass  # Created by a concurrent transaction
+    
+    def _apply_balance_deltas(self, session, balance_deltas: List[dict], kind: str = 'voice'):
+        """
+        Add coins / pending seconds / duration deltas to voice_balances (caller's transaction)
+        
+        One executemany UPDATE (balance = balance + delta) for the batch, coin
+        changes are appended to voice_ledger.
+        """
+        if not balance_deltas:
+            return
+        now = datetime.now()
+        params = [
+            {
+                'b_guild': d['guild_id'],
+                'b_user': d['user_id'],
+                'b_coins': d['coins'],
+                'b_pending': d['pending_seconds'],
+                'b_duration': d['duration'],
+                'b_now': now
+            }
+            for d in balance_deltas
+        ]
+        conn = session.connection()
+        if len(params) == 1:
+            # Single user: try the UPDATE first, create the row only if it is missing
+            if conn.execute(_VOICE_BALANCE_ADD, params[0]).rowcount == 0:
+                self._ensure_balance_rows(session, {(balance_deltas[0]['guild_id'], balance_deltas[0]['user_id'])})
+                session.connection().execute(_VOICE_BALANCE_ADD, params[0])
+        else:
+            self._ensure_balance_rows(session, {(d['guild_id'], d['user_id']) for d in balance_deltas})
+            session.connection().execute(_VOICE_BALANCE_ADD, params)
+        entries = [
+            {'guild_id': d['guild_id'], 'user_id': d['user_id'], 'delta': d['coins'], 'kind': kind, 'created_at': now}
+            for d in balance_deltas if d['coins']
+        ]
+        if entries:
+            session.connection().execute(insert(VoiceLedgerEntry.__table__), entries)
+    
+    async def seed_voice_ledger(self) -> int:
+        """Write an 'opening' entry per existing balance if voice_ledger is empty (first start after upgrade)"""
+        def _seed():
+            with self.session_scope() as session:
+                if session.query(VoiceLedgerEntry.id).first():
+                    return 0
+                balances = VoiceBalance.__table__
+                result = session.connection().execute(
+                    insert(VoiceLedgerEntry.__table__).from_select(
+                        ['guild_id', 'user_id', 'delta', 'kind', 'created_at'],
+                        select(
+                            balances.c.guild_id, balances.c.user_id, balances.c.balance,
+                            literal('opening'), literal(datetime.now())
+                        ).where(balances.c.balance != 0)
+                    )
+                )
+                return result.rowcount
+        return await asyncio.to_thread(_seed)
+    
+    async def audit_voice_ledger(self, guild_id: Optional[int] = None, fix: bool = False) -> List[dict]:
+        """
+        Compare voice_balances.balance with the sum of voice_ledger entries
+        
+        Args:
+            fix: Rebuild the mismatching balances from the ledger
+        
+        Returns:
+            [{"guild_id", "user_id", "balance", "ledger"}] of mismatching users
+        """
+        def _audit():
+            with self.session_scope() as session:
+                sums = session.query(
+                    VoiceLedgerEntry.guild_id,
+                    VoiceLedgerEntry.user_id,
+                    func.sum(VoiceLedgerEntry.delta).label('total')
+                ).group_by(VoiceLedgerEntry.guild_id, VoiceLedgerEntry.user_id)
+                if guild_id is not None:
+                    sums = sums.filter(VoiceLedgerEntry.guild_id == guild_id)
+                sums = sums.subquery()
+                
+                query = session.query(
+                    VoiceBalance.guild_id, VoiceBalance.user_id, VoiceBalance.balance,
+                    func.coalesce(sums.c.total, 0)
+                ).outerjoin(
+                    sums, (sums.c.guild_id == VoiceBalance.guild_id) & (sums.c.user_id == VoiceBalance.user_id)
+                ).filter(VoiceBalance.balance != func.coalesce(sums.c.total, 0))
+                if guild_id is not None:
+                    query = query.filter(VoiceBalance.guild_id == guild_id)
+                
+                mismatches = [
+                    {"guild_id": g, "user_id": u, "balance": int(b or 0), "ledger": int(total)}
+                    for g, u, b, total in query
+                ]
+                if fix and mismatches:
+                    table = VoiceBalance.__table__
+                    session.connection().execute(
+                        update(table)
+                        .where(table.c.guild_id == bindparam('b_guild'), table.c.user_id == bindparam('b_user'))
+                        .values(balance=bindparam('b_ledger')),
+                        [{'b_guild': m['guild_id'], 'b_user': m['user_id'], 'b_ledger': m['ledger']} for m in mismatches]
                     )
-                    session.add(receiver)
+                return mismatches
+        return await asyncio.to_thread(_audit)
+    
+    def _apply_voice_rollup(self, session, closed: Iterable[dict]) -> int:
+        """
+        Add closed sessions to the hourly voice_hourly buckets (caller's transaction)
+        
+        Args:
+            closed: dicts with guild_id, user_id, channel_id, channel_name, joined_at, left_at
+        
+        Returns:
+            Number of buckets touched
+        """
+        buckets = {}
+        for s in closed:
+            if not s.get('left_at') or not s.get('channel_id'):
+                continue
+            for hour, seconds in split_hours(s['joined_at'], s['left_at']):
+                key = (s['guild_id'], hour, s['channel_id'], s['user_id'])
+                total, _ = buckets.get(key, (0.0, None))
+                buckets[key] = (total + seconds, s.get('channel_name'))
+        if not buckets:
+            return 0
+        
+        hours = [k[1] for k in buckets]
+        existing = {
+            (b.guild_id, b.hour, b.channel_id, b.user_id): b
+            for b in session.query(VoiceHourly).filter(
+                VoiceHourly.guild_id.in_({k[0] for k in buckets}),
+                VoiceHourly.hour >= min(hours),
+                VoiceHourly.hour <= max(hours),
+                VoiceHourly.user_id.in_({k[3] for k in buckets})
+            )
+        }
+        for (guild_id, hour, channel_id, user_id), (seconds, channel_name) in buckets.items():
+            bucket = existing.get((guild_id, hour, channel_id, user_id))
+            if bucket:
+                bucket.seconds += seconds
+                if channel_name:
+                    bucket.channel_name = channel_name
+            else:
+                session.add(VoiceHourly(
+                    guild_id=guild_id, hour=hour, channel_id=channel_id,
+                    channel_name=channel_name, user_id=user_id, seconds=seconds
+                ))
+        return len(buckets)
+    
+    async def apply_voice_ledger(self, sessions: List[dict], balance_deltas: List[dict],
+                                 opened: Optional[List[dict]] = None) -> List[int]:
+        """
+        Write a batch of voice sessions and balance deltas in one transaction
+        
+        Args:
+            sessions: closed sessions (guild_id, user_id, channel_id, channel_name,
+                      joined_at, left_at, duration_seconds, coins_earned); rows with
+                      an 'id' close that open row, the rest are inserted
+            balance_deltas: dicts with guild_id, user_id, coins, pending_seconds, duration
+            opened: sessions still in voice, stored as open rows (left_at NULL)
+        
+        Returns:
+            IDs of the open rows, in the order of `opened`
+        """
+        opened = opened or []
+        if not sessions and not balance_deltas and not opened:
+            return []
+        
+        def _apply():
+            with self.session_scope() as session:
+                new_rows = [s for s in sessions if not s.get('id')]
+                closed_rows = [s for s in sessions if s.get('id')]
+                if new_rows:
+                    session.bulk_insert_mappings(VoiceSession, new_rows)
+                if closed_rows:
+                    session.bulk_update_mappings(VoiceSession, closed_rows)
+                
+                open_rows = [VoiceSession(**row) for row in opened]
+                if open_rows:
+                    session.add_all(open_rows)
                     session.flush()
                 
-                sender.balance -= amount
-                receiver.balance += amount
-                return True
-        return await asyncio.to_thread(_transfer)
+                self._apply_balance_deltas(session, balance_deltas)
+                self._apply_voice_rollup(session, sessions)
+                return [row.id for row in open_rows]
+        return await asyncio.to_thread(_apply)
+    
+    async def reconcile_voice_sessions(self, current: List[dict], policy: str = "heartbeat",
+                                       max_seconds: float = 4 * 3600,
+                                       heartbeat_at: Optional[datetime] = None) -> dict:
+        """
+        Startup repair of voice sessions in one transaction
+        
+        Sessions left open by a crash / restart (left_at NULL) are closed and
+        credited to the balances, then everyone currently in voice gets a new
+        open row.
+        
+        Args:
+            current: dicts with guild_id, user_id, channel_id, channel_name, joined_at
+            policy: Where an orphaned session ends:
+                    'heartbeat'    - last time the bot was known alive (heartbeat_at)
+                    'max_duration' - now
+                    'discard'      - joined_at (no time credited)
+                    Every policy is capped at joined_at + max_seconds.
+            max_seconds: Longest duration credited to one orphaned session
+            heartbeat_at: Last heartbeat; 'heartbeat' falls back to 'max_duration' without it
+        
+        Returns:
+            Dict with closed, capped, credited_seconds and opened_ids (order of `current`)
+        """
+        def _reconcile():
+            with self.session_scope() as session:
+                now = datetime.now()
+                orphans = session.query(VoiceSession).filter(VoiceSession.left_at.is_(None)).all()
+                
+                closed_rows = []
+                rollup = []
+                deltas = {}
+                capped = 0
+                credited = 0.0
+                for orphan in orphans:
+                    if policy == "discard":
+                        end = orphan.joined_at
+                    elif policy == "heartbeat" and heartbeat_at:
+                        end = heartbeat_at
+                    else:
+                        end = now
+                    cap = orphan.joined_at + timedelta(seconds=max_seconds)
+                    if end > cap:
+                        end = cap
+                        capped += 1
+                    end = max(orphan.joined_at, min(end, now))
+                    duration = (end - orphan.joined_at).total_seconds()
+                    
+                    closed_rows.append({'id': orphan.id, 'left_at': end, 'duration_seconds': duration})
+                    rollup.append({
+                        'guild_id': orphan.guild_id, 'user_id': orphan.user_id,
+                        'channel_id': orphan.channel_id, 'channel_name': orphan.channel_name,
+                        'joined_at': orphan.joined_at, 'left_at': end
+                    })
+                    coins, pending_secs = voice_credit(duration, orphan.channel_name)
+                    delta = deltas.setdefault(
+                        (orphan.guild_id, orphan.user_id),
+                        {'guild_id': orphan.guild_id, 'user_id': orphan.user_id,
+                         'coins': 0, 'pending_seconds': 0.0, 'duration': 0.0}
+                    )
+                    delta['coins'] += coins
+                    delta['pending_seconds'] += pending_secs
+                    delta['duration'] += duration
+                    credited += duration
+                
+                if closed_rows:
+                    session.bulk_update_mappings(VoiceSession, closed_rows)
+                self._apply_balance_deltas(session, list(deltas.values()))
+                self._apply_voice_rollup(session, rollup)
+                
+                open_rows = [VoiceSession(**row) for row in current]
+                if open_rows:
+                    session.add_all(open_rows)
+                    session.flush()
+                
+                return {
+                    'closed': len(closed_rows),
+                    'capped': capped,
+                    'credited_seconds': credited,
+                    'opened_ids': [row.id for row in open_rows]
+                }
+        return await asyncio.to_thread(_reconcile)
     
-    async def get_user_voice_stats(self, guild_id: int, user_id: int) -> dict:
-        """Get user's voice stats (Historical Balance + Active Session)"""
+    async def get_user_voice_stats(self, guild_id: int, user_id: int, include_open: bool = True) -> dict:
+        """Get user's voice stats (Historical Balance + Active Session unless include_open=False)"""
         def _query():
             with self.session_scope() as session:
                 # 1. Get total from VoiceBalance (Includes history + completed sessions)
@@ -685,30 +1264,29 @@ class DatabaseAdapter:
                 total_seconds = float(balance_record.total_time_seconds) if balance_record else 0.0
                 
                 # 2. Check for ACTIVE session (add real-time duration)
-                active_session = session.query(VoiceSession).filter(
-                    VoiceSession.guild_id == guild_id,
-                    VoiceSession.user_id == user_id,
-                    VoiceSession.left_at.is_(None)
-                ).first()
+                active_session = None
+                if include_open:
+                    active_session = session.query(VoiceSession).filter(
+                        VoiceSession.guild_id == guild_id,
+                        VoiceSession.user_id == user_id,
+                        VoiceSession.left_at.is_(None)
+                    ).first()
                 
                 current_session_duration = 0.0
                 if active_session:
                     current_session_duration = (datetime.now() - active_session.joined_at).total_seconds()
                     total_seconds += current_session_duration
                 
-                # 3. Per-channel breakdown (Completed Sessions)
+                # 3. Per-channel breakdown (Completed Sessions, from the hourly rollup)
                 from sqlalchemy import func
                 channel_stats = session.query(
-                    VoiceSession.channel_id,
-                    VoiceSession.channel_name,
-                    func.sum(VoiceSession.duration_seconds).label('total_seconds')
+                    VoiceHourly.channel_id,
+                    func.max(VoiceHourly.channel_name),
+                    func.sum(VoiceHourly.seconds).label('total_seconds')
                 ).filter(
-                    VoiceSession.guild_id == guild_id, 
-                    VoiceSession.user_id == user_id,
-                    VoiceSession.left_at.isnot(None) # Only completed
-                ).group_by(
-                    VoiceSession.channel_id, VoiceSession.channel_name
-                ).all()
+                    VoiceHourly.guild_id == guild_id,
+                    VoiceHourly.user_id == user_id
+                ).group_by(VoiceHourly.channel_id).all()
                 
                 channels = {}
                 for cid, cname, secs in channel_stats:
@@ -733,8 +1311,10 @@ class DatabaseAdapter:
                 }
         return await asyncio.to_thread(_query)
     
-    async def get_voice_leaderboard(self, guild_id: int, limit: int = 10) -> List[dict]:
-        """Get top users by total voice time (Balance + Active Sessions)"""
+    async def get_voice_leaderboard(self, guild_id: int, limit: int = 10,
+                                    extra_seconds: Optional[Dict[int, float]] = None,
+                                    include_open: bool = True) -> List[dict]:
+        """Get top users by total voice time (Balance + Active Sessions + extra_seconds, e.g. not yet flushed)"""
         def _query():
             with self.session_scope() as session:
                 # 1. Get all balances
@@ -747,10 +1327,12 @@ class DatabaseAdapter:
                 stats_map = {uid: float(secs or 0.0) for uid, secs in balances}
                 
                 # 2. Get active sessions to add real-time duration
-                active_sessions = session.query(VoiceSession).filter(
-                    VoiceSession.guild_id == guild_id,
-                    VoiceSession.left_at.is_(None)
-                ).all()
+                active_sessions = []
+                if include_open:
+                    active_sessions = session.query(VoiceSession).filter(
+                        VoiceSession.guild_id == guild_id,
+                        VoiceSession.left_at.is_(None)
+                    ).all()
                 
                 now = datetime.now()
                 for s in active_sessions:
@@ -758,6 +1340,9 @@ class DatabaseAdapter:
                         duration = (now - s.joined_at).total_seconds()
                         stats_map[s.user_id] = stats_map.get(s.user_id, 0.0) + duration
                 
+                for uid, secs in (extra_seconds or {}).items():
+                    stats_map[uid] = stats_map.get(uid, 0.0) + secs
+                
                 # 3. Sort and limit
                 sorted_stats = sorted(stats_map.items(), key=lambda x: x[1], reverse=True)[:limit]
                 
@@ -767,19 +1352,190 @@ class DatabaseAdapter:
                 ]
         return await asyncio.to_thread(_query)
     
-    async def get_user_voice_history(self, guild_id: int, user_id: int, days: int = 7) -> List[VoiceSession]:
-        """Get recent session history"""
+    async def get_voice_totals(self, guild_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[int, float]]:
+        """Total voice seconds per user from voice_balances: {guild_id: {user_id: seconds}}"""
+        def _query():
+            with self.session_scope() as session:
+                query = session.query(VoiceBalance.guild_id, VoiceBalance.user_id, VoiceBalance.total_time_seconds)
+                if guild_ids is not None:
+                    query = query.filter(VoiceBalance.guild_id.in_(list(guild_ids)))
+                totals = {}
+                for guild_id, user_id, seconds in query:
+                    totals.setdefault(guild_id, {})[user_id] = float(seconds or 0.0)
+                return totals
+        return await asyncio.to_thread(_query)
+    
+    async def get_user_voice_history(self, guild_id: int, user_id: int, days: Optional[int] = 7,
+                                     limit: int = 25, cursor: Optional[tuple] = None) -> VoiceHistoryPage:
+        """
+        Recent sessions of a user, newest first, one page at a time
+        
+        Keyset pagination on (joined_at, id): `cursor` is the next_cursor of
+        the previous page, so every page is a bounded index range scan
+        (idx_voice_user_history) however long the history is.
+        """
+        def _query():
+            with self.session_scope() as session:
+                query = session.query(
+                    VoiceSession.id, VoiceSession.channel_id, VoiceSession.channel_name,
+                    VoiceSession.joined_at, VoiceSession.left_at, VoiceSession.duration_seconds
+                ).filter(
+                    VoiceSession.guild_id == guild_id,
+                    VoiceSession.user_id == user_id
+                )
+                if days is not None:
+                    query = query.filter(VoiceSession.joined_at >= datetime.now() - timedelta(days=days))
+                if cursor is not None:
+                    joined_at, session_id = cursor
+                    query = query.filter(or_(
+                        VoiceSession.joined_at < joined_at,
+                        and_(VoiceSession.joined_at == joined_at, VoiceSession.id < session_id)
+                    ))
+                rows = query.order_by(
+                    VoiceSession.joined_at.desc(), VoiceSession.id.desc()
+                ).limit(limit + 1).all()
+                
+                sessions = [VoiceSessionRecord(r.id, r.channel_id, r.channel_name, r.joined_at, r.left_at,
+                                               float(r.duration_seconds or 0.0)) for r in rows[:limit]]
+                next_cursor = None
+                if len(rows) > limit:
+                    next_cursor = (sessions[-1].joined_at, sessions[-1].id)
+                return VoiceHistoryPage(sessions, next_cursor)
+        return await asyncio.to_thread(_query)
+    
+    def _date_bucket(self, column, bucket: str):
+        """SQL expression truncating a datetime column to the day / week (Monday) it falls in"""
+        if bucket not in ("day", "week"):
+            raise ValueError(f"Unknown bucket: {bucket}")
+        if self.engine.dialect.name == "sqlite":
+            if bucket == "week":
+                return func.date(column, "weekday 0", "-6 days")
+            return func.date(column)
+        return func.date(func.date_trunc(bucket, column))
+    
+    async def get_user_voice_buckets(self, guild_id: int, user_id: int, bucket: str = "day",
+                                     days: int = 28) -> List[dict]:
+        """
+        Completed voice sessions of a user summed per day or week (grouped in SQL)
+        
+        Returns:
+            [{"start": date, "seconds": float, "sessions": int}] oldest first
+        """
         def _query():
             with self.session_scope() as session:
-                from_date = datetime.now() - timedelta(days=days)
-                sessions = session.query(VoiceSession).filter(
+                since = (datetime.now() - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+                start = self._date_bucket(VoiceSession.joined_at, bucket).label("start")
+                rows = session.query(
+                    start,
+                    func.sum(VoiceSession.duration_seconds),
+                    func.count(VoiceSession.id)
+                ).filter(
                     VoiceSession.guild_id == guild_id,
                     VoiceSession.user_id == user_id,
-                    VoiceSession.joined_at >= from_date
-                ).order_by(VoiceSession.joined_at.desc()).all()
+                    VoiceSession.joined_at >= since,
+                    VoiceSession.left_at.isnot(None)
+                ).group_by(start).order_by(start).all()
                 
-                session.expunge_all()
-                return sessions
+                return [
+                    {
+                        "start": day if isinstance(day, date) else date.fromisoformat(day),
+                        "seconds": float(seconds or 0.0),
+                        "sessions": count
+                    }
+                    for day, seconds, count in rows
+                ]
+        return await asyncio.to_thread(_query)
+    
+    async def rebuild_voice_hourly(self, only_if_empty: bool = True) -> int:
+        """
+        (Re)build voice_hourly from all completed sessions
+        
+        Args:
+            only_if_empty: Skip if the rollup already has rows (first start after upgrade)
+        
+        Returns:
+            Number of sessions rolled up
+        """
+        def _rebuild():
+            with self.session_scope() as session:
+                if only_if_empty and session.query(VoiceHourly.id).first():
+                    return 0
+                session.query(VoiceHourly).delete()
+                
+                count = 0
+                batch = []
+                query = session.query(
+                    VoiceSession.guild_id, VoiceSession.user_id, VoiceSession.channel_id,
+                    VoiceSession.channel_name, VoiceSession.joined_at, VoiceSession.left_at
+                ).filter(VoiceSession.left_at.isnot(None)).order_by(VoiceSession.id)
+                for row in query.yield_per(1000):
+                    batch.append(row._asdict())
+                    if len(batch) >= 1000:
+                        self._apply_voice_rollup(session, batch)
+                        session.flush()
+                        count += len(batch)
+                        batch = []
+                self._apply_voice_rollup(session, batch)
+                return count + len(batch)
+        return await asyncio.to_thread(_rebuild)
+    
+    async def get_voice_heatmap(self, guild_id: int, days: int = 28,
+                                channel_id: Optional[int] = None, user_id: Optional[int] = None) -> List[List[float]]:
+        """
+        Voice occupancy by weekday and hour from the hourly rollup
+        
+        Args:
+            channel_id / user_id: Restrict to one channel or one user (weekly pattern)
+        
+        Returns:
+            7x24 matrix of seconds, [weekday (0=Monday)][hour]
+        """
+        def _query():
+            with self.session_scope() as session:
+                from sqlalchemy import func
+                since = (datetime.now() - timedelta(days=days)).replace(minute=0, second=0, microsecond=0)
+                query = session.query(VoiceHourly.hour, func.sum(VoiceHourly.seconds)).filter(
+                    VoiceHourly.guild_id == guild_id,
+                    VoiceHourly.hour >= since
+                )
+                if channel_id is not None:
+                    query = query.filter(VoiceHourly.channel_id == channel_id)
+                if user_id is not None:
+                    query = query.filter(VoiceHourly.user_id == user_id)
+                
+                matrix = [[0.0] * 24 for _ in range(7)]
+                for hour, seconds in query.group_by(VoiceHourly.hour):
+                    matrix[hour.weekday()][hour.hour] += float(seconds or 0.0)
+                return matrix
+        return await asyncio.to_thread(_query)
+    
+    async def get_voice_channel_trend(self, guild_id: int, days: int = 30) -> Dict[int, dict]:
+        """
+        Daily voice seconds per channel from the hourly rollup
+        
+        Returns:
+            {channel_id: {"name": str, "total": seconds, "days": {date: seconds}}}
+        """
+        def _query():
+            with self.session_scope() as session:
+                from sqlalchemy import func
+                since = (datetime.now() - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+                rows = session.query(
+                    VoiceHourly.channel_id,
+                    func.max(VoiceHourly.channel_name),
+                    VoiceHourly.hour,
+                    func.sum(VoiceHourly.seconds)
+                ).filter(
+                    VoiceHourly.guild_id == guild_id,
+                    VoiceHourly.hour >= since
+                ).group_by(VoiceHourly.channel_id, VoiceHourly.hour)
+                
+                trend = {}
+                for cid, name, hour, seconds in rows:
+                    entry = trend.setdefault(cid, {"name": name or "Unknown", "total": 0.0, "days": {}})
+                    entry["total"] += float(seconds or 0.0)
+                    entry["days"][hour.date()] = entry["days"].get(hour.date(), 0.0) + float(seconds or 0.0)
+                return trend
         return await asyncio.to_thread(_query)
     
     # ============================================
@@ -900,8 +1656,8 @@ class DatabaseAdapter:
         
         return await asyncio.to_thread(_calculate)
     
-    async def save_report_delta(self, period_type: str, start_snapshot_id: int, delta_entries: list):
-        """Save calculated deltas"""
+    async def save_report_delta(self, period_type: str, start_snapshot_id: int, delta_entries: list, update_hall_of_fame: bool = True):
+        """Save calculated deltas (and update Hall of Fame unless disabled, e.g. for previews)"""
         from .models import ReportDelta, DeltaEntry
         
         def _save():
@@ -919,14 +1675,167 @@ class DatabaseAdapter:
                         kills_delta=entry_data['kills_delta'],
                         deaths_delta=entry_data['deaths_delta'],
                         revives_delta=entry_data['revives_delta'],
+                        wounds_delta=entry_data.get('wounds_delta', 0),
                         rank=entry_data.get('rank')
                     )
                     session.add(entry)
                 
+                session.flush()
+                # Hall of Fame is maintained in the same transaction
+                if update_hall_of_fame:
+                    self._update_hall_of_fame(session, period_type, delta_entries)
+                
                 return delta_record.id
         
         return await asyncio.to_thread(_save)
     
+    def _update_hall_of_fame(self, session, period_type: str, delta_entries: list):
+        """
+        Incremental Hall of Fame maintenance for one saved report (sync, in-session).
+        Records are compare-and-set; the report's champion gets +1 on its tally row.
+        """
+        from .models import HallOfFameRecord
+        
+        if not delta_entries:
+            return
+        
+        now = datetime.utcnow()
+        
+        def compare_and_set(record_type, entry, value):
+            result = session.execute(
+                update(HallOfFameRecord)
+                .where(HallOfFameRecord.record_type == record_type, HallOfFameRecord.value < value)
+                .values(steam_id=entry['steam_id'], player_name=entry.get('player_name'), value=value, achieved_at=now)
+            )
+            if result.rowcount == 0:
+                exists = session.query(HallOfFameRecord.id).filter_by(record_type=record_type).first()
+                if not exists:
+                    session.add(HallOfFameRecord(
+                        record_type=record_type, steam_id=entry['steam_id'],
+                        player_name=entry.get('player_name'), value=value, achieved_at=now
+                    ))
+        
+        best_score = max(delta_entries, key=lambda e: e.get('score_delta', 0))
+        best_kills = max(delta_entries, key=lambda e: e.get('kills_delta', 0))
+        compare_and_set(f"highest_{period_type}_score", best_score, best_score.get('score_delta', 0))
+        compare_and_set(f"highest_{period_type}_kills", best_kills, best_kills.get('kills_delta', 0))
+        
+        # Champion tallies: only this report's winner changes (rank 1 by score, first entry on ties)
+        champion_type = f"{period_type}_champions"
+        if not session.query(HallOfFameRecord.id).filter_by(record_type=champion_type).first():
+            # No tallies yet: count every report saved so far once, this one included
+            self._rebuild_champions(session, period_type, now)
+            return
+        result = session.execute(
+            update(HallOfFameRecord)
+            .where(HallOfFameRecord.record_type == champion_type, HallOfFameRecord.steam_id == best_score['steam_id'])
+            .values(value=HallOfFameRecord.value + 1, player_name=best_score.get('player_name'), achieved_at=now)
+        )
+        if result.rowcount == 0:
+            session.add(HallOfFameRecord(
+                record_type=champion_type, steam_id=best_score['steam_id'],
+                player_name=best_score.get('player_name'), value=1, achieved_at=now
+            ))
+    
+    def _rebuild_champions(self, session, period_type: str, now: datetime):
+        """Re-derive the champion tallies of a period from every saved report (sync, in-session)"""
+        from sqlalchemy import func
+        from .models import HallOfFameRecord, ReportDelta, DeltaEntry
+        
+        position = func.row_number().over(
+            partition_by=DeltaEntry.delta_id,
+            order_by=(DeltaEntry.score_delta.desc(), DeltaEntry.id)
+        ).label('position')
+        ranked = session.query(DeltaEntry.steam_id, DeltaEntry.player_name, position)\
+            .join(ReportDelta, ReportDelta.id == DeltaEntry.delta_id)\
+            .filter(ReportDelta.period_type == period_type)\
+            .subquery()
+        tallies = session.query(ranked.c.steam_id, func.max(ranked.c.player_name), func.count())\
+            .filter(ranked.c.position == 1)\
+            .group_by(ranked.c.steam_id)\
+            .all()
+        
+        champion_type = f"{period_type}_champions"
+        session.query(HallOfFameRecord).filter_by(record_type=champion_type).delete(synchronize_session=False)
+        session.bulk_insert_mappings(HallOfFameRecord, [
+            {'record_type': champion_type, 'steam_id': steam_id, 'player_name': name, 'value': count, 'achieved_at': now}
+            for steam_id, name, count in tallies
+        ])
+    
+    async def delete_report_deltas(self, period_type: str) -> int:
+        """Delete all saved deltas (entries + artifacts) of a period type, e.g. stale previews"""
+        from .models import ReportDelta
+        
+        def _delete():
+            with self.session_scope() as session:
+                deltas = session.query(ReportDelta).filter_by(period_type=period_type).all()
+                for d in deltas:
+                    session.delete(d)
+                return len(deltas)
+        
+        return await asyncio.to_thread(_delete)
+    
+    async def save_report_artifact(self, delta_id: int, embed_payload: dict, chart_png: Optional[bytes]):
+        """Store the pre-rendered embed payload and chart for a saved report"""
+        from .models import ReportArtifact
+        
+        def _save():
+            with self.session_scope() as session:
+                artifact = session.query(ReportArtifact).filter_by(delta_id=delta_id).first()
+                if not artifact:
+                    artifact = ReportArtifact(delta_id=delta_id)
+                    session.add(artifact)
+                artifact.embed_json = json.dumps(embed_payload, ensure_ascii=False)
+                artifact.chart_png = chart_png
+                artifact.created_at = datetime.utcnow()
+        
+        await asyncio.to_thread(_save)
+    
+    async def get_latest_report(self, period_type: str):
+        """
+        Latest materialized report of a period type.
+        
+        Returns:
+            dict with id, timestamp, entries (calculate_deltas format), embed (dict or None),
+            chart_png (bytes or None) - or None if nothing saved
+        """
+        from sqlalchemy.orm import selectinload
+        from .models import ReportDelta
+        
+        def _get():
+            with self.session_scope() as session:
+                d = session.query(ReportDelta)\
+                    .options(selectinload(ReportDelta.entries), selectinload(ReportDelta.artifact))\
+                    .filter_by(period_type=period_type)\
+                    .order_by(ReportDelta.timestamp.desc(), ReportDelta.id.desc())\
+                    .first()
+                if not d:
+                    return None
+                
+                artifact = d.artifact
+                return {
+                    'id': d.id,
+                    'timestamp': d.timestamp,
+                    'entries': [
+                        {
+                            'steam_id': e.steam_id,
+                            'player_name': e.player_name,
+                            'score_delta': e.score_delta or 0,
+                            'kills_delta': e.kills_delta or 0,
+                            'deaths_delta': e.deaths_delta or 0,
+                            'revives_delta': e.revives_delta or 0,
+                            'wounds_delta': e.wounds_delta or 0,
+                            'rank': e.rank
+                        }
+                        for e in sorted(d.entries, key=lambda e: (e.rank is None, e.rank))
+                    ],
+                    'embed': json.loads(artifact.embed_json) if artifact and artifact.embed_json else None,
+                    'chart_png': artifact.chart_png if artifact else None,
+                    'artifact_created_at': artifact.created_at if artifact else None
+                }
+        
+        return await asyncio.to_thread(_get)
+    
     async def get_report_history(self, period_type: str, limit: int = 10):
         """Get recent deltas"""
         from .models import ReportDelta
@@ -965,9 +1874,107 @@ class DatabaseAdapter:
             with self.session_scope() as session:
                 meta = session.query(ReportMetadata).filter_by(key=key).first()
                 return meta.value if meta else None
-        
+
         return await asyncio.to_thread(_get)
 
+    # === STATS TIME SERIES ===
+
+    async def record_stat_samples(self, samples: list, recorded_at: datetime = None) -> int:
+        """
+        Append one time-series sample per player (delta vs. previous sample).
+        Players whose cumulative stats did not change write no row; a player's
+        first sample only stores the baseline head.
+
+        Args:
+            samples: [{'steam_id', 'score', 'kills', 'deaths', 'revives', 'wounds'}] cumulative values
+            recorded_at: Sample time (default: now, UTC)
+
+        Returns:
+            Number of rows appended
+        """
+        from .models import PlayerStatSample, PlayerStatHead
+        fields = STAT_SERIES_FIELDS
+
+        def _record():
+            ts = recorded_at or datetime.utcnow()
+            by_id = {s['steam_id']: s for s in samples if s.get('steam_id')}
+            if not by_id:
+                return 0
+
+            with self.session_scope() as session:
+                heads = {
+                    h.steam_id: h for h in
+                    session.query(PlayerStatHead).filter(PlayerStatHead.steam_id.in_(list(by_id))).all()
+                }
+
+                rows = []
+                for steam_id, s in by_id.items():
+                    current = {f: int(s.get(f) or 0) for f in fields}
+                    head = heads.get(steam_id)
+                    if head is None:
+                        # First sample: baseline only. The cumulative totals are not
+                        # a change inside any window, so no sample row is written.
+                        session.add(PlayerStatHead(steam_id=steam_id, recorded_at=ts, **current))
+                        continue
+                    delta = {f: current[f] - (getattr(head, f) or 0) for f in fields}
+                    if not any(delta.values()):
+                        continue
+                    for f in fields:
+                        setattr(head, f, current[f])
+                    head.recorded_at = ts
+                    rows.append({'steam_id': steam_id, 'recorded_at': ts, **delta})
+
+                if rows:
+                    session.bulk_insert_mappings(PlayerStatSample, rows)
+                return len(rows)
+
+        return await asyncio.to_thread(_record)
+
+    async def stats_delta(self, player_ids: Optional[List[str]], t0: datetime, t1: datetime) -> list:
+        """
+        Stat change per player between t0 and t1, taken from the nearest
+        samples at or before each bound.
+
+        Args:
+            player_ids: Steam IDs to include (None = all players)
+            t0: Window start
+            t1: Window end
+
+        Returns:
+            List of dicts in calculate_deltas() format, ranked by score
+        """
+        from sqlalchemy import func
+        from .models import PlayerStatSample
+
+        def _query():
+            with self.session_scope() as session:
+                cols = [func.sum(getattr(PlayerStatSample, f)) for f in STAT_SERIES_FIELDS]
+                query = session.query(PlayerStatSample.steam_id, Player.name, *cols)\
+                    .outerjoin(Player, Player.steam_id == PlayerStatSample.steam_id)\
+                    .filter(PlayerStatSample.recorded_at > t0, PlayerStatSample.recorded_at <= t1)
+                if player_ids is not None:
+                    query = query.filter(PlayerStatSample.steam_id.in_(list(player_ids)))
+                rows = query.group_by(PlayerStatSample.steam_id, Player.name).all()
+
+                deltas = [
+                    {
+                        'steam_id': steam_id,
+                        'player_name': name or steam_id,
+                        'score_delta': score or 0,
+                        'kills_delta': kills or 0,
+                        'deaths_delta': deaths or 0,
+                        'revives_delta': revives or 0,
+                        'wounds_delta': wounds or 0
+                    }
+                    for steam_id, name, score, kills, deaths, revives, wounds in rows
+                ]
+                deltas.sort(key=lambda x: x['score_delta'], reverse=True)
+                for rank, d in enumerate(deltas, 1):
+                    d['rank'] = rank
+                return deltas
+
+        return await asyncio.to_thread(_query)
+
 
     
     # ============================================
@@ -1165,48 +2172,233 @@ class DatabaseAdapter:
                 return True
         return await asyncio.to_thread(_upsert)
 
+    async def finish_training_match(self, match_id: int, end_time: datetime, participants: List[dict],
+                                    snapshot_end: str = None, deltas: Optional[Dict[str, dict]] = None) -> dict:
+        """
+        Close a training match and store everyone the recorder saw, in one transaction
+        
+        Args:
+            participants: MatchRecorder.participants() rows
+            deltas: steam_id -> {"kills_delta", "deaths_delta"} counted during the match
+                (SquadGame.log); players with kills/deaths get 'delta' KDA, the rest 'pending'
+        
+        Manual / hybrid rows already entered for the match are left as they are.
+        
+        Returns:
+            {"presence": rows, "added": new player rows, "delta": players with automatic KDA}
+        """
+        from .models import TrainingMatchPresence
+        deltas = deltas or {}
+        
+        def _finish():
+            with self.session_scope() as session:
+                session.query(TrainingMatch).filter_by(id=match_id).update(
+                    {"status": "completed", "end_time": end_time,
+                     **({"snapshot_end_json": snapshot_end} if snapshot_end else {})},
+                    synchronize_session=False
+                )
+                
+                # Re-finishing a match replaces its presence rows
+                session.query(TrainingMatchPresence).filter_by(match_id=match_id).delete(synchronize_session=False)
+                session.bulk_insert_mappings(TrainingMatchPresence, [
+                    {
+                        "match_id": match_id,
+                        "battlemetrics_id": p["battlemetrics_id"],
+                        "steam_id": p["steam_id"],
+                        "name": p["name"],
+                        "first_seen": p["first_seen"],
+                        "last_seen": p["last_seen"],
+                        "seconds": p["seconds"],
+                        "samples": p["samples"],
+                        "intervals_json": json.dumps([[j.isoformat(), l.isoformat() if l else None]
+                                                      for j, l in p["intervals"]])
+                    }
+                    for p in participants
+                ])
+                
+                existing = {
+                    steam_id: (row_id, source) for row_id, steam_id, source in session.query(
+                        TrainingMatchPlayer.id, TrainingMatchPlayer.steam_id, TrainingMatchPlayer.data_source
+                    ).filter(TrainingMatchPlayer.match_id == match_id)
+                }
+                inserts, updates = [], []
+                for p in participants:
+                    steam_id = p["steam_id"]
+                    if not steam_id:
+                        continue
+                    d = deltas.get(steam_id)
+                    values = {"data_source": "pending"}
+                    if d and (d["kills_delta"] or d["deaths_delta"]):
+                        kills, deaths = d["kills_delta"], d["deaths_delta"]
+                        values = {
+                            "final_kills": kills,
+                            "final_deaths": deaths,
+                            "final_assists": 0,
+                            "kd_ratio": round(kills / deaths, 2) if deaths > 0 else kills,
+                            "data_source": "delta"
+                        }
+                    if steam_id not in existing:
+                        inserts.append({"match_id": match_id, "steam_id": steam_id, **values})
+                        existing[steam_id] = (None, values["data_source"])
+                    elif existing[steam_id][1] == "pending" and values["data_source"] == "delta":
+                        updates.append({"id": existing[steam_id][0], **values})
+                
+                if inserts:
+                    session.bulk_insert_mappings(TrainingMatchPlayer, inserts)
+                if updates:
+                    session.bulk_update_mappings(TrainingMatchPlayer, updates)
+                
+                return {
+                    "presence": len(participants),
+                    "added": len(inserts),
+                    "delta": sum(1 for row in inserts + updates if row["data_source"] == "delta")
+                }
+        return await asyncio.to_thread(_finish)
+
     async def get_active_training_match(self):
         """Get the currently active training match"""
         def _get():
             with self.session_scope() as session:
-                return session.query(TrainingMatch).filter_by(status='active').order_by(TrainingMatch.start_time.desc()).first()
+                match = session.query(TrainingMatch).filter_by(status='active').order_by(TrainingMatch.start_time.desc()).first()
+                if match:
+                    session.expunge(match)  # Detach so id / start_time stay readable
+                return match
         return await asyncio.to_thread(_get)
 
+    @staticmethod
+    def _training_match_query(session):
+        """Training matches with players (+ Player names) and presence in 2 extra queries, whatever the page size"""
+        return session.query(TrainingMatch).options(
+            selectinload(TrainingMatch.players).joinedload(TrainingMatchPlayer.player),
+            selectinload(TrainingMatch.presence)
+        )
+    
+    @staticmethod
+    def _training_match_dict(match) -> dict:
+        presence = {p.steam_id: p for p in match.presence if p.steam_id}
+        
+        def name(p):
+            if p.player:
+                return p.player.name
+            seen = presence.get(p.steam_id)
+            return seen.name if seen and seen.name else "Unknown"
+        
+        return {
+            'match_id': match.id,
+            'server_ip': match.server_ip,
+            'map_name': match.map_name,
+            'start_time': match.start_time.isoformat() if match.start_time else None,
+            'end_time': match.end_time.isoformat() if match.end_time else None,
+            'status': match.status,
+            'players': [{
+                'steam_id': p.steam_id,
+                'name': name(p),
+                'final_kills': p.final_kills,
+                'final_deaths': p.final_deaths,
+                'final_assists': p.final_assists,
+                'kd_ratio': p.kd_ratio,
+                'data_source': p.data_source,
+                'seconds_on_server': presence[p.steam_id].seconds if p.steam_id in presence else None
+            } for p in match.players]
+        }
+    
     async def get_training_matches(self, limit: int = 10, status: str = None):
         """Get recent training matches with full details"""
         def _get():
             with self.session_scope() as session:
-                query = session.query(TrainingMatch)
+                query = self._training_match_query(session)
                 if status:
-                    query = query.filter_by(status=status)
+                    query = query.filter(TrainingMatch.status == status)
                 
                 # Order by ID desc (newest first)
                 query = query.order_by(TrainingMatch.id.desc()).limit(limit)
+                return [self._training_match_dict(match) for match in query.all()]
+        return await asyncio.to_thread(_get)
+    
+    async def get_training_match_detail(self, match_id: int) -> Optional[dict]:
+        """One training match by ID (same dict as get_training_matches) or None"""
+        def _get():
+            with self.session_scope() as session:
+                match = self._training_match_query(session).filter(TrainingMatch.id == match_id).first()
+                return self._training_match_dict(match) if match else None
+        return await asyncio.to_thread(_get)
+    
+    async def list_training_matches(self, cursor: Optional[tuple] = None, limit: int = 10,
+                                    status: str = None) -> tuple:
+        """
+        Training matches newest first, one page at a time
+        
+        Keyset pagination on (start_time, id) over idx_training_status_start;
+        `cursor` is the next_cursor returned with the previous page.
+        
+        Returns:
+            (matches, next_cursor) - next_cursor is None on the last page
+        """
+        def _get():
+            with self.session_scope() as session:
+                query = self._training_match_query(session)
+                if status:
+                    query = query.filter(TrainingMatch.status == status)
+                if cursor is not None:
+                    start_time, match_id = cursor
+                    query = query.filter(or_(
+                        TrainingMatch.start_time < start_time,
+                        and_(TrainingMatch.start_time == start_time, TrainingMatch.id < match_id)
+                    ))
+                rows = query.order_by(
+                    TrainingMatch.start_time.desc(), TrainingMatch.id.desc()
+                ).limit(limit + 1).all()
                 
-                matches = []
-                for match in query.all():
-                    # Get players
-                    players = match.players # Relationship
-                    
-                    matches.append({
-                        'match_id': match.id,
-                        'server_ip': match.server_ip,
-                        'map_name': match.map_name,
-                        'start_time': match.start_time.isoformat() if match.start_time else None,
-                        'end_time': match.end_time.isoformat() if match.end_time else None,
-                        'status': match.status,
-                        'players': [{
-                            'steam_id': p.steam_id,
-                            'name': p.player.name if p.player else "Unknown", # Resolve via relationship
-                            'final_kills': p.final_kills,
-                            'final_deaths': p.final_deaths,
-                            'final_assists': p.final_assists,
-                            'kd_ratio': p.kd_ratio,
-                            'data_source': p.data_source
-                        } for p in players]
-                    })
-                return matches
+                page = rows[:limit]
+                next_cursor = (page[-1].start_time, page[-1].id) if len(rows) > limit else None
+                return [self._training_match_dict(match) for match in page], next_cursor
         return await asyncio.to_thread(_get)
+    
+    async def get_training_player_totals(self, steam_ids: Optional[List[str]] = None,
+                                         status: Optional[str] = 'completed', limit: int = None) -> List[dict]:
+        """
+        Per-player totals over all training matches in one grouped query
+        
+        Returns:
+            [{'steam_id', 'name', 'matches', 'kills', 'deaths', 'assists', 'kd_ratio'}] by kills
+        """
+        def _query():
+            with self.session_scope() as session:
+                kills = func.sum(TrainingMatchPlayer.final_kills)
+                query = session.query(
+                    TrainingMatchPlayer.steam_id,
+                    func.max(Player.name),
+                    func.count(TrainingMatchPlayer.match_id),
+                    kills,
+                    func.sum(TrainingMatchPlayer.final_deaths),
+                    func.sum(TrainingMatchPlayer.final_assists)
+                ).join(
+                    TrainingMatch, TrainingMatch.id == TrainingMatchPlayer.match_id
+                ).outerjoin(
+                    Player, Player.steam_id == TrainingMatchPlayer.steam_id
+                ).filter(TrainingMatchPlayer.data_source != 'pending')
+                if status:
+                    query = query.filter(TrainingMatch.status == status)
+                if steam_ids is not None:
+                    query = query.filter(TrainingMatchPlayer.steam_id.in_(list(steam_ids)))
+                query = query.group_by(TrainingMatchPlayer.steam_id).order_by(kills.desc())
+                if limit:
+                    query = query.limit(limit)
+                
+                totals = []
+                for steam_id, name, matches, k, d, a in query:
+                    k, d, a = k or 0, d or 0, a or 0
+                    totals.append({
+                        'steam_id': steam_id,
+                        'name': name or steam_id,
+                        'matches': matches,
+                        'kills': k,
+                        'deaths': d,
+                        'assists': a,
+                        'kd_ratio': round(k / d, 2) if d > 0 else float(k)
+                    })
+                return totals
+        return await asyncio.to_thread(_query)
 
     # ============================================
     # HALL OF FAME OPERATIONS
@@ -1218,8 +2410,9 @@ class DatabaseAdapter:
         
         def _query():
             with self.session_scope() as session:
+                # Single read over idx_hof_type_value
                 records = session.query(HallOfFameRecord).order_by(
-                    HallOfFameRecord.achieved_at.desc()
+                    HallOfFameRecord.record_type, HallOfFameRecord.value.desc()
                 ).all()
                 session.expunge_all()
                 return records
@@ -1329,3 +2522,42 @@ class DatabaseAdapter:
         
         return await asyncio.to_thread(_query)
 
+    
+    # ============================================
+    # SCHEDULER STATE
+    # ============================================
+    
+    async def get_scheduled_job(self, name: str):
+        """Get stored scheduler state for a job (dict or None)"""
+        from .models import ScheduledJob
+        
+        def _get():
+            with self.session_scope() as session:
+                job = session.query(ScheduledJob).filter_by(name=name).first()
+                if not job:
+                    return None
+                return {
+                    'name': job.name,
+                    'last_run': job.last_run,
+                    'next_run': job.next_run,
+                    'last_status': job.last_status
+                }
+        
+        return await asyncio.to_thread(_get)
+    
+    async def save_scheduled_job(self, name: str, last_run: Optional[datetime], next_run: Optional[datetime], last_status: Optional[str] = None):
+        """Upsert scheduler state for a job"""
+        from .models import ScheduledJob
+        
+        def _save():
+            with self.session_scope() as session:
+                job = session.query(ScheduledJob).filter_by(name=name).first()
+                if not job:
+                    job = ScheduledJob(name=name)
+                    session.add(job)
+                job.last_run = last_run
+                job.next_run = next_run
+                if last_status is not None:
+                    job.last_status = last_status
+        
+        await asyncio.to_thread(_save)
@@ -1,9 +1,9 @@
 """
 SQLAlchemy models for Cotabot database schema
 """
-from sqlalchemy import Column, Integer, String, BigInteger, Float, DateTime, Date, Boolean, Text, ForeignKey, UniqueConstraint, Index
+from sqlalchemy import Column, Integer, String, BigInteger, Float, DateTime, Date, Boolean, Text, LargeBinary, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, backref
 from datetime import datetime
 
 Base = declarative_base()
@@ -72,6 +72,21 @@ class ActivityLog(Base):
     )
 
 
+class ActivityPresence(Base):
+    """Per-player presence bitmap of one day: 720 bits, one per 2-minute slot (see database/presence.py)"""
+    __tablename__ = 'activity_presence'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
+    date = Column(Date, nullable=False)
+    bits = Column(LargeBinary(90), nullable=False)
+    
+    __table_args__ = (
+        Index('idx_activity_presence_player_date', 'player_id', 'date', unique=True),
+        Index('idx_activity_presence_date', 'date'),
+    )
+
+
 class Event(Base):
     """Discord events"""
     __tablename__ = 'events'
@@ -93,6 +108,7 @@ class Event(Base):
     
     __table_args__ = (
         UniqueConstraint('guild_id', 'event_id', name='_guild_event_uc'),
+        Index('idx_event_guild_active_time', 'guild_id', 'active', 'timestamp'),
     )
 
 
@@ -218,10 +234,78 @@ class DeltaEntry(Base):
     # Relationship
     delta = relationship("ReportDelta", back_populates="entries")
     
+    __table_args__ = (
+        # Per-report ranking (champion window queries)
+        Index('idx_delta_entry_delta_score', 'delta_id', 'score_delta'),
+    )
+    
     def __repr__(self):
         return f"<DeltaEntry(player={self.player_name}, score_delta={self.score_delta})>"
 
 
+
+class ReportArtifact(Base):
+    """Pre-rendered report (embed payload + chart PNG) for a saved ReportDelta"""
+    __tablename__ = 'report_artifacts'
+    
+    id = Column(Integer, primary_key=True)
+    delta_id = Column(Integer, ForeignKey('report_deltas.id', ondelete='CASCADE'), nullable=False, unique=True, index=True)
+    embed_json = Column(Text)  # discord.Embed.to_dict()
+    chart_png = Column(LargeBinary)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    delta = relationship("ReportDelta", backref=backref("artifact", uselist=False, cascade="all, delete-orphan"))
+    
+    def __repr__(self):
+        return f"<ReportArtifact(delta_id={self.delta_id}, created_at={self.created_at})>"
+
+
+
+class PlayerStatSample(Base):
+    """
+    Append-only stats time series, delta-encoded per player.
+    Each row holds the change since the player's previous sample, so the
+    change over any window is SUM(...) WHERE t0 < recorded_at <= t1.
+    """
+    __tablename__ = 'player_stat_samples'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    steam_id = Column(String(50), nullable=False)
+    recorded_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    score = Column(Integer, default=0)
+    kills = Column(Integer, default=0)
+    deaths = Column(Integer, default=0)
+    revives = Column(Integer, default=0)
+    wounds = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index('idx_stat_sample_player_time', 'steam_id', 'recorded_at'),
+        Index('idx_stat_sample_time', 'recorded_at'),
+    )
+
+    def __repr__(self):
+        return f"<PlayerStatSample(steam_id={self.steam_id}, at={self.recorded_at}, score={self.score})>"
+
+
+
+class PlayerStatHead(Base):
+    """Last cumulative values per player (base for the next delta sample)"""
+    __tablename__ = 'player_stat_heads'
+
+    steam_id = Column(String(50), primary_key=True)
+    recorded_at = Column(DateTime, nullable=False)
+
+    score = Column(Integer, default=0)
+    kills = Column(Integer, default=0)
+    deaths = Column(Integer, default=0)
+    revives = Column(Integer, default=0)
+    wounds = Column(Integer, default=0)
+
+    def __repr__(self):
+        return f"<PlayerStatHead(steam_id={self.steam_id}, score={self.score})>"
+
+
 # ============================================
 # VOICE STATS MODELS
 # ============================================
@@ -249,6 +333,7 @@ class VoiceSession(Base):
         Index('idx_voice_user_guild', 'user_id', 'guild_id'),
         Index('idx_voice_channel', 'channel_id'),
         Index('idx_voice_joined', 'joined_at'),
+        Index('idx_voice_user_history', 'guild_id', 'user_id', 'joined_at'),
     )
     
     def __repr__(self):
@@ -275,6 +360,48 @@ class VoiceBalance(Base):
         return f"<VoiceBalance(user={self.user_id}, balance={self.balance}, pending={self.pending_seconds}s)>"
 
 
+class VoiceLedgerEntry(Base):
+    """Append-only log of voice coin changes (audit / balance rebuild)"""
+    __tablename__ = 'voice_ledger'
+    
+    id = Column(Integer, primary_key=True)
+    guild_id = Column(BigInteger, nullable=False)
+    user_id = Column(BigInteger, nullable=False)
+    delta = Column(Integer, nullable=False)  # Coins (+ earned / received, - sent)
+    kind = Column(String(20), nullable=False)  # 'opening', 'voice', 'transfer_in', 'transfer_out', 'adjust'
+    counterparty_id = Column(BigInteger)  # Other side of a transfer
+    created_at = Column(DateTime, default=datetime.now)
+    
+    __table_args__ = (
+        Index('idx_voice_ledger_user', 'guild_id', 'user_id', 'id'),
+    )
+    
+    def __repr__(self):
+        return f"<VoiceLedgerEntry(user={self.user_id}, {self.kind} {self.delta:+d})>"
+
+
+class VoiceHourly(Base):
+    """Voice occupancy rollup: seconds per (hour, channel, user), filled from closed sessions"""
+    __tablename__ = 'voice_hourly'
+    
+    id = Column(Integer, primary_key=True)
+    guild_id = Column(BigInteger, nullable=False)
+    hour = Column(DateTime, nullable=False)  # Bucket start (local time, minute=0)
+    channel_id = Column(BigInteger, nullable=False)
+    channel_name = Column(String(100))  # Latest known name
+    user_id = Column(BigInteger, nullable=False)
+    seconds = Column(Float, default=0.0)
+    
+    __table_args__ = (
+        Index('idx_voice_hourly_bucket', 'guild_id', 'hour', 'channel_id', 'user_id', unique=True),
+        Index('idx_voice_hourly_user', 'guild_id', 'user_id', 'hour'),
+        Index('idx_voice_hourly_channel', 'guild_id', 'channel_id', 'hour'),
+    )
+    
+    def __repr__(self):
+        return f"<VoiceHourly(hour={self.hour}, channel={self.channel_name}, user={self.user_id}, {self.seconds}s)>"
+
+
 
 
 class ReportMetadata(Base):
@@ -301,6 +428,13 @@ class HallOfFameRecord(Base):
     value = Column(Float, nullable=False)
     achieved_at = Column(DateTime, default=datetime.utcnow)
     
+    # Records: one row per record_type (updated in place, compare-and-set)
+    # Champion tallies: one row per (record_type, steam_id), value = count
+    __table_args__ = (
+        Index('idx_hof_type_value', 'record_type', 'value'),
+        UniqueConstraint('record_type', 'steam_id', name='_hof_type_player_uc'),
+    )
+    
     def __repr__(self):
         return f"<HallOfFameRecord(type={self.record_type}, player={self.player_name}, value={self.value})>"
 
@@ -339,6 +473,12 @@ class TrainingMatch(Base):
     
     # Relationship
     players = relationship("TrainingMatchPlayer", back_populates="match", cascade="all, delete-orphan")
+    presence = relationship("TrainingMatchPresence", back_populates="match", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Active match lookup and newest-first listing
+        Index('idx_training_status_start', 'status', 'start_time'),
+    )
     
     def __repr__(self):
         return f"<TrainingMatch(id={self.id}, map={self.map_name}, status={self.status})>"
@@ -381,6 +521,33 @@ class TrainingMatchPlayer(Base):
         return f"<TrainingMatchPlayer(match={self.match_id}, player={self.steam_id})>"
 
 
+class TrainingMatchPresence(Base):
+    """Time on the training server per player, from in-match BattleMetrics samples"""
+    __tablename__ = 'training_match_presence'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    match_id = Column(Integer, ForeignKey('training_matches.id'), nullable=False)
+    battlemetrics_id = Column(String(50), nullable=False)
+    steam_id = Column(String(50), nullable=True)  # NULL when BattleMetrics has no Steam identifier
+    name = Column(String(100))
+    
+    first_seen = Column(DateTime)
+    last_seen = Column(DateTime)
+    seconds = Column(Float, default=0.0)
+    samples = Column(Integer, default=0)
+    # [[joined, left], ...] ISO timestamps
+    intervals_json = Column(Text)
+    
+    match = relationship("TrainingMatch", back_populates="presence")
+    
+    __table_args__ = (
+        Index('idx_training_presence_match', 'match_id', 'battlemetrics_id', unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<TrainingMatchPresence(match={self.match_id}, player={self.battlemetrics_id}, seconds={self.seconds})>"
+
+
 # ============================================
 # ADMIN ACTIVITY LOG
 # ============================================
@@ -419,3 +586,21 @@ class WebBotAction(Base):
     
     def __repr__(self):
         return f"<WebBotAction(type={self.action_type}, status={self.status}, created={self.created_at})>"
+
+
+# ============================================
+# SCHEDULER STATE
+# ============================================
+
+class ScheduledJob(Base):
+    """Last/next run of scheduled bot jobs (reports, backups, syncs)"""
+    __tablename__ = 'scheduled_jobs'
+    
+    name = Column(String(50), primary_key=True)
+    last_run = Column(DateTime, nullable=True)
+    next_run = Column(DateTime, nullable=True)
+    last_status = Column(String(20))  # 'ok', 'error'
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ScheduledJob(name={self.name}, last={self.last_run}, next={self.next_run})>"
@@ -0,0 +1,96 @@
+"""
+Presence bitmaps: one bit per 2-minute slot of a day (720 bits = 90 bytes).
+
+Slot i covers minutes [2i, 2i + 2) of the local day and is stored MSB-first
+(byte i // 8, bit 7 - i % 8), the order np.unpackbits uses, so a stack of
+bitmaps unpacks straight into a (rows, 720) slot matrix.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+SLOT_MINUTES = 2
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+BITMAP_BYTES = SLOTS_PER_DAY // 8
+SLOTS_PER_HOUR = 60 // SLOT_MINUTES
+EMPTY_BITMAP = bytes(BITMAP_BYTES)
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def slot_of(t: datetime) -> int:
+    return (t.hour * 60 + t.minute) // SLOT_MINUTES
+
+
+def day_slots(start: datetime, end: Optional[datetime] = None) -> Dict[date, List[int]]:
+    """date -> slots touched by [start, end]; a single slot when end is None"""
+    if end is None or end <= start:
+        return {start.date(): [slot_of(start)]}
+    result = {}
+    day = start.date()
+    while day <= end.date():
+        first = slot_of(start) if day == start.date() else 0
+        last = slot_of(end) if day == end.date() else SLOTS_PER_DAY - 1
+        result[day] = list(range(first, last + 1))
+        day += timedelta(days=1)
+    return result
+
+
+def set_slots(bits: Optional[bytes], slots: Iterable[int]) -> Tuple[bytes, int]:
+    """(bitmap with the slots set, number of slots that were not set before)"""
+    buf = bytearray(bits or EMPTY_BITMAP)
+    added = 0
+    for slot in slots:
+        mask = 0x80 >> (slot & 7)
+        if not buf[slot >> 3] & mask:
+            buf[slot >> 3] |= mask
+            added += 1
+    return bytes(buf), added
+
+
+def as_matrix(bitmaps: List[bytes]) -> np.ndarray:
+    """(rows, 90) uint8 matrix of a list of bitmaps"""
+    if not bitmaps:
+        return np.zeros((0, BITMAP_BYTES), dtype=np.uint8)
+    return np.frombuffer(b"".join(bitmaps), dtype=np.uint8).reshape(len(bitmaps), BITMAP_BYTES)
+
+
+def popcount(matrix: np.ndarray) -> np.ndarray:
+    """Set bits per row"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(matrix).sum(axis=1, dtype=np.int64)
+    return _POPCOUNT[matrix].sum(axis=1, dtype=np.int64)
+
+
+def minutes(matrix: np.ndarray) -> np.ndarray:
+    """Present minutes per row"""
+    return popcount(matrix) * SLOT_MINUTES
+
+
+def hour_of_week(days: List[date], matrix: np.ndarray) -> np.ndarray:
+    """7 x 24 present minutes (Monday first) summed over all rows"""
+    heatmap = np.zeros((7, 24), dtype=np.int64)
+    if not len(days):
+        return heatmap
+    hours = np.unpackbits(matrix, axis=1).reshape(len(days), 24, SLOTS_PER_HOUR).sum(axis=2, dtype=np.int64)
+    np.add.at(heatmap, np.array([d.weekday() for d in days]), hours * SLOT_MINUTES)
+    return heatmap
+
+
+def overlap_minutes(target: Dict[date, bytes], days: List[date], matrix: np.ndarray) -> np.ndarray:
+    """Minutes each row shares with the target player's bitmap of the same day"""
+    if not len(days):
+        return np.zeros(0, dtype=np.int64)
+    target_matrix = as_matrix([target.get(d, EMPTY_BITMAP) for d in days])
+    return minutes(np.bitwise_and(matrix, target_matrix))
+
+
+def overlap_by_player(target: Dict[date, bytes], player_ids: List[int], days: List[date],
+                      matrix: np.ndarray) -> Dict[int, int]:
+    """player_id -> minutes shared with the target, summed over the rows (players with no overlap left out)"""
+    if not len(days):
+        return {}
+    ids, index = np.unique(np.asarray(player_ids), return_inverse=True)
+    totals = np.bincount(index, weights=overlap_minutes(target, days, matrix), minlength=len(ids))
+    return {int(pid): int(total) for pid, total in zip(ids, totals) if total}
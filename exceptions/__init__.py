@@ -7,6 +7,7 @@ from .cotabot_exceptions import (
     DatabaseOperationError,
     APIError,
     BattleMetricsAPIError,
+    RconError,
     GoogleSheetsAPIError,
     ConfigError,
     MissingConfigError,
@@ -25,6 +26,7 @@ __all__ = [
     'DatabaseOperationError',
     'APIError',
     'BattleMetricsAPIError',
+    'RconError',
     'GoogleSheetsAPIError',
     'ConfigError',
     'MissingConfigError',
@@ -80,6 +80,16 @@ class GoogleSheetsAPIError(APIError):
     pass
 
 
+class RconError(APIError):
+    """
+    Squad RCON connection or command errors
+    
+    Example:
+        raise RconError("RCON authentication failed for 127.0.0.1:21114")
+    """
+    pass
+
+
 class APITimeoutError(APIError):
     """
     Raised when API request times out
@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.presence import BITMAP_BYTES, SLOTS_PER_HOUR, SLOT_MINUTES, as_matrix, hour_of_week, overlap_by_player
+
+PLAYERS = 300
+DAYS = 28
+
+
+def build_rows():
+    """~3 hours of evening play per player-day, as stored bitmaps"""
+    rng = np.random.default_rng(7)
+    rows = []
+    start = date.today() - timedelta(days=DAYS)
+    for player_id in range(PLAYERS):
+        for d in range(DAYS):
+            slots = np.zeros(720, dtype=np.uint8)
+            first = rng.integers(540, 630)
+            slots[first:first + rng.integers(30, 120)] = 1
+            rows.append((player_id, start + timedelta(days=d), np.packbits(slots).tobytes()))
+    return rows
+
+
+def naive_heatmap(rows):
+    heatmap = [[0] * 24 for _ in range(7)]
+    for _, day, bits in rows:
+        for slot in range(720):
+            if bits[slot >> 3] & (0x80 >> (slot & 7)):
+                heatmap[day.weekday()][slot // SLOTS_PER_HOUR] += SLOT_MINUTES
+    return heatmap
+
+
+def naive_overlap(target, rows):
+    totals = {}
+    for player_id, day, bits in rows:
+        mine = target.get(day)
+        if mine:
+            shared = sum(bin(a & b).count("1") for a, b in zip(bits, mine)) * SLOT_MINUTES
+            totals[player_id] = totals.get(player_id, 0) + shared
+    return totals
+
+
+def main():
+    rows = build_rows()
+    print(f"=== Presence bitmaps: {PLAYERS} players x {DAYS} days ({len(rows) * BITMAP_BYTES / 1024:.0f} KiB) ===")
+
+    start = time.perf_counter()
+    expected = naive_heatmap(rows)
+    naive_hm = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = as_matrix([r[2] for r in rows])
+    heatmap = hour_of_week([r[1] for r in rows], matrix)
+    fast_hm = time.perf_counter() - start
+    assert heatmap.tolist() == expected
+
+    target = {day: bits for pid, day, bits in rows if pid == 0}
+    others = [r for r in rows if r[0] != 0]
+    start = time.perf_counter()
+    expected = naive_overlap(target, others)
+    naive_ov = time.perf_counter() - start
+
+    start = time.perf_counter()
+    totals = overlap_by_player(target, [r[0] for r in others], [r[1] for r in others], as_matrix([r[2] for r in others]))
+    fast_ov = time.perf_counter() - start
+    assert totals == {pid: minutes for pid, minutes in expected.items() if minutes}
+
+    print(f"Hour-of-week heatmap: per-bit loop {naive_hm * 1000:8.1f} ms | unpackbits {fast_hm * 1000:6.1f} ms ({naive_hm / fast_hm:.0f}x)")
+    print(f"Overlap with 1 player: per-byte loop {naive_ov * 1000:7.1f} ms | AND + popcount {fast_ov * 1000:4.1f} ms ({naive_ov / fast_ov:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
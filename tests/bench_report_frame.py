@@ -0,0 +1,108 @@
+import sys
+import os
+import time
+import random
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.squad.report_frame import ReportFrame
+
+PLAYERS = 10_000
+WEEKS = 52
+
+
+def make_week(rng):
+    deltas = []
+    for i in range(PLAYERS):
+        kills = rng.randint(0, 400)
+        deaths = rng.randint(0, 300)
+        deltas.append({
+            "steam_id": f"7656119{i:010d}",
+            "player_name": f"Player{i}",
+            "score_delta": rng.randint(0, 20000),
+            "kills_delta": kills,
+            "deaths_delta": deaths,
+            "revives_delta": rng.randint(0, 150),
+            "wounds_delta": rng.randint(0, 500),
+        })
+    return deltas
+
+
+def legacy_week(db_deltas):
+    """Old plain-Python path: normalize, sort, max, sums."""
+    deltas = []
+    for d in db_deltas:
+        d_norm = d.copy()
+        d_norm['score'] = d.get('score_delta', 0)
+        d_norm['kills'] = d.get('kills_delta', 0)
+        d_norm['deaths'] = d.get('deaths_delta', 0)
+        d_norm['revives'] = d.get('revives_delta', 0)
+        d_norm['name'] = d.get('player_name', 'Unknown')
+        k = d_norm['kills']
+        d_val = d_norm['deaths']
+        d_norm['kd'] = k / d_val if d_val > 0 else k
+        deltas.append(d_norm)
+    top_10 = sorted(deltas, key=lambda x: x.get('score', 0), reverse=True)[:10]
+    max(deltas, key=lambda x: x.get('kills', 0))
+    max(deltas, key=lambda x: x.get('kd', 0))
+    sum(d.get('score', 0) for d in deltas) / len(deltas)
+    sum(d.get('kills', 0) for d in deltas) / len(deltas)
+    return deltas, top_10
+
+
+def legacy_most_improved(prev, curr, k=10):
+    prev_scores = {d['steam_id']: d['score'] for d in prev}
+    changes = [
+        (d['score'] - prev_scores[d['steam_id']], d['name'])
+        for d in curr if d['steam_id'] in prev_scores
+    ]
+    return sorted(changes, reverse=True)[:k]
+
+
+def frame_week(db_deltas):
+    frame = ReportFrame.from_deltas(db_deltas)
+    frame.summary()
+    frame.percentile("score", [50, 90, 99])
+    return frame, frame.records(frame.top_k("score", 10))
+
+
+def main():
+    print(f"=== ReportFrame benchmark: {PLAYERS} players x {WEEKS} weeks ===")
+    rng = random.Random(42)
+    weeks = [make_week(rng) for _ in range(WEEKS)]
+
+    start = time.perf_counter()
+    legacy = [legacy_week(w) for w in weeks]
+    legacy_improved = [legacy_most_improved(legacy[i - 1][0], legacy[i][0]) for i in range(1, WEEKS)]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = [frame_week(w) for w in weeks]
+    frames = [f for f, _ in results]
+    improved = [ReportFrame.most_improved(frames[i - 1], frames[i], k=10) for i in range(1, WEEKS)]
+    frame_time = time.perf_counter() - start
+
+    # Analytics only (columns already loaded)
+    start = time.perf_counter()
+    for f in frames:
+        f.summary()
+        f.top_k("score", 10)
+        f.percentile("score", [50, 90, 99])
+    analytics_time = time.perf_counter() - start
+
+    # Same leaderboard / improvement values as the legacy path
+    for (_, old), (_, new) in zip(legacy, results):
+        assert [p['score'] for p in old] == [p['score'] for p in new]
+    for old, new in zip(legacy_improved, improved):
+        assert [c for c, _ in old] == [p['change'] for p in new]
+    print("[PASS] Results match legacy implementation")
+
+    print(f"Legacy (python loops):          {legacy_time:.2f}s")
+    print(f"ReportFrame (load + analytics): {frame_time:.2f}s")
+    print(f"ReportFrame (analytics only):   {analytics_time:.3f}s")
+    print(f"Speedup: {legacy_time / frame_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import asyncio
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from database.models import Event as EventModel, EventParticipant
+from cogs.event import Event, EventView
+
+GUILD_ID = 999999997
+CLICKS = 100
+BACKGROUND_EVENTS = 20
+BACKGROUND_PARTICIPANTS = 50
+EDIT_LATENCY = 0.02  # simulated Discord message edit round trip
+
+
+class FakeMessage:
+    def __init__(self, message_id, embed):
+        self.id = message_id
+        self.embeds = [embed]
+        self.jump_url = f"https://discord.com/channels/{GUILD_ID}/1/{message_id}"
+        self.edits = 0
+
+    async def edit(self, embed=None):
+        await asyncio.sleep(EDIT_LATENCY)
+        self.edits += 1
+        self.embeds = [embed]
+
+
+class FakeResponse:
+    def __init__(self, message):
+        self.message = message
+        self.acked_at = None
+
+    async def defer(self):
+        self.acked_at = time.perf_counter()
+
+    async def edit_message(self, embed=None):
+        self.acked_at = time.perf_counter()
+        await self.message.edit(embed=embed)
+
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.mention = f"<@{user_id}>"
+        self.display_name = f"User{user_id}"
+
+
+class FakeChannel:
+    name = "etkinlik-log"
+
+    def __init__(self):
+        self.sends = []
+
+    async def send(self, embed=None, embeds=None):
+        self.sends.append(embeds or [embed])
+
+
+LOG_CHANNEL = FakeChannel()
+
+
+class FakeGuild:
+    id = GUILD_ID
+    name = "Bench Guild"
+    text_channels = [LOG_CHANNEL]
+
+
+class FakeInteraction:
+    def __init__(self, client, message, user_id):
+        self.client = client
+        self.message = message
+        self.user = FakeUser(user_id)
+        self.guild = FakeGuild()
+        self.response = FakeResponse(message)
+
+
+class FakeBot:
+    guilds = [FakeGuild()]
+
+    def __init__(self):
+        self.cog = None
+
+    def get_cog(self, name):
+        return self.cog
+
+
+def make_embed():
+    embed = discord.Embed(title="📅 Bench Event", description="Bench")
+    embed.add_field(name="✅ Katılanlar (0)", value="-", inline=True)
+    embed.add_field(name="❌ Katılmayanlar (0)", value="-", inline=True)
+    embed.add_field(name="❔ Belki (0)", value="-", inline=True)
+    return embed
+
+
+async def seed(cog):
+    def clean():
+        with cog.db.session_scope() as session:
+            ids = [e.id for e in session.query(EventModel).filter_by(guild_id=GUILD_ID)]
+            if ids:
+                session.query(EventParticipant).filter(EventParticipant.event_id.in_(ids)).delete(synchronize_session=False)
+            session.query(EventModel).filter_by(guild_id=GUILD_ID).delete()
+
+    async def cleanup():
+        await asyncio.to_thread(clean)
+    await cleanup()
+
+    start = datetime.now() + timedelta(days=1)
+    db_ids = []
+    for i in range(BACKGROUND_EVENTS + 1):
+        db_id = await cog.db.add_event(GUILD_ID, i + 1, f"Event {i}", "", start + timedelta(hours=i), 1, 1)
+        await cog.db.update_event_message(db_id, 7000 + i)
+        db_ids.append(db_id)
+    rows = [
+        {"event_db_id": db_id, "user_id": 10_000 + u, "user_mention": f"<@{10_000 + u}>", "status": "attendee"}
+        for db_id in db_ids[1:] for u in range(BACKGROUND_PARTICIPANTS)
+    ]
+    await cog.db.upsert_event_participants(rows)
+    return cleanup
+
+
+async def run_legacy(cog, message, db_id):
+    """Previous behaviour: per click edit + upsert + full reload of all events"""
+    async def click(user_id):
+        user = FakeUser(user_id)
+        embed = message.embeds[0]
+        attendees = EventView().get_users_from_field(embed.fields[0].value)
+        attendees = [u for u in attendees if not u.startswith(user.mention)] + [user.mention]
+        embed.set_field_at(0, name=f"✅ Katılanlar ({len(attendees)})", value="\n".join(attendees), inline=True)
+        await message.edit(embed=embed)
+        await cog.db.add_event_participant(db_id, user_id, user.mention, "attendee")
+        await cog.store.load([GUILD_ID])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(click(1000 + i) for i in range(CLICKS)))
+    return time.perf_counter() - start
+
+
+async def run_aggregated(cog, message):
+    view = EventView()
+    interactions = [FakeInteraction(cog.bot, message, 2000 + i) for i in range(CLICKS)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(view.update_embed(it, "join") for it in interactions))
+    ack_latency = max(it.response.acked_at for it in interactions) - start
+    await cog.rsvp.flush()
+    return time.perf_counter() - start, ack_latency
+
+
+async def main():
+    print(f"=== RSVP burst: {CLICKS} concurrent clicks ===")
+    bot = FakeBot()
+    cog = Event(bot)
+    bot.cog = cog
+    cleanup = await seed(cog)
+    await cog.store.load([GUILD_ID])
+
+    legacy_msg = FakeMessage(7000, make_embed())
+    legacy_time = await run_legacy(cog, legacy_msg, cog.store.get_by_message(7000)["db_id"])
+    legacy_edits = legacy_msg.edits
+
+    # Fresh event state for the aggregated run
+    await cleanup()
+    await seed(cog)
+    await cog.store.load([GUILD_ID])
+    cog.rsvp.window = 0.25
+    message = FakeMessage(7000, make_embed())
+    total_time, ack_latency = await run_aggregated(cog, message)
+
+    event = cog.store.get_by_message(7000)
+    assert len(event["attendees"]) == CLICKS
+    assert message.embeds[0].fields[0].name == f"✅ Katılanlar ({CLICKS})"
+    fresh = await cog.db.get_event_by_message_id(GUILD_ID, 7000)
+    assert len([p for p in fresh.participants if p.status == "attendee"]) == CLICKS
+    print("[PASS] All clicks in embed, store and database")
+    assert len(LOG_CHANNEL.sends) == 1, len(LOG_CHANNEL.sends)
+    logged = "\n".join(e.description for e in LOG_CHANNEL.sends[0])
+    assert all(f"<@{2000 + i}>" in logged for i in range(CLICKS))
+    print("[PASS] One #etkinlik-log message for the whole window")
+
+    stats = cog.rsvp.stats
+    print(f"Legacy:     {legacy_time:.2f}s, {legacy_edits} edits, {CLICKS} DB writes + {CLICKS} full reloads")
+    print(f"Aggregated: {total_time:.2f}s, {stats['edits']} edit(s), {stats['flushes']} transaction(s), "
+          f"{stats['db_rows']} rows, {stats['logs']} log message(s), "
+          f"all clicks acknowledged in {ack_latency * 1000:.1f}ms")
+
+    await cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.squad.squad_log import SquadLogParser, SquadLogTailer
+
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "SquadGame_sample.log")
+LINES = 300000
+# Real logs are mostly engine chatter; ~5% of lines are events we care about
+EVENT_SHARE = 0.05
+
+NOISE = [
+    "[2026.01.10-20.00.01:250][  5]LogEOS: Verbose: [LogEOSAuth] Refreshing token",
+    "[2026.01.10-20.00.10:000][ 30]LogNet: Display: NotifyAcceptingConnection accepted from: 10.0.0.14:7787",
+    "[2026.01.10-20.00.11:000][ 31]LogSquad: Warning: Vehicle BP_BTR80_C_2147 has no valid spawn",
+    "[2026.01.10-20.00.12:000][ 32]LogOnline: STEAM: Adding user 76561198000000009 from RegisterPlayer",
+    "[2026.01.10-20.00.13:000][ 33]LogGameMode: Display: Match State Changed from WaitingToStart to InProgress",
+    "[2026.01.10-20.00.14:000][ 34]LogSquadTrace: [DedicatedServer]OnPossess(): PC=Alpha Pawn=BP_Soldier_RU_Rifleman_C_2147",
+]
+
+# Straightforward alternative: every pattern searched on every line
+NAIVE = [re.compile(p) for p in (
+    r"LogSquad: PostLogin: NewPlayer: \S+ \S*?PersistentLevel\.(\S+) \(IP: [\d.]+ \| Online IDs: EOS: ([0-9a-f]+)(?: steam: (\d{17}))?\)",
+    r"LogNet: Join succeeded: (.+)",
+    r"LogNet: UChannel::Close: .*?PC: (\S+), Owner: \S+, UniqueId: RedpointEOS:([0-9a-f]+)",
+    r"LogSquadTrace: \[DedicatedServer\](?:ASQSoldier::)?(Wound|Die)\(\): Player:(.+) KillingDamage=-?([0-9.]+) from \S+ "
+    r"\(Online IDs: EOS: ([0-9a-f]+) steam: (\d{17}) \| Contr?oller ID: \S+\) caused by ([\w-]+?)_C",
+    r"LogSquad: (.+) \(Online IDs: EOS: [0-9a-f]+ steam: (\d{17})\) has revived (.+) \(Online IDs: EOS: [0-9a-f]+ steam: (\d{17})\)\.",
+    r"LogWorld: Bringing World /\w+/(?:Maps/)?([\w-]+)/(?:.+/)?([\w-]+)(?:\.[\w-]+)",
+    r"LogSquadGameEvents: Display: Team (\d), (.*) \( ?.*? ?\) has (won|lost) the match with (\d+) Tickets on layer (.*) \(level .*\)!",
+)]
+HEAD = re.compile(r"^\[([0-9.:-]+)\]\[([ 0-9]*)\]")
+
+
+def build_log(path):
+    with open(SAMPLE, encoding="utf-8") as f:
+        events = [l for l in f.read().splitlines() if l.startswith("[")]
+    rng = random.Random(11)
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(LINES):
+            f.write((rng.choice(events) if rng.random() < EVENT_SHARE else rng.choice(NOISE)) + "\n")
+
+
+def naive(lines):
+    events = []
+    for line in lines:
+        for pattern in NAIVE:
+            m = pattern.search(line)
+            if m:
+                stamp, chain = HEAD.match(line).groups()
+                events.append((datetime.strptime(stamp, "%Y.%m.%d-%H.%M.%S:%f"), int(chain), m.groups()))
+                break
+    return events
+
+
+def main():
+    print(f"=== SquadGame.log parsing: {LINES} lines, {EVENT_SHARE:.0%} events ===")
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, "SquadGame.log")
+        build_log(path)
+        size_mb = os.path.getsize(path) / 1e6
+
+        start = time.perf_counter()
+        tailer = SquadLogTailer(path)
+        parser = SquadLogParser()
+        events = 0
+        while True:
+            lines = tailer.read_lines()
+            if not lines:
+                break
+            events += len(parser.parse_lines(lines))
+        tailed = time.perf_counter() - start
+        tailer.close()
+
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        start = time.perf_counter()
+        naive(lines)
+        naive_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        SquadLogParser().parse_lines(lines)
+        parse_time = time.perf_counter() - start
+
+        print(f"Tailer + parser: {LINES / tailed:10.0f} lines/s ({size_mb / tailed:.0f} MB/s), {events} events")
+        print(f"Parser only:     {LINES / parse_time:10.0f} lines/s")
+        print(f"All patterns:    {LINES / naive_time:10.0f} lines/s (every regex searched on every line)")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import asyncio
+import random
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.adapter import DatabaseAdapter
+from database.models import VoiceBalance, VoiceLedgerEntry
+
+GUILD_ID = 999999995
+USERS = 20
+START_BALANCE = 50
+TRANSFERS = 500
+VOICE_CREDITS = 100
+
+
+def legacy_transfer(db, sender_id, receiver_id, amount):
+    """Previous behaviour: read both ORM rows, change in Python, commit"""
+    with db.session_scope() as session:
+        sender = session.query(VoiceBalance).filter_by(guild_id=GUILD_ID, user_id=sender_id).first()
+        if not sender or sender.balance < amount:
+            return False
+        receiver = session.query(VoiceBalance).filter_by(guild_id=GUILD_ID, user_id=receiver_id).first()
+        time.sleep(0)  # let other threads interleave between read and write
+        sender.balance -= amount
+        receiver.balance += amount
+        return True
+
+
+def legacy_credit(db, user_id, coins):
+    with db.session_scope() as session:
+        balance = session.query(VoiceBalance).filter_by(guild_id=GUILD_ID, user_id=user_id).first()
+        time.sleep(0)
+        balance.balance += coins
+
+
+async def reset(db):
+    def _reset():
+        with db.session_scope() as session:
+            session.query(VoiceLedgerEntry).filter_by(guild_id=GUILD_ID).delete()
+            session.query(VoiceBalance).filter_by(guild_id=GUILD_ID).delete()
+    await asyncio.to_thread(_reset)
+    for user_id in range(USERS):
+        await db.update_voice_balance(GUILD_ID, user_id, coins_delta=START_BALANCE, kind='opening')
+
+
+async def balances(db):
+    def _read():
+        with db.session_scope() as session:
+            return {b.user_id: b.balance for b in session.query(VoiceBalance).filter_by(guild_id=GUILD_ID)}
+    return await asyncio.to_thread(_read)
+
+
+def workload(seed=7):
+    rng = random.Random(seed)
+    ops = [("transfer", rng.randrange(USERS), rng.randrange(USERS), rng.randint(1, 20)) for _ in range(TRANSFERS)]
+    ops += [("credit", rng.randrange(USERS), None, 1) for _ in range(VOICE_CREDITS)]
+    rng.shuffle(ops)
+    return [op for op in ops if op[1] != op[2]]
+
+
+async def run(db, ops, legacy):
+    errors = 0
+
+    async def one(op):
+        nonlocal errors
+        kind, a, b, amount = op
+        try:
+            if legacy:
+                if kind == "transfer":
+                    await asyncio.to_thread(legacy_transfer, db, a, b, amount)
+                else:
+                    await asyncio.to_thread(legacy_credit, db, a, amount)
+            else:
+                if kind == "transfer":
+                    await db.transfer_voice_coins(GUILD_ID, a, b, amount)
+                else:
+                    await db.update_voice_balance(GUILD_ID, a, coins_delta=amount, kind='voice')
+        except Exception:
+            errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(op) for op in ops))
+    return time.perf_counter() - start, errors
+
+
+async def main():
+    print(f"=== Concurrent voice economy: {TRANSFERS} transfers + {VOICE_CREDITS} voice credits, {USERS} users ===")
+    db = DatabaseAdapter('sqlite:///cotabot_dev.db')
+    db.init_db()
+    ops = workload()
+    credited = sum(op[3] for op in ops if op[0] == "credit")
+    expected_total = USERS * START_BALANCE + credited
+
+    await reset(db)
+    legacy_time, legacy_errors = await run(db, ops, legacy=True)
+    legacy_total = sum((await balances(db)).values())
+
+    await reset(db)
+    atomic_time, atomic_errors = await run(db, ops, legacy=False)
+    final = await balances(db)
+    atomic_total = sum(final.values())
+
+    assert atomic_errors == 0
+    assert atomic_total == expected_total, (atomic_total, expected_total)
+    assert min(final.values()) >= 0
+    assert not await db.audit_voice_ledger(GUILD_ID)
+    print("[PASS] Atomic: coins conserved, no negative balance, ledger matches every balance")
+
+    print(f"Legacy: {len(ops) / legacy_time:7.0f} ops/s, {legacy_errors} errors, "
+          f"total {legacy_total} (expected {expected_total}, drift {legacy_total - expected_total:+d})")
+    print(f"Atomic: {len(ops) / atomic_time:7.0f} ops/s, {atomic_errors} errors, total {atomic_total}")
+
+    await reset(db)
+    await asyncio.to_thread(lambda: db.engine.dispose())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
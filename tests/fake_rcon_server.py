@@ -0,0 +1,130 @@
+"""
+Local fake Squad RCON server for tests.
+
+Speaks the same packet format as the real server: auth handshake (empty
+RESPONSE_VALUE + AUTH_RESPONSE, id -1 on a wrong password), command
+responses split into 4096-byte packets, the terminator echo (empty packet
++ the 0x01 marker packet) and unsolicited chat packets (type 1).
+"""
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.squad.rcon import (
+    encode_packet, read_packet,
+    SERVERDATA_AUTH, SERVERDATA_AUTH_RESPONSE, SERVERDATA_CHAT_VALUE,
+    SERVERDATA_EXECCOMMAND, SERVERDATA_RESPONSE_VALUE
+)
+
+CHUNK = 4096
+TERMINATOR_MARKER = "\x00\x00\x00\x01\x00\x00\x00\x00"
+
+
+class FakeRconServer:
+    def __init__(self, password="secret"):
+        self.password = password
+        # [{"id", "eos_id", "steam_id", "name", "team_id", "squad_id", "leader", "role"}]
+        self.players = []
+        self.disconnected = []
+        self.server_info = {"ServerName_s": "Fake Squad Server", "MapName_s": "Narva", "MaxPlayers": 100,
+                            "PlayerCount_I": 0, "PublicQueue_I": 0}
+        self.commands = []
+        self.connections = 0
+        # Authenticated clients (receive broadcasts) / every open connection
+        self._writers = []
+        self._handlers = {}
+        self._server = None
+        self.port = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        for writer in self._handlers.values():
+            writer.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+
+    def add_player(self, steam_id, name, team_id=1, squad_id=None, eos_id=None):
+        self.players.append({
+            "id": len(self.players) + len(self.disconnected), "eos_id": eos_id or f"0002{steam_id[-12:]:0>28}",
+            "steam_id": steam_id, "name": name, "team_id": team_id, "squad_id": squad_id,
+            "leader": False, "role": "USA_Rifleman_01"
+        })
+
+    def remove_player(self, steam_id):
+        for p in list(self.players):
+            if p["steam_id"] == steam_id:
+                self.players.remove(p)
+                self.disconnected.append(p)
+
+    def list_players_body(self):
+        lines = ["----- Active Players -----"]
+        for p in self.players:
+            lines.append(
+                f"ID: {p['id']} | Online IDs: EOS: {p['eos_id']} steam: {p['steam_id']} | Name: {p['name']} | "
+                f"Team ID: {p['team_id']} | Squad ID: {p['squad_id'] if p['squad_id'] is not None else 'N/A'} | "
+                f"Is Leader: {p['leader']} | Role: {p['role']}"
+            )
+        lines.append("----- Recently Disconnected Players [Max of 15] -----")
+        for p in self.disconnected:
+            lines.append(
+                f"ID: {p['id']} | Online IDs: EOS: {p['eos_id']} steam: {p['steam_id']} | "
+                f"Since Disconnect: 00m.10s | Name: {p['name']}"
+            )
+        return "\n".join(lines)
+
+    def respond(self, command):
+        if command == "ListPlayers":
+            return self.list_players_body()
+        if command == "ShowServerInfo":
+            return json.dumps({**self.server_info, "PlayerCount_I": len(self.players)})
+        return ""
+
+    def broadcast(self, body):
+        """Push an unsolicited chat/broadcast packet to every connected client"""
+        for writer in self._writers:
+            writer.write(encode_packet(0, SERVERDATA_CHAT_VALUE, body))
+
+    def drop_clients(self):
+        for writer in self._writers:
+            writer.close()
+        self._writers = []
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self._handlers[asyncio.current_task()] = writer
+        authed = False
+        try:
+            while True:
+                packet_id, packet_type, body = await read_packet(reader)
+                if packet_type == SERVERDATA_AUTH:
+                    authed = body == self.password
+                    writer.write(encode_packet(packet_id, SERVERDATA_RESPONSE_VALUE))
+                    writer.write(encode_packet(packet_id if authed else -1, SERVERDATA_AUTH_RESPONSE))
+                    if authed:
+                        self._writers.append(writer)
+                elif not authed:
+                    break
+                elif packet_type == SERVERDATA_EXECCOMMAND:
+                    self.commands.append(body)
+                    response = self.respond(body)
+                    for start in range(0, max(len(response), 1), CHUNK):
+                        writer.write(encode_packet(packet_id, SERVERDATA_RESPONSE_VALUE, response[start:start + CHUNK]))
+                elif packet_type == SERVERDATA_RESPONSE_VALUE:
+                    writer.write(encode_packet(packet_id, SERVERDATA_RESPONSE_VALUE))
+                    writer.write(encode_packet(packet_id, SERVERDATA_RESPONSE_VALUE, TERMINATOR_MARKER))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if writer in self._writers:
+                self._writers.remove(writer)
+            self._handlers.pop(asyncio.current_task(), None)
+            writer.close()
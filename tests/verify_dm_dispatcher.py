@@ -0,0 +1,89 @@
+import asyncio
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from cogs.utils.dm_dispatcher import DMDispatcher, CANNOT_DM_USER
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+        self.reason = "test"
+        self.headers = {}
+
+
+class FakeUser:
+    active = 0
+    peak = 0
+
+    def __init__(self, user_id, closed=False, rate_limited=0, server_errors=0):
+        self.id = user_id
+        self.closed = closed
+        self.rate_limited = rate_limited
+        self.server_errors = server_errors
+        self.received = 0
+
+    async def send(self, content=None, embed=None):
+        FakeUser.active += 1
+        FakeUser.peak = max(FakeUser.peak, FakeUser.active)
+        try:
+            await asyncio.sleep(0.01)
+            if self.closed:
+                raise discord.Forbidden(FakeResponse(403), {"code": CANNOT_DM_USER, "message": "Cannot send messages to this user"})
+            if self.rate_limited:
+                self.rate_limited -= 1
+                raise discord.RateLimited(0.05)
+            if self.server_errors:
+                self.server_errors -= 1
+                raise discord.HTTPException(FakeResponse(502), "Bad Gateway")
+            self.received += 1
+        finally:
+            FakeUser.active -= 1
+
+    def __str__(self):
+        return f"User{self.id}"
+
+
+async def test_dm_dispatcher():
+    print("=== Testing DMDispatcher ===")
+    rate = 20
+    dispatcher = DMDispatcher(workers=4, rate=rate, max_retries=3)
+    dispatcher.start()
+
+    users = [FakeUser(i) for i in range(36)]
+    users += [FakeUser(100, closed=True), FakeUser(101, closed=True)]
+    users += [FakeUser(200, rate_limited=1), FakeUser(201, server_errors=1)]
+
+    start = time.perf_counter()
+    batch = dispatcher.send_many(users, embed=discord.Embed(title="Test"), tag="test")
+    queued_in = time.perf_counter() - start
+    assert queued_in < 0.01, "send_many must not block"
+    await asyncio.wait_for(batch.done.wait(), timeout=10)
+    elapsed = time.perf_counter() - start
+
+    summary = batch.summary()
+    assert summary["sent"] == 38 and summary["skipped"] == 2 and summary["failed"] == 0, summary
+    assert all(u.received == 1 for u in users if not u.closed)
+    print(f"[OK] {summary['sent']} sent, {summary['skipped']} closed DMs, retries succeeded")
+
+    assert FakeUser.peak <= 4
+    # 40 sends + 2 retries under a 20/s bucket (20 token burst)
+    assert elapsed >= (42 - rate) / rate * 0.9, elapsed
+    print(f"[OK] Peak concurrency {FakeUser.peak}, {elapsed:.2f}s for 42 attempts at {rate}/s")
+
+    batch2 = dispatcher.send_many(users[36:38], tag="closed")
+    assert batch2.done.is_set() and batch2.skipped == 2
+    print("[OK] Closed DMs skipped from cache without an API call")
+
+    print(f"[OK] Latency p50 {summary['p50_ms']}ms, max {summary['max_ms']}ms")
+    dispatcher.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(test_dm_dispatcher())
+    print("=== All DM dispatcher checks passed ===")
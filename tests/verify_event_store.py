@@ -0,0 +1,162 @@
+import asyncio
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event as sa_event
+from database.adapter import DatabaseAdapter
+from database.models import Event, EventParticipant
+from cogs.utils.event_store import EventStore
+
+
+async def test_event_store():
+    print("=== Testing EventStore ===")
+
+    db = DatabaseAdapter('sqlite:///cotabot_dev.db')
+    db.init_db()
+    guild_id = 999999998
+    channel_id = 111222333
+
+    def clean():
+        with db.session_scope() as session:
+            ids = [e.id for e in session.query(Event).filter_by(guild_id=guild_id)]
+            if ids:
+                session.query(EventParticipant).filter(EventParticipant.event_id.in_(ids)).delete(synchronize_session=False)
+            session.query(Event).filter_by(guild_id=guild_id).delete()
+    await asyncio.to_thread(clean)
+
+    store = EventStore(db)
+    await store.load([guild_id])
+    assert len(store) == 0
+
+    # Create two events, the later one first (list must stay time ordered)
+    start = datetime.now() + timedelta(hours=2)
+    late = await store.add_event(guild_id, 2, "Late", "", start + timedelta(hours=1), channel_id, 1)
+    early = await store.add_event(guild_id, 1, "Early", "", start, channel_id, 1)
+    await store.set_message(late["db_id"], 5002)
+    await store.set_message(early["db_id"], 5001)
+    assert [e["event_id"] for e in store.guild_events(guild_id)] == [1, 2]
+    assert store.get_by_message(5001) is early and store.get(late["db_id"]) is late
+    print("[OK] Events created, indexed by message_id and db_id")
+
+    # RSVPs update the cached event in place
+    await store.set_participant(early["db_id"], 10, "<@10>", "attendee")
+    await store.set_participant(early["db_id"], 11, "<@11>", "attendee")
+    await store.set_participant(early["db_id"], 12, "<@12>", "decline", reason="İşim var")
+    await store.set_participant(early["db_id"], 10, "<@10>", "maybe")
+    assert early["attendees"] == ["<@11>"]
+    assert early["declined"] == ["<@12>"]
+    assert early["tentative"] == ["<@10>"]
+    print("[OK] Participant changes applied without reload")
+
+    await store.update_event(early["db_id"], title="Early Edited", timestamp=start + timedelta(hours=3))
+    await store.set_reminder_sent(late["db_id"])
+    assert early["title"] == "Early Edited"
+    assert [e["event_id"] for e in store.guild_events(guild_id)] == [2, 1]
+    print("[OK] Event edits applied, order kept by timestamp")
+
+    # A fresh load from the database must match the in-memory state
+    fresh = EventStore(db)
+    await fresh.load([guild_id])
+    for cached in store.guild_events(guild_id):
+        loaded = fresh.get(cached["db_id"])
+        assert loaded == cached, (loaded, cached)
+    print("[OK] In-memory state matches a full reload")
+
+    await store.deactivate(late["db_id"])
+    assert store.get(late["db_id"]) is None and store.get_by_message(5002) is None
+    assert [e["event_id"] for e in store.guild_events(guild_id)] == [1]
+    print("[OK] Deactivated event removed from store")
+
+    await asyncio.to_thread(clean)
+
+
+async def test_bulk_load():
+    print("=== Testing Bulk Event Loading ===")
+
+    db = DatabaseAdapter('sqlite:///cotabot_dev.db')
+    db.init_db()
+    guild_ids = [999999990 + i for i in range(3)]
+
+    def clean():
+        with db.session_scope() as session:
+            ids = [e.id for e in session.query(Event).filter(Event.guild_id.in_(guild_ids))]
+            if ids:
+                session.query(EventParticipant).filter(EventParticipant.event_id.in_(ids)).delete(synchronize_session=False)
+            session.query(Event).filter(Event.guild_id.in_(guild_ids)).delete(synchronize_session=False)
+    await asyncio.to_thread(clean)
+
+    start = datetime.now() + timedelta(days=1)
+    for g, guild_id in enumerate(guild_ids):
+        for i in range(10):
+            db_id = await db.add_event(guild_id, i + 1, f"G{g} E{i}", "", start + timedelta(hours=i), 1, 1)
+            await db.upsert_event_participants([
+                {"event_db_id": db_id, "user_id": u, "user_mention": f"<@{u}>", "status": "attendee"}
+                for u in range(5)
+            ])
+            if i >= 8:
+                await db.deactivate_event(db_id)
+
+    queries = []
+    sa_event.listen(db.engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    grouped = await db.get_events_bulk(guild_ids)
+    bulk_queries = len(queries)
+
+    assert bulk_queries == 2, queries
+    assert all(len(grouped[gid]) == 8 for gid in guild_ids)
+    assert all(len(e.participants) == 5 for gid in guild_ids for e in grouped[gid])
+    print(f"[OK] 3 guilds, 24 events, 120 participants in {bulk_queries} queries")
+
+    queries.clear()
+    latest = await db.get_events_bulk(guild_ids[:1], active_only=False, limit_per_guild=4)
+    assert [e.event_id for e in latest[guild_ids[0]]] == [10, 9, 8, 7]
+    assert len(queries) == 2
+    print("[OK] Listing (active + archived, newest first, limited) in 2 queries")
+
+    try:
+        grouped[guild_ids[0]][0].title = "changed"
+        raise AssertionError("EventRecord must be read-only")
+    except AttributeError:
+        pass
+    print("[OK] Records are read-only")
+
+    await asyncio.to_thread(clean)
+
+
+async def test_start_without_channel():
+    print("=== Testing start of an event whose channel is gone ===")
+    from cogs.event import Event as EventCog
+
+    class GoneBot:
+        def get_channel(self, channel_id):
+            return None
+
+        def get_guild(self, guild_id):
+            return None
+
+    cog = EventCog(GoneBot())
+    guild_id = 999999989
+
+    def clean():
+        with cog.db.session_scope() as session:
+            session.query(Event).filter_by(guild_id=guild_id).delete()
+    await asyncio.to_thread(clean)
+
+    await cog.store.load([guild_id])
+    event = await cog.store.add_event(guild_id, 1, "Gone", "", datetime.now() - timedelta(minutes=1), 1, 1)
+    await cog.archive_started_event(event)
+    assert cog.store.get(event["db_id"]) is None
+    assert not (await cog.db.get_events_bulk([guild_id]))[guild_id]
+    print("[OK] Event deactivated even though its channel no longer exists")
+
+    await asyncio.to_thread(clean)
+
+
+if __name__ == "__main__":
+    asyncio.run(test_event_store())
+    asyncio.run(test_bulk_load())
+    asyncio.run(test_start_without_channel())
+    print("=== All event store checks passed ===")
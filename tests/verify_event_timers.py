@@ -0,0 +1,52 @@
+import asyncio
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.utils.event_timers import EventTimers
+
+
+async def test_event_timers():
+    print("=== Testing EventTimers ===")
+    fired = []
+
+    async def on_fire(event_id, action):
+        fired.append((event_id, action, time.time()))
+
+    timers = EventTimers(on_fire)
+    timers.start()
+    now = time.time()
+
+    timers.schedule(1, "start", now + 0.30)
+    timers.schedule(2, "reminder", now + 0.10)
+    timers.schedule(2, "start", now + 0.40)
+    timers.schedule(3, "start", now + 0.20)
+
+    # Edit: move event 1 earlier (must wake the sleeping runner), cancel event 3
+    await asyncio.sleep(0.02)
+    timers.schedule(1, "start", now + 0.05)
+    timers.cancel(3)
+    assert len(timers) == 3
+    assert timers.next_deadline()[1:] == (1, "start")
+
+    await asyncio.sleep(0.6)
+    timers.stop()
+
+    order = [(e, a) for e, a, _ in fired]
+    assert order == [(1, "start"), (2, "reminder"), (2, "start")], order
+    print("[OK] Timers fired in deadline order, rescheduled and cancelled timers honoured")
+
+    lateness = max(t - expected for (_, _, t), expected in zip(fired, (now + 0.05, now + 0.10, now + 0.40)))
+    assert lateness < 0.05, lateness
+    print(f"[OK] Max lateness {lateness * 1000:.1f}ms")
+
+    assert len(timers) == 0 and timers.next_deadline() is None
+    print("[OK] Heap drained")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_event_timers())
+    print("=== All event timer checks passed ===")
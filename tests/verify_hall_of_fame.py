@@ -0,0 +1,71 @@
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event as sa_event
+from database.adapter import DatabaseAdapter
+from database.models import HallOfFameRecord, ReportDelta
+
+PERIOD = "hoftest"
+
+
+def entries(*scores):
+    return [
+        {'steam_id': steam_id, 'player_name': f"P{steam_id}", 'score_delta': score, 'kills_delta': score // 10,
+         'deaths_delta': 0, 'revives_delta': 0, 'rank': rank}
+        for rank, (steam_id, score) in enumerate(scores, 1)
+    ]
+
+
+async def test_hall_of_fame():
+    print("=== Testing incremental Hall of Fame ===")
+    db = DatabaseAdapter('sqlite:///cotabot_dev.db')
+    db.init_db()
+
+    def clean():
+        with db.session_scope() as session:
+            for d in session.query(ReportDelta).filter_by(period_type=PERIOD).all():
+                session.delete(d)
+            session.query(HallOfFameRecord).filter(HallOfFameRecord.record_type.like(f"%{PERIOD}%"))\
+                .delete(synchronize_session=False)
+    await asyncio.to_thread(clean)
+
+    def tallies():
+        with db.session_scope() as session:
+            return {
+                r.steam_id: r.value for r in
+                session.query(HallOfFameRecord).filter_by(record_type=f"{PERIOD}_champions")
+            }
+
+    try:
+        await db.save_report_delta(PERIOD, 0, entries(("A", 500), ("B", 300)))
+        assert await asyncio.to_thread(tallies) == {"A": 1}
+
+        statements = []
+        sa_event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        await db.save_report_delta(PERIOD, 0, entries(("B", 400), ("A", 400)))   # tie: first entry wins
+        await db.save_report_delta(PERIOD, 0, entries(("A", 900), ("B", 100)))
+        assert not any(s.lstrip().upper().startswith("DELETE") for s in statements), statements
+        assert not any("row_number" in s.lower() for s in statements)
+        assert await asyncio.to_thread(tallies) == {"A": 2, "B": 1}
+        print("[OK] Each saved report bumps only its champion's tally row")
+
+        with db.session_scope() as session:
+            db._rebuild_champions(session, PERIOD, datetime.utcnow())
+        assert await asyncio.to_thread(tallies) == {"A": 2, "B": 1}
+        print("[OK] Incremental tallies match a full rebuild")
+
+        records = {r.record_type: r for r in await db.get_hall_of_fame_records() if PERIOD in r.record_type}
+        assert records[f"highest_{PERIOD}_score"].value == 900 and records[f"highest_{PERIOD}_kills"].value == 90
+        print("[OK] Score / kill records compare-and-set")
+    finally:
+        await asyncio.to_thread(clean)
+
+
+if __name__ == "__main__":
+    asyncio.run(test_hall_of_fame())
+    print("=== All Hall of Fame checks passed ===")
@@ -0,0 +1,159 @@
+import asyncio
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event as sa_event
+from database.adapter import DatabaseAdapter
+from database.models import TrainingMatch, TrainingMatchPlayer, TrainingMatchPresence
+from cogs.utils.match_recorder import MatchRecorder
+
+MATCH_ID = 999998
+
+
+def snapshot(*players):
+    return {"players": [
+        {"battlemetrics_id": bm, "steam_id": steam or "unknown", "name": f"Player{bm}"}
+        for bm, steam in players
+    ]}
+
+
+def test_recorder():
+    print("=== Testing MatchRecorder ===")
+    start = datetime(2026, 1, 1, 20, 0)
+    minute = timedelta(minutes=1)
+    rec = MatchRecorder(MATCH_ID, start)
+
+    a, b, c = ("1", "7656100000000001"), ("2", "7656100000000002"), ("3", None)
+    rec.observe(snapshot(a, b), start + 0.1 * minute)     # first sample counts from match start
+    rec.observe(snapshot(a, b, c), start + minute)
+    rec.observe(snapshot(a, c), start + 2 * minute)       # b left
+    rec.observe(None, start + 3 * minute)                 # API error: nobody leaves
+    rec.observe(snapshot(a, b, c), start + 4 * minute)    # b back
+    rec.stop(snapshot(a, b), start + 5 * minute)          # c left at the end
+
+    people = {p["battlemetrics_id"]: p for p in rec.participants()}
+    assert people["1"]["seconds"] == 300 and people["1"]["intervals"] == [[start, start + 5 * minute]]
+    assert people["2"]["seconds"] == 180 and len(people["2"]["intervals"]) == 2
+    assert people["3"]["seconds"] == 240 and people["3"]["steam_id"] is None
+    assert rec.samples == 5 and rec.online() == 0
+    print("[OK] Join/leave intervals and time on server from samples; failed fetch ignored")
+
+    # Restored after a restart 30 minutes into the match: no credit for the unknown part
+    resumed = MatchRecorder(MATCH_ID, start, resumed=True)
+    resumed.observe(snapshot(a, b), start + 30 * minute)
+    resumed.stop(snapshot(a), start + 40 * minute)
+    people = {p["battlemetrics_id"]: p for p in resumed.participants()}
+    assert people["1"]["seconds"] == 600 and people["2"]["seconds"] == 600
+    assert people["1"]["first_seen"] == start + 30 * minute
+    print("[OK] Resumed recorder opens intervals at its first sample")
+    return rec
+
+
+async def test_finish(rec):
+    print("=== Testing finish_training_match ===")
+    db = DatabaseAdapter('sqlite:///cotabot_dev.db')
+    db.init_db()
+
+    def clean():
+        with db.session_scope() as session:
+            session.query(TrainingMatchPresence).filter_by(match_id=MATCH_ID).delete()
+            session.query(TrainingMatchPlayer).filter_by(match_id=MATCH_ID).delete()
+            session.query(TrainingMatch).filter_by(id=MATCH_ID).delete()
+    await asyncio.to_thread(clean)
+
+    try:
+        await db.create_training_match(MATCH_ID, "127.0.0.1", "TestMap", rec.started_at)
+        # KDA entered by hand during the match must survive
+        await db.add_training_player(MATCH_ID, {"steam_id": "7656100000000002", "final_kills": 9,
+                                                "final_deaths": 3, "data_source": "manual"})
+
+        commits = []
+        sa_event.listen(db.engine, "commit", lambda conn: commits.append(1))
+        deltas = {"7656100000000001": {"steam_id": "7656100000000001", "kills_delta": 12, "deaths_delta": 4},
+                  "7656100000000002": {"steam_id": "7656100000000002", "kills_delta": 1, "deaths_delta": 1}}
+        result = await db.finish_training_match(MATCH_ID, rec.ended_at, rec.participants(), deltas=deltas)
+        assert len(commits) == 1
+        assert result == {"presence": 3, "added": 1, "delta": 1}, result
+        print("[OK] Match closed, 3 presence rows and new players written in one transaction")
+
+        match = next(m for m in await db.get_training_matches(limit=50) if m["match_id"] == MATCH_ID)
+        players = {p["steam_id"]: p for p in match["players"]}
+        assert match["status"] == "completed"
+        assert players["7656100000000001"]["data_source"] == "delta" and players["7656100000000001"]["kd_ratio"] == 3.0
+        assert players["7656100000000002"]["data_source"] == "manual" and players["7656100000000002"]["final_kills"] == 9
+        assert players["7656100000000001"]["seconds_on_server"] == 300
+        print("[OK] Delta KDA filled automatically, manual entry kept, time on server reported")
+    finally:
+        await asyncio.to_thread(clean)
+
+
+async def test_match_queries():
+    print("=== Testing training match queries ===")
+    db = DatabaseAdapter('sqlite:///cotabot_dev.db')
+    db.init_db()
+    ids = list(range(MATCH_ID - 12, MATCH_ID))
+
+    def clean():
+        with db.session_scope() as session:
+            session.query(TrainingMatchPlayer).filter(TrainingMatchPlayer.match_id.in_(ids)).delete()
+            session.query(TrainingMatch).filter(TrainingMatch.id.in_(ids)).delete()
+    await asyncio.to_thread(clean)
+
+    try:
+        base = datetime(2030, 1, 1, 20, 0)
+        for n, match_id in enumerate(ids):
+            await db.create_training_match(match_id, "127.0.0.1", f"Map{n}", base + timedelta(days=n))
+            await db.update_training_match(match_id, status="completed", end_time=base + timedelta(days=n, hours=1))
+            for p in range(4):
+                await db.add_training_player(match_id, {"steam_id": f"76561{p}", "final_kills": p + 1,
+                                                        "final_deaths": 2, "data_source": "manual"})
+
+        statements = []
+        sa_event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        pages, cursor, seen, player_counts = 0, None, [], []
+        while True:
+            statements.clear()
+            page, cursor = await db.list_training_matches(cursor=cursor, limit=5, status="completed")
+            assert len(statements) <= 4, len(statements)
+            # The shared dev DB may hold other completed matches; only the test's own are checked
+            own = [m for m in page if m["match_id"] in ids]
+            seen += [m["match_id"] for m in own]
+            player_counts += [len(m["players"]) for m in own]
+            pages += 1
+            if cursor is None or len(seen) == len(ids):
+                break
+        assert seen == ids[::-1] and player_counts == [4] * len(ids), player_counts
+        print(f"[OK] {len(ids)} matches listed newest first in {pages} pages, at most 4 queries per page")
+
+        statements.clear()
+        detail = await db.get_training_match_detail(ids[3])
+        assert detail["map_name"] == "Map3" and len(detail["players"]) == 4 and len(statements) <= 4
+        assert await db.get_training_match_detail(-1) is None
+        print("[OK] Direct lookup by ID")
+
+        statements.clear()
+        totals = {t["steam_id"]: t for t in await db.get_training_player_totals(steam_ids=[f"76561{p}" for p in range(4)])}
+        assert len(statements) == 1
+        assert totals["765613"]["matches"] == 12 and totals["765613"]["kills"] == 48 and totals["765613"]["kd_ratio"] == 2.0
+        print("[OK] Cross-match player totals from one grouped query")
+
+        with db.engine.connect() as conn:
+            plan = " ".join(str(r) for r in conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN SELECT id FROM training_matches WHERE status = 'completed' ORDER BY start_time DESC"
+            ))
+        assert "idx_training_status_start" in plan, plan
+        print("[OK] Listing served by idx_training_status_start")
+    finally:
+        await asyncio.to_thread(clean)
+
+
+if __name__ == "__main__":
+    recorder = test_recorder()
+    asyncio.run(test_finish(recorder))
+    asyncio.run(test_match_queries())
+    print("=== All match recorder checks passed ===")
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import sys
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.adapter import DatabaseAdapter
+from database.models import ActivityLog, ActivityPresence
+from database.presence import (
+    BITMAP_BYTES, SLOTS_PER_DAY, slot_of, day_slots, set_slots, as_matrix, popcount, hour_of_week, overlap_minutes
+)
+
+STEAM_IDS = ["76561198_TEST_PRES1", "76561198_TEST_PRES2", "76561198_TEST_PRES3"]
+
+
+def test_bitmaps():
+    print("=== Testing presence bitmap helpers ===")
+    assert SLOTS_PER_DAY == 720 and BITMAP_BYTES == 90
+    assert slot_of(datetime(2026, 1, 1, 0, 1)) == 0 and slot_of(datetime(2026, 1, 1, 23, 59)) == 719
+
+    bits, added = set_slots(None, [0, 7, 8, 719])
+    assert added == 4 and bits[0] == 0b10000001 and bits[1] == 0b10000000 and bits[-1] == 0b00000001
+    again, added = set_slots(bits, [7, 719, 100])
+    assert added == 1, "already set slots are not counted again"
+    assert np.unpackbits(as_matrix([again]), axis=1)[0].nonzero()[0].tolist() == [0, 7, 8, 100, 719]
+
+    spans = day_slots(datetime(2026, 1, 1, 23, 50), datetime(2026, 1, 2, 0, 5))
+    assert spans == {date(2026, 1, 1): [715, 716, 717, 718, 719], date(2026, 1, 2): [0, 1, 2]}
+
+    rng = np.random.default_rng(3)
+    matrix = rng.integers(0, 256, size=(50, BITMAP_BYTES), dtype=np.uint8)
+    assert popcount(matrix).tolist() == [sum(bin(b).count("1") for b in row) for row in matrix.tolist()]
+    print("[OK] Slot math, idempotent bit-sets, vectorized popcount")
+
+    monday = date(2026, 1, 5)
+    a, _ = set_slots(None, range(slot_of(datetime(2026, 1, 5, 20)), slot_of(datetime(2026, 1, 5, 21))))
+    heatmap = hour_of_week([monday, monday + timedelta(days=1)], as_matrix([a, a]))
+    assert heatmap[0][20] == 60 and heatmap[1][20] == 60 and heatmap.sum() == 120
+    b, _ = set_slots(None, range(slot_of(datetime(2026, 1, 5, 20, 30)), slot_of(datetime(2026, 1, 5, 22))))
+    assert overlap_minutes({monday: a}, [monday, monday + timedelta(days=1)], as_matrix([b, b])).tolist() == [30, 0]
+    print("[OK] Hour-of-week heatmap and AND overlap")
+
+
+async def test_presence_db():
+    print("=== Testing presence bitmaps in the database ===")
+    db = DatabaseAdapter('sqlite:///cotabot_dev.db')
+    db.init_db()
+
+    def clean():
+        with db.session_scope() as session:
+            from database.models import Player
+            ids = [p.id for p in session.query(Player).filter(Player.steam_id.in_(STEAM_IDS))]
+            session.query(ActivityPresence).filter(ActivityPresence.player_id.in_(ids)).delete()
+            session.query(ActivityLog).filter(ActivityLog.player_id.in_(ids)).delete()
+            session.query(Player).filter(Player.id.in_(ids)).delete()
+    await asyncio.to_thread(clean)
+
+    try:
+        p1, p2, p3 = [await db.add_player(s, f"Presence{n}") for n, s in enumerate(STEAM_IDS, 1)]
+        today = date.today()
+        evening = datetime.combine(today, time(20, 0, 30))
+
+        # Tracker poll fired twice in the same slot (sequentially and concurrently)
+        assert await db.mark_presence([(p1, evening, None), (p2, evening, None)], count_minutes=True) == 2
+        assert await db.mark_presence([(p1, evening + timedelta(seconds=50), None)], count_minutes=True) == 0
+        results = await asyncio.gather(*(
+            db.mark_presence([(p1, evening + timedelta(minutes=2), None)], count_minutes=True) for _ in range(3)
+        ))
+        assert sum(results) == 1, results
+        logs = {l.player_id: l.minutes for l in await db.get_player_activity(p1, days=1)}
+        assert logs == {p1: 4}, logs
+        assert await db.get_presence_minutes(p1, days=1) == {today: 4}
+        print("[OK] Double-fired polls set each slot once; activity_logs minutes = popcount * 2")
+
+        # Exact sessions (SquadGame.log): bits only, minutes are written separately
+        await db.mark_presence([
+            (p1, evening, evening + timedelta(hours=1)),
+            (p2, evening + timedelta(minutes=30), evening + timedelta(hours=2)),
+            (p3, evening + timedelta(hours=2), evening + timedelta(hours=3)),
+        ])
+        assert (await db.get_presence_minutes(p1, days=1))[today] == 62
+        assert [l.minutes for l in await db.get_player_activity(p1, days=1)] == [4]
+
+        heatmap = await db.get_presence_heatmap(days=1, player_ids=[p1, p2, p3])
+        row = heatmap[today.weekday()]
+        assert row[20] == 60 + 32 and row[22] == 60 + 2 and row[23] == 2, row
+
+        overlap = await db.get_presence_overlap(p1, days=1)
+        assert [(p.id, minutes) for p, minutes in overlap] == [(p2, 34)], overlap
+        print("[OK] Session spans, hour-of-week heatmap and co-play overlap from the bitmaps")
+    finally:
+        await asyncio.to_thread(clean)
+
+
+if __name__ == "__main__":
+    test_bitmaps()
+    asyncio.run(test_presence_db())
+    print("=== All presence checks passed ===")
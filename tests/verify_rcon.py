@@ -0,0 +1,150 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.squad.rcon import SquadRcon, RconPlayer, ChatMessage, ServerBroadcast, parse_list_players, parse_broadcast
+from cogs.utils.match_recorder import MatchRecorder
+from exceptions import RconError
+from fake_rcon_server import FakeRconServer
+
+STEAM_A = "76561198000000001"
+STEAM_B = "76561198000000002"
+
+
+def test_parsing():
+    print("=== Testing ListPlayers / chat parsing ===")
+    body = "\n".join([
+        "----- Active Players -----",
+        f"ID: 3 | Online IDs: EOS: 0002aaaa steam: {STEAM_A} | Name: Alpha | Team ID: 1 | Squad ID: 2 | "
+        "Is Leader: True | Role: USA_SL_01",
+        "ID: 7 | Online IDs: EOS: 0002bbbb | Name: Console | Team ID: 2 | Squad ID: N/A | Is Leader: False | Role: RUS_Rifleman_01",
+        "----- Recently Disconnected Players [Max of 15] -----",
+        f"ID: 1 | Online IDs: EOS: 0002cccc steam: {STEAM_B} | Since Disconnect: 01m.02s | Name: Gone",
+    ])
+    players = parse_list_players(body)
+    assert players == [
+        RconPlayer(3, "0002aaaa", STEAM_A, "Alpha", 1, 2, True, "USA_SL_01"),
+        RconPlayer(7, "0002bbbb", None, "Console", 2, None, False, "RUS_Rifleman_01"),
+    ], players
+    legacy = parse_list_players(
+        f"ID: 0 | SteamID: {STEAM_B} | Name: Old | Team ID: 1 | Squad ID: N/A | Is Leader: False | Role: X"
+    )
+    assert legacy[0].steam_id == STEAM_B and legacy[0].eos_id is None and legacy[0].name == "Old"
+
+    chat = parse_broadcast(f"[ChatAll] [Online IDs:EOS: 0002aaaa steam: {STEAM_A}] Alpha : gg : wp")
+    assert isinstance(chat, ChatMessage) and chat.channel == "ChatAll" and chat.steam_id == STEAM_A
+    assert chat.name == "Alpha" and chat.message == "gg : wp"
+    old_chat = parse_broadcast(f"[ChatTeam] [SteamID:{STEAM_B}] Old : hi")
+    assert old_chat.steam_id == STEAM_B and old_chat.eos_id is None
+    other = parse_broadcast("[SteamID:76561198000000001] Alpha has possessed admin camera.")
+    assert isinstance(other, ServerBroadcast)
+    print("[OK] Current + legacy formats, disconnected section ignored, chat vs. other broadcasts")
+
+
+async def test_client():
+    print("=== Testing SquadRcon against the fake server ===")
+    server = await FakeRconServer().start()
+    try:
+        server.add_player(STEAM_A, "Alpha", squad_id=1)
+        server.add_player(STEAM_B, "Bravo", team_id=2)
+        rcon = SquadRcon("127.0.0.1", server.port, "secret", server_id="19262595", timeout=2)
+
+        players = await rcon.list_players()
+        assert [p.name for p in players] == ["Alpha", "Bravo"]
+        snapshot = await rcon.snapshot()
+        assert snapshot["server_id"] == "19262595" and snapshot["source"] == "rcon"
+        assert snapshot["players"][0]["steam_id"] == STEAM_A and snapshot["players"][0]["battlemetrics_id"] is None
+        info = await rcon.server_info()
+        assert info["PlayerCount_I"] == 2 and info["MapName_s"] == "Narva"
+        assert server.connections == 1, "commands reuse one connection"
+        print("[OK] One authenticated connection for ListPlayers, snapshot and ShowServerInfo")
+
+        # A response larger than one packet, and several commands in flight at once
+        for i in range(200):
+            server.add_player(f"7656119900000{i:04d}", f"Player{i}")
+        results = await asyncio.gather(*(rcon.list_players() for _ in range(5)))
+        assert all(len(r) == 202 for r in results)
+        print("[OK] Multi-packet responses reassembled, concurrent commands routed by packet ID")
+
+        # Unsolicited chat packets reach sync and async listeners
+        events = []
+
+        async def async_listener(event):
+            events.append(("async", event))
+        rcon.add_listener(lambda event: events.append(("sync", event)))
+        rcon.add_listener(async_listener)
+        server.broadcast(f"[ChatAll] [Online IDs:EOS: 0002aaaa steam: {STEAM_A}] Alpha : hello")
+        await rcon.execute("ShowNextMap")
+        await asyncio.sleep(0.05)
+        assert [kind for kind, _ in events] == ["sync", "async"] and events[0][1].message == "hello"
+        print("[OK] Chat packets delivered between command responses")
+
+        # Dropped connection: the next command reconnects
+        server.drop_clients()
+        await asyncio.sleep(0.05)
+        assert not rcon.connected
+        assert len(await rcon.list_players()) == 202
+        assert server.connections == 2 and rcon.stats["connects"] == 2
+        print("[OK] Reconnects after the server drops the connection")
+
+        # Server gone: snapshot() fails soft and retries are backed off
+        await server.stop()
+        await asyncio.sleep(0.05)
+        assert await rcon.snapshot() is None
+        try:
+            await rcon.execute("ListPlayers")
+            assert False, "backoff should reject the command"
+        except RconError as e:
+            assert "retrying" in str(e)
+        await rcon.close()
+        print("[OK] Unreachable server: snapshot() returns None, reconnects are backed off")
+    finally:
+        if server._server.is_serving():
+            await server.stop()
+
+    server = await FakeRconServer(password="right").start()
+    try:
+        rcon = SquadRcon("127.0.0.1", server.port, "wrong", timeout=2)
+        try:
+            await rcon.list_players()
+            assert False, "wrong password should fail"
+        except RconError as e:
+            assert "authentication" in str(e)
+        assert not rcon.connected
+        print("[OK] Wrong password raises RconError")
+    finally:
+        await server.stop()
+
+
+async def test_recorder_with_rcon():
+    print("=== Testing MatchRecorder with RCON snapshots ===")
+    server = await FakeRconServer().start()
+    try:
+        rcon = SquadRcon("127.0.0.1", server.port, "secret", timeout=2)
+        start = datetime(2026, 1, 10, 20, 0, 0)
+        recorder = MatchRecorder(1, start)
+        server.add_player(STEAM_A, "Alpha")
+        recorder.observe(await rcon.snapshot(), start + timedelta(seconds=15))
+        server.add_player(STEAM_B, "Bravo")
+        recorder.observe(await rcon.snapshot(), start + timedelta(seconds=30))
+        server.remove_player(STEAM_A)
+        recorder.observe(await rcon.snapshot(), start + timedelta(seconds=45))
+        recorder.stop(await rcon.snapshot(), start + timedelta(seconds=60))
+        await rcon.close()
+
+        seconds = {p["steam_id"]: p["seconds"] for p in recorder.participants()}
+        assert seconds == {STEAM_A: 45.0, STEAM_B: 30.0}, seconds
+        print("[OK] 15-second samples keyed by Steam ID")
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    test_parsing()
+    asyncio.run(test_client())
+    asyncio.run(test_recorder_with_rcon())
+    print("=== All RCON checks passed ===")
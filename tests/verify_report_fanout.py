@@ -0,0 +1,104 @@
+import asyncio
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from cogs.squad.reports import ReportSystem
+from cogs.utils.config import REPORT_FANOUT_CONCURRENCY
+
+SEND_DELAY = 0.05
+
+
+class FakeChannel:
+    def __init__(self, name, rate_limits=0, fail=False):
+        self.name = name
+        self.rate_limits = rate_limits
+        self.fail = fail
+        self.sent = []
+
+    async def send(self, embed=None, file=None):
+        FakeChannel.active += 1
+        FakeChannel.peak = max(FakeChannel.peak, FakeChannel.active)
+        try:
+            await asyncio.sleep(SEND_DELAY)
+            if self.fail:
+                raise discord.Forbidden(FakeResponse(403), "Missing Access")
+            if self.rate_limits:
+                self.rate_limits -= 1
+                raise discord.RateLimited(0.01)
+            self.sent.append((embed, file))
+        finally:
+            FakeChannel.active -= 1
+
+
+FakeChannel.active = 0
+FakeChannel.peak = 0
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+        self.reason = "test"
+
+
+class FakeGuild:
+    def __init__(self, gid, channels):
+        self.id = gid
+        self.name = f"Guild{gid}"
+        self.text_channels = channels
+
+
+class FakeBot:
+    def __init__(self, guilds):
+        self.guilds = guilds
+
+
+async def test_fan_out():
+    print("=== Testing Concurrent Report Fan-out ===")
+    guilds = [FakeGuild(i, [FakeChannel("rapor-log")]) for i in range(20)]
+    guilds.append(FakeGuild(100, [FakeChannel("squad-log", rate_limits=2)]))
+    guilds.append(FakeGuild(101, [FakeChannel("rapor-log", fail=True)]))
+    guilds.append(FakeGuild(102, [FakeChannel("genel")]))
+
+    reports = ReportSystem(FakeBot(guilds), json_mode=True)
+    artifact = {
+        "period": "weekly",
+        "embed": discord.Embed(title="Test Report").to_dict(),
+        "chart_png": b"\x89PNG fake",
+    }
+
+    start = time.perf_counter()
+    results = await reports.fan_out_report(artifact)
+    elapsed = time.perf_counter() - start
+
+    by_guild = {r["guild_id"]: r for r in results}
+    assert len(results) == len(guilds)
+    assert all(by_guild[i]["ok"] for i in range(20))
+    print("[OK] Report posted to all #rapor-log guilds")
+
+    assert by_guild[100]["ok"] and by_guild[100]["channel"] == "squad-log"
+    print("[OK] Rate limited send retried, #squad-log fallback used")
+
+    assert not by_guild[101]["ok"] and by_guild[101]["error"]
+    assert not by_guild[102]["ok"] and by_guild[102]["error"] == "no report channel"
+    print("[OK] Failures reported per guild")
+
+    assert FakeChannel.peak <= REPORT_FANOUT_CONCURRENCY
+    sequential = len(guilds) * SEND_DELAY
+    assert elapsed < sequential
+    print(f"[OK] Peak concurrency {FakeChannel.peak}/{REPORT_FANOUT_CONCURRENCY}, "
+          f"{elapsed:.2f}s vs {sequential:.2f}s sequential")
+
+    # Each send gets its own discord.File over the same chart bytes
+    files = [f for g in guilds for c in g.text_channels for _, f in c.sent]
+    assert len({id(f) for f in files}) == len(files)
+    print("[OK] Shared chart bytes, one File per send")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_fan_out())
+    print("=== All fan-out checks passed ===")
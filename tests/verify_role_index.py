@@ -0,0 +1,83 @@
+import asyncio
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.utils.role_index import RoleIndex
+from cogs.utils.event_store import mention_id
+
+CLAN_A, CLAN_B, OTHER = 1, 2, 3
+
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+        self.members = []
+
+
+class FakeMember:
+    def __init__(self, guild, user_id, role_ids, bot=False):
+        self.guild = guild
+        self.id = user_id
+        self.bot = bot
+        self.roles = [guild.roles[r] for r in role_ids]
+
+    def with_roles(self, role_ids):
+        return FakeMember(self.guild, self.id, role_ids, self.bot)
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.roles = {r: FakeRole(r) for r in (CLAN_A, CLAN_B, OTHER)}
+
+    def get_role(self, role_id):
+        return self.roles.get(role_id)
+
+    def add(self, user_id, role_ids, bot=False):
+        member = FakeMember(self, user_id, role_ids, bot)
+        for r in role_ids:
+            self.roles[r].members.append(member)
+        return member
+
+
+async def test_role_index():
+    print("=== Testing RoleIndex ===")
+    guild = FakeGuild(42)
+    for user_id in range(100, 110):
+        guild.add(user_id, [CLAN_A])
+    both = guild.add(200, [CLAN_A, CLAN_B])
+    guild.add(300, [OTHER])
+    guild.add(400, [CLAN_B], bot=True)
+
+    index = RoleIndex([CLAN_A, CLAN_B, 999])
+    assert index.members(guild) == set(range(100, 110)) | {200}
+    assert index.role_members(guild, CLAN_B) == {200}
+    assert index.found_roles(guild) == {CLAN_A, CLAN_B}
+    print("[OK] Guild indexed from roles (bots and untracked roles ignored)")
+
+    responded = {mention_id(m) for m in ["<@100>", "<@!101> (İşim var)", "<@200>"]}
+    assert index.missing(guild, responded) == set(range(102, 110))
+    print("[OK] Missing members by user ID set difference")
+
+    # Role changes: 105 leaves the clan, 300 joins it, 200 keeps CLAN_A
+    await index.on_member_update(FakeMember(guild, 105, [CLAN_A]), FakeMember(guild, 105, []))
+    await index.on_member_update(FakeMember(guild, 300, [OTHER]), FakeMember(guild, 300, [OTHER, CLAN_B]))
+    await index.on_member_update(both, both.with_roles([CLAN_A]))
+    assert 105 not in index.members(guild) and 300 in index.members(guild)
+    assert index.role_members(guild, CLAN_B) == {300} and 200 in index.members(guild)
+    print("[OK] on_member_update keeps the index current")
+
+    await index.on_member_remove(FakeMember(guild, 100, [CLAN_A]))
+    assert 100 not in index.members(guild)
+    print("[OK] on_member_remove drops the member")
+
+    assert mention_id("Eski Oyuncu") is None and mention_id("<@abc>") is None
+    print("[OK] Plain-name entries are not matched")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_role_index())
+    print("=== All role index checks passed ===")
@@ -0,0 +1,78 @@
+import asyncio
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.adapter import DatabaseAdapter
+from database.models import ScheduledJob
+from cogs.utils.scheduler import DeadlineScheduler, daily_at, weekly_at, monthly_at, every
+
+
+class FakeBot:
+    async def wait_until_ready(self):
+        return
+
+
+def test_schedules():
+    print("=== Testing Schedule Functions ===")
+    t = datetime(2026, 3, 2, 9, 0)  # Monday 09:00
+
+    assert weekly_at(0, 9)(t) == datetime(2026, 3, 9, 9, 0)
+    assert weekly_at(0, 9)(t - timedelta(minutes=1)) == t
+    assert weekly_at(6, 20)(t) == datetime(2026, 3, 8, 20, 0)
+    assert monthly_at(1, 10)(t) == datetime(2026, 4, 1, 10, 0)
+    assert monthly_at(1, 10)(datetime(2026, 12, 15)) == datetime(2027, 1, 1, 10, 0)
+    assert daily_at(3)(t) == datetime(2026, 3, 3, 3, 0)
+    assert daily_at(3)(datetime(2026, 3, 2, 1, 0)) == datetime(2026, 3, 2, 3, 0)
+    assert every(timedelta(hours=6))(t) == datetime(2026, 3, 2, 15, 0)
+    print("[OK] Next fire times are correct")
+
+
+async def test_catch_up():
+    print("=== Testing Scheduler Persistence / Catch-up ===")
+    db = DatabaseAdapter('sqlite:///cotabot_dev.db')
+    db.init_db()
+    names = ("test_missed", "test_skipped", "test_future")
+
+    def clean():
+        with db.session_scope() as session:
+            session.query(ScheduledJob).filter(ScheduledJob.name.in_(names)).delete(synchronize_session=False)
+    await asyncio.to_thread(clean)
+
+    now = datetime.now()
+    for name in names[:2]:
+        await db.save_scheduled_job(name, now - timedelta(days=8), now - timedelta(days=1))
+
+    runs = []
+
+    def job(name):
+        async def _run():
+            runs.append(name)
+        return _run
+
+    scheduler = DeadlineScheduler(FakeBot(), db)
+    await scheduler.add_job("test_missed", weekly_at(0, 9), job("test_missed"))
+    await scheduler.add_job("test_skipped", weekly_at(0, 9), job("test_skipped"), catch_up=False)
+    await scheduler.add_job("test_future", every(timedelta(hours=1)), job("test_future"))
+    scheduler.start()
+    await asyncio.sleep(0.5)
+    scheduler.stop()
+
+    assert runs == ["test_missed"], runs
+    print("[OK] Missed run executed once, catch_up=False skipped, future job waiting")
+
+    state = await db.get_scheduled_job("test_missed")
+    assert state["last_status"] == "ok"
+    assert state["next_run"] > now
+    print(f"[OK] State persisted: next run {state['next_run']}")
+
+    await asyncio.to_thread(clean)
+
+
+if __name__ == "__main__":
+    test_schedules()
+    asyncio.run(test_catch_up())
+    print("=== All scheduler checks passed ===")
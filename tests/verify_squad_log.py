@@ -0,0 +1,207 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.squad.squad_log import (
+    SquadLogParser, SquadLogTailer, SquadLogSource,
+    PlayerConnected, PlayerDisconnected, PlayerDied, NewGame, RoundEnded
+)
+from cogs.utils.match_recorder import MatchRecorder
+
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "SquadGame_sample.log")
+
+
+def read_sample():
+    with open(SAMPLE, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_parser():
+    print("=== Testing SquadLogParser on the sample log ===")
+    parser = SquadLogParser()
+    events = parser.parse_lines(read_sample())
+    kinds = [type(e).__name__ for e in events]
+    assert kinds == [
+        "NewGame", "PlayerConnected", "PlayerConnected", "PlayerConnected",
+        "PlayerWounded", "PlayerRevived", "PlayerWounded", "PlayerDied", "PlayerWounded", "PlayerDied",
+        "PlayerDisconnected", "RoundEnded", "RoundEnded", "PlayerDisconnected"
+    ], kinds
+    joined = events[1]
+    assert joined == PlayerConnected(joined.time, 12, "Alpha", "76561198000000001",
+                                     "0002aaaaaaaaaaaaaaaaaaaaaaaaaaa1", "BP_PlayerController_C_2147481001")
+    utc_offset = datetime.now() - datetime.utcnow()
+    assert abs(joined.time - utc_offset - datetime(2026, 1, 10, 20, 0, 2, 10000)) < timedelta(seconds=1)
+    assert events[0] == NewGame(events[0].time, 1, "Narva", "Narva_RAAS_v1")
+
+    died = [e for e in events if isinstance(e, PlayerDied)]
+    assert died[0].victim_steam_id == "76561198000000002" and died[0].attacker_steam_id == "76561198000000001"
+    assert died[0].weapon == "BP_M4" and died[0].damage == 150.0
+    left = [e for e in events if isinstance(e, PlayerDisconnected)]
+    assert [(e.name, e.steam_id) for e in left] == [("Bravo", "76561198000000002"), ("Alpha", "76561198000000001")]
+    assert left[1].joined_at == joined.time
+    ended = [e for e in events if isinstance(e, RoundEnded)]
+    assert ended[0].won and ended[0].team == 1 and ended[0].tickets == 150 and not ended[1].won
+    print(f"[OK] {len(events)} typed events, IDs resolved from joins, times converted from UTC")
+
+    recorder = MatchRecorder(1, started_at=events[0].time)
+    recorder.apply_log_events(events)
+    assert recorder.log_stats["76561198000000001"] == {"kills": 2, "deaths": 1, "revives": 0}
+    assert recorder.log_stats["76561198000000002"] == {"kills": 0, "deaths": 1, "revives": 0}
+    assert recorder.log_stats["76561198000000003"] == {"kills": 1, "deaths": 0, "revives": 1}
+    print("[OK] Training recorder counts kills / deaths / revives from log events")
+
+    # Alpha and Bravo on the same team (RCON sample): Alpha's wounds on Bravo are teamkills
+    recorder = MatchRecorder(1, started_at=events[0].time)
+    recorder.observe({"players": [
+        {"steam_id": f"7656119800000000{n}", "name": name, "team_id": team}
+        for n, name, team in [(1, "Alpha", 1), (2, "Bravo", 1), (3, "Charlie", 2)]
+    ]}, events[0].time)
+    recorder.apply_log_events(events)
+    assert recorder.log_stats["76561198000000001"]["kills"] == 0
+    assert recorder.log_stats["76561198000000003"]["kills"] == 1
+    print("[OK] Teamkills are not counted when RCON gave both teams")
+
+
+def test_tailer():
+    print("=== Testing SquadLogTailer ===")
+    lines = read_sample()
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, "SquadGame.log")
+        checkpoint = os.path.join(tmp, "checkpoint.json")
+
+        # Half the file, the last line cut in the middle
+        head = "\n".join(lines[:10]) + "\n" + lines[10][:40]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(head)
+        tailer = SquadLogTailer(path, checkpoint)
+        got = []
+        while True:
+            batch = tailer.read_lines(max_bytes=256)
+            if not batch:
+                break
+            got += batch
+        assert got == lines[:10], "partial last line must wait"
+        tailer.save_checkpoint()
+        tailer.close()
+        print("[OK] Incremental reads in small chunks, partial line held back")
+
+        # Restart from the checkpoint after the rest was written
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(lines[10][40:] + "\n" + "\n".join(lines[11:20]) + "\n")
+        tailer = SquadLogTailer(path, checkpoint)
+        got = []
+        while True:
+            batch = tailer.read_lines(max_bytes=256)
+            if not batch:
+                break
+            got += batch
+        assert got == lines[10:20], got[:2]
+        print("[OK] Restart resumes at the checkpoint offset, nothing skipped or repeated")
+
+        # Rotation: old file gets 2 more lines, then is renamed and a new log starts
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines[20:22]) + "\n")
+        os.rename(path, os.path.join(tmp, "SquadGame-backup.log"))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines[22:]) + "\n")
+        got = []
+        for _ in range(10):
+            got += tailer.read_lines()
+        assert got == lines[20:], got
+        assert tailer.stats["rotations"] == 1
+        print("[OK] Rotation: old file drained, new file read from the start")
+
+        # The last lines of the old file land between the read and the rotation check
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(lines[0] + "\n")
+        os.replace(path, os.path.join(tmp, "SquadGame-backup.log"))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(lines[1] + "\n")
+        read_complete, reads = tailer._read_complete, []
+
+        def late_write(max_bytes):
+            reads.append(max_bytes)
+            return [] if len(reads) == 1 else read_complete(max_bytes)
+        tailer._read_complete = late_write
+        got = []
+        for _ in range(10):
+            got += tailer.read_lines()
+        assert got == lines[:2] and tailer.stats["rotations"] == 2, (got, tailer.stats)
+        tailer.close()
+        print("[OK] Rotation after draining unread lines is counted too")
+    finally:
+        shutil.rmtree(tmp)
+
+
+async def test_source():
+    print("=== Testing SquadLogSource ===")
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, "SquadGame.log")
+        shutil.copy(SAMPLE, path)
+        source = SquadLogSource(path, os.path.join(tmp, "checkpoint.json"), max_bytes=512)
+        batches = []
+        source.add_listener(lambda events: batches.append(events))
+
+        async def async_listener(events):
+            batches.append(len(events))
+        source.add_listener(async_listener)
+
+        assert await source.poll() == 14
+        assert len(batches) == 2 and len(batches[0]) == 14 and batches[1] == 14
+        assert await source.poll() == 0
+        assert os.path.exists(os.path.join(tmp, "checkpoint.json"))
+        source.tailer.close()
+        print("[OK] One poll = one batch to sync and async listeners, then checkpoint")
+    finally:
+        shutil.rmtree(tmp)
+
+    tmp = tempfile.mkdtemp()
+    try:
+        lines = read_sample()
+        path = os.path.join(tmp, "SquadGame.log")
+        checkpoint = os.path.join(tmp, "checkpoint.json")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines[:12]) + "\n")
+        source = SquadLogSource(path, checkpoint)
+        await source.poll()
+        source.tailer.close()
+
+        # Bot restart after the joins: the sessions come back from the checkpoint
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines[12:]) + "\n")
+        source = SquadLogSource(path, checkpoint)
+        batches = []
+        source.add_listener(lambda events: batches.append(events))
+        await source.poll()
+        left = [e for e in batches[0] if isinstance(e, PlayerDisconnected)]
+        assert [e.name for e in left] == ["Bravo", "Alpha"] and all(e.joined_at for e in left), left
+        print("[OK] Open sessions survive a restart through the checkpoint")
+
+        # Server restart: the log rotates with Charlie still connected
+        os.replace(path, os.path.join(tmp, "SquadGame-backup.log"))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(lines[0] + "\n")
+        batches.clear()
+        await source.poll()
+        closed = [e for e in batches[0] if isinstance(e, PlayerDisconnected)]
+        assert [(e.name, e.time) for e in closed] == [("Charlie", left[-1].time)] and closed[0].joined_at, closed
+        assert source.parser.players == {}
+        source.tailer.close()
+        print("[OK] Rotation closes the sessions left open at the last event of the old log")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    test_parser()
+    test_tailer()
+    asyncio.run(test_source())
+    print("=== All squad log checks passed ===")
@@ -0,0 +1,59 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.adapter import DatabaseAdapter
+from database.models import PlayerStatHead, PlayerStatSample
+
+STEAM_A = "76561198_TEST_SERIES1"
+STEAM_B = "76561198_TEST_SERIES2"
+
+
+def sample(steam_id, score, kills, deaths):
+    return {'steam_id': steam_id, 'score': score, 'kills': kills, 'deaths': deaths, 'revives': 0, 'wounds': 0}
+
+
+async def test_stat_series():
+    print("=== Testing delta-encoded stat samples ===")
+    db = DatabaseAdapter('sqlite:///cotabot_dev.db')
+    db.init_db()
+
+    def clean():
+        with db.session_scope() as session:
+            ids = [STEAM_A, STEAM_B]
+            session.query(PlayerStatSample).filter(PlayerStatSample.steam_id.in_(ids)).delete()
+            session.query(PlayerStatHead).filter(PlayerStatHead.steam_id.in_(ids)).delete()
+    await asyncio.to_thread(clean)
+
+    try:
+        t = datetime(2026, 1, 10, 12, 0, 0)
+        # A has lifetime totals before the window; B is first seen inside it
+        assert await db.record_stat_samples([sample(STEAM_A, 50000, 900, 400)], t) == 0
+        assert await db.record_stat_samples(
+            [sample(STEAM_A, 50300, 905, 402), sample(STEAM_B, 80000, 1500, 700)], t + timedelta(hours=6)
+        ) == 1, "first sample writes only the baseline"
+        assert await db.record_stat_samples(
+            [sample(STEAM_A, 50300, 905, 402), sample(STEAM_B, 80200, 1504, 701)], t + timedelta(hours=12)
+        ) == 1, "unchanged players write no row"
+        print("[OK] First sample stores the head only, unchanged players skipped")
+
+        window = await db.stats_delta([STEAM_A, STEAM_B], t - timedelta(hours=1), t + timedelta(hours=13))
+        by_id = {d['steam_id']: d for d in window}
+        assert by_id[STEAM_A]['score_delta'] == 300 and by_id[STEAM_A]['kills_delta'] == 5
+        assert by_id[STEAM_B]['score_delta'] == 200 and by_id[STEAM_B]['kills_delta'] == 4
+        assert by_id[STEAM_B]['deaths_delta'] == 1
+
+        first_only = await db.stats_delta([STEAM_B], t, t + timedelta(hours=6))
+        assert first_only == [], first_only
+        print("[OK] Windows containing a player's first sample exclude lifetime totals")
+    finally:
+        await asyncio.to_thread(clean)
+
+
+if __name__ == "__main__":
+    asyncio.run(test_stat_series())
+    print("=== All stat series checks passed ===")
@@ -0,0 +1,108 @@
+import asyncio
+import random
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.utils.voice_leaderboard import GuildLeaderboard, VoiceLeaderboard
+from cogs.utils.voice_ledger import VoiceLedger
+
+
+def brute_force(totals, live):
+    merged = dict(totals)
+    for uid, secs in live.items():
+        merged[uid] = merged.get(uid, 0.0) + secs
+    return sorted(((uid, s) for uid, s in merged.items() if s > 0), key=lambda item: (-item[1], item[0]))
+
+
+def test_against_sort():
+    print("=== Testing GuildLeaderboard against a full sort ===")
+    rng = random.Random(3)
+    totals = {uid: float(rng.randint(0, 5000)) for uid in range(300)}
+    board = GuildLeaderboard(totals)
+
+    for step in range(2000):
+        uid = rng.randrange(350)
+        secs = float(rng.randint(-200, 600))
+        board.add(uid, secs)
+        totals[uid] = max(totals.get(uid, 0.0) + secs, 0.0)
+
+        if step % 50 == 0:
+            live = {rng.randrange(400): float(rng.randint(1, 3000)) for _ in range(rng.randint(0, 8))}
+            expected = brute_force(totals, live)
+            assert board.top(10, live) == expected[:10]
+            for pos, (uid_, secs_) in enumerate(expected, 1):
+                assert board.rank(uid_, live) == (pos, secs_), (uid_, pos)
+    assert board.rank(10 ** 6) == (None, 0.0)
+    print("[OK] top() and rank() match a full sort after 2000 updates with live users")
+
+
+def test_scale():
+    print("=== Testing update/lookup cost ===")
+    rng = random.Random(5)
+    board = VoiceLeaderboard()
+    board.load({1: {uid: float(rng.randint(1, 10 ** 6)) for uid in range(50000)}})
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        board.add(1, rng.randrange(50000), float(rng.randint(1, 3600)))
+    update_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        board.rank(1, rng.randrange(50000))
+        board.top(1, 10)
+    lookup_ms = (time.perf_counter() - start) * 1000
+    print(f"[OK] 50000 users: 10000 updates in {update_ms:.0f} ms, 10000 rank+top lookups in {lookup_ms:.0f} ms")
+
+
+async def test_load_race():
+    print("=== Testing leaderboard load with leaves during the totals query ===")
+
+    class SlowDB:
+        """voice_balances in a dict; the totals query yields to the loop"""
+        def __init__(self):
+            self.totals = {}
+
+        async def apply_voice_ledger(self, sessions, rows, opened):
+            for row in rows:
+                guild = self.totals.setdefault(row["guild_id"], {})
+                guild[row["user_id"]] = guild.get(row["user_id"], 0.0) + row["duration"]
+            return list(range(len(opened)))
+
+        async def get_voice_totals(self):
+            snapshot = {g: dict(users) for g, users in self.totals.items()}
+            await asyncio.sleep(0.05)
+            return snapshot
+
+    ledger = VoiceLedger(SlowDB(), interval=60)
+    board = VoiceLeaderboard()
+    ledger.add_listener(board.add)
+    start = datetime.now() - timedelta(hours=1)
+    for user_id in (1, 2, 3):
+        ledger.join(1, user_id, 1, "Genel", joined_at=start)
+    ledger.leave(1, 1, at=start + timedelta(seconds=100))
+
+    async def leave_during_load():
+        await asyncio.sleep(0.01)
+        ledger.leave(1, 2, at=start + timedelta(seconds=200))
+        await ledger.flush()  # the periodic flush must not slip in between
+    racer = asyncio.create_task(leave_during_load())
+    totals = await ledger.flush_and_read(ledger.db.get_voice_totals)
+    board.load(totals, ledger.unflushed_durations())
+    await racer
+    ledger.leave(1, 3, at=start + timedelta(seconds=300))
+
+    assert board.board(1).totals == {1: 100.0, 2: 200.0, 3: 300.0}, board.board(1).totals
+    print("[OK] Leaves during the load are kept, flushed or not")
+
+
+if __name__ == "__main__":
+    test_against_sort()
+    test_scale()
+    asyncio.run(test_load_race())
+    print("=== All voice leaderboard checks passed ===")
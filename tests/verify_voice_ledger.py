@@ -0,0 +1,294 @@
+import asyncio
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event as sa_event, text
+from database.adapter import DatabaseAdapter
+from database.models import VoiceSession, VoiceBalance, VoiceHourly
+from cogs.utils.voice_ledger import VoiceLedger
+
+GUILD_ID = 999999996
+
+
+async def test_voice_ledger():
+    print("=== Testing VoiceLedger ===")
+
+    db = DatabaseAdapter('sqlite:///cotabot_dev.db')
+    db.init_db()
+
+    def clean():
+        with db.session_scope() as session:
+            session.query(VoiceSession).filter_by(guild_id=GUILD_ID).delete()
+            session.query(VoiceBalance).filter_by(guild_id=GUILD_ID).delete()
+            session.query(VoiceHourly).filter_by(guild_id=GUILD_ID).delete()
+    await asyncio.to_thread(clean)
+
+    writes = []
+    sa_event.listen(db.engine, "before_cursor_execute", lambda *args: writes.append(args[2]))
+
+    ledger = VoiceLedger(db, interval=0.2, max_events=1000)
+    start = datetime.now() - timedelta(minutes=30)
+
+    # 20 users: join, 90s later move to a second channel, 150s later leave
+    for user_id in range(20):
+        ledger.join(GUILD_ID, user_id, 1, "Genel", joined_at=start)
+    for user_id in range(20):
+        ledger.leave(GUILD_ID, user_id, at=start + timedelta(seconds=90))
+        ledger.join(GUILD_ID, user_id, 2, "AFK", joined_at=start + timedelta(seconds=90))
+    for user_id in range(20):
+        ledger.leave(GUILD_ID, user_id, at=start + timedelta(seconds=240))
+    ledger.join(GUILD_ID, 99, 1, "Genel", joined_at=datetime.now() - timedelta(seconds=120))
+
+    assert not writes, "join/leave must not hit the database"
+    assert ledger.pending(GUILD_ID, 0) == {"coins": 1, "pending_seconds": 30.0, "duration": 240.0}
+    assert 119 <= ledger.guild_extra_seconds(GUILD_ID)[99] <= 125
+    print("[OK] 80 voice events recorded in memory, live totals readable")
+
+    commits = []
+    sa_event.listen(db.engine, "commit", lambda conn: commits.append(1))
+    await asyncio.sleep(0.4)
+    assert not ledger.has_pending()
+    assert len(commits) == 1, commits
+    print("[OK] Timed flush wrote 40 sessions, 20 balances and 1 open row in one transaction")
+
+    stats = await db.get_user_voice_stats(GUILD_ID, 0)
+    balance = await db.get_voice_balance(GUILD_ID, 0)
+    assert stats["total_seconds"] == 240.0 and balance.balance == 1
+    assert stats["channels"]["1"]["seconds"] == 90.0 and stats["channels"]["2"]["seconds"] == 150.0
+    print("[OK] Sessions and balances match the recorded events")
+
+    # Size trigger
+    ledger.max_events = 5
+    for user_id in range(5):
+        ledger.join(GUILD_ID, user_id, 1, "Genel", joined_at=start)
+        ledger.leave(GUILD_ID, user_id, at=start + timedelta(seconds=60))
+    await asyncio.sleep(0.05)
+    assert not ledger.has_pending()
+    assert (await db.get_voice_balance(GUILD_ID, 4)).balance == 2
+    print("[OK] Flush after max_events without waiting for the timer")
+
+    await ledger.close()
+    assert ledger.live_seconds(GUILD_ID, 99) == 0.0
+    assert (await db.get_voice_balance(GUILD_ID, 99)).balance == 2
+    print("[OK] close() credits users still in voice")
+
+    await asyncio.to_thread(clean)
+
+
+async def test_reconcile():
+    print("=== Testing startup reconciliation ===")
+
+    db = DatabaseAdapter('sqlite:///cotabot_dev.db')
+    db.init_db()
+
+    def clean():
+        with db.session_scope() as session:
+            session.query(VoiceSession).filter_by(guild_id=GUILD_ID).delete()
+            session.query(VoiceBalance).filter_by(guild_id=GUILD_ID).delete()
+            session.query(VoiceHourly).filter_by(guild_id=GUILD_ID).delete()
+    await asyncio.to_thread(clean)
+
+    def rows(**filters):
+        with db.session_scope() as session:
+            return [(s.id, s.left_at, s.duration_seconds)
+                    for s in session.query(VoiceSession).filter_by(guild_id=GUILD_ID, **filters)]
+
+    now = datetime.now()
+    # Previous run: user 1 joined 20 min ago and the heartbeat stored the open row, then the bot crashed
+    crashed = VoiceLedger(db)
+    crashed.join(GUILD_ID, 1, 1, "Genel", joined_at=now - timedelta(minutes=20))
+    await crashed.flush()
+    # Legacy row open for 10 hours (e.g. from before the ledger)
+    await db.apply_voice_ledger([], [], [{"guild_id": GUILD_ID, "user_id": 2, "channel_id": 1,
+                                          "channel_name": "Genel", "joined_at": now - timedelta(hours=10)}])
+    assert len(rows(left_at=None)) == 2
+
+    current = [{"guild_id": GUILD_ID, "user_id": u, "channel_id": 1, "channel_name": "Genel", "joined_at": now}
+               for u in (1, 3)]
+    heartbeat = now - timedelta(minutes=5)
+    writes = []
+    sa_event.listen(db.engine, "commit", lambda conn: writes.append(1))
+    result = await db.reconcile_voice_sessions(current, policy="heartbeat", max_seconds=4 * 3600, heartbeat_at=heartbeat)
+
+    assert len(writes) == 1, "reconciliation must be one transaction"
+    assert result["closed"] == 2 and result["capped"] == 1 and len(result["opened_ids"]) == 2
+    assert (await db.get_voice_balance(GUILD_ID, 1)).total_time_seconds == 15 * 60
+    assert (await db.get_voice_balance(GUILD_ID, 2)).total_time_seconds == 4 * 3600
+    assert (await db.get_voice_balance(GUILD_ID, 2)).balance == 240
+    print(f"[OK] {result['closed']} orphans closed ({result['capped']} capped), balances credited, 1 transaction")
+
+    ledger = VoiceLedger(db)
+    for row, session_id in zip(current, result["opened_ids"]):
+        ledger.join(row["guild_id"], row["user_id"], row["channel_id"], row["channel_name"],
+                    joined_at=row["joined_at"] - timedelta(minutes=3), session_id=session_id)
+    assert len(rows(left_at=None)) == 2
+    ledger.leave(GUILD_ID, 3)
+    await ledger.flush()
+    closed = [r for r in rows(user_id=3)]
+    assert len(closed) == 1 and closed[0][0] == result["opened_ids"][1] and closed[0][1] is not None
+    print("[OK] Users in voice tracked on the new open rows; leave closes the same row")
+
+    await asyncio.to_thread(clean)
+
+
+async def test_reconnect():
+    print("=== Testing gateway reconnect ===")
+    from types import SimpleNamespace
+    from cogs.voice_stats import VoiceStats
+
+    member = SimpleNamespace(id=1, bot=False)
+    channel = SimpleNamespace(id=1, name="Genel", members=[member])
+    bot = SimpleNamespace(guilds=[SimpleNamespace(id=GUILD_ID, voice_channels=[channel])])
+    cog = VoiceStats(bot)
+
+    def clean():
+        with cog.db.session_scope() as session:
+            session.query(VoiceSession).filter_by(guild_id=GUILD_ID).delete()
+            session.query(VoiceBalance).filter_by(guild_id=GUILD_ID).delete()
+            session.query(VoiceHourly).filter_by(guild_id=GUILD_ID).delete()
+    await asyncio.to_thread(clean)
+
+    now = datetime.now()
+    cog.last_reconcile = {"closed": 0}
+    for user_id in (1, 2):
+        cog.ledger.join(GUILD_ID, user_id, 1, "Genel", joined_at=now - timedelta(minutes=30))
+    # User 2 left while the gateway was down (10 minutes ago)
+    cog.disconnected_at = now - timedelta(minutes=10)
+    await cog.on_ready()
+
+    assert list(cog.ledger.open_sessions) == [(GUILD_ID, 1)]
+    assert cog.ledger.pending(GUILD_ID, 2)["duration"] == 20 * 60
+    assert cog.disconnected_at is None
+    print("[OK] Users gone after a reconnect are closed at the disconnect, users still in voice keep their session")
+
+    await cog.ledger.flush()
+    await asyncio.to_thread(clean)
+
+
+async def test_hourly_rollup():
+    print("=== Testing hourly voice rollup ===")
+
+    db = DatabaseAdapter('sqlite:///cotabot_dev.db')
+    db.init_db()
+
+    def clean():
+        with db.session_scope() as session:
+            session.query(VoiceSession).filter_by(guild_id=GUILD_ID).delete()
+            session.query(VoiceBalance).filter_by(guild_id=GUILD_ID).delete()
+            session.query(VoiceHourly).filter_by(guild_id=GUILD_ID).delete()
+    await asyncio.to_thread(clean)
+
+    # Monday 20:30 -> 22:15 in channel 1, user 1; Monday 21:00 -> 21:30 in channel 2, user 2
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    monday = today - timedelta(days=today.weekday() + 7)
+    ledger = VoiceLedger(db)
+    ledger.join(GUILD_ID, 1, 1, "Genel", joined_at=monday.replace(hour=20, minute=30))
+    ledger.leave(GUILD_ID, 1, at=monday.replace(hour=22, minute=15))
+    ledger.join(GUILD_ID, 2, 2, "Oyun", joined_at=monday.replace(hour=21))
+    ledger.leave(GUILD_ID, 2, at=monday.replace(hour=21, minute=30))
+    await ledger.flush()
+
+    def buckets():
+        with db.session_scope() as session:
+            return sorted((b.hour.hour, b.channel_id, b.user_id, b.seconds)
+                          for b in session.query(VoiceHourly).filter_by(guild_id=GUILD_ID))
+    assert buckets() == [(20, 1, 1, 1800.0), (21, 1, 1, 3600.0), (21, 2, 2, 1800.0), (22, 1, 1, 900.0)]
+    print("[OK] Closed sessions split into hour buckets on flush")
+
+    # Same hour again: bucket grows instead of a new row
+    ledger.join(GUILD_ID, 2, 2, "Oyun", joined_at=monday.replace(hour=21, minute=40))
+    ledger.leave(GUILD_ID, 2, at=monday.replace(hour=21, minute=50))
+    await ledger.flush()
+    assert (21, 2, 2, 2400.0) in buckets() and len(buckets()) == 4
+    print("[OK] Buckets maintained incrementally")
+
+    heatmap = await db.get_voice_heatmap(GUILD_ID, days=28)
+    assert heatmap[0][21] == 6000.0 and heatmap[0][20] == 1800.0 and sum(map(sum, heatmap)) == 8700.0
+    pattern = await db.get_voice_heatmap(GUILD_ID, days=28, user_id=2)
+    assert sum(map(sum, pattern)) == 2400.0
+    trend = await db.get_voice_channel_trend(GUILD_ID, days=30)
+    assert trend[1]["total"] == 6300.0 and trend[2]["days"] == {monday.date(): 2400.0}
+    stats = await db.get_user_voice_stats(GUILD_ID, 1, include_open=False)
+    assert stats["channels"] == {"1": {"name": "Genel", "seconds": 6300.0}}
+    print("[OK] Heatmap, weekly pattern, channel trend and !stat breakdown read from buckets")
+
+    # Rebuild from sessions gives the same buckets
+    before = buckets()
+    await db.rebuild_voice_hourly(only_if_empty=False)
+    assert buckets() == before
+    print("[OK] Rebuild from voice_sessions matches incremental rollup")
+
+    await asyncio.to_thread(clean)
+
+
+async def test_voice_history():
+    print("=== Testing paginated voice history ===")
+
+    db = DatabaseAdapter('sqlite:///cotabot_dev.db')
+    db.init_db()
+
+    def clean():
+        with db.session_scope() as session:
+            session.query(VoiceSession).filter_by(guild_id=GUILD_ID).delete()
+            session.query(VoiceBalance).filter_by(guild_id=GUILD_ID).delete()
+            session.query(VoiceHourly).filter_by(guild_id=GUILD_ID).delete()
+    await asyncio.to_thread(clean)
+
+    # 3 sessions a day for 20 days; two of them share a joined_at (keyset tie-break on id)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    rows = []
+    for day in range(20):
+        for hour in (10, 10, 18):
+            joined = today - timedelta(days=day) + timedelta(hours=hour)
+            rows.append({"guild_id": GUILD_ID, "user_id": 1, "channel_id": 1, "channel_name": "Genel",
+                         "joined_at": joined, "left_at": joined + timedelta(minutes=30),
+                         "duration_seconds": 1800.0, "coins_earned": 0})
+    await db.apply_voice_ledger(rows, [])
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = await db.get_user_voice_history(GUILD_ID, 1, days=None, limit=7, cursor=cursor)
+        assert len(page.sessions) <= 7
+        seen += page.sessions
+        pages += 1
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    keys = [(s.joined_at, s.id) for s in seen]
+    assert len(seen) == 60 and len(set(keys)) == 60 and keys == sorted(keys, reverse=True)
+    assert pages == 9
+    week = await db.get_user_voice_history(GUILD_ID, 1, days=7, limit=100)
+    # Whether the sessions 7 days ago are still inside the window depends on the time of day
+    in_week = sum(1 for r in rows if r["joined_at"] >= datetime.now() - timedelta(days=7))
+    assert len(week.sessions) == in_week and week.next_cursor is None, (len(week.sessions), in_week)
+    print(f"[OK] 60 sessions in {pages} keyset pages, newest first, no duplicates or gaps")
+
+    with db.engine.connect() as conn:
+        plan = " ".join(str(r) for r in conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM voice_sessions WHERE guild_id = :g AND user_id = :u "
+            "AND joined_at < :t ORDER BY joined_at DESC, id DESC LIMIT 8"
+        ), {"g": GUILD_ID, "u": 1, "t": datetime.now()}))
+    assert "idx_voice_user_history" in plan, plan
+    print("[OK] History pages are served by idx_voice_user_history")
+
+    daily = await db.get_user_voice_buckets(GUILD_ID, 1, bucket="day", days=6)
+    assert [r["seconds"] for r in daily] == [5400.0] * 7 and daily[-1]["start"] == today.date()
+    weekly = await db.get_user_voice_buckets(GUILD_ID, 1, bucket="week", days=19)
+    assert sum(r["sessions"] for r in weekly) == 60
+    assert all(r["start"].weekday() == 0 for r in weekly)
+    print("[OK] Daily and weekly buckets summed in SQL")
+
+    await asyncio.to_thread(clean)
+
+
+if __name__ == "__main__":
+    asyncio.run(test_voice_ledger())
+    asyncio.run(test_reconcile())
+    asyncio.run(test_reconnect())
+    asyncio.run(test_hourly_rollup())
+    asyncio.run(test_voice_history())
+    print("=== All voice ledger checks passed ===")
@@ -578,7 +578,8 @@ def get_events():
     try:
         guild_id = int(request.args.get('guild_id', 1234567890))  # Placeholder
         
-        events = run_async(get_db().get_all_events(guild_id))
+        # Events + participants in two queries
+        events = run_async(get_db().get_events_bulk([guild_id], active_only=False, limit_per_guild=50))[guild_id]
         
         result = []
         for event in events:
@@ -592,7 +593,7 @@ def get_events():
                 'creator_id': event.creator_id,
                 'active': event.active,
                 'created_at': event.created_at.isoformat() if event.created_at else None,
-                'participants_count': len(event.participants) if event.participants else 0
+                'participants_count': len(event.participants)
             }
             result.append(event_data)
         
@@ -671,7 +672,7 @@ def get_active_events():
     try:
         guild_id = int(request.args.get('guild_id', 1234567890))
         
-        events = run_async(get_db().get_active_events(guild_id))
+        events = run_async(get_db().get_events_bulk([guild_id], active_only=True))[guild_id]
         
         result = []
         for event in events:
@@ -681,7 +682,7 @@ def get_active_events():
                 'title': event.title,
                 'description': event.description,
                 'timestamp': event.timestamp.isoformat(),
-                'participants_count': len(event.participants) if event.participants else 0
+                'participants_count': len(event.participants)
             }
             result.append(event_data)
         
@@ -696,6 +697,75 @@ def get_active_events():
             'error': str(e)
         }), 500
 
+# ============================================
+# VOICE ENDPOINTS
+# ============================================
+
+def encode_voice_cursor(cursor):
+    """(joined_at, id) keyset cursor -> opaque string for the client"""
+    if cursor is None:
+        return None
+    joined_at, session_id = cursor
+    return f"{joined_at.isoformat()}_{session_id}"
+
+def decode_voice_cursor(value):
+    if not value:
+        return None
+    joined_at, session_id = value.rsplit('_', 1)
+    return datetime.fromisoformat(joined_at), int(session_id)
+
+@app.route('/api/voice/history', methods=['GET'])
+@require_api_key
+def get_voice_history():
+    """Voice sessions of a user, newest first (cursor pagination) or summed per day/week"""
+    try:
+        guild_id = int(request.args.get('guild_id', 1234567890))
+        user_id = int(request.args['user_id'])
+        bucket = request.args.get('bucket')
+        
+        if bucket:
+            days = min(int(request.args.get('days', 28)), 366)
+            rows = run_async(get_db().get_user_voice_buckets(guild_id, user_id, bucket=bucket, days=days))
+            return jsonify({
+                'success': True,
+                'bucket': bucket,
+                'data': [{
+                    'start': row['start'].isoformat(),
+                    'seconds': row['seconds'],
+                    'sessions': row['sessions']
+                } for row in rows]
+            })
+        
+        limit = min(int(request.args.get('page_size', config.DEFAULT_PAGE_SIZE)), config.MAX_PAGE_SIZE)
+        days = request.args.get('days')
+        page = run_async(get_db().get_user_voice_history(
+            guild_id, user_id,
+            days=int(days) if days else None,
+            limit=limit,
+            cursor=decode_voice_cursor(request.args.get('cursor'))
+        ))
+        
+        return jsonify({
+            'success': True,
+            'data': [{
+                'id': s.id,
+                'channel_id': str(s.channel_id) if s.channel_id else None,
+                'channel_name': s.channel_name,
+                'joined_at': s.joined_at.isoformat(),
+                'left_at': s.left_at.isoformat() if s.left_at else None,
+                'duration_seconds': s.duration_seconds
+            } for s in page.sessions],
+            'next_cursor': encode_voice_cursor(page.next_cursor)
+        })
+    except (KeyError, ValueError) as e:
+        return jsonify({'success': False, 'error': f"Invalid parameter: {e}"}), 400
+    except Exception as e:
+        logger.error(f"Error getting voice history: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 # ============================================
 # REPORTS ENDPOINTS
 # ============================================
@@ -709,6 +779,7 @@ def get_hall_of_fame():
         
         result = [{
             'record_type': r.record_type,
+            'steam_id': r.steam_id,
             'player_name': r.player_name,
             'value': r.value,
             'achieved_at': r.achieved_at.isoformat() if r.achieved_at else None
@@ -51,12 +51,16 @@ function initSocketIO() {
 
 // Handle event participant updates
 function handleEventParticipantUpdate(data) {
-    const { event_id, action, user_id, username, status } = data;
-
-    // Show toast notification
-    const actionText = status === 'attendee' ? 'joined' :
-        status === 'declined' ? 'declined' : 'marked maybe';
-    toast.info(`${username} ${actionText} event #${event_id}`);
+    const { event_id, action, user_id, username, status, count } = data;
+
+    // Show toast notification (bursts arrive batched, one message per event)
+    if (count > 1) {
+        toast.info(`${count} participant updates on event #${event_id}`);
+    } else {
+        const actionText = status === 'attendee' ? 'joined' :
+            (status === 'declined' || status === 'decline') ? 'declined' : 'marked maybe';
+        toast.info(`${username} ${actionText} event #${event_id}`);
+    }
 
     // If we're on the events page, refresh the data
     if (window.location.hash === '#events') {